@@ -10,7 +10,6 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, simpledialog
 from PIL import ImageTk, Image
 from tkinterdnd2 import *
-import shutil
 import psutil                 # CPU／メモリ取得用
 import threading              # バックグラウンドスレッド用
 import time                   # スリープ用
@@ -21,11 +20,20 @@ setup_logging(debug_mode=False)  # False=本番モード, True=デバッグモ
 logger = get_logger(__name__)
 
 # ロジックモジュールのインポート
-from GazoToolsLogic import load_config, save_config, HakoData, GazoPicture, calculate_file_hash, VectorBatchProcessor, save_ratings, save_tags, calculate_window_layout
+from GazoToolsLogic import load_config, save_config, HakoData, GazoPicture, calculate_file_hash, VectorBatchProcessor, save_ratings, save_tags, calculate_window_layout, flush_hash_index, decide_next_image, prepare_slide_image, flush_slide_vectors
+from lib.GazoToolsSlideShow import SlideShowPrefetcher
 from lib.GazoToolsBasicLib import tkConvertWinSize, blend_color
-from lib.GazoToolsLib import GetKoFolder, GetGazoFiles
 from lib.GazoToolsState import get_app_state
-from lib.GazoToolsImageCache import ImageCache, TileImageLoader
+from lib.GazoToolsImageCache import ImageCache, TileImageLoader, folder_preload_tag
+from lib.GazoToolsVectorJob import VectorJob
+from lib.GazoToolsVectorStore import VectorStore
+from lib.GazoToolsThumbStore import ThumbnailStore
+from lib.GazoToolsFileOps import bulk_move
+from lib.GazoToolsMoveJournal import MoveJournal
+from lib.GazoToolsFolderModel import FolderModel, COUNT_UNREADABLE
+from lib.GazoToolsFolderManifest import FolderManifest
+from lib.GazoToolsWatcher import FolderWatcher, apply_to_hash_index, ADDED, MODIFIED
+from lib.GazoToolsData import convert_vector_storage
 from lib.config_defaults import (
     calculate_folder_window_width, calculate_folder_window_height,
     calculate_file_window_width, calculate_file_window_height,
@@ -33,7 +41,10 @@ from lib.config_defaults import (
     get_move_grid_columns, MOVE_DESTINATION_SLOTS, MOVE_DESTINATION_MIN,
     MOVE_DESTINATION_OPTIONS, COLOR_MOVE_BG_2, SS_INTERVAL_OPTIONS, 
     MIN_AI_THRESHOLD, MAX_AI_THRESHOLD, DEFAULT_AI_THRESHOLD, COLOR_REGISTER_BG,
-    RATING_SIZE_PRESETS, RATING_POSITION_PRESETS
+    RATING_SIZE_PRESETS, RATING_POSITION_PRESETS, VECTOR_STORAGE_MODES,
+    SS_PREFETCH_RETRY_MS, IMAGE_CACHE_FULL_MB, IMAGE_CACHE_THUMB_MB,
+    SS_AI_PLAN_MODES, SS_AI_DIVERSITY_OPTIONS,
+    WATCH_AUTO_VECTORIZE, VECTOR_JOB_FILE
 )
 from lib.GazoToolsGUI import SplashWindow, SimilarityMoveDialog, VectorWindow
 
@@ -59,8 +70,8 @@ koRoot.after(1500, close_splash)
 
 # --- 画像キャッシュの初期化 ---
 try:
-    image_cache = ImageCache.get_instance(max_size_mb=256)
-    tile_loader = TileImageLoader(tile_size=(200, 200), cache_mb=256)
+    image_cache = ImageCache.get_instance(max_size_mb=IMAGE_CACHE_FULL_MB, thumb_size_mb=IMAGE_CACHE_THUMB_MB)
+    tile_loader = TileImageLoader(tile_size=(200, 200), cache_mb=IMAGE_CACHE_FULL_MB)
     logger.info("ImageCache と TileImageLoader を初期化しました")
 except Exception as e:
     logger.warning(f"ImageCache 初期化エラー: {e}")
@@ -146,8 +157,12 @@ def on_app_state_changed(event_name, data):
             logger.debug(f"CPU色が変更されました")
         
         elif event_name == "ss_include_subfolders_changed":
-            # 子フォルダ設定変更時
-            refresh_ui(DEFOLDER)
+            # 子フォルダ設定変更時（画像リストを作り直すのじゃ）
+            refresh_ui(DEFOLDER, force=True)
+        
+        elif event_name == "library_changed":
+            # フォルダ監視で見つけた変化を反映
+            on_library_changed(data["events"])
     
     except Exception as e:
         logger.error(f"UI更新コールバックエラー ({event_name}): {e}", exc_info=True)
@@ -155,56 +170,124 @@ def on_app_state_changed(event_name, data):
 # コールバックを登録
 app_state.register_callback(on_app_state_changed)
 
-def refresh_ui(new_path):
-    """パスに基づいてUIを全更新するのじゃ。のじゃ。"""
+def refresh_ui(new_path, force=False):
+    """パスに基づいてUIを更新するのじゃ。のじゃ。
+
+    別のフォルダに移ったとき（または force=True）は全部作り直し、
+    同じフォルダなら mtime が変わった分だけ読み直して、変わった行だけ直すのじゃ。
+    """
     global DEFOLDER
-    if not os.path.exists(new_path):
+    if not new_path or not os.path.exists(new_path):
         logger.warning(f"パスが存在しません: {new_path}")
         return
     
-    DEFOLDER = new_path
-    
+    navigated = force or folder_model.path is None or \
+        os.path.normcase(os.path.abspath(new_path)) != os.path.normcase(os.path.abspath(folder_model.path))
     try:
-        all_items = os.listdir(DEFOLDER)
-        folders = GetKoFolder(all_items, DEFOLDER)
-        files = GetGazoFiles(all_items, DEFOLDER)
-        logger.info(f"UI更新: {DEFOLDER} (フォルダ:{len(folders)}件, ファイル:{len(files)}件)")
+        if navigated:
+            folder_model.load(new_path)
+            diff = None
+        else:
+            diff = folder_model.refresh()
     except Exception as e:
         logger.error(f"再読み込みエラー: {e}", exc_info=True)
         messagebox.showerror("エラー", f"フォルダの読み込みに失敗しました:\n{e}")
         return
+    folders, files = folder_model.folders, folder_model.files
+    path_changed = new_path != DEFOLDER
+    previous_folder = DEFOLDER
+    DEFOLDER = new_path
 
     # AppState に反映
     app_state.set_current_files(files)
     app_state.set_current_folders(folders)
+    # 子フォルダの画像数は裏で数え直し、終わった行から直すのじゃ（変わっていなければ stat だけ）
+    request_folder_counts()
+    if not navigated and not diff:
+        return # 一覧は何も変わっていないのじゃ
     
-    data_manager.SetGazoFiles(files, DEFOLDER, include_subfolders=app_state.ss_include_subfolders)
-    GazoControl.SetFolder(DEFOLDER)
-    
-    koRoot.title("画像tools - " + DEFOLDER)
-    save_config(DEFOLDER)
+    if navigated or diff.file_edits:
+        data_manager.SetGazoFiles(files, DEFOLDER, include_subfolders=app_state.ss_include_subfolders)
+        ss_prefetcher.invalidate()
+    if navigated:
+        if image_cache is not None and previous_folder and path_changed:
+            # 前のフォルダの先読みだけ取り消すのじゃ（整列など他の先読みは続ける）
+            image_cache.cancel_preloads(tag=folder_preload_tag(previous_folder))
+        GazoControl.SetFolder(DEFOLDER)
+        # 子フォルダは、スライドショーに含めるときだけ見回るのじゃ
+        folder_watcher.watch([DEFOLDER], recursive=app_state.ss_include_subfolders)
+        koRoot.title("画像tools - " + DEFOLDER)
+    if path_changed:
+        save_config(DEFOLDER)
     
-    folder_listbox.delete(0, tk.END)
-    try:
-        current_name = os.path.basename(DEFOLDER) or DEFOLDER
-        folder_listbox.insert(tk.END, f"({len(files)}) [現在] {current_name}")
-    except:
-        folder_listbox.insert(tk.END, "(-) [現在] ???")
+    if navigated:
+        rebuild_listboxes()
+    else:
+        apply_folder_diff(diff)
 
-    for f in folders:
-        try:
-            sub_items = os.listdir(os.path.join(DEFOLDER, f))
-            count = len(GetGazoFiles(sub_items, os.path.join(DEFOLDER, f)))
-            folder_listbox.insert(tk.END, f"({count}) {f}")
-        except:
-            folder_listbox.insert(tk.END, f"(-) {f}")
+    if 'folder_win' in globals() and 'file_win' in globals():
+        adjust_window_layouts(folders, files)
+
+def folder_row_text(name):
+    """フォルダ一覧の1行分の表示なのじゃ。のじゃ。"""
+    count = folder_model.counts.get(name)
+    if count is None:
+        return f"(…) {name}" # まだ数えているのじゃ
+    if count == COUNT_UNREADABLE:
+        return f"(-) {name}"
+    return f"({count}) {name}"
+
+def request_folder_counts():
+    """子フォルダの画像数をスレッドプールで数えてもらうのじゃ。のじゃ。"""
+    folder_model.count_async(lambda path, name, count: koRoot.after(0, on_folder_count, path, name, count))
+
+def on_folder_count(path, name, count):
+    """数え終わった子フォルダの行だけ書き換えるのじゃ。のじゃ。"""
+    if not folder_model.set_count(path, name, count):
+        return
+    idx = folder_model.folders.index(name) + 1 # 先頭行は現在のフォルダ
+    folder_listbox.delete(idx)
+    folder_listbox.insert(idx, folder_row_text(name))
+
+def current_row_text():
+    """フォルダ一覧の先頭行（現在のフォルダ）の表示なのじゃ。のじゃ。"""
+    current_name = os.path.basename(DEFOLDER) or DEFOLDER
+    return f"({len(folder_model.files)}) [現在] {current_name}"
+
+def rebuild_listboxes():
+    """フォルダ一覧とファイル一覧を作り直すのじゃ。のじゃ。"""
+    folder_listbox.delete(0, tk.END)
+    folder_listbox.insert(tk.END, current_row_text())
+    for f in folder_model.folders:
+        folder_listbox.insert(tk.END, folder_row_text(f))
     
     file_listbox.delete(0, tk.END)
-    for f in files:
+    for f in folder_model.files:
         file_listbox.insert(tk.END, f)
 
-    if 'folder_win' in globals() and 'file_win' in globals():
-        adjust_window_layouts(folders, files)
+def apply_list_edits(listbox, edits, offset=0, text=str):
+    """list_edits の結果を Listbox に適用するのじゃ。のじゃ。"""
+    for edit in edits:
+        if edit[0] == "delete":
+            listbox.delete(edit[1] + offset)
+        else:
+            listbox.insert(edit[1] + offset, text(edit[2]))
+
+def apply_folder_diff(diff):
+    """差分だけを一覧に反映するのじゃ。のじゃ。"""
+    # 先頭行は現在のフォルダなので、子フォルダは1行ずらすのじゃ
+    apply_list_edits(folder_listbox, diff.folder_edits, offset=1, text=folder_row_text)
+    inserted = {edit[2] for edit in diff.folder_edits if edit[0] == "insert"}
+    for name in diff.changed_counts:
+        if name in inserted:
+            continue
+        idx = folder_model.folders.index(name) + 1
+        folder_listbox.delete(idx)
+        folder_listbox.insert(idx, folder_row_text(name))
+    if diff.file_edits:
+        folder_listbox.delete(0)
+        folder_listbox.insert(0, current_row_text())
+    apply_list_edits(file_listbox, diff.file_edits)
 
 def adjust_window_layouts(folders, files):
     """ウィンドウ配置の自動調整なのじゃ。のじゃ。"""
@@ -383,18 +466,10 @@ def create_file_list_window(parent, files, draw_func):
             def search_similar():
                 try:
                     target_dest = move_dest_list[move_reg_idx] if move_dest_list[move_reg_idx] else ""
-                    # move_callbackはexecute_moveでOK
-                    # refresh_callbackはこのウィンドウを更新する関数があればそれを渡すが、
-                    # ファイルリストは自動更新されない造りっぽいので、refresh= lambda p: draw_func(None) ?
-                    # draw_funcは画像を表示する関数なので違う。
-                    # リスト更新は... ファイルリストウィンドウ再生成？
-                    # まぁ移動機能メインじゃないのでNoneでも良いが、移動したら消えてほしい。
-                    
-                    # 簡易的に None でいく（移動時は手動でウィンドウ閉じて開き直してもらうか、
-                    # SmartMoveDialogが勝手にやってくれるのを期待）
-                    # execute_move は成功時に move_dest_count を更新したりするが、UI更新は...
-                    
-                    dialog = SimilarityMoveDialog(win, full_path, target_dest, DEFOLDER, execute_move, refresh_callback=None)
+                    # まとめて移動し、終わったらダイアログが1回だけ画面を更新するのじゃ
+                    dialog = SimilarityMoveDialog(win, full_path, target_dest, DEFOLDER,
+                                                  lambda paths, dest: execute_moves(paths, dest, refresh=False),
+                                                  refresh_callback=refresh_ui)
                 except Exception as e:
                     messagebox.showerror("エラー", f"類似画像検索起動エラー: {e}")
 
@@ -425,6 +500,8 @@ ss_mode = tk.BooleanVar(value=app_state.ss_mode)
 ss_interval = tk.IntVar(value=app_state.ss_interval)
 ss_ai_mode = tk.BooleanVar(value=app_state.ss_ai_mode)
 ss_ai_threshold = tk.DoubleVar(value=app_state.ss_ai_threshold)
+ss_ai_plan_mode = tk.StringVar(value=app_state.ss_ai_plan_mode)
+ss_ai_diversity = tk.DoubleVar(value=app_state.ss_ai_diversity)
 ss_include_subfolders = tk.BooleanVar(value=app_state.ss_include_subfolders)
 ss_after_id = None
 
@@ -461,28 +538,56 @@ def update_dd_display():
             if path: move_text_vars[i].set(f"{i+1}: {os.path.basename(path)}")
             else: move_text_vars[i].set(f"{i+1}: (未登録)")
 
+def get_ss_params():
+    """先読みスレッドに渡すスライドショーの設定を集めるのじゃ（メインスレッドで呼ぶのじゃ）。"""
+    return {
+        "screen_size": (koRoot.winfo_screenwidth(), koRoot.winfo_screenheight()),
+        "random_size": GazoControl.random_size.get(),
+        "ai_mode": ss_ai_mode.get(),
+        "threshold": ss_ai_threshold.get(),
+        "plan_mode": ss_ai_plan_mode.get(),
+        "diversity": ss_ai_diversity.get(),
+    }
+
 def auto_slideshow():
     global ss_after_id
     if ss_mode.get():
-        # Logicに次の画像を決定してもらう
-        next_image = decide_next_image(
-            data_manager, 
-            ss_ai_mode.get(), 
-            ss_ai_threshold.get()
-        )
-
-        GazoControl.Drawing(next_image)
+        # 次の画像は先読みスレッドが決めて準備しておくので、ここでは表示するだけなのじゃ
+        params = get_ss_params()
+        if params["ai_mode"]:
+            # AI再生順はここ（メインスレッド）から別スレッドで作らせ、先読みでは作らないのじゃ
+            data_manager.prepare_ai_playlist(params["plan_mode"], params["diversity"])
+        else:
+            data_manager.release_ai_playlist()
+        ss_prefetcher.start(params)
+        prepared = ss_prefetcher.next()
+        if prepared is None:
+            # 準備が間に合っていなければ、少し待ってから表示するのじゃ
+            ss_after_id = koRoot.after(SS_PREFETCH_RETRY_MS, auto_slideshow)
+            return
+
+        GazoControl.Drawing(prepared.file_name, prepared=prepared)
         ms = max(1000, ss_interval.get() * 1000)
         ss_after_id = koRoot.after(ms, auto_slideshow)
     else:
+        stop_slideshow_prefetch()
         ss_after_id = None
 
 def toggle_ss():
     global ss_after_id
     if ss_after_id:
         koRoot.after_cancel(ss_after_id)
+        ss_after_id = None
     if ss_mode.get():
         auto_slideshow()
+    else:
+        stop_slideshow_prefetch()
+
+def stop_slideshow_prefetch(timeout=None):
+    """先読みを止め、先読みで計算したベクトルの未保存分を書き出すのじゃ。のじゃ。"""
+    ss_prefetcher.stop(timeout)
+    data_manager.release_ai_playlist()
+    flush_slide_vectors(GazoControl.vectors_cache)
 
 def reset_move_destinations():
     """登録済みの移動先フォルダを全てリセットするのじゃ。のじゃ。"""
@@ -512,6 +617,8 @@ def on_closing_main():
         app_state.set_ss_interval(ss_interval.get())
         app_state.set_ss_ai_mode(ss_ai_mode.get())
         app_state.set_ss_ai_threshold(ss_ai_threshold.get())
+        app_state.set_ss_ai_plan_mode(ss_ai_plan_mode.get())
+        app_state.set_ss_ai_diversity(ss_ai_diversity.get())
         app_state.set_ss_include_subfolders(ss_include_subfolders.get())
         
         # AppState を設定ファイルに保存
@@ -527,6 +634,14 @@ def on_closing_main():
             else:
                 GazoControl.tag_dict[image_hash] = {"tag": "", "hint": "", "rating": None, "assigned_rating": rating_name}
         save_tags(GazoControl.tag_dict)
+        # 先読み・フォルダ監視・ベクトル化ジョブを止めてチェックポイントを書き出す
+        stop_slideshow_prefetch(1)
+        folder_watcher.stop(1)
+        stop_vector_job()
+        # ハッシュインデックスの未保存分を書き出す
+        flush_hash_index()
+        ThumbnailStore.get_instance().flush()
+        FolderManifest.get_instance().flush()
 
         logger.info("アプリケーション終了: 設定と評価データを保存しました")
     except Exception as e:
@@ -552,6 +667,20 @@ def disable_all_topmost():
 # 実体生成
 data_manager = HakoData(DEFOLDER)
 GazoControl = GazoPicture(koRoot, DEFOLDER)
+folder_model = FolderModel()
+
+def on_fs_events(events):
+    """フォルダ監視で届いた変化を反映するのじゃ（監視スレッドから呼ばれる）。"""
+    apply_to_hash_index(events)
+    koRoot.after(0, app_state.notify_library_changed, events)
+
+folder_watcher = FolderWatcher(on_fs_events)
+folder_watcher.start()
+ss_prefetcher = SlideShowPrefetcher(
+    lambda params: decide_next_image(data_manager, params["ai_mode"], params["threshold"],
+                                     params["plan_mode"], params["diversity"]),
+    lambda name, params: prepare_slide_image(name, data_manager.StartFolder, params["screen_size"],
+                                             params["random_size"], GazoControl.vectors_cache))
 GazoControl.random_pos.set(SAVED_SETTINGS.get("random_pos", False))
 GazoControl.random_size.set(SAVED_SETTINGS.get("random_size", False))
 koRoot.attributes("-topmost", SAVED_SETTINGS.get("topmost", True))
@@ -575,6 +704,16 @@ def set_cpu_high_color():
 # カラーブレンド関数は Logic に移動したので削除
 
 
+def format_image_cache_stats():
+    """ステータスバー用に、画像キャッシュのヒット率と使用量を文字列にするのじゃ。"""
+    if image_cache is None:
+        return ""
+    stats = image_cache.get_stats()
+    tiers = stats["tiers"]
+    return (f"  IMG: hit {stats['hit_rate']:.0%} ({stats['hits']}/{stats['hits'] + stats['misses']})"
+            f"  表示 {tiers['full']['size_mb']:.0f}/{tiers['full']['max_mb']:.0f} MB"
+            f"  サムネ {tiers['thumb']['size_mb']:.0f}/{tiers['thumb']['max_mb']:.0f} MB")
+
 # ★ ここからリソース監視スレッドを起動 ★
 # ★ ここからリソース監視スレッドを起動 ★
 def _update_resource_usage():
@@ -582,6 +721,7 @@ def _update_resource_usage():
         try:
             cpu = psutil.cpu_percent(interval=1)          # 1 秒ごとに測定
             mem = psutil.Process().memory_info().rss // (1024 * 1024)  # MB 単位
+            cache_text = format_image_cache_stats()
             
             # メインスレッドでUI更新を行うためのクロージャ
             def update_ui():
@@ -589,7 +729,7 @@ def _update_resource_usage():
                     # CPU 使用率に応じて背景色をブレンド
                     ratio = min(cpu / 100.0, 1.0)
                     bg = blend_color(cpu_low_color.get(), cpu_high_color.get(), ratio)
-                    status_label.config(text=f"CPU: {cpu}%  MEM: {mem} MB", bg=bg)
+                    status_label.config(text=f"CPU: {cpu}%  MEM: {mem} MB{cache_text}", bg=bg)
                 except Exception:
                     pass # アプリ終了時などにエラーになるのを防ぐ
 
@@ -716,6 +856,9 @@ def open_explorer():
 
 file_menu.add_command(label="エクスプローラーで開く(E)", command=open_explorer)
 file_menu.add_separator()
+file_menu.add_command(label="移動を元に戻す(Z)", command=lambda: undo_move())
+file_menu.add_command(label="移動をやり直す(Y)", command=lambda: redo_move())
+file_menu.add_separator()
 file_menu.add_command(label="終了(X)", command=on_closing_main)
 
 show_folder_win = tk.BooleanVar(value=app_state.show_folder_window)
@@ -917,14 +1060,31 @@ def set_ai_threshold():
 
 ss_sub.add_command(label="類似度の閾値を設定...", command=set_ai_threshold)
 
+# AI類似度順の再生順の作り方と多様性
+SS_AI_PLAN_MODE_LABELS = {
+    "walk": "近い画像をたどる",
+    "mmr": "似すぎを避けて並べる (MMR)",
+    "random_walk": "ランダムウォーク",
+}
+ss_plan_menu = tk.Menu(ss_sub, tearoff=0)
+ss_sub.add_cascade(label="AI再生順の作り方", menu=ss_plan_menu)
+for mode in SS_AI_PLAN_MODES:
+    ss_plan_menu.add_radiobutton(label=SS_AI_PLAN_MODE_LABELS.get(mode, mode), variable=ss_ai_plan_mode, value=mode,
+                                 command=lambda: app_state.set_ss_ai_plan_mode(ss_ai_plan_mode.get()))
+
+ss_diversity_menu = tk.Menu(ss_sub, tearoff=0)
+ss_sub.add_cascade(label="AI再生順の多様性", menu=ss_diversity_menu)
+for value in SS_AI_DIVERSITY_OPTIONS:
+    ss_diversity_menu.add_radiobutton(label="0（似ている順）" if value == 0 else f"{value}", variable=ss_ai_diversity,
+                                      value=value, command=lambda: app_state.set_ss_ai_diversity(ss_ai_diversity.get()))
+
 # 子フォルダを含める設定
 ss_sub.add_separator()
 
 def on_include_subfolders_change():
     """子フォルダを含める設定を変更した時の処理"""
+    # 現在のフォルダで画像リストを再構築するのは、変更通知を受けた refresh_ui がやるのじゃ
     app_state.set_ss_include_subfolders(ss_include_subfolders.get())
-    # 現在のフォルダで画像リストを再構築
-    refresh_ui(DEFOLDER)
 
 ss_sub.add_checkbutton(label="子フォルダの画像も含める", variable=ss_include_subfolders, command=on_include_subfolders_change)
 
@@ -934,33 +1094,159 @@ tools_menu = tk.Menu(menubar, tearoff=0)
 menubar.add_cascade(label="ツール(T)", menu=tools_menu)
 
 processor = None
-def run_vector_update():
-    """AIベクトル更新を実行するのじゃ。のじゃ。"""
+
+# プログレスコールバック
+def on_vector_progress(current, total, filename):
+    # メインスレッドでUI更新（after経由）
+    koRoot.after(0, lambda: koRoot.title(f"画像tools - {current}/{total} {filename} を解析中..."))
+
+# 完了コールバック
+def on_vector_finish(message):
+    def _finish_ui():
+        koRoot.title(f"画像tools - {DEFOLDER}")
+        messagebox.showinfo("完了", message)
+        queue_vectorization()
+    koRoot.after(0, _finish_ui)
+
+watch_vector_queue = set()  # フォルダ監視で増えた、ベクトル化待ちの画像
+
+def on_queue_vector_finish(message):
+    """フォルダ監視から始めたベクトル化の完了なのじゃ（ダイアログは出さないのじゃ）。"""
+    def _finish_ui():
+        koRoot.title(f"画像tools - {DEFOLDER}")
+        logger.info(f"増えた画像のベクトル化: {message}")
+        queue_vectorization()
+    koRoot.after(0, _finish_ui)
+
+def queue_vectorization(paths=()):
+    """増えた・変わった画像をバックグラウンドでベクトル化するのじゃ。のじゃ。
+
+    ベクトルが1件も無い（AI を使っていない）間は何もしないのじゃ。
+    ベクトル化中や中断したジョブがあるときは待たせておき、終わってからまとめて処理するのじゃ。
+    """
+    global processor
+    if not WATCH_AUTO_VECTORIZE:
+        return
+    watch_vector_queue.update(paths)
+    if not watch_vector_queue or (processor and processor.is_alive()) or os.path.exists(VECTOR_JOB_FILE):
+        return
+    if len(VectorStore.get_instance()) == 0:
+        watch_vector_queue.clear()
+        return
+    files = sorted(watch_vector_queue)
+    watch_vector_queue.clear()
+    processor = VectorBatchProcessor(DEFOLDER, on_vector_progress, on_queue_vector_finish, files=files)
+    processor.start()
+
+def on_library_changed(events):
+    """フォルダ監視で見つけた変化を一覧・スライドショー・ベクトル化待ちに反映するのじゃ。のじゃ。"""
+    current = os.path.normcase(os.path.abspath(DEFOLDER))
+    deeper = False
+    for event in events:
+        for path in (event.path, event.old_path):
+            if path and os.path.normcase(os.path.dirname(os.path.abspath(path))) != current:
+                deeper = True
+    # 現在のフォルダの一覧は mtime が変わった分だけ読み直すのじゃ（子フォルダの画像数も数え直す）
+    refresh_ui(DEFOLDER)
+    if deeper and app_state.ss_include_subfolders:
+        data_manager.SetGazoFiles(folder_model.files, DEFOLDER, include_subfolders=True)
+        ss_prefetcher.invalidate()
+    queue_vectorization([e.path for e in events if e.kind in (ADDED, MODIFIED) and not e.is_dir])
+
+def run_vector_update(include_all=False):
+    """AIベクトル更新を実行するのじゃ。のじゃ。
+
+    include_all=True の場合は、子フォルダと登録済みの移動先フォルダもまとめて処理するのじゃ。
+    """
     global processor
     if processor and processor.is_alive():
         messagebox.showinfo("情報", "既にバックグラウンドで処理中なのじゃ。")
         return
 
-    msg = "AI(MobileNetV3)を使って画像のベクトル化を行うのじゃ。\n処理はバックグラウンドで行われるので、ウィンドウ操作は継続できるのじゃ。\n\n開始しても良いかの？"
+    if include_all:
+        roots = [DEFOLDER] + [d for d in app_state.move_dest_list if d]
+        msg = (f"現在のフォルダ・子フォルダ・登録済みの移動先（{len(roots) - 1}件）を全てベクトル化するのじゃ。\n"
+               "よく開くフォルダから順に処理し、同じ内容の画像は1回だけ解析するのじゃ。\n\n開始しても良いかの？")
+    else:
+        roots = None
+        msg = "AI(MobileNetV3)を使って画像のベクトル化を行うのじゃ。\n処理はバックグラウンドで行われるので、ウィンドウ操作は継続できるのじゃ。\n\n開始しても良いかの？"
     if not messagebox.askyesno("確認", msg):
         return
 
-    # プログレスコールバック
-    def on_progress(current, total, filename):
-        # メインスレッドでUI更新（after経由）
-        koRoot.after(0, lambda: koRoot.title(f"画像tools - {current}/{total} {filename} を解析中..."))
-
-    # 完了コールバック
-    def on_finish(message):
-        def _finish_ui():
-            koRoot.title(f"画像tools - {DEFOLDER}")
-            messagebox.showinfo("完了", message)
-        koRoot.after(0, _finish_ui)
+    # ジョブファイルは1つだけなので、中断したジョブを黙って上書きしないのじゃ
+    unfinished = VectorJob.load()
+    if unfinished is not None and not unfinished.is_finished:
+        answer = messagebox.askyesnocancel(
+            "確認", f"前回中断したベクトル化ジョブが残っているのじゃ。\n"
+                    f"{unfinished.folder}（残り{len(unfinished.pending)}件）\n\n"
+                    "「はい」で中断したジョブを続きから再開、「いいえ」で破棄して新しく始めるのじゃ。")
+        if answer is None:
+            return
+        if answer:
+            processor = VectorBatchProcessor.resume(unfinished, on_vector_progress, on_vector_finish)
+            processor.start()
+            return
+
+    processor = VectorBatchProcessor(DEFOLDER, on_vector_progress, on_vector_finish,
+                                     roots=roots, recursive=include_all, replace=True)
+    processor.start()
 
-    processor = VectorBatchProcessor(DEFOLDER, on_progress, on_finish)
+def resume_vector_job():
+    """前回中断したベクトル化ジョブがあれば、バックグラウンドで続きから再開するのじゃ。"""
+    global processor
+    job = VectorJob.load()
+    if job is None:
+        return
+    if job.is_finished:
+        job.remove()
+        return
+    logger.info(f"中断されたベクトル化ジョブを再開します: 残り{len(job.pending)}件")
+    processor = VectorBatchProcessor.resume(job, on_vector_progress, on_vector_finish)
     processor.start()
 
+def stop_vector_job(timeout=10):
+    """終了時にベクトル化を止め、チェックポイントを書き出させるのじゃ。"""
+    if processor and processor.is_alive():
+        processor.stop()
+        processor.join(timeout)
+
 tools_menu.add_command(label="AIベクトルを更新・作成", command=run_vector_update)
+tools_menu.add_command(label="AIベクトルを更新・作成（子フォルダ・移動先も含む）", command=lambda: run_vector_update(include_all=True))
+
+# ベクトル保存形式（float16 / PCA 圧縮）
+storage_mode_var = tk.StringVar(value=VectorStore.get_instance().mode)
+
+def change_vector_storage():
+    """ベクトルの保存形式をバックグラウンドで変換するのじゃ。"""
+    mode = storage_mode_var.get()
+    current = VectorStore.get_instance().mode
+    if mode == current:
+        return
+    if processor and processor.is_alive():
+        messagebox.showinfo("情報", "ベクトル化の処理中は保存形式を変えられないのじゃ。")
+        storage_mode_var.set(current)
+        return
+    msg = (f"ベクトルの保存形式を {current} から {mode} に変換するのじゃ。\n"
+           "PCA 圧縮は元に戻せない（精度が落ちたまま）ので、戻すには再ベクトル化が必要なのじゃ。\n\n変換しても良いかの？")
+    if not messagebox.askyesno("確認", msg):
+        storage_mode_var.set(current)
+        return
+
+    def _convert():
+        try:
+            convert_vector_storage(mode)
+            koRoot.after(0, lambda: messagebox.showinfo("完了", f"ベクトルの保存形式を {mode} に変換したのじゃ。"))
+        except Exception as e:
+            logger.error(f"ベクトル保存形式の変換に失敗: {e}", exc_info=True)
+            err = str(e)
+            koRoot.after(0, lambda: (storage_mode_var.set(VectorStore.get_instance().mode),
+                                     messagebox.showerror("エラー", f"変換に失敗したのじゃ: {err}")))
+    threading.Thread(target=_convert, daemon=True).start()
+
+storage_sub = tk.Menu(tools_menu, tearoff=0)
+tools_menu.add_cascade(label="ベクトル保存形式", menu=storage_sub)
+for m in VECTOR_STORAGE_MODES:
+    storage_sub.add_radiobutton(label=m, variable=storage_mode_var, value=m, command=change_vector_storage)
 
 # 移動先フォルダ数の設定メニュー
 count_var = tk.IntVar(value=app_state.move_dest_count)
@@ -1187,9 +1473,9 @@ config_menu.add_command(label="評価UI設定...", command=open_rating_ui_settin
 config_menu.add_separator()
 config_menu.add_command(label="常に最前面(T) ON/OFF", command=lambda: koRoot.attributes("-topmost", not koRoot.attributes("-topmost")))
 
-all_items = os.listdir(DEFOLDER)
-folder_win, folder_listbox = create_folder_list_window(koRoot, GetKoFolder(all_items, DEFOLDER))
-file_win, file_listbox = create_file_list_window(koRoot, GetGazoFiles(all_items, DEFOLDER), GazoControl.Drawing)
+# 一覧の中身は下の refresh_ui で folder_model から入れるのじゃ
+folder_win, folder_listbox = create_folder_list_window(koRoot, [])
+file_win, file_listbox = create_file_list_window(koRoot, [], GazoControl.Drawing)
 # ベクトル表示用ウィンドウ
 vector_window = VectorWindow(koRoot)
 
@@ -1253,29 +1539,86 @@ lbl_reg.pack(fill=tk.BOTH, padx=5, pady=(5, 15)) # 15ピクセルの余白をあ
 move_frame = tk.Frame(koRoot)
 move_frame.pack(fill=tk.BOTH, padx=5, pady=(0, 5), expand=True)
 
-def execute_move(file_path, dest_folder, refresh=True):
+def execute_moves(file_paths, dest_folder, refresh=True):
+    """複数ファイルをまとめて移動し、最後に1回だけ画面を更新するのじゃ。のじゃ。
+
+    失敗したファイルは最後にまとめて表示するのじゃ。
+
+    Returns:
+        list: MoveResult のリスト（移動先が無効なら空）
+    """
     if not dest_folder or not os.path.exists(dest_folder):
         logger.error(f"移動先フォルダが無効: {dest_folder}")
         messagebox.showerror("エラー", "移動先フォルダが正しく登録されていないのじゃ！")
-        return
+        return []
     try:
-        filename = os.path.basename(file_path)
-        shutil.move(file_path, os.path.join(dest_folder, filename))
-        logger.info(f"ファイル移動成功: {filename} -> {dest_folder}")
-        if refresh:
-            refresh_ui(DEFOLDER)
-    except FileNotFoundError as e:
-        logger.error(f"ファイルが見つかりません: {file_path}")
-        messagebox.showerror("エラー", f"ファイルが見つかりません: {filename}")
-    except PermissionError as e:
-        logger.error(f"ファイル移動: 権限がありません: {file_path}")
-        messagebox.showerror("エラー", f"ファイルを移動する権限がありません: {filename}")
+        results = bulk_move(file_paths, dest_folder)
     except Exception as e:
-        logger.error(f"ファイル移動エラー: {file_path} -> {dest_folder}", exc_info=True)
+        logger.error(f"ファイル移動エラー: {dest_folder}", exc_info=True)
         messagebox.showerror("失敗", f"移動中にエラーが起きたのじゃ: {e}")
+        return []
+
+    # 移動できた分は1つのバッチとして履歴に残し、Ctrl+Z でまとめて元に戻せるようにするのじゃ
+    MoveJournal.get_instance().record(results)
+    show_move_failures(results)
+    if refresh and any(r.ok for r in results):
+        refresh_ui(DEFOLDER)
+    return results
+
+def show_move_failures(results, title="エラー"):
+    """移動できなかったファイルをまとめて表示するのじゃ。のじゃ。"""
+    failed = [r for r in results if not r.ok]
+    if not failed:
+        return
+    lines = [f"{os.path.basename(r.src)}: {r.error}" for r in failed[:10]]
+    if len(failed) > 10:
+        lines.append(f"...ほか {len(failed) - 10}件")
+    messagebox.showerror(title, f"{len(failed)}件のファイルを移動できなかったのじゃ:\n" + "\n".join(lines))
+
+def confirm_replay(title, pairs):
+    """元に戻す・やり直すで動くファイルを見せて、実行して良いか確認するのじゃ。のじゃ。"""
+    lines = [f"{os.path.basename(src)} → {os.path.dirname(dest)}" for src, dest in pairs[:10]]
+    if len(pairs) > 10:
+        lines.append(f"...ほか {len(pairs) - 10}件")
+    return messagebox.askyesno(title, f"{len(pairs)}件のファイルを移動するのじゃ。良いかの？\n" + "\n".join(lines))
+
+def undo_move():
+    """最後の一括移動を、確認してから元に戻すのじゃ。のじゃ。"""
+    journal = MoveJournal.get_instance()
+    pairs = journal.preview()
+    if not pairs:
+        logger.info("元に戻す移動はありません")
+        return
+    if not confirm_replay("元に戻す", pairs):
+        return
+    results = journal.undo()
+    if results is None:
+        return
+    show_move_failures(results, title="元に戻す")
+    refresh_ui(DEFOLDER)
+
+def redo_move():
+    """元に戻した一括移動を、確認してからやり直すのじゃ。のじゃ。"""
+    journal = MoveJournal.get_instance()
+    pairs = journal.preview(redo=True)
+    if not pairs:
+        logger.info("やり直す移動はありません")
+        return
+    if not confirm_replay("やり直し", pairs):
+        return
+    results = journal.redo()
+    if results is None:
+        return
+    show_move_failures(results, title="やり直し")
+    refresh_ui(DEFOLDER)
+
+def execute_move(file_path, dest_folder, refresh=True):
+    """1ファイルを移動するのじゃ。のじゃ。"""
+    results = execute_moves([file_path], dest_folder, refresh=refresh)
+    return bool(results) and results[0].ok
 
 # 移動処理コールバックをLogic側に登録
-GazoControl.set_move_callback(execute_move)
+GazoControl.set_move_callback(execute_moves)
 GazoControl.set_refresh_callback(refresh_ui)
 
 def rebuild_move_area():
@@ -1308,18 +1651,17 @@ def rebuild_move_area():
                 try:
                     # 複数ファイルのパース処理
                     files = koRoot.tk.splitlist(event.data)
-                    count = 0
+                    paths = []
                     for f in files:
                         p = os.path.normpath(f)
                         if os.path.isfile(p):
-                            execute_move(p, app_state.move_dest_list[idx], refresh=False)
-                            count += 1
+                            paths.append(p)
                         elif os.path.isdir(p):
                              messagebox.showwarning("注意", f"フォルダは移動できないのじゃ: {p}")
                     
-                    if count > 0:
-                        refresh_ui(DEFOLDER)
-                        logger.info(f"[BATCH MOVE] {count}個のファイルを移動して画面を更新")
+                    if paths:
+                        results = execute_moves(paths, app_state.move_dest_list[idx])
+                        logger.info(f"[BATCH MOVE] {sum(r.ok for r in results)}個のファイルを移動して画面を更新")
                 except Exception as e:
                     logger.error(f"ドロップ処理エラー: {e}", exc_info=True)
             return drop_handler
@@ -1391,6 +1733,24 @@ def on_ctrl_r(event):
     GazoControl.CloseAll()
     print("[HOTKEY] Ctrl+R: 全ての画像ウィンドウを閉じました")
 
+def is_text_input(widget):
+    """文字を入力する部品（Entry・Text など）なら True を返すのじゃ。のじゃ。"""
+    return isinstance(widget, (tk.Entry, tk.Text, tk.Spinbox))
+
+def on_ctrl_z(event):
+    """Ctrl + Z で最後の移動を元に戻すのじゃ（文字入力中はその部品の取り消しに任せる）。のじゃ。"""
+    if is_text_input(event.widget):
+        return
+    undo_move()
+    print("[HOTKEY] Ctrl+Z: 移動を元に戻しました")
+
+def on_ctrl_y(event):
+    """Ctrl + Y で元に戻した移動をやり直すのじゃ（文字入力中は何もしない）。のじゃ。"""
+    if is_text_input(event.widget):
+        return
+    redo_move()
+    print("[HOTKEY] Ctrl+Y: 移動をやり直しました")
+
 def on_space(event):
     GazoControl.Drawing(data_manager.RandamGazoSet())
 
@@ -1401,10 +1761,17 @@ koRoot.bind_all("<Control-r>", on_ctrl_r)
 koRoot.bind_all("<Control-e>", on_ctrl_e)
 koRoot.bind_all("<Control-t>", on_ctrl_t)
 koRoot.bind_all("<Control-i>", on_ctrl_i)
+# ファイルを動かすキーは、メイン画面と一覧ウィンドウの中だけで効くようにするのじゃ
+for move_win in (koRoot, folder_win, file_win):
+    move_win.bind("<Control-z>", on_ctrl_z)
+    move_win.bind("<Control-y>", on_ctrl_y)
 
 if ss_mode.get():
     koRoot.after(1000, auto_slideshow)
 
+# 中断されたベクトル化ジョブの再開（スプラッシュが閉じてから）
+koRoot.after(2000, resume_vector_job)
+
 
 def on_closing():
     """アプリ終了時の処理"""
@@ -1423,6 +1790,12 @@ def on_closing():
 
         cfg = app_state.to_dict()
         save_config(cfg["last_folder"], cfg["geometries"], cfg["settings"])
+        stop_slideshow_prefetch(1)
+        folder_watcher.stop(1)
+        stop_vector_job()
+        flush_hash_index()
+        ThumbnailStore.get_instance().flush()
+        FolderManifest.get_instance().flush()
         logger.info("アプリケーションを終了します (設定を保存しました)")
     except Exception as e:
         logger.error(f"終了時の保存エラー: {e}")
@@ -12,17 +12,25 @@ import tkinter as tk
 from tkinter import filedialog, simpledialog, messagebox
 from PIL import ImageTk, Image, ImageOps
 import math
+import time
+import threading
+import queue
 import ctypes
 from ctypes import wintypes
 from lib.GazoToolsLib import GetKoFolder, GetGazoFiles
 from lib.GazoToolsData import (
-    load_config, save_config, calculate_file_hash,
+    load_config, save_config, calculate_file_hash, get_hashes, peek_hashes, flush_hash_index,
     load_tags, save_tags, load_ratings, save_ratings,
     load_vectors, save_vectors, HakoData
 )
 from lib.GazoToolsAI import VectorEngine, VectorBatchProcessor
 from lib.GazoToolsState import get_app_state
 from lib.GazoToolsVectorInterpreter import get_interpreter
+from lib.GazoToolsSlideShow import PreparedImage
+from lib.GazoToolsImageCache import ImageCache, FIT_COVER
+
+# 整列の先読みに付ける目印（整列し直したとき、前回の残りだけを取り消すのじゃ）
+TILE_PRELOAD_TAG = "tile_windows"
 
 # ロギング設定 (循環参照回避のためここで行わない場合もあるが、Loggerは一般的に安全)
 from lib.GazoToolsLogger import LoggerManager
@@ -33,9 +41,202 @@ app_state = get_app_state()
 from lib.config_defaults import (
     calculate_folder_window_width, calculate_folder_window_height,
     calculate_file_window_width, calculate_file_window_height,
-    WINDOW_SPACING
+    WINDOW_SPACING, SS_VECTOR_SAVE_COUNT, SS_VECTOR_SAVE_INTERVAL, TILE_POLL_MS
 )
 
+# ----------------------------------------------------------------------
+# 画像の表示サイズ計算・表示準備
+# ----------------------------------------------------------------------
+def calculate_display_size(orig_w, orig_h, screen_w, screen_h, random_size=False):
+    """設定の最大・最小サイズに合わせた画像の表示サイズを計算するのじゃ。のじゃ。
+
+    Tk に触らないので、スライドショーの先読みスレッドからも呼べるのじゃ。
+
+    Returns:
+        tuple: (表示幅, 表示高さ, 倍率)
+    """
+    # 最大サイズの決定（0の場合は画面サイズの80%を使用）
+    if app_state.image_max_width > 0:
+        limit_w = app_state.image_max_width
+    else:
+        limit_w = screen_w * 0.8
+
+    if app_state.image_max_height > 0:
+        limit_h = app_state.image_max_height
+    else:
+        limit_h = screen_h * 0.8
+
+    # アスペクト比を維持してスケールを計算
+    scale = min(limit_w / orig_w, limit_h / orig_h)
+    new_w, new_h = int(orig_w * scale), int(orig_h * scale)
+
+    # 最小サイズを適用（元の画像が小さい場合に拡大）
+    if new_w < app_state.image_min_width and new_h < app_state.image_min_height:
+        # 最小サイズに合わせて拡大（アスペクト比を維持）
+        scale_w = app_state.image_min_width / orig_w
+        scale_h = app_state.image_min_height / orig_h
+        scale = max(scale_w, scale_h)
+        new_w, new_h = int(orig_w * scale), int(orig_h * scale)
+    elif new_w < app_state.image_min_width:
+        # 幅が最小サイズ未満の場合
+        scale = app_state.image_min_width / orig_w
+        new_w = app_state.image_min_width
+        new_h = int(orig_h * scale)
+    elif new_h < app_state.image_min_height:
+        # 高さが最小サイズ未満の場合
+        scale = app_state.image_min_height / orig_h
+        new_w = int(orig_w * scale)
+        new_h = app_state.image_min_height
+
+    # 最大サイズを再チェック（最小サイズ適用後の確認）
+    if app_state.image_max_width > 0 and new_w > app_state.image_max_width:
+        scale = app_state.image_max_width / new_w
+        new_w = app_state.image_max_width
+        new_h = int(new_h * scale)
+    if app_state.image_max_height > 0 and new_h > app_state.image_max_height:
+        scale = app_state.image_max_height / new_h
+        new_w = int(new_w * scale)
+        new_h = app_state.image_max_height
+
+    # ランダムサイズが有効な場合、スケールをランダムに変更
+    if random_size:
+        # 最小スケールと最大スケールを計算
+        min_scale_w = app_state.image_min_width / new_w if app_state.image_min_width > 0 and new_w > 0 else 0.5
+        min_scale_h = app_state.image_min_height / new_h if app_state.image_min_height > 0 and new_h > 0 else 0.5
+        min_scale = max(min_scale_w, min_scale_h)
+
+        # 最大サイズが設定されている場合
+        if app_state.image_max_width > 0 or app_state.image_max_height > 0:
+            max_scale_w = app_state.image_max_width / new_w if app_state.image_max_width > 0 and new_w > 0 else 2.0
+            max_scale_h = app_state.image_max_height / new_h if app_state.image_max_height > 0 and new_h > 0 else 2.0
+            max_scale = min(max_scale_w, max_scale_h)
+        else:
+            # 最大サイズが0の場合は画面サイズの80%を上限とする
+            max_scale_w = (screen_w * 0.8) / new_w if new_w > 0 else 2.0
+            max_scale_h = (screen_h * 0.8) / new_h if new_h > 0 else 2.0
+            max_scale = min(max_scale_w, max_scale_h)
+
+        # ランダムスケールを生成（最小と最大の間、ただし最小は0.5以上）
+        min_scale = max(min_scale, 0.5)
+        max_scale = max(max_scale, min_scale + 0.1)  # 最低限の範囲を確保
+        random_scale = random.uniform(min_scale, max_scale)
+        new_w = int(new_w * random_scale)
+        new_h = int(new_h * random_scale)
+
+        # 最小サイズを再チェック
+        if app_state.image_min_width > 0 and new_w < app_state.image_min_width:
+            scale = app_state.image_min_width / new_w if new_w > 0 else 1.0
+            new_w = app_state.image_min_width
+            new_h = int(new_h * scale)
+        if app_state.image_min_height > 0 and new_h < app_state.image_min_height:
+            scale = app_state.image_min_height / new_h if new_h > 0 else 1.0
+            new_w = int(new_w * scale)
+            new_h = app_state.image_min_height
+
+        # 最大サイズを再チェック
+        if app_state.image_max_width > 0 and new_w > app_state.image_max_width:
+            scale = app_state.image_max_width / new_w if new_w > 0 else 1.0
+            new_w = app_state.image_max_width
+            new_h = int(new_h * scale)
+        if app_state.image_max_height > 0 and new_h > app_state.image_max_height:
+            scale = app_state.image_max_height / new_h if new_h > 0 else 1.0
+            new_w = int(new_w * scale)
+            new_h = app_state.image_max_height
+
+    return new_w, new_h, scale
+
+
+def prepare_display_image(fileName, fullName, screen_size, random_size=False):
+    """画像を読み込み、表示サイズにリサイズしてハッシュを付けるのじゃ。のじゃ。
+
+    Args:
+        fileName (str): 画像リスト上の名前
+        fullName (str): 正規化したフルパス
+        screen_size (tuple): (画面幅, 画面高さ)
+        random_size (bool): ランダムサイズで表示するか
+
+    Returns:
+        PreparedImage: 表示の準備ができた画像
+    """
+    with Image.open(fullName) as img:
+        new_w, new_h, scale = calculate_display_size(img.width, img.height, screen_size[0], screen_size[1], random_size)
+    # 原寸でデコードせず、表示サイズに近い解像度でデコードしたものをキャッシュから受け取るのじゃ
+    img_resized = ImageCache.get_instance().get(fullName, (new_w, new_h))
+    return PreparedImage(fileName, fullName, img_resized, scale, calculate_file_hash(fullName))
+
+def prepare_slide_image(fileName, start_folder, screen_size, random_size=False, vectors=None):
+    """スライドショーの先読み用に、表示画像とベクトルを準備するのじゃ。のじゃ。
+
+    ワーカースレッドから呼ぶので、ベクトルが未登録ならここで計算してストアに追加しておくのじゃ。
+    （表示時にメインスレッドで AI を動かさずに済むのじゃ）
+    """
+    if os.path.isabs(fileName):
+        fullName = os.path.normcase(os.path.abspath(fileName))
+    else:
+        fullName = os.path.normcase(os.path.abspath(os.path.join(start_folder, fileName)))
+    prepared = prepare_display_image(fileName, fullName, screen_size, random_size)
+
+    if (vectors is not None and prepared.image_hash and prepared.image_hash not in vectors
+            and app_state.vector_display.get("enabled", True)
+            and app_state.vector_display.get("auto_vectorize", True)):
+        engine = VectorEngine.get_instance()
+        if engine.check_available():
+            vec = engine.get_image_feature(fullName)
+            if vec:
+                vectors[prepared.image_hash] = vec
+                flush_slide_vectors(vectors, force=False)
+    return prepared
+
+# 先読みで計算したベクトルは、1枚ごとではなくまとめて保存するのじゃ
+_slide_vector_lock = threading.Lock()
+_slide_vector_pending = 0
+_slide_vector_saved_at = time.monotonic()
+
+def flush_slide_vectors(vectors, force=True):
+    """先読みで追加したベクトルを保存するのじゃ。のじゃ。
+
+    force=False のときは SS_VECTOR_SAVE_COUNT 件溜まるか SS_VECTOR_SAVE_INTERVAL 秒経つまで
+    数えるだけにするのじゃ（保存のたびにインデックス全体を書き直すので）。
+    スライドショーを止めたときと終了時は force=True で呼ぶのじゃ。
+
+    Returns:
+        bool: 保存した場合 True
+    """
+    global _slide_vector_pending, _slide_vector_saved_at
+    with _slide_vector_lock:
+        if not force:
+            _slide_vector_pending += 1
+            if (_slide_vector_pending < SS_VECTOR_SAVE_COUNT
+                    and time.monotonic() - _slide_vector_saved_at < SS_VECTOR_SAVE_INTERVAL):
+                return False
+        elif _slide_vector_pending == 0:
+            return False
+        _slide_vector_pending = 0
+        _slide_vector_saved_at = time.monotonic()
+    try:
+        save_vectors(vectors)
+        return True
+    except Exception as e:
+        logger.warning(f"先読みベクトルの保存に失敗: {e}")
+        return False
+
+def decide_next_image(data_manager, ai_mode, threshold, plan_mode=None, diversity=None):
+    """スライドショーで次に表示する画像を決めるのじゃ。のじゃ。
+
+    Args:
+        data_manager (HakoData): 画像リストを持つデータクラス
+        ai_mode (bool): AI類似度順で再生するか（False ならランダム）
+        threshold (float): AI類似度順のときの類似度の閾値
+        plan_mode (str): AI類似度順の再生順の作り方（walk / mmr / random_walk、省略時は設定の値）
+        diversity (float): AI類似度順の多様性 0〜1（省略時は設定の値）
+
+    Returns:
+        str: 画像名（無ければ None）
+    """
+    if ai_mode:
+        return data_manager.GetNextAIImage(threshold, plan_mode, diversity)
+    return data_manager.RandamGazoSet()
+
 # ----------------------------------------------------------------------
 # 画面レイアウト計算ロジック
 # ----------------------------------------------------------------------
@@ -117,10 +318,19 @@ class GazoPicture():
         self._move_callback = None
         self._refresh_callback = None
 
+        # 整列（TileWindows）で先読みした画像の受け渡し
+        self._tile_results = queue.SimpleQueue()
+        self._tile_waiting = 0      # 受け取り待ちの件数（メインスレッドだけが触る）
+        self._tile_polling = False
+        self._tile_generation = 0   # 整列し直したら古い結果は捨てるのじゃ
+
     def set_move_callback(self, callback):
         """移動処理を実行するコールバックを設定するのじゃ。"""
     def set_move_callback(self, callback):
-        """移動処理を実行するコールバックを設定するのじゃ。"""
+        """移動処理を実行するコールバックを設定するのじゃ。
+
+        callback(パスのリスト, 移動先フォルダ, refresh=bool) は MoveResult のリストを返すのじゃ。
+        """
         self._move_callback = callback
 
     def set_refresh_callback(self, callback):
@@ -1048,7 +1258,11 @@ class GazoPicture():
         if GazoPicture._info_window:
             GazoPicture._info_window.withdraw()
 
-    def Drawing(self, fileName):
+    def Drawing(self, fileName, prepared=None):
+        """画像ウィンドウを開くのじゃ。のじゃ。
+
+        prepared (PreparedImage) を渡すと、デコード・リサイズ・ハッシュ計算を省略するのじゃ。
+        """
         if not fileName: return
         
         # 相対パスの場合はStartFolderと結合、フルパスの場合はそのまま使用
@@ -1069,102 +1283,13 @@ class GazoPicture():
                 del self.open_windows[fullName]
 
         try:
-            with Image.open(fullName) as img:
-                orig_w, orig_h = img.width, img.height
-                screen_w = self.parent.winfo_screenwidth()
-                screen_h = self.parent.winfo_screenheight()
-                
-                # 最大サイズの決定（0の場合は画面サイズの80%を使用）
-                if app_state.image_max_width > 0:
-                    limit_w = app_state.image_max_width
-                else:
-                    limit_w = screen_w * 0.8
-                
-                if app_state.image_max_height > 0:
-                    limit_h = app_state.image_max_height
-                else:
-                    limit_h = screen_h * 0.8
-                
-                # アスペクト比を維持してスケールを計算
-                scale = min(limit_w / orig_w, limit_h / orig_h)
-                new_w, new_h = int(orig_w * scale), int(orig_h * scale)
-                
-                # 最小サイズを適用（元の画像が小さい場合に拡大）
-                if new_w < app_state.image_min_width and new_h < app_state.image_min_height:
-                    # 最小サイズに合わせて拡大（アスペクト比を維持）
-                    scale_w = app_state.image_min_width / orig_w
-                    scale_h = app_state.image_min_height / orig_h
-                    scale = max(scale_w, scale_h)
-                    new_w, new_h = int(orig_w * scale), int(orig_h * scale)
-                elif new_w < app_state.image_min_width:
-                    # 幅が最小サイズ未満の場合
-                    scale = app_state.image_min_width / orig_w
-                    new_w = app_state.image_min_width
-                    new_h = int(orig_h * scale)
-                elif new_h < app_state.image_min_height:
-                    # 高さが最小サイズ未満の場合
-                    scale = app_state.image_min_height / orig_h
-                    new_w = int(orig_w * scale)
-                    new_h = app_state.image_min_height
-                
-                # 最大サイズを再チェック（最小サイズ適用後の確認）
-                if app_state.image_max_width > 0 and new_w > app_state.image_max_width:
-                    scale = app_state.image_max_width / new_w
-                    new_w = app_state.image_max_width
-                    new_h = int(new_h * scale)
-                if app_state.image_max_height > 0 and new_h > app_state.image_max_height:
-                    scale = app_state.image_max_height / new_h
-                    new_w = int(new_w * scale)
-                    new_h = app_state.image_max_height
-
-                # ランダムサイズが有効な場合、スケールをランダムに変更
-                if self.random_size.get():
-                    # 最小スケールと最大スケールを計算
-                    min_scale_w = app_state.image_min_width / new_w if app_state.image_min_width > 0 and new_w > 0 else 0.5
-                    min_scale_h = app_state.image_min_height / new_h if app_state.image_min_height > 0 and new_h > 0 else 0.5
-                    min_scale = max(min_scale_w, min_scale_h)
-                    
-                    # 最大サイズが設定されている場合
-                    if app_state.image_max_width > 0 or app_state.image_max_height > 0:
-                        max_scale_w = app_state.image_max_width / new_w if app_state.image_max_width > 0 and new_w > 0 else 2.0
-                        max_scale_h = app_state.image_max_height / new_h if app_state.image_max_height > 0 and new_h > 0 else 2.0
-                        max_scale = min(max_scale_w, max_scale_h)
-                    else:
-                        # 最大サイズが0の場合は画面サイズの80%を上限とする
-                        max_scale_w = (screen_w * 0.8) / new_w if new_w > 0 else 2.0
-                        max_scale_h = (screen_h * 0.8) / new_h if new_h > 0 else 2.0
-                        max_scale = min(max_scale_w, max_scale_h)
-                    
-                    # ランダムスケールを生成（最小と最大の間、ただし最小は0.5以上）
-                    min_scale = max(min_scale, 0.5)
-                    max_scale = max(max_scale, min_scale + 0.1)  # 最低限の範囲を確保
-                    random_scale = random.uniform(min_scale, max_scale)
-                    new_w = int(new_w * random_scale)
-                    new_h = int(new_h * random_scale)
-                    
-                    # 最小サイズを再チェック
-                    if app_state.image_min_width > 0 and new_w < app_state.image_min_width:
-                        scale = app_state.image_min_width / new_w if new_w > 0 else 1.0
-                        new_w = app_state.image_min_width
-                        new_h = int(new_h * scale)
-                    if app_state.image_min_height > 0 and new_h < app_state.image_min_height:
-                        scale = app_state.image_min_height / new_h if new_h > 0 else 1.0
-                        new_w = int(new_w * scale)
-                        new_h = app_state.image_min_height
-                    
-                    # 最大サイズを再チェック
-                    if app_state.image_max_width > 0 and new_w > app_state.image_max_width:
-                        scale = app_state.image_max_width / new_w if new_w > 0 else 1.0
-                        new_w = app_state.image_max_width
-                        new_h = int(new_h * scale)
-                    if app_state.image_max_height > 0 and new_h > app_state.image_max_height:
-                        scale = app_state.image_max_height / new_h if new_h > 0 else 1.0
-                        new_w = int(new_w * scale)
-                        new_h = app_state.image_max_height
-
-                img_resized = img.resize((new_w, new_h), Image.LANCZOS)
-                tkimg = ImageTk.PhotoImage(img_resized)
-                del img_resized # 不要になったので即座に掃除するのじゃ
+            screen_w = self.parent.winfo_screenwidth()
+            screen_h = self.parent.winfo_screenheight()
+            if prepared is None:
+                prepared = prepare_display_image(fileName, fullName, (screen_w, screen_h), self.random_size.get())
+            new_w, new_h = prepared.size
+            scale = prepared.scale
+            tkimg = ImageTk.PhotoImage(prepared.image)
             
             # 表示位置の計算
             if self.random_pos.get():
@@ -1198,7 +1323,7 @@ class GazoPicture():
 
             # ハッシュ計算とパス保持（後の処理で使用）
             win._image_path = fullName
-            win._image_hash = calculate_file_hash(fullName)
+            win._image_hash = prepared.image_hash or calculate_file_hash(fullName)
 
             # 表示するUI要素によって高さを動的に調整
             text_area_h = 0
@@ -1380,17 +1505,18 @@ class GazoPicture():
                 
                 # 移動コールバックラッパー（共通化）
                 def create_wrapped_move_cb():
-                    def wrapped_move_cb(f_path, d_folder, refresh=True):
-                        if self._move_callback:
-                            self._move_callback(f_path, d_folder, refresh)
+                    def wrapped_move_cb(f_paths, d_folder):
+                        # 画面の更新はダイアログが最後に1回だけ行うのじゃ
+                        results = self._move_callback(f_paths, d_folder, refresh=False) if self._move_callback else []
                         
                         # 移動したファイルが表示中の画像ならウィンドウを閉じる
-                        if f_path == fullName:
+                        if any(r.ok and r.src == fullName for r in results):
                             try:
                                 win.destroy()
                             except: pass
                             if fullName in self.open_windows:
                                 del self.open_windows[fullName]
+                        return results
                     return wrapped_move_cb
 
                 def make_move_func(dest):
@@ -1519,44 +1645,81 @@ class GazoPicture():
         # 四隅を優先したいという前回の魂を継承し、端の領域から順に画像を割り当てるのじゃ
         # (rectsの順序は分割アルゴリズム上、それなりに端から並ぶはずなのじゃ)
         
-        for idx, (fullName, win) in enumerate(win_list):
-            if idx >= len(rects): break
+        # 全ての窓の画像を1つの先読みにまとめ、使う順（端の領域から）に読み込むのじゃ
+        # アスペクト比を維持しつつ領域を完全に埋める（クロップあり）。同じ配置ならキャッシュから返るのじゃ
+        # Tk のスレッドは待たず、読み終わった窓から順に _poll_tiles で配置するのじゃ
+        placements = list(zip(win_list, rects))
+        cache = ImageCache.get_instance()
+        cache.cancel_preloads(tag=TILE_PRELOAD_TAG)  # 前回の整列の残りはもう要らないのじゃ
+        self._tile_generation += 1
+        generation = self._tile_generation
+        futures = cache.preload_async([fullName for (fullName, _), _ in placements],
+                                      [(rect[2], rect[3]) for _, rect in placements],
+                                      fit=FIT_COVER, tag=TILE_PRELOAD_TAG)
+        self._tile_waiting += len(futures)
+        for placement, future in zip(placements, futures):
+            future.add_done_callback(
+                lambda f, placement=placement: self._tile_results.put((generation, placement, f)))
+        if not self._tile_polling:
+            self._tile_polling = True
+            self.parent.after(TILE_POLL_MS, self._poll_tiles)
+
+    def _poll_tiles(self):
+        """先読みスレッドから届いた画像で窓を配置するのじゃ（メインスレッドで呼ぶ）。
+
+        受け取り待ちが残っている間だけ、TILE_POLL_MS ごとに呼び直すのじゃ。
+        """
+        while True:
             try:
-                rx, ry, rw, rh = rects[idx]
-                
-                # 画像を読み込んで「びっちり」させるのじゃ
-                with Image.open(fullName) as img:
-                    # ImageOps.fit を使ってアスペクト比を維持しつつ領域を完全に埋める（クロップあり）
-                    img_fitted = ImageOps.fit(img, (rw, rh), Image.LANCZOS)
-                    tkimg = ImageTk.PhotoImage(img_fitted)
-                    del img_fitted
-                
-                # ウィンドウの更新（枠なし！）
-                win.overrideredirect(True)
-                win.geometry(f"{rw}x{rh}+{rx}+{ry}")
-                
-                # キャンバスの更新
-                canvas = win.winfo_children()[0]
-                canvas.config(width=rw, height=rh)
-                canvas.delete("all")
-                canvas.image = tkimg
-                canvas.create_image(0, 0, image=tkimg, anchor=tk.NW)
-                
-                # ドラッグ情報の更新（枠なし移動を維持）
-                def start_drag_puz(event, target_win):
-                    target_win._drag_start_x = event.x_root - target_win.winfo_x()
-                    target_win._drag_start_y = event.y_root - target_win.winfo_y()
-                def do_drag_puz(event, target_win):
-                    nx = event.x_root - target_win._drag_start_x
-                    ny = event.y_root - target_win._drag_start_y
-                    target_win.geometry(f"+{nx}+{ny}")
-                
-                canvas.bind("<Button-1>", lambda e, w=win: start_drag_puz(e, w))
-                canvas.bind("<B1-Motion>", lambda e, w=win: do_drag_puz(e, w))
+                generation, placement, future = self._tile_results.get_nowait()
+            except queue.Empty:
+                break
+            self._tile_waiting -= 1
+            if generation == self._tile_generation and not future.cancelled():
+                self._place_tile(placement, future)
+        if self._tile_waiting > 0:
+            try:
+                self.parent.after(TILE_POLL_MS, self._poll_tiles)
+                return
+            except tk.TclError:
+                pass # アプリを閉じた後なのじゃ
+        self._tile_polling = False
+
+    def _place_tile(self, placement, future):
+        """読み込んだ画像で1つの窓を領域いっぱいに配置するのじゃ（メインスレッドで呼ぶ）。"""
+        (fullName, win), (rx, ry, rw, rh) = placement
+        try:
+            # 画像を読み込んで「びっちり」させるのじゃ
+            img_fitted = future.result()
+            tkimg = ImageTk.PhotoImage(img_fitted)
+            del img_fitted
+
+            # ウィンドウの更新（枠なし！）
+            win.overrideredirect(True)
+            win.geometry(f"{rw}x{rh}+{rx}+{ry}")
+
+            # キャンバスの更新
+            canvas = win.winfo_children()[0]
+            canvas.config(width=rw, height=rh)
+            canvas.delete("all")
+            canvas.image = tkimg
+            canvas.create_image(0, 0, image=tkimg, anchor=tk.NW)
 
-                print(f"[PUZZLE] {os.path.basename(fullName)} を {rw}x{rh}@{rx},{ry} に敷き詰めたのじゃ。")
-            except Exception as e:
-                print(f"パズル整列エラー({fullName}): {e}")
+            # ドラッグ情報の更新（枠なし移動を維持）
+            def start_drag_puz(event, target_win):
+                target_win._drag_start_x = event.x_root - target_win.winfo_x()
+                target_win._drag_start_y = event.y_root - target_win.winfo_y()
+            def do_drag_puz(event, target_win):
+                nx = event.x_root - target_win._drag_start_x
+                ny = event.y_root - target_win._drag_start_y
+                target_win.geometry(f"+{nx}+{ny}")
+
+            canvas.bind("<Button-1>", lambda e, w=win: start_drag_puz(e, w))
+            canvas.bind("<B1-Motion>", lambda e, w=win: do_drag_puz(e, w))
+
+            print(f"[PUZZLE] {os.path.basename(fullName)} を {rw}x{rh}@{rx},{ry} に敷き詰めたのじゃ。")
+        except Exception as e:
+            print(f"パズル整列エラー({fullName}): {e}")
 
 
 
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+GazoTools 画像デコードのベンチマークスクリプト
+
+原寸デコード + LANCZOS（従来の方法）と、draft / reduce による縮小デコード + LANCZOS の
+1枚あたりの時間を比較します。
+
+使い方:
+    python benchmark_decode.py                 # ダミー画像（40MP 相当）で比較
+    python benchmark_decode.py 画像1 画像2 ...  # 手元の画像で比較
+"""
+
+import time
+import sys
+from pathlib import Path
+from PIL import Image
+from lib.GazoToolsImageDecode import decode_to_size
+
+SCREEN_SIZE = (1920, 1080)  # 表示上限は画面の80%（Drawing と同じ）
+REPEAT = 3
+
+
+def create_sample_images():
+    """テスト用の大きなダミー画像（JPEG / PNG）を作成"""
+    import numpy as np
+
+    test_dir = Path("test_images")
+    test_dir.mkdir(exist_ok=True)
+
+    # なめらかなグラデーション + ノイズ（写真に近い圧縮率になるように）
+    w, h = 7728, 5152  # 約40メガピクセル
+    y, x = np.mgrid[0:h, 0:w]
+    base = np.stack([x * 255 // w, y * 255 // h, (x + y) * 255 // (w + h)], axis=-1)
+    noise = np.random.randint(0, 16, (h, w, 3))
+    img = Image.fromarray((base + noise).clip(0, 255).astype(np.uint8))
+
+    paths = []
+    for ext, kwargs in ((".jpg", {"quality": 90}), (".png", {"compress_level": 1})):
+        path = test_dir / f"bench_40mp{ext}"
+        if not path.exists():
+            img.save(path, **kwargs)
+        paths.append(str(path))
+    return paths
+
+
+def target_size(img):
+    """画面の80%に収まるサイズ（アスペクト比維持）"""
+    limit_w, limit_h = SCREEN_SIZE[0] * 0.8, SCREEN_SIZE[1] * 0.8
+    scale = min(limit_w / img.width, limit_h / img.height)
+    return int(img.width * scale), int(img.height * scale)
+
+
+def decode_full(path):
+    """従来の方法: 原寸でデコードしてから LANCZOS"""
+    with Image.open(path) as img:
+        return img.resize(target_size(img), Image.LANCZOS)
+
+
+def decode_reduced(path):
+    """縮小デコード: draft / reduce で目標サイズ付近まで縮めてから LANCZOS"""
+    with Image.open(path) as img:
+        return decode_to_size(img, target_size(img))
+
+
+def measure(func, path):
+    """REPEAT 回実行した中央値（秒）"""
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func(path)
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2]
+
+
+def main():
+    paths = sys.argv[1:] or create_sample_images()
+
+    print("\n" + "=" * 70)
+    print("GazoTools 画像デコードベンチマーク")
+    print("=" * 70)
+    print(f"{'ファイル':<28}{'原寸':>8}{'従来(ms)':>12}{'縮小(ms)':>12}{'高速化':>10}")
+
+    for path in paths:
+        with Image.open(path) as img:
+            size = f"{img.width * img.height / 1e6:.0f}MP"
+        full = measure(decode_full, path)
+        reduced = measure(decode_reduced, path)
+        print(f"{Path(path).name[:27]:<28}{size:>8}{full * 1000:>12.1f}{reduced * 1000:>12.1f}{full / reduced:>9.1f}倍")
+
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@
 機能: AI (MobileNetV3) を使用した軽量な画像ベクトル化ロジックを提供するクラスなのじゃ
 '''
 from PIL import Image
+import numpy as np
 import torch
 from torchvision import models, transforms
 import os
@@ -14,9 +15,23 @@ from collections import OrderedDict
 from .GazoToolsExceptions import AIModelError, ImageLoadError, VectorProcessingError
 from .GazoToolsLogger import LoggerManager
 import time
-from lib.GazoToolsData import load_vectors, save_vectors, calculate_file_hash
-from lib.GazoToolsLib import GetGazoFiles
+from lib.GazoToolsData import (
+    load_vectors, save_vectors, calculate_file_hash, update_ann_index, flush_hash_index, save_hash_index_changes
+)
+from lib.GazoToolsLib import CollapseRoots
+from lib.GazoToolsFolderManifest import FolderManifest
 from lib.GazoToolsExceptions import FileHashError
+from lib.GazoToolsSimilarity import SimilarityIndex, normalize_vector
+from lib.GazoToolsVectorPipeline import VectorPipeline
+from lib.GazoToolsVectorStore import VectorStore
+from lib.GazoToolsVectorJob import VectorJob, listing_digest
+from lib.GazoToolsInference import (
+    select_inference_model, cosine_parity, to_channels_last, parity_key, load_parity, save_parity,
+    INFERENCE_MODE_FLOAT32
+)
+from lib.GazoToolsHashIndex import HashIndex
+from lib.config_defaults import VECTOR_CHECKPOINT_COUNT, VECTOR_CHECKPOINT_INTERVAL, INFERENCE_PARITY_SAMPLES
+from lib.GazoToolsState import get_app_state
 
 
 logger = LoggerManager.get_logger(__name__)
@@ -34,12 +49,16 @@ class VectorEngine:
                 cls._instance = cls()
         return cls._instance
 
-    def __init__(self, debug_mode=False, cache_size=256):
+    def __init__(self, debug_mode=False, cache_size=256, inference_mode=None, channels_last=None,
+                 parity_tolerance=None):
         """モデルを読み込むのじゃ。初回はダウンロードが走るかもしれないのじゃ。
         
         Args:
             debug_mode (bool): デバッグログを出力するか
             cache_size (int): ベクトルキャッシュの最大サイズ（LRU）
+            inference_mode (str): 推論モード（省略時は AppState の設定）
+            channels_last (bool): channels_last で推論するか（省略時は AppState の設定）
+            parity_tolerance (float): 高速モードの float32 とのコサイン類似度の下限（省略時は AppState の設定）
         """
         self.debug_mode = debug_mode
         self.cache_size = cache_size
@@ -86,12 +105,97 @@ class VectorEngine:
             # メモリ最適化：勾配計算を無効化
             torch.set_grad_enabled(False)
             
+            # 推論モード（量子化・jit・channels_last）を適用するのじゃ
+            app_state = get_app_state()
+            self._apply_inference_mode(
+                inference_mode or app_state.ai_inference_mode,
+                app_state.ai_channels_last if channels_last is None else channels_last,
+                app_state.ai_parity_tolerance if parity_tolerance is None else parity_tolerance)
+            
             self.available = True
             logger.info("AIモデルの準備が全て正常に完了したのじゃ！")
         except Exception as e:
             logger.error(f"AIモデルの読み込み手順でエラーが発生したのじゃ: {e}", exc_info=True)
             raise AIModelError(f"Failed to initialize AI model: {e}") from e
 
+    def _apply_inference_mode(self, mode, channels_last, tolerance):
+        """float32 モデルから推論用モデルを作り、パリティチェックに通れば差し替えるのじゃ。
+
+        パリティはライブラリの実画像で確かめ、結果はモデル・モードごとに記録しておくので、
+        2回目からは余分な推論をしないのじゃ。
+        """
+        self.model_fp32 = self.model
+        self.inference_mode = INFERENCE_MODE_FLOAT32
+        self.channels_last = False
+        self.parity = None
+        if self.device.type != "cpu":
+            if mode != INFERENCE_MODE_FLOAT32:
+                logger.info(f"推論モード '{mode}' は CPU 専用なので、{self.device} では float32 で推論するのじゃ")
+            return
+        if mode == INFERENCE_MODE_FLOAT32 and not channels_last:
+            return
+
+        key = parity_key(str(self.weights), mode, channels_last)
+        parity = load_parity(key)
+        samples = self._parity_samples() if parity is None else None
+        if samples is None:
+            # jit.trace の入力例は形が合えば良いので、実画像が無ければ乱数で済ませるのじゃ
+            example = torch.randn(1, 3, 224, 224, generator=torch.Generator().manual_seed(0))
+        else:
+            example = samples[:1]
+        if parity is None and samples is None:
+            logger.warning(f"パリティ確認用の実画像が無いので、推論モード '{mode}' は float32 で推論するのじゃ"
+                           "（ベクトル化した画像ができたら次回確かめるのじゃ）")
+            return
+        self.model, self.inference_mode, self.channels_last, self.parity = select_inference_model(
+            self.model_fp32, mode, example, tolerance,
+            channels_last=channels_last, parity_inputs=samples, parity=parity)
+        if samples is not None and self.parity is not None:
+            save_parity(key, self.parity, len(samples))
+
+    def _parity_samples(self, count=INFERENCE_PARITY_SAMPLES):
+        """パリティ確認用に、ベクトル化済みの実画像を count 枚まで前処理して返すのじゃ。
+
+        Returns:
+            torch.Tensor: shape=(n, 3, 224, 224)。見つからなければ None
+        """
+        store = VectorStore.get_instance()
+        batch = []
+        for path, entry in list(HashIndex.get_instance().entries.items()):
+            if len(batch) >= count:
+                break
+            if entry[3] not in store or not os.path.exists(path):
+                continue
+            try:
+                with Image.open(path) as img:
+                    batch.append(self.preprocess(img.convert("RGB")))
+            except (OSError, ValueError) as e:
+                logger.debug(f"パリティ確認用の画像を読めません: {path} - {e}")
+        return torch.stack(batch) if batch else None
+
+    def _to_input(self, input_batch):
+        """推論モードに合わせて入力テンソルをデバイス・メモリ配置に載せるのじゃ。"""
+        input_batch = input_batch.to(self.device)
+        if self.channels_last:
+            input_batch = to_channels_last(input_batch)
+        return input_batch
+
+    def check_parity(self, input_batch=None):
+        """現在の推論モデルと float32 モデルの出力のコサイン類似度（最小値）を返すのじゃ。
+
+        Args:
+            input_batch (torch.Tensor): 前処理済みの入力（省略時はライブラリの実画像）
+
+        Returns:
+            float: コサイン類似度の最小値（確かめる画像が無ければ None）
+        """
+        if input_batch is None:
+            input_batch = self._parity_samples()
+            if input_batch is None:
+                return None
+        input_batch = input_batch.to(self.device)
+        return cosine_parity(self.model_fp32, self.model, input_batch, self.channels_last)
+
     def check_available(self):
         return self.available
 
@@ -161,7 +265,7 @@ class VectorEngine:
                 logger.debug(f"画像の前処理を行うのじゃ: {image.size}")
             
             input_tensor = self.preprocess(image)
-            input_batch = input_tensor.unsqueeze(0).to(self.device)
+            input_batch = self._to_input(input_tensor.unsqueeze(0))
 
             if self.debug_mode:
                 logger.debug("AIモデルで推論を実行するのじゃ。")
@@ -246,22 +350,11 @@ class VectorEngine:
                 if not images:
                     continue
                 
-                # 前処理（画像をテンソルに変換）
+                # 前処理（画像をテンソルに変換）してまとめて推論するのじゃ
                 input_tensors = [self.preprocess(img) for img in images]
-                input_batch = torch.stack(input_tensors).to(self.device)
-                
-                # バッチ推論
-                with torch.no_grad():
-                    outputs = self.model(input_batch)
+                vectors = self.infer_tensor_batch(torch.stack(input_tensors))
                 
-                # L2正規化と結果の収集
-                for i, (path, output) in enumerate(zip(valid_paths, outputs)):
-                    feature_vector = output
-                    norm = feature_vector.norm(p=2)
-                    if norm > 0:
-                        feature_vector = feature_vector / norm
-                    
-                    vec_list = feature_vector.tolist()
+                for path, vec_list in zip(valid_paths, vectors):
                     results.append((path, vec_list))
                     
                     if self.debug_mode:
@@ -274,17 +367,38 @@ class VectorEngine:
             logger.error(f"バッチ処理中にエラー: {e}", exc_info=True)
             raise VectorProcessingError(f"Failed to batch process images: {e}") from e
 
+    def infer_tensor_batch(self, input_batch):
+        """前処理済みのテンソルをまとめて推論し、L2正規化したベクトルのリストを返すのじゃ。
+
+        Args:
+            input_batch (torch.Tensor or np.ndarray): shape=(n, 3, H, W) の前処理済みバッチ
+
+        Returns:
+            list: ベクトル（リスト）のリスト
+        """
+        if not self.available:
+            raise AIModelError("AI model is not available")
+        if isinstance(input_batch, np.ndarray):
+            input_batch = torch.from_numpy(input_batch)
+        with torch.no_grad():
+            outputs = self.model(self._to_input(input_batch))
+            outputs = torch.nn.functional.normalize(outputs.float(), p=2, dim=1)
+        return outputs.cpu().tolist()
+
     def compare_features(self, vec1, vec2):
         """2つのベクトルのコサイン類似度（0.0〜1.0）を計算するのじゃ。"""
         try:
-            if not vec1 or not vec2:
+            if vec1 is None or vec2 is None or len(vec1) == 0 or len(vec2) == 0:
                 logger.warning("比較するベクトルが空です")
                 raise VectorProcessingError("Cannot compare empty vectors")
             
-            # torcで計算するのじゃ
-            t1 = torch.tensor(vec1)
-            t2 = torch.tensor(vec2)
-            score = torch.nn.functional.cosine_similarity(t1.unsqueeze(0), t2.unsqueeze(0)).item()
+            # 片方が圧縮形式 (PCA) なら、もう片方も同じ空間に揃えるのじゃ
+            if len(vec1) != len(vec2):
+                store = VectorStore.get_instance()
+                vec1, vec2 = store.encode_query(vec1), store.encode_query(vec2)
+            
+            # numpyの内積1回で計算するのじゃ
+            score = float(np.dot(normalize_vector(vec1), normalize_vector(vec2)))
             
             if self.debug_mode:
                 logger.debug(f"ベクトル比較完了: 類似度スコア = {score:.4f}")
@@ -298,39 +412,30 @@ class VectorEngine:
     def compare_features_batch(self, query_vec, candidate_vecs, threshold=0.5):
         """クエリベクトルと複数の候補ベクトルを比較し、閾値以上のスコアを返すのじゃ。
         
-        バッチ比較により、大量の類似度計算を高速に処理できるのじゃ。
+        候補を1つの行列にまとめ、行列×ベクトル1回で全スコアを計算するのじゃ。
+        候補がベクトルストアの圧縮形式（float16 / PCA コード）でも、そのまま渡せるのじゃ。
         
         Args:
             query_vec (list): クエリベクトル（特徴量）
-            candidate_vecs (list): 候補ベクトルのリスト
+            candidate_vecs (list or np.ndarray): 候補ベクトルのリスト、または shape=(n, dim) の行列
             threshold (float): スコア閾値（0.0-1.0）。この以上のマッチを返す。
             
         Returns:
             list: (インデックス, スコア) のタプルリスト。スコア順（降順）に返す。
         """
         try:
-            if not query_vec or not candidate_vecs:
+            if query_vec is None or candidate_vecs is None or len(query_vec) == 0 or len(candidate_vecs) == 0:
                 logger.warning("比較用ベクトルが不足しています")
                 return []
             
-            t_query = torch.tensor(query_vec)
-            t_candidates = torch.stack([torch.tensor(v) for v in candidate_vecs])
-            
-            # バッチコサイン類似度計算
-            scores = torch.nn.functional.cosine_similarity(
-                t_query.unsqueeze(0),
-                t_candidates
-            )
-            
-            # 閾値以上のマッチを抽出＆ソート
-            matches = []
-            for idx, score in enumerate(scores):
-                score_val = score.item()
-                if score_val >= threshold:
-                    matches.append((idx, score_val))
-            
-            # スコア降順でソート
-            matches.sort(key=lambda x: x[1], reverse=True)
+            # 候補が圧縮コード（幅が codec.dim）のときだけクエリを圧縮するのじゃ。
+            # dict API が返す元の次元の候補なら、クエリもそのまま比べるのじゃ
+            matrix = np.asarray(candidate_vecs, dtype=np.float32)
+            codec = VectorStore.get_instance().codec
+            if codec is not None and (matrix.ndim != 2 or matrix.shape[1] != codec.dim):
+                codec = None
+            index = SimilarityIndex(range(len(matrix)), matrix, codec=codec)
+            matches = index.range(query_vec, threshold)
             
             if self.debug_mode:
                 logger.debug(f"バッチ比較完了: {len(candidate_vecs)}個中{len(matches)}個がマッチ（閾値={threshold}）")
@@ -342,14 +447,130 @@ class VectorEngine:
             raise VectorProcessingError(f"Failed to batch compare features: {e}") from e
 
 class VectorBatchProcessor(threading.Thread):
-    """バックグラウンドでベクトル化を行うスレッドクラスなのじゃ。"""
-    def __init__(self, folder_path, callback_progress=None, callback_finish=None):
+    """バックグラウンドでベクトル化を行うスレッドクラスなのじゃ。
+
+    処理はジョブ（VectorJob）として管理し、一定件数・一定時間ごとにベクトルと
+    マニフェストを保存するのじゃ。途中で止めても次回は残りから再開できるのじゃ。
+    ジョブファイルは1つだけなので、中断したジョブが残っているときは replace=True で
+    なければ新しいジョブを始めないのじゃ。
+    """
+    def __init__(self, folder_path, callback_progress=None, callback_finish=None, job=None,
+                 checkpoint_count=VECTOR_CHECKPOINT_COUNT, checkpoint_interval=VECTOR_CHECKPOINT_INTERVAL,
+                 roots=None, recursive=False, files=None, replace=False):
+        """初期化処理。
+
+        Args:
+            folder_path (str): 対象フォルダ
+            job (VectorJob): 再開するジョブ（None なら新規作成）
+            roots (list): 複数フォルダを対象にする場合のフォルダリスト（省略時は folder_path のみ）
+            recursive (bool): 子フォルダもたどるか
+            files (list): フォルダをたどらず、このファイル（フルパス）だけを対象にする
+            replace (bool): 中断したジョブが残っていても捨てて新しく始めるか
+        """
         super().__init__()
         self.folder_path = folder_path
         self.callback_progress = callback_progress
         self.callback_finish = callback_finish
+        self.job = job  # 再開するジョブ（None なら folder_path から新規作成）
+        self.checkpoint_count = checkpoint_count
+        self.checkpoint_interval = checkpoint_interval
+        self.roots = roots or [folder_path]
+        self.recursive = recursive
+        self.files = files
+        self.replace = replace
         self.daemon = True # メイン終了時に一緒に終わるようにするのじゃ
         self.running = True
+        self._buffer = None  # ベクトルストアが読めないときに、このスレッドで作る一時 dict
+
+    @classmethod
+    def resume(cls, job, callback_progress=None, callback_finish=None):
+        """保存済みのジョブを、ジョブを作ったときと同じ対象で再開するプロセッサを作るのじゃ。"""
+        return cls(job.folder, callback_progress, callback_finish, job=job,
+                   roots=job.roots, recursive=job.recursive, files=job.files)
+
+    def _iter_target_folders(self):
+        """対象フォルダを (フォルダパス, 画像ファイル名リスト) で返すのじゃ。
+
+        よく開くフォルダから先に処理できるよう、訪問回数の多い順に並べるのじゃ
+        （同じ回数ならたどった順）。
+        """
+        folders = []
+        for root in CollapseRoots(self.roots):
+            for folder, files in FolderManifest.get_instance().walk(root, recursive=self.recursive):
+                if not self.running:
+                    return
+                folders.append((folder, files))
+        app_state = get_app_state()
+        folders.sort(key=lambda item: app_state.get_folder_visits(item[0]), reverse=True)
+        yield from folders
+
+    def _iter_target_files(self):
+        """対象ファイルをフルパスで返すのじゃ。"""
+        if self.files is not None:
+            yield from (path for path in self.files if os.path.isfile(path))
+            return
+        for folder, files in self._iter_target_folders():
+            for filename in files:
+                yield os.path.join(folder, filename)
+
+    def _create_job(self, vectors):
+        """対象フォルダのファイルをハッシュし、ベクトル未登録のものだけでジョブを作るのじゃ。
+
+        同じ内容のファイルが複数あっても、推論は1回だけで済むようにハッシュで重複を除くのじゃ。
+        """
+        pending = {}
+        queued_hashes = set()
+        targets = []
+        for full_path in self._iter_target_files():
+            if not self.running:
+                break
+            targets.append(full_path)
+            try:
+                file_hash = calculate_file_hash(full_path)
+            except FileHashError as e:
+                logger.warning(f"ハッシュ計算失敗: {os.path.basename(full_path)}")
+                continue
+            
+            # まだベクトルがない、あるいはハッシュが変わった場合のみ計算
+            if file_hash and file_hash not in vectors and file_hash not in queued_hashes:
+                pending[full_path] = file_hash
+                queued_hashes.add(file_hash)
+        if self.files is not None:
+            logger.info(f"ベクトル更新開始: 指定の{len(targets)}ファイルをチェック、{len(pending)}件が未登録")
+        else:
+            logger.info(f"ベクトル更新開始: {len(targets)}ファイルをチェック、{len(pending)}件が未登録 "
+                        f"(対象{len(self.roots)}フォルダ, 子フォルダ{'含む' if self.recursive else '含まない'})")
+        return VectorJob(self.folder_path, pending, roots=self.roots, recursive=self.recursive,
+                         files=self.files, listing=listing_digest(targets))
+
+    def _is_current(self, job):
+        """ジョブを作ったときから、対象ファイルの一覧が変わっていないか確かめるのじゃ。"""
+        targets = []
+        for full_path in self._iter_target_files():
+            if not self.running:
+                return True  # 止めるところなので、確かめきれなくても作り直さないのじゃ
+            targets.append(full_path)
+        return job.listing is not None and job.listing == listing_digest(targets)
+
+    def _checkpoint(self, vectors, job, final=False):
+        """ベクトル・ハッシュインデックス・マニフェストの順に保存するのじゃ。
+
+        ベクトルを先に書くので、途中で落ちても「保存済みなのに待ち行列に残る」だけで、
+        再開時にはベクトル登録済みとして読み飛ばされるのじゃ。
+        呼び出し元から渡された vectors は変えないのじゃ（空にするのは、このスレッドが
+        作った一時 dict だけ）。
+        ハッシュインデックスは途中では変更分の追記だけにし、全体の書き直しは final のとき
+        （ジョブが終わった・止めたとき）だけにするのじゃ。
+        """
+        save_vectors(vectors)
+        if vectors is self._buffer:
+            # 保存済みの分は一時 dict に残しておく必要が無いのじゃ
+            vectors.clear()
+        if final:
+            flush_hash_index()
+        else:
+            save_hash_index_changes()
+        job.save()
 
     def run(self):
         try:
@@ -360,86 +581,112 @@ class VectorBatchProcessor(threading.Thread):
                     self.callback_finish("AIモデルが利用できないのじゃ")
                 return
 
-            all_items = os.listdir(self.folder_path)
-            files = GetGazoFiles(all_items, self.folder_path)
-            total = len(files)
-            
             try:
                 vectors = load_vectors()
             except VectorProcessingError as e:
                 logger.warning(f"既存ベクトルデータの読み込み失敗、新規作成します: {e}")
-                vectors = {}
+                vectors = self._buffer = {}
+            
+            job = self.job
+            if job is None:
+                unfinished = VectorJob.load()
+                if unfinished is not None and not unfinished.is_finished and not self.replace:
+                    logger.warning(f"中断したベクトル化ジョブが残っているので開始しません: "
+                                   f"{unfinished.folder} (残り{len(unfinished.pending)}件)")
+                    if self.callback_finish:
+                        self.callback_finish(f"中断したジョブ（{unfinished.folder}）が残っているので開始しなかったのじゃ。")
+                    return
+            elif not self._is_current(job):
+                logger.info(f"ジョブを作ってからフォルダの中身が変わったので、作り直すのじゃ: {job.folder}")
+                job = None
+            if job is None:
+                job = self._create_job(vectors)
+                if not self.running:
+                    logger.info("ベクトル化処理が中止されました")
+                    return
+                job.save()
+                self.job = job
+            else:
+                logger.info(f"ベクトル化ジョブを再開するのじゃ: 残り{len(job.pending)}件 / {job.total}件")
+                # 前回のチェックポイント後に保存済みになったものは読み飛ばすのじゃ
+                for full_path, file_hash in list(job.pending.items()):
+                    if file_hash in vectors:
+                        job.mark_done(full_path)
             
             updated_count = 0
             failed_count = 0
+            total = job.total
             
-            logger.info(f"ベクトル更新開始: {total}ファイルをチェック")
-            
+            # デコード・前処理はプロセスプール、推論はこのスレッドでバッチ実行するのじゃ
+            workers = get_app_state().ai_vector_workers or None
+            pipeline = VectorPipeline(engine, workers=workers)
             start_time = time.time()
             last_log_time = start_time
-            
-            for i, filename in enumerate(files):
-                if not self.running: 
-                    logger.info("ベクトル化処理が中止されました")
-                    break
+            last_checkpoint_time = start_time
+            since_checkpoint = 0
+            
+            if self.callback_progress and job.done_count:
+                self.callback_progress(job.done_count, total, "")
+            
+            for full_path, vec, error in pipeline.process(list(job.pending.keys()), lambda: self.running):
+                filename = os.path.basename(full_path)
+                file_hash = job.pending.get(full_path)
+                if vec and file_hash:
+                    vectors[file_hash] = vec
+                    job.mark_done(full_path)
+                    updated_count += 1
+                else:
+                    logger.warning(f"ベクトル化失敗: {filename} - {error}")
+                    job.mark_failed(full_path)
+                    failed_count += 1
+                since_checkpoint += 1
                 
-                # タイムアウトチェック (10分)
+                # チェックポイント (N件ごと、またはT秒ごと)
                 current_time = time.time()
-                elapsed = current_time - start_time
-                if elapsed > 600:
-                    logger.warning(f"ベクトル化処理がタイムアウト (10分経過)")
-                    if self.callback_finish:
-                        self.callback_finish("タイムアウトにより停止したのじゃ")
-                    break
-
+                if (since_checkpoint >= self.checkpoint_count
+                        or current_time - last_checkpoint_time >= self.checkpoint_interval):
+                    self._checkpoint(vectors, job)
+                    since_checkpoint = 0
+                    last_checkpoint_time = current_time
+                
                 # 経過表示 (1分ごと)
                 if current_time - last_log_time >= 60:
-                    logger.info(f"ベクトル化処理中... {i}/{total} ({int(elapsed)}秒経過)")
+                    logger.info(f"ベクトル化処理中... {job.done_count}/{total} "
+                                f"({int(current_time - start_time)}秒経過, {pipeline.images_per_sec:.1f} 枚/秒)")
                     last_log_time = current_time
-
-                full_path = os.path.join(self.folder_path, filename)
-                
-                try:
-                    file_hash = calculate_file_hash(full_path)
-                except FileHashError as e:
-                    logger.warning(f"ハッシュ計算失敗: {filename}")
-                    failed_count += 1
-                    continue
-                
-                # まだベクトルがない、あるいはハッシュが変わった場合のみ計算
-                if file_hash and file_hash not in vectors:
-                    try:
-                        vec = engine.get_image_feature(full_path)
-                        if vec:
-                            vectors[file_hash] = vec
-                            updated_count += 1
-                    except Exception as e:
-                        logger.warning(f"ベクトル化失敗: {filename} - {e}")
-                        failed_count += 1
                 
                 if self.callback_progress:
-                    self.callback_progress(i + 1, total, filename)
-                
-                # 少し休みを入れてCPUを占有しすぎないようにするのじゃ
-                time.sleep(0.01)
-
+                    self.callback_progress(job.done_count, total, filename)
+            
             # ベクトルを保存
             try:
-                if updated_count > 0:
-                    save_vectors(vectors)
+                self._checkpoint(vectors, job, final=True)
+                # 近似インデックスに差分を反映（件数が閾値を超えていれば初回学習も行う）
+                update_ann_index()
             except VectorProcessingError as e:
                 logger.error(f"ベクトルデータ保存失敗: {e}")
                 if self.callback_finish:
                     self.callback_finish(f"ベクトル保存エラー: {e}")
                 return
+            
+            if not job.is_finished:
+                logger.info(f"ベクトル化処理が中止されました（残り{len(job.pending)}件は次回再開します）")
+                if self.callback_finish:
+                    self.callback_finish(f"中断したのじゃ。残り{len(job.pending)}件は次回続きから処理するのじゃ。")
+                return
+            
+            job.remove()
                 
             if self.callback_finish:
                 message = f"完了！ {updated_count}件のベクトルを新規追加したのじゃ。"
                 if failed_count > 0:
                     message += f"({failed_count}件失敗)"
+                if pipeline.processed:
+                    message += f" [{pipeline.images_per_sec:.1f} 枚/秒]"
                 self.callback_finish(message)
             
-            logger.info(f"ベクトル更新完了: 追加{updated_count}件、失敗{failed_count}件")
+            logger.info(f"ベクトル更新完了: 追加{updated_count}件、失敗{failed_count}件 "
+                        f"({pipeline.images_per_sec:.1f} 枚/秒)")
             
         except Exception as e:
             logger.error(f"ベクトル化スレッド処理中に予期しないエラー: {e}", exc_info=True)
@@ -0,0 +1,300 @@
+'''
+作成日: 2026年01月09日
+作成者: tamate masayuki
+機能: 近似最近傍 (IVF) インデックス
+説明: k-means のセントロイドでベクトルをクラスタに分け、クエリに近い nprobe 個の
+      クラスタだけを調べることで、数十万件規模のライブラリでも検索を速くするのじゃ。
+      ベクトルストアの行番号で索引化するので、ストアの追記に合わせて差分だけ追加できるのじゃ。
+'''
+import os
+import threading
+import numpy as np
+from lib.GazoToolsExceptions import VectorProcessingError
+from lib.GazoToolsLogger import LoggerManager
+from lib.GazoToolsSimilarity import SimilarityIndex, normalize_rows, normalize_vector
+from lib.config_defaults import (
+    VECTOR_ANN_FILE, ANN_MIN_VECTORS, ANN_NLIST, DEFAULT_ANN_NPROBE,
+    ANN_RETRAIN_FACTOR, ANN_TRAIN_SAMPLE, ANN_KMEANS_ITERATIONS
+)
+
+logger = LoggerManager.get_logger(__name__)
+
+ANN_INDEX_VERSION = 1
+ASSIGN_CHUNK = 8192  # クラスタ割り当てを行う1回あたりの行数
+
+
+def auto_nlist(count):
+    """件数からクラスタ数を決めるのじゃ（おおよそ sqrt(n)）。"""
+    return int(max(16, min(4096, round(np.sqrt(max(count, 1))))))
+
+
+def train_kmeans(data, nlist, iterations=ANN_KMEANS_ITERATIONS, seed=0):
+    """正規化済みベクトルに球面 k-means をかけてセントロイドを返すのじゃ。
+
+    Args:
+        data (np.ndarray): shape=(n, dim) の正規化済み行列
+        nlist (int): クラスタ数
+        iterations (int): 反復回数
+        seed (int): 乱数シード
+
+    Returns:
+        np.ndarray: shape=(nlist, dim) の正規化済みセントロイド
+    """
+    n = data.shape[0]
+    nlist = max(1, min(nlist, n))
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(n, nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(data @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        counts = np.bincount(assign, minlength=nlist)
+        empty = counts == 0
+        if empty.any():
+            # 空のクラスタはランダムな点で置き直すのじゃ
+            sums[empty] = data[rng.choice(n, int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class IVFIndex:
+    """ベクトルストアの行番号を転置リストで持つ IVF 近似インデックスなのじゃ。
+
+    ``nprobe`` が精度と速度のつまみで、大きいほど取りこぼしが減る代わりに遅くなるのじゃ。
+    ストアに未書き出しの行や、まだ索引化していない行は総当たりで補うので、
+    結果から新しいベクトルが漏れることはないのじゃ。
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        """シングルトンインスタンスを取得するのじゃ。"""
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, index_file=VECTOR_ANN_FILE, nlist=ANN_NLIST, nprobe=DEFAULT_ANN_NPROBE,
+                 min_vectors=ANN_MIN_VECTORS):
+        """初期化処理。
+
+        Args:
+            index_file (str): インデックスの保存先 (.npz)
+            nlist (int): クラスタ数（0 なら自動）
+            nprobe (int): 検索時に調べるクラスタ数
+            min_vectors (int): 学習を始める最小件数
+        """
+        self.index_file = index_file
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_vectors = min_vectors
+        self.centroids = None     # shape=(nlist, dim)
+        self.lists = []           # クラスタごとの行番号 (np.int64)
+        self.indexed_rows = 0     # 索引化済みのストア行数
+        self.trained_rows = 0     # 学習時のストア行数
+        self._ann_lock = threading.RLock()
+        self._load()
+
+    # ==================== 永続化 ====================
+
+    def _load(self):
+        """保存済みのインデックスを読み込むのじゃ。壊れていれば作り直すのじゃ。"""
+        if not os.path.exists(self.index_file):
+            return
+        try:
+            with np.load(self.index_file) as data:
+                if int(data["version"]) != ANN_INDEX_VERSION:
+                    logger.warning("IVF インデックスのバージョンが違うので作り直すのじゃ")
+                    return
+                self.centroids = data["centroids"].astype(np.float32)
+                offsets = data["offsets"]
+                ids = data["ids"].astype(np.int64)
+                self.lists = [ids[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+                self.indexed_rows = int(data["indexed_rows"])
+                self.trained_rows = int(data["trained_rows"])
+            logger.info(f"IVF インデックスを読み込みました: {self.indexed_rows}行 / {len(self.lists)}クラスタ")
+        except Exception as e:
+            logger.warning(f"IVF インデックス読み込み失敗、作り直すのじゃ: {e}")
+            self.reset()
+
+    def save(self):
+        """インデックスを一時ファイル経由で保存するのじゃ。
+
+        Raises:
+            VectorProcessingError: 書き込みに失敗した場合
+        """
+        with self._ann_lock:
+            if not self.is_trained:
+                return
+            sizes = np.array([len(l) for l in self.lists], dtype=np.int64)
+            offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+            ids = np.concatenate(self.lists) if self.lists else np.zeros(0, dtype=np.int64)
+            try:
+                os.makedirs(os.path.dirname(self.index_file) or ".", exist_ok=True)
+                tmp_path = self.index_file + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    np.savez(f, version=ANN_INDEX_VERSION, centroids=self.centroids,
+                             offsets=offsets, ids=ids,
+                             indexed_rows=self.indexed_rows, trained_rows=self.trained_rows)
+                os.replace(tmp_path, self.index_file)
+            except (IOError, OSError) as e:
+                logger.error(f"IVF インデックス書き込みエラー: {self.index_file}", exc_info=True)
+                raise VectorProcessingError(f"Cannot write ANN index: {e}") from e
+
+    def reset(self):
+        """インデックスを空にするのじゃ。"""
+        with self._ann_lock:
+            self.centroids = None
+            self.lists = []
+            self.indexed_rows = 0
+            self.trained_rows = 0
+
+    def clear(self):
+        """インデックスを空にし、保存済みファイルも消すのじゃ（ストアの行番号が変わったとき用）。"""
+        with self._ann_lock:
+            self.reset()
+            try:
+                if os.path.exists(self.index_file):
+                    os.remove(self.index_file)
+            except OSError as e:
+                logger.warning(f"IVF インデックス削除失敗: {e}")
+
+    # ==================== 学習・追加 ====================
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def train(self, store):
+        """ストアの書き出し済み行からセントロイドを学習し、全行を割り当て直すのじゃ。"""
+        count = store.disk_count
+        if count == 0:
+            return
+        nlist = self.nlist or auto_nlist(count)
+        sample_n = min(count, max(ANN_TRAIN_SAMPLE, nlist * 4))
+        rng = np.random.default_rng(0)
+        sample_ids = np.sort(rng.choice(count, sample_n, replace=False))
+        sample = normalize_rows(store.get_rows(sample_ids))
+        logger.info(f"IVF インデックス学習開始: {count}行, {nlist}クラスタ, サンプル{sample_n}行")
+        centroids = train_kmeans(sample, nlist)
+
+        with self._ann_lock:
+            self.centroids = centroids
+            self.lists = [np.zeros(0, dtype=np.int64) for _ in range(centroids.shape[0])]
+            self.indexed_rows = 0
+            self.trained_rows = count
+            self._assign_rows(store, count)
+        logger.info("IVF インデックス学習完了")
+
+    def _assign_rows(self, store, end):
+        """indexed_rows から end までの行を最寄りのクラスタに追加するのじゃ。"""
+        start = self.indexed_rows
+        new_lists = [[] for _ in self.lists]
+        for chunk_start in range(start, end, ASSIGN_CHUNK):
+            row_ids = np.arange(chunk_start, min(end, chunk_start + ASSIGN_CHUNK), dtype=np.int64)
+            block = normalize_rows(store.get_rows(row_ids))
+            assign = np.argmax(block @ self.centroids.T, axis=1)
+            order = np.argsort(assign, kind="stable")
+            bounds = np.searchsorted(assign[order], np.arange(len(self.lists) + 1))
+            for c in range(len(self.lists)):
+                if bounds[c] < bounds[c + 1]:
+                    new_lists[c].append(row_ids[order[bounds[c]:bounds[c + 1]]])
+        for c, parts in enumerate(new_lists):
+            if parts:
+                self.lists[c] = np.concatenate([self.lists[c]] + parts)
+        self.indexed_rows = end
+
+    def update(self, store):
+        """ストアに追記された行をインデックスに反映するのじゃ。
+
+        件数が min_vectors に達したら初回学習し、学習時から ANN_RETRAIN_FACTOR 倍を
+        超えて増えたら学習し直すのじゃ。それ以外は差分の行を割り当てるだけなのじゃ。
+
+        Returns:
+            bool: インデックスが変化した場合 True
+        """
+        count = store.disk_count
+        with self._ann_lock:
+            if self.is_trained and (self.centroids.shape[1] != store.dim or count < self.indexed_rows):
+                # ストアが作り直された場合は学習し直すのじゃ
+                self.reset()
+            if not self.is_trained:
+                if count < self.min_vectors:
+                    return False
+                self.train(store)
+            elif count > self.trained_rows * ANN_RETRAIN_FACTOR:
+                self.train(store)
+            elif count > self.indexed_rows:
+                self._assign_rows(store, count)
+            else:
+                return False
+            self.save()
+            return True
+
+    # ==================== 検索 ====================
+
+    def _probe(self, query, nprobe):
+        """クエリに近いクラスタの行番号をまとめて返すのじゃ。"""
+        nprobe = max(1, min(nprobe, len(self.lists)))
+        centroid_scores = self.centroids @ query
+        if nprobe < len(self.lists):
+            probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            probe = np.arange(len(self.lists))
+        parts = [self.lists[c] for c in probe if len(self.lists[c])]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def search(self, store, query, hashes=None, k=None, threshold=None, nprobe=None):
+        """近似検索で類似度の高いハッシュを返すのじゃ。
+
+        Args:
+            store (VectorStore): ベクトルストア
+            query (array-like): クエリベクトル
+            hashes (iterable): 検索対象を絞るハッシュ（省略時はストア全体）
+            k (int): 最大件数（省略時は制限なし）
+            threshold (float): これ未満のスコアは除外（省略可）
+            nprobe (int): 調べるクラスタ数（省略時は self.nprobe）
+
+        Returns:
+            list: (ハッシュ, スコア) のタプルリスト（スコア降順）
+        """
+        q = normalize_vector(store.encode_query(query))
+        with self._ann_lock:
+            if not self.is_trained:
+                raise VectorProcessingError("ANN index is not trained")
+            if q.shape[0] != self.centroids.shape[1]:
+                raise VectorProcessingError(
+                    f"Query dimension mismatch: expected {self.centroids.shape[1]}, got {q.shape[0]}")
+            probed = self._probe(q, nprobe or self.nprobe)
+            indexed_rows = self.indexed_rows
+
+        # 対象ハッシュを「索引化済みの行」と「それ以外」に分けるのじゃ
+        if hashes is None:
+            hashes = store.keys()
+        row_to_hash = {}
+        rest = []
+        for h in hashes:
+            row = store.rows.get(h)
+            if row is None:
+                continue
+            if row < indexed_rows:
+                row_to_hash[row] = h
+            else:
+                rest.append(h)
+
+        results = []
+        if row_to_hash:
+            wanted = np.fromiter(row_to_hash.keys(), dtype=np.int64, count=len(row_to_hash))
+            rows = probed[np.isin(probed, wanted)]
+            if rows.size:
+                index = SimilarityIndex(rows.tolist(), store.get_rows(rows))
+                results.extend((row_to_hash[r], s) for r, s in index.top_k(q, len(index), threshold))
+        if rest:
+            # 未索引の新しい行は総当たりで補うのじゃ
+            index = SimilarityIndex.from_store(store, rest)
+            results.extend(index.top_k(q, len(index), threshold))
+
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:k] if k is not None else results
@@ -6,15 +6,20 @@
 import os
 import json
 import csv
-import hashlib
 from lib.GazoToolsExceptions import (
     ConfigError, ImageLoadError, FileHashError, TagManagementError,
     VectorProcessingError, FileOperationError
 )
 from lib.GazoToolsLogger import LoggerManager
+from lib.GazoToolsHashIndex import HashIndex
+from lib.GazoToolsFolderManifest import FolderManifest
+from lib.GazoToolsVectorStore import VectorStore
+from lib.GazoToolsANN import IVFIndex
+from lib.GazoToolsSimilarity import SimilarityIndex
+from lib.GazoToolsState import get_app_state
 from lib.config_defaults import (
     get_default_config, MOVE_DESTINATION_SLOTS,
-    TAG_CSV_FILE, VECTOR_DATA_FILE, RATING_DATA_FILE, CONFIG_FILE
+    TAG_CSV_FILE, RATING_DATA_FILE, CONFIG_FILE, ANN_MIN_CANDIDATES
 )
 
 logger = LoggerManager.get_logger(__name__)
@@ -80,24 +85,57 @@ def save_config(path, geometries=None, settings=None):
         raise ConfigError(f"Unexpected error saving config: {e}") from e
 
 def calculate_file_hash(filepath):
-    """ファイルのMD5ハッシュ値を計算するのじゃ。のじゃ。"""
-    hash_md5 = hashlib.md5()
+    """ファイルのMD5ハッシュ値を計算するのじゃ。のじゃ。
+
+    ハッシュインデックスを先に確認し、サイズ・mtime・inode が変わっていなければ
+    ファイルを読まずに保存済みのハッシュを返すのじゃ。
+    """
     try:
-        with open(filepath, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        logger.debug(f"ハッシュ計算完了: {os.path.basename(filepath)}")
-        return hash_md5.hexdigest()
-    except FileNotFoundError as e:
-        logger.error(f"ファイルが見つかりません: {filepath}", exc_info=True)
-        raise FileHashError(f"File not found: {filepath}") from e
-    except IOError as e:
-        logger.error(f"ファイル読み込みエラー: {filepath}", exc_info=True)
-        raise FileHashError(f"Cannot read file: {filepath}") from e
+        digest = HashIndex.get_instance().get_hash(filepath)
+        logger.debug(f"ハッシュ取得完了: {os.path.basename(filepath)}")
+        return digest
+    except FileHashError:
+        logger.error(f"ハッシュ計算失敗: {filepath}", exc_info=True)
+        raise
     except Exception as e:
         logger.error(f"ハッシュ計算中に予期しないエラー: {filepath}", exc_info=True)
         raise FileHashError(f"Unexpected error calculating hash: {e}") from e
 
+def get_hashes(paths):
+    """複数ファイルのハッシュをまとめて取得するのじゃ。のじゃ。
+
+    Args:
+        paths (list): ファイルパスのリスト
+
+    Returns:
+        dict: {パス: ハッシュ}。読めなかったファイルは含まれないのじゃ。
+    """
+    return HashIndex.get_instance().get_hashes(paths)
+
+def peek_hashes(paths):
+    """ハッシュインデックスに載っているファイルだけ、保存済みのハッシュを返すのじゃ。のじゃ。
+
+    ファイルを読まないので、大きなフォルダでもすぐ終わるのじゃ。
+
+    Returns:
+        dict: {パス: ハッシュ}。インデックスに無い・変更されたファイルは含まれないのじゃ。
+    """
+    index = HashIndex.get_instance()
+    results = {}
+    for path in paths:
+        digest = index.peek(path)
+        if digest is not None:
+            results[path] = digest
+    return results
+
+def flush_hash_index():
+    """ハッシュインデックス全体を書き直すのじゃ（終了時やジョブの終わりに呼ぶ）。のじゃ。"""
+    HashIndex.get_instance().flush()
+
+def save_hash_index_changes():
+    """ハッシュインデックスの未保存の変更だけを追記ログに書き出すのじゃ。のじゃ。"""
+    HashIndex.get_instance().save_pending()
+
 def load_tags():
     """タグデータと評価データを読み込むのじゃ。のじゃ。"""
     tags = {} # key: hash, value: {tag: "...", hint: "...", rating: int or None, assigned_rating: str}
@@ -201,41 +239,102 @@ def save_ratings(ratings):
         raise TagManagementError(f"Unexpected error saving tags: {e}") from e
 
 def load_vectors():
-    """ベクトルデータを読み込むのじゃ。のじゃ。"""
-    if os.path.exists(VECTOR_DATA_FILE):
-        try:
-            with open(VECTOR_DATA_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            logger.info(f"ベクトルデータを読み込みました: {len(data)}件")
-            return data
-        except json.JSONDecodeError as e:
-            logger.error(f"ベクトルファイルのJSON解析エラー: {VECTOR_DATA_FILE}", exc_info=True)
-            raise VectorProcessingError(f"Invalid JSON in vector file: {e}") from e
-        except IOError as e:
-            logger.error(f"ベクトルファイル読み込みエラー: {VECTOR_DATA_FILE}", exc_info=True)
-            raise VectorProcessingError(f"Cannot read vector file: {e}") from e
-        except Exception as e:
-            logger.error(f"ベクトル読み込み中に予期しないエラー: {e}", exc_info=True)
-            raise VectorProcessingError(f"Unexpected error loading vectors: {e}") from e
-    return {}
+    """ベクトルデータを読み込むのじゃ。のじゃ。
+
+    バイナリのベクトルストア（memmap）を返すのじゃ。dict と同じように扱えるのじゃ。
+    旧形式の vectordata.json しか無い場合は初回に一度だけ移行するのじゃ。
+    """
+    try:
+        return VectorStore.get_instance()
+    except VectorProcessingError:
+        raise
+    except Exception as e:
+        logger.error(f"ベクトル読み込み中に予期しないエラー: {e}", exc_info=True)
+        raise VectorProcessingError(f"Unexpected error loading vectors: {e}") from e
 
 def save_vectors(vectors):
-    """ベクトルデータを保存するのじゃ。のじゃ。"""
+    """ベクトルデータを保存するのじゃ。のじゃ。
+
+    ストアには追記のみ行うのじゃ。普通の dict を渡された場合は中身をストアに追加するのじゃ。
+    """
     try:
-        os.makedirs(os.path.dirname(VECTOR_DATA_FILE), exist_ok=True)
-        with open(VECTOR_DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(vectors, f)
-        logger.info(f"ベクトルデータを保存しました: {len(vectors)}件")
-    except IOError as e:
-        logger.error(f"ベクトルファイル書き込みエラー: {VECTOR_DATA_FILE}", exc_info=True)
-        raise VectorProcessingError(f"Cannot write vector file: {e}") from e
+        store = VectorStore.get_instance()
+        if vectors is not store:
+            store.update(vectors)
+        store.flush()
+    except VectorProcessingError:
+        raise
     except Exception as e:
         logger.error(f"ベクトル保存中に予期しないエラー: {e}", exc_info=True)
+        raise VectorProcessingError(f"Unexpected error saving vectors: {e}") from e
+
+def update_ann_index():
+    """ベクトルストアへの追記を近似インデックスに反映するのじゃ。のじゃ。
+
+    Returns:
+        bool: インデックスが更新された場合 True
+    """
+    try:
+        return IVFIndex.get_instance().update(VectorStore.get_instance())
+    except VectorProcessingError as e:
+        logger.warning(f"近似インデックス更新失敗: {e}")
+        return False
+
+def convert_vector_storage(mode):
+    """ベクトルの保存形式を変換し、近似インデックスを作り直すのじゃ。のじゃ。
+
+    Args:
+        mode (str): "float32" / "float16" / "pca256" / "pca128"
+
+    Returns:
+        bool: 変換した場合 True
+
+    Raises:
+        VectorProcessingError: 変換に失敗した場合
+    """
+    store = VectorStore.get_instance()
+    if not store.convert(mode):
+        return False
+    # 行番号と次元が変わるので、近似インデックスは作り直すのじゃ
+    ann = IVFIndex.get_instance()
+    ann.clear()
+    update_ann_index()
+    return True
+
+def search_similar(vectors, query, hashes, threshold=None, k=None):
+    """類似度の高いハッシュを降順で返すのじゃ。のじゃ。
+
+    候補が ANN_MIN_CANDIDATES 件以上で近似インデックスが学習済みなら IVF で、
+    それ以外は総当たりの行列計算で検索するのじゃ。
+
+    Args:
+        vectors (VectorStore or dict): ベクトルデータ
+        query (list): クエリベクトル
+        hashes (iterable): 検索対象のハッシュ
+        threshold (float): これ未満のスコアは除外（省略可）
+        k (int): 最大件数（省略時は制限なし）
+
+    Returns:
+        list: (ハッシュ, スコア) のタプルリスト
+    """
+    hashes = list(hashes)
+    if isinstance(vectors, VectorStore) and len(hashes) >= ANN_MIN_CANDIDATES:
+        ann = IVFIndex.get_instance()
+        if ann.is_trained:
+            try:
+                return ann.search(vectors, query, hashes, k=k, threshold=threshold,
+                                  nprobe=get_app_state().ai_ann_nprobe)
+            except VectorProcessingError as e:
+                logger.warning(f"近似検索失敗、総当たりで検索するのじゃ: {e}")
+    index = SimilarityIndex.from_store(vectors, hashes)
+    return index.top_k(query, k if k is not None else len(index), threshold)
 
 # -------------------------------------------------------------------
 # Additional Imports for HakoData
 import random
+import threading
 from lib.GazoToolsLib import GetKoFolder, GetGazoFiles
+from lib.GazoToolsPlaylist import AIPlaylist
 # from lib.GazoToolsAI import VectorEngine # Circular import fix: Moved to local scope
 
 class HakoData():
@@ -244,8 +343,13 @@ class HakoData():
         self.StartFolder = def_folder
         self.GazoFiles = []
         self.vectors_cache = {}
-        self.ai_playlist = []     # AI再生用のキュー
-        self.visited_files = set() # 表示済みファイル（AIモード用）
+        self.ai_playlist = None   # AI再生用の再生順（prepare_ai_playlist で別スレッドに作らせる）
+        self.generation = 0       # SetGazoFiles のたびに増える（古いフォルダの再生順を見分ける目印）
+        self._playlist_generation = None  # ai_playlist を作ったときの generation
+        self._building_generation = None  # 作っている（作り終えた）再生順の generation
+        self._failed_generation = None    # 再生順を作れなかった generation
+        self._ai_wanted = False   # AI再生を使っている間は、フォルダが変わるたびに作り直すのじゃ
+        self._lock = threading.Lock()   # 先読みスレッドとメインスレッドで一覧を入れ替えるときの鍵
 
     def SetGazoFiles(self, GazoFiles, folder_path, include_subfolders=False):
         """画像ファイルリストを設定するのじゃ。のじゃ。
@@ -255,20 +359,36 @@ class HakoData():
             folder_path: フォルダパス
             include_subfolders: 子フォルダを含めるかどうか
         """
-        self.StartFolder = folder_path
-        self.GazoFiles = GazoFiles
-        
         # 子フォルダを含める場合は再帰的に収集
         if include_subfolders:
-            self.GazoFiles = self._collect_all_images(folder_path)
-        
-        # フォルダが変わったらキャッシュと状態をリセット
-        self.vectors_cache = load_vectors()
-        self.ai_playlist = []
-        self.visited_files = set()
+            GazoFiles = self._collect_all_images(folder_path)
+        vectors = load_vectors()
+
+        # フォルダが変わったらキャッシュと状態をリセット（一覧と世代はまとめて入れ替えるのじゃ）
+        with self._lock:
+            self.StartFolder = folder_path
+            self.GazoFiles = GazoFiles
+            self.vectors_cache = vectors
+            self.generation += 1
+            self.ai_playlist = None
+            self._playlist_generation = None
+            rebuild = self._ai_wanted
+        if rebuild:
+            self.prepare_ai_playlist()
+
+    def snapshot(self):
+        """(画像リスト, 基準フォルダ, ベクトル, 世代) を一度にまとめて返すのじゃ。のじゃ。
+
+        先読みスレッドから使うときは、途中でフォルダが変わっても組み合わせが崩れないように
+        個別の属性ではなくこれを使うのじゃ。
+        """
+        with self._lock:
+            return list(self.GazoFiles), self.StartFolder, self.vectors_cache, self.generation
 
     def _collect_all_images(self, base_folder):
         """ベースフォルダとその子フォルダから全ての画像を収集するのじゃ。のじゃ。
+
+        フォルダマニフェストを使うので、前回から変わっていないフォルダは一覧を読まないのじゃ。
         
         Args:
             base_folder: 基準となるフォルダパス
@@ -276,114 +396,104 @@ class HakoData():
         Returns:
             list: ベースフォルダからの相対パスのリスト
         """
-        all_images = []
-        
-        def collect_recursive(current_folder, base_path):
-            """再帰的に画像を収集する内部関数なのじゃ。"""
-            try:
-                items = os.listdir(current_folder)
-                folders = GetKoFolder(items, current_folder)
-                files = GetGazoFiles(items, current_folder)
-                
-                # 現在のフォルダの画像を追加（ベースフォルダからの相対パス）
-                for f in files:
-                    full_path = os.path.join(current_folder, f)
-                    relative_path = os.path.relpath(full_path, base_path)
-                    all_images.append(relative_path)
-                
-                # サブフォルダを再帰的に処理
-                for folder in folders:
-                    subfolder_path = os.path.join(current_folder, folder)
-                    collect_recursive(subfolder_path, base_path)
-            except PermissionError:
-                logger.warning(f"アクセス権限がありません: {current_folder}")
-            except Exception as e:
-                logger.warning(f"フォルダ読み込みエラー: {current_folder} - {e}")
-        
-        collect_recursive(base_folder, base_folder)
-        logger.info(f"子フォルダを含めて{len(all_images)}件の画像を収集しました")
+        manifest = FolderManifest.get_instance()
+        scanned, reused = manifest.scanned, manifest.reused
+        all_images = manifest.collect(base_folder)
+        logger.info(f"子フォルダを含めて{len(all_images)}件の画像を収集しました "
+                    f"(読み込み:{manifest.scanned - scanned}フォルダ, 再利用:{manifest.reused - reused}フォルダ)")
         return all_images
 
+    def _to_full_path(self, f):
+        """相対パスまたはファイル名からフルパスを構築するのじゃ。"""
+        if os.path.isabs(f):
+            return f
+        return os.path.join(self.StartFolder, f)
+
     def RandamGazoSet(self):
         """ランダム、またはAI順序で画像を返すのじゃ。のじゃ。"""
         if not self.GazoFiles:
             return None
         return random.choice(self.GazoFiles)
 
-    def GetNextAIImage(self, threshold):
-        """AI類似度順で次の画像を取得するのじゃ。のじゃ。"""
-        if not self.GazoFiles:
+    def prepare_ai_playlist(self, mode=None, diversity=None):
+        """今のフォルダの AI 再生順を別スレッドで作り始めるのじゃ。のじゃ。
+
+        ハッシュの対応付けと近傍グラフは時間がかかるので、スライドショーの先読みではなく
+        ここで作るのじゃ。作成済み・作成中なら何もしないので、何度呼んでも良いのじゃ。
+        一度呼ぶと、以後はフォルダが変わるたびに SetGazoFiles から作り直すのじゃ。
+
+        Args:
+            mode (str): 再生順の作り方（省略時は設定の値）
+            diversity (float): 多様性 0〜1（省略時は設定の値）
+
+        Returns:
+            threading.Thread: 作り始めたスレッド（作り始めなかったら None）
+        """
+        app_state = get_app_state()
+        mode = mode or app_state.ss_ai_plan_mode
+        diversity = app_state.ss_ai_diversity if diversity is None else diversity
+        with self._lock:
+            self._ai_wanted = True
+            if self._building_generation == self.generation or not self.GazoFiles:
+                return None
+            generation = self._building_generation = self.generation
+            files, folder, vectors = list(self.GazoFiles), self.StartFolder, self.vectors_cache
+        thread = threading.Thread(target=self._build_ai_playlist,
+                                  args=(generation, files, folder, vectors, mode, diversity),
+                                  name="AIPlaylistBuilder", daemon=True)
+        thread.start()
+        return thread
+
+    def release_ai_playlist(self):
+        """AI再生をやめたので、フォルダが変わっても再生順を作らないようにするのじゃ。のじゃ。"""
+        with self._lock:
+            self._ai_wanted = False
+
+    def _build_ai_playlist(self, generation, files, folder, vectors, mode, diversity):
+        """再生順を作り、その間にフォルダが変わっていなければ差し替えるのじゃ（別スレッド）。"""
+        try:
+            playlist = AIPlaylist(files, folder, vectors, mode, diversity)
+            playlist.prepare()
+        except Exception as e:
+            logger.error(f"AI再生順の準備に失敗: {folder} - {e}", exc_info=True)
+            with self._lock:
+                self._failed_generation = generation
+            return
+        with self._lock:
+            if generation == self.generation:
+                self.ai_playlist = playlist
+                self._playlist_generation = generation
+
+    def GetNextAIImage(self, threshold, mode=None, diversity=None):
+        """AI類似度順で次の画像を取得するのじゃ。のじゃ。
+
+        再生順は prepare_ai_playlist が別スレッドで作っておくので、ここでは次の1枚を
+        取り出すだけなのじゃ。先読みスレッドから呼ばれるので、一覧は snapshot で受け取り、
+        再生順がまだ無いときやフォルダが途中で変わったときは None を返すのじゃ
+        （先読みスレッドは少し待ってからもう一度呼ぶ）。再生順を作れなかったフォルダでは
+        ランダムに選ぶのじゃ。
+
+        Args:
+            threshold (float): 次に進める類似度の下限
+            mode (str): 再生順の作り方（省略時は設定の値）
+            diversity (float): 多様性 0〜1（省略時は設定の値）
+        """
+        files, folder, vectors, generation = self.snapshot()
+        if not files:
             return None
-            
-        # プレイリストに残りがあればそれを返す
-        if self.ai_playlist:
-            next_img = self.ai_playlist.pop(0)
-            self.visited_files.add(next_img)
-            return next_img
-            
-        # プレイリストが空の場合、新しい「シード」を探す
-        # 未訪問のファイルの中から最初のものをシードにするのじゃ
-        seed_cand = [f for f in self.GazoFiles if f not in self.visited_files]
-        
-        if not seed_cand:
-            # 全て訪問済みの場合はリセットして最初から
-            self.visited_files.clear()
-            seed_cand = self.GazoFiles
-            
-        # シード決定（リストの先頭＝フォルダ順の若いもの＝「1番目の画像」）
-        seed_file = seed_cand[0]
-        
-        # シードをプレイリストの先頭に追加
-        self.ai_playlist.append(seed_file)
-        
-        # 類似画像を検索してプレイリストの後ろに繋げる処理
-        from lib.GazoToolsAI import VectorEngine
-        engine = VectorEngine.get_instance()
-        if engine.check_available():
-            # 相対パスまたはファイル名からフルパスを構築
-            if os.path.isabs(seed_file):
-                seed_path = seed_file
-            else:
-                seed_path = os.path.join(self.StartFolder, seed_file)
-            seed_hash = calculate_file_hash(seed_path)
-            
-            # シードのベクトル取得（キャッシュにあればラッキー）
-            seed_vec = self.vectors_cache.get(seed_hash)
-            if not seed_vec:
-                # 無ければ計算してみる
-                seed_vec = engine.get_image_feature(seed_path)
-                if seed_vec and seed_hash:
-                    self.vectors_cache[seed_hash] = seed_vec
-
-            if seed_vec:
-                # 他の画像の類似度を計算して高い順に並べる
-                sim_list = []
-                for f in seed_cand: # 自分自身も含むが、それは後で除外されるか、最初にpopされるのでOK
-                    if f == seed_file: continue
-                    
-                    # 相対パスまたはファイル名からフルパスを構築
-                    if os.path.isabs(f):
-                        f_path = f
-                    else:
-                        f_path = os.path.join(self.StartFolder, f)
-                    f_hash = calculate_file_hash(f_path)
-                    f_vec = self.vectors_cache.get(f_hash)
-                    
-                    if not f_vec:
-                        # リアルタイム計算は重いので、キャッシュにない場合スキップするか検討。
-                        # ここではスキップするのじゃ（高速化のため）
-                        continue
-                        
-                    score = engine.compare_features(seed_vec, f_vec)
-                    if score >= threshold:
-                        sim_list.append((f, score))
-                
-                # 類似度が高い順にソート
-                sim_list.sort(key=lambda x: x[1], reverse=True)
-                
-                # プレイリストに追加
-                for f, s in sim_list:
-                    self.ai_playlist.append(f)
-                    
-        # 準備できたので1つ返す
-        return self.GetNextAIImage(threshold) # 再帰呼び出しでpop(0)へ
+        app_state = get_app_state()
+        mode = mode or app_state.ss_ai_plan_mode
+        diversity = app_state.ss_ai_diversity if diversity is None else diversity
+        with self._lock:
+            playlist = self.ai_playlist if self._playlist_generation == generation else None
+            failed = self._failed_generation == generation
+        if failed:
+            return random.choice(files)
+        if playlist is None:
+            self.prepare_ai_playlist(mode, diversity)
+            return None
+        playlist.configure(mode, diversity)
+        name = playlist.next(threshold)
+        with self._lock:
+            # 選んでいる間にフォルダが変わったら、古いフォルダの画像は返さないのじゃ
+            return name if generation == self.generation else None
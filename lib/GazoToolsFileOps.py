@@ -0,0 +1,158 @@
+'''
+作成日: 2026年01月17日
+作成者: tamate masayuki
+機能: ファイルの一括移動
+説明: 同じドライブ内の移動は os.rename で一瞬で終わらせ、別ドライブへの移動だけ
+      コピー＋削除をスレッドで並列に行うのじゃ。エラーは1件ずつ結果に記録して最後に返すので、
+      途中でダイアログを出して止まることはないのじゃ。
+'''
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from lib.GazoToolsExceptions import FileOperationError
+from lib.GazoToolsHashIndex import HashIndex
+from lib.GazoToolsLogger import LoggerManager
+from lib.config_defaults import FILE_MOVE_WORKERS
+
+logger = LoggerManager.get_logger(__name__)
+
+METHOD_RENAME = "rename"
+METHOD_COPY = "copy"
+
+
+class MoveResult:
+    """1ファイル分の移動結果なのじゃ。"""
+
+    __slots__ = ("src", "dest", "ok", "error", "method")
+
+    def __init__(self, src, dest, ok=False, error=None, method=None):
+        """初期化処理。
+
+        Args:
+            src (str): 移動元のパス
+            dest (str): 移動先のパス
+            ok (bool): 移動できたか
+            error (str): 失敗した理由
+            method (str): METHOD_RENAME または METHOD_COPY
+        """
+        self.src = src
+        self.dest = dest
+        self.ok = ok
+        self.error = error
+        self.method = method
+
+    def __repr__(self):
+        state = "ok" if self.ok else f"error={self.error!r}"
+        return f"MoveResult({self.src!r} -> {self.dest!r}, {state})"
+
+
+def same_device(path, folder):
+    """ファイルとフォルダが同じファイルシステム上にあるか調べるのじゃ。"""
+    try:
+        return os.stat(path).st_dev == os.stat(folder).st_dev
+    except OSError:
+        return False
+
+
+def _describe(e):
+    if isinstance(e, FileNotFoundError):
+        return "ファイルが見つかりません"
+    if isinstance(e, PermissionError):
+        return "権限がありません"
+    if isinstance(e, FileExistsError):
+        return "移動先に同じ名前のファイルがあります"
+    return str(e)
+
+
+def _rename(result):
+    if os.path.exists(result.dest):
+        raise FileExistsError(result.dest)
+    os.rename(result.src, result.dest)
+
+
+def _copy_and_delete(result):
+    if os.path.exists(result.dest):
+        raise FileExistsError(result.dest)
+    try:
+        shutil.copy2(result.src, result.dest)
+    except BaseException:
+        # 書きかけのコピーは残さないのじゃ
+        try:
+            os.remove(result.dest)
+        except OSError:
+            pass
+        raise
+    os.remove(result.src)
+
+
+def _run(result, func):
+    try:
+        func(result)
+        result.ok = True
+    except OSError as e:
+        result.error = _describe(e)
+    return result
+
+
+def move_pairs(pairs, workers=FILE_MOVE_WORKERS):
+    """(移動元, 移動先) の組をまとめて移動するのじゃ。
+
+    移動先のフォルダと同じドライブなら os.rename、違えばコピー＋削除をスレッドで並列に行うのじゃ。
+    移動先に同じ名前のファイルがある場合は上書きせず、失敗として記録するのじゃ。
+    移動できたファイルは、ハッシュインデックスのエントリも移動先へ引き継ぐのじゃ。
+
+    Args:
+        pairs (list): (移動元パス, 移動先パス) のリスト（この順に処理する）
+        workers (int): 別ドライブへのコピーに使うスレッド数
+
+    Returns:
+        list: MoveResult のリスト（pairs と同じ順）
+    """
+    results = [MoveResult(src, dest) for src, dest in pairs]
+    copies = []
+    seen = set()
+    for result in results:
+        key = os.path.normcase(result.dest)
+        if key in seen:
+            # 別フォルダの同名ファイル。並列コピーで上書きし合わないよう2件目以降は移動しないのじゃ
+            result.error = _describe(FileExistsError(result.dest))
+            continue
+        seen.add(key)
+        if same_device(result.src, os.path.dirname(result.dest)):
+            result.method = METHOD_RENAME
+            _run(result, _rename)
+        else:
+            result.method = METHOD_COPY
+            copies.append(result)
+
+    if copies:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="FileMove") as pool:
+            list(pool.map(lambda r: _run(r, _copy_and_delete), copies))
+
+    index = HashIndex.get_instance()
+    for result in results:
+        if result.ok:
+            index.rename(result.src, result.dest)
+        else:
+            logger.warning(f"ファイル移動失敗: {result.src} -> {result.dest} ({result.error})")
+    logger.info(f"一括移動: {sum(r.ok for r in results)}/{len(results)}件 (コピー {len(copies)}件)")
+    return results
+
+
+def bulk_move(paths, dest_folder, workers=FILE_MOVE_WORKERS):
+    """複数のファイルを1つのフォルダへまとめて移動するのじゃ。
+
+    Args:
+        paths (list): 移動するファイルのパス（この順に処理する）
+        dest_folder (str): 移動先フォルダ
+        workers (int): 別ドライブへのコピーに使うスレッド数
+
+    Returns:
+        list: MoveResult のリスト（paths と同じ順）
+
+    Raises:
+        FileOperationError: 移動先フォルダが存在しない場合
+    """
+    if not dest_folder or not os.path.isdir(dest_folder):
+        raise FileOperationError(f"Destination folder does not exist: {dest_folder}")
+    return move_pairs([(src, os.path.join(dest_folder, os.path.basename(src))) for src in paths], workers)
@@ -0,0 +1,156 @@
+'''
+作成日: 2026年01月18日
+作成者: tamate masayuki
+機能: フォルダの走査結果の保存（マニフェスト）
+説明: フォルダごとに mtime・画像ファイル名・子フォルダ名を覚えておき、次に同じフォルダを
+      たどるとき mtime が同じなら一覧を読まずに覚えていた結果を使うのじゃ。
+      フォルダの mtime は中身の追加・削除・リネームで変わるので、変わっていないフォルダは
+      stat 1回で済むのじゃ（子フォルダの中身の変化は子フォルダ自身の mtime で分かる）。
+'''
+import os
+import json
+import threading
+from lib.GazoToolsLib import scan_folder
+from lib.GazoToolsFolderModel import settled_mtime
+from lib.GazoToolsLogger import LoggerManager
+from lib.config_defaults import FOLDER_MANIFEST_FILE
+
+logger = LoggerManager.get_logger(__name__)
+
+FOLDER_MANIFEST_VERSION = 1
+
+
+def _key(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+class FolderManifest:
+    """フォルダの走査結果を mtime 付きで保存するシングルトンクラスなのじゃ。
+
+    エントリは ``正規化したパス -> [mtime_ns, 画像ファイル名, 子フォルダ名]`` の形なのじゃ。
+    変更直後のフォルダは mtime を None で保存し、次回も読み直すのじゃ。
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        """シングルトンインスタンスを取得するのじゃ。"""
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, manifest_file=FOLDER_MANIFEST_FILE):
+        """初期化処理。
+
+        Args:
+            manifest_file (str): 保存先の JSON ファイル
+        """
+        self.manifest_file = manifest_file
+        self.entries = {}
+        self.scanned = 0  # 一覧を読んだフォルダ数
+        self.reused = 0   # 覚えていた結果を使ったフォルダ数
+        self._entry_lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    # ==================== 永続化 ====================
+
+    def _load(self):
+        if not os.path.exists(self.manifest_file):
+            return
+        try:
+            with open(self.manifest_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == FOLDER_MANIFEST_VERSION:
+                self.entries = data.get("dirs", {})
+                logger.info(f"フォルダマニフェストを読み込みました: {len(self.entries)}件")
+        except (IOError, json.JSONDecodeError) as e:
+            logger.warning(f"フォルダマニフェスト読み込み失敗、作り直します: {e}")
+            self.entries = {}
+
+    def flush(self):
+        """変更があればファイルに書き出すのじゃ。"""
+        with self._entry_lock:
+            if not self._dirty:
+                return
+            data = {"version": FOLDER_MANIFEST_VERSION, "dirs": dict(self.entries)}
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.manifest_file) or ".", exist_ok=True)
+            tmp_path = self.manifest_file + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.manifest_file)
+        except IOError as e:
+            logger.error(f"フォルダマニフェスト書き込み失敗: {self.manifest_file} - {e}")
+
+    # ==================== 走査 ====================
+
+    def listing(self, folder):
+        """フォルダの (画像ファイル名, 子フォルダ名) を返すのじゃ。mtime が同じなら読まないのじゃ。
+
+        Raises:
+            OSError: フォルダが読めない場合
+        """
+        key = _key(folder)
+        try:
+            st = os.stat(folder)
+        except OSError:
+            self.forget(folder)
+            raise
+        with self._entry_lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] is not None and entry[0] == st.st_mtime_ns:
+                self.reused += 1
+                return entry[1], entry[2]
+        files, subdirs = scan_folder(folder)
+        if entry is not None:
+            # 消えた子フォルダの分は、その下のエントリごと忘れるのじゃ
+            for name in set(entry[2]) - set(subdirs):
+                self.forget(os.path.join(folder, name))
+        with self._entry_lock:
+            self.entries[key] = [settled_mtime(st), files, subdirs]
+            self.scanned += 1
+            self._dirty = True
+        return files, subdirs
+
+    def forget(self, folder):
+        """フォルダとその下のエントリを消すのじゃ。"""
+        key = _key(folder)
+        prefix = key.rstrip(os.sep) + os.sep
+        with self._entry_lock:
+            stale = [k for k in self.entries if k == key or k.startswith(prefix)]
+            for k in stale:
+                del self.entries[k]
+            if stale:
+                self._dirty = True
+
+    def walk(self, root, recursive=True):
+        """root 以下を名前順にたどり、(フォルダパス, 画像ファイル名リスト) を順に返すジェネレータなのじゃ。
+
+        各フォルダは scan_folder で読むが、前回から変わっていないフォルダは一覧を読まないのじゃ。
+        読めないフォルダは飛ばすのじゃ。
+        """
+        stack = [root]
+        while stack:
+            current = stack.pop()
+            try:
+                files, subdirs = self.listing(current)
+            except OSError:
+                continue
+            if files:
+                yield current, files
+            if recursive:
+                # 名前順にたどるため逆順で積む
+                stack.extend(os.path.join(current, d) for d in reversed(subdirs))
+
+    def collect(self, root):
+        """root 以下の全画像を root からの相対パスで返すのじゃ。"""
+        images = []
+        for folder, files in self.walk(root):
+            rel = os.path.relpath(folder, root)
+            images.extend(files if rel == "." else (os.path.join(rel, f) for f in files))
+        return images
@@ -0,0 +1,217 @@
+'''
+作成日: 2026年01月18日
+作成者: tamate masayuki
+機能: フォルダ一覧・ファイル一覧の差分更新
+説明: 現在のフォルダの画像ファイル・子フォルダ・子フォルダごとの画像数を覚えておき、
+      フォルダの mtime が変わったときだけ読み直すのじゃ。読み直した結果は前回との差分
+      （削除・追加・件数の変化）として返すので、画面は変わった行だけ直せばよいのじゃ。
+      子フォルダの画像数はスレッドプールで数え、終わったものから知らせるのじゃ。
+'''
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from lib.GazoToolsLib import scan_folder
+from lib.GazoToolsLogger import LoggerManager
+from lib.config_defaults import FOLDER_COUNT_WORKERS
+
+logger = LoggerManager.get_logger(__name__)
+
+# mtime の精度（FAT は2秒）より新しい変更は、同じ mtime のまま次の変更が来るかもしれないのじゃ
+MTIME_SETTLE_SEC = 2.0
+
+COUNT_UNREADABLE = -1  # 読めなかった子フォルダの画像数（None はまだ数えていない）
+
+
+def sort_key(name):
+    """一覧の並び順（大文字・小文字を区別しない名前順）なのじゃ。"""
+    return (name.lower(), name)
+
+
+def list_edits(old, new):
+    """並び順どおりの2つのリストの差分を、Listbox に順に適用できる操作で返すのじゃ。
+
+    Args:
+        old (list): 今表示している項目（sort_key 順）
+        new (list): 新しい項目（sort_key 順）
+
+    Returns:
+        list: ("delete", 位置) または ("insert", 位置, 項目) のリスト
+    """
+    edits = []
+    i = j = pos = 0
+    while i < len(old) or j < len(new):
+        if j >= len(new) or (i < len(old) and sort_key(old[i]) < sort_key(new[j])):
+            edits.append(("delete", pos))
+            i += 1
+        elif i >= len(old) or sort_key(new[j]) < sort_key(old[i]):
+            edits.append(("insert", pos, new[j]))
+            pos += 1
+            j += 1
+        else:
+            pos += 1
+            i += 1
+            j += 1
+    return edits
+
+
+def settled_mtime(st):
+    """変更が落ち着いた mtime を返すのじゃ。変更直後なら None（次回も読み直す）。"""
+    if time.time() - st.st_mtime < MTIME_SETTLE_SEC:
+        return None
+    return st.st_mtime_ns
+
+
+class FolderDiff:
+    """前回からの変化なのじゃ。"""
+
+    __slots__ = ("file_edits", "folder_edits", "changed_counts")
+
+    def __init__(self, file_edits=None, folder_edits=None, changed_counts=None):
+        """初期化処理。
+
+        Args:
+            file_edits (list): ファイル一覧の list_edits
+            folder_edits (list): 子フォルダ一覧の list_edits
+            changed_counts (dict): 件数が変わった（または新しい）子フォルダ {名前: 件数}
+        """
+        self.file_edits = file_edits or []
+        self.folder_edits = folder_edits or []
+        self.changed_counts = changed_counts or {}
+
+    def __bool__(self):
+        return bool(self.file_edits or self.folder_edits or self.changed_counts)
+
+
+class FolderModel:
+    """現在のフォルダの内容を覚えておき、変わった分だけ読み直すクラスなのじゃ。
+
+    子フォルダの画像数は最初は前回の値（無ければ None）で、count_async で数え直すのじゃ。
+    """
+
+    def __init__(self, workers=FOLDER_COUNT_WORKERS):
+        """初期化処理。
+
+        Args:
+            workers (int): 子フォルダの画像数を数えるスレッド数
+        """
+        self.path = None
+        self.files = []     # 画像ファイル名（sort_key 順）
+        self.folders = []   # 子フォルダ名（sort_key 順）
+        self.counts = {}    # {子フォルダ名: 画像数, None（未集計）, COUNT_UNREADABLE}
+        self._mtime_ns = None
+        self._count_cache = {}  # {子フォルダのパス: (mtime_ns, 画像数)}
+        self._cache_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="FolderCount")
+
+    def _scan(self):
+        """フォルダを1回だけ走査して (画像ファイル, 子フォルダ) を sort_key 順で返すのじゃ。
+
+        どれを一覧に入れるかは、フォルダ走査やフォルダ監視と同じ scan_folder の規則なのじゃ。
+
+        Raises:
+            OSError: フォルダが読めない場合
+        """
+        files, folders = scan_folder(self.path)
+        return sorted(files, key=sort_key), sorted(folders, key=sort_key)
+
+    def _cached_count(self, name):
+        """前回数えた画像数を返すのじゃ（今も正しいかは確かめない）。"""
+        with self._cache_lock:
+            cached = self._count_cache.get(os.path.join(self.path, name))
+        return cached[1] if cached is not None else None
+
+    def count_images(self, folder):
+        """フォルダの画像数を返すのじゃ。mtime が変わっていなければ読み直さないのじゃ。
+
+        ワーカースレッドから呼ぶのじゃ。
+
+        Returns:
+            int: 画像数（読めなければ COUNT_UNREADABLE）
+        """
+        try:
+            st = os.stat(folder)
+            with self._cache_lock:
+                cached = self._count_cache.get(folder)
+            if cached is not None and cached[0] is not None and cached[0] == st.st_mtime_ns:
+                return cached[1]
+            count = len(scan_folder(folder)[0])
+        except OSError:
+            with self._cache_lock:
+                self._count_cache.pop(folder, None)
+            return COUNT_UNREADABLE
+        with self._cache_lock:
+            self._count_cache[folder] = (settled_mtime(st), count)
+        return count
+
+    def count_async(self, callback):
+        """全ての子フォルダの画像数をスレッドプールで数え直すのじゃ。
+
+        数え終わるたびに callback(フォルダのパス, 子フォルダ名, 画像数) をワーカースレッドから呼ぶので、
+        画面に反映するときはメインスレッドに回して set_count を呼ぶのじゃ。
+        """
+        path = self.path
+
+        def _count(name):
+            if path != self.path:
+                return # 別のフォルダに移ったので要らないのじゃ
+            callback(path, name, self.count_images(os.path.join(path, name)))
+
+        for name in list(self.folders):
+            self._executor.submit(_count, name)
+
+    def set_count(self, path, name, count):
+        """数え終わった画像数を反映するのじゃ（メインスレッドで呼ぶ）。
+
+        Returns:
+            bool: 表示を直す必要があれば True
+        """
+        if path != self.path or name not in self.counts or self.counts[name] == count:
+            return False
+        self.counts[name] = count
+        return True
+
+    def load(self, path):
+        """別のフォルダを読み込むのじゃ（画像数は前回の値で仮置きする）。
+
+        Raises:
+            OSError: フォルダが読めない場合
+        """
+        self.path = path
+        st = os.stat(path)
+        self.files, self.folders = self._scan()
+        self._mtime_ns = settled_mtime(st)
+        self.counts = {name: self._cached_count(name) for name in self.folders}
+        logger.info(f"フォルダ読み込み: {path} (フォルダ:{len(self.folders)}件, ファイル:{len(self.files)}件)")
+
+    def refresh(self):
+        """前回から変わった分だけ読み直し、差分を返すのじゃ。
+
+        フォルダ自体の mtime が変わっていなければ一覧は読まないのじゃ。
+        新しく現れた子フォルダの画像数は仮置きなので、続けて count_async を呼ぶのじゃ。
+
+        Returns:
+            FolderDiff: 変化（何も変わっていなければ空）
+
+        Raises:
+            OSError: フォルダが読めない場合
+        """
+        st = os.stat(self.path)
+        if self._mtime_ns is not None and st.st_mtime_ns == self._mtime_ns:
+            return FolderDiff()
+        files, folders = self._scan()
+        self._mtime_ns = settled_mtime(st)
+
+        diff = FolderDiff(list_edits(self.files, files), list_edits(self.folders, folders))
+        counts = {}
+        for name in folders:
+            if name in self.counts:
+                counts[name] = self.counts[name]
+            else:
+                counts[name] = diff.changed_counts[name] = self._cached_count(name)
+
+        self.files, self.folders, self.counts = files, folders, counts
+        if diff:
+            logger.info(f"フォルダ差分更新: {self.path} (ファイル操作:{len(diff.file_edits)}件, "
+                        f"フォルダ操作:{len(diff.folder_edits)}件)")
+        return diff
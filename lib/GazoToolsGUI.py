@@ -9,6 +9,7 @@ from PIL import Image, ImageTk
 import random
 import threading
 import time
+import queue
 
 # 依存モジュールのインポート
 # 注意: GazoToolsLogicからデータ関連の関数をインポートしますが、
@@ -17,6 +18,10 @@ from lib.GazoToolsLogger import get_logger
 from lib.GazoToolsState import get_app_state
 from lib.GazoToolsAI import VectorEngine
 from lib.GazoToolsLib import GetGazoFiles
+from lib.GazoToolsSimilarity import SimilarityIndex, RankedCandidates
+from lib.GazoToolsThumbStore import ThumbnailStore
+from lib.GazoToolsExceptions import FileHashError
+from lib.config_defaults import SMART_MOVE_BATCH_SIZE, THUMB_POLL_MS
 
 # 相対インポートではなく、ルートからのインポートを使用
 # (アプリ実行時のパス構成に依存)
@@ -36,6 +41,8 @@ except ImportError:
 logger = get_logger(__name__)
 app_state = get_app_state()
 
+THUMB_SIZE = (64, 64)  # 類似画像リストのサムネイルサイズ
+
 class ScrollableFrame(tk.Frame):
     """スクロール可能なフレームウィジェット"""
     def __init__(self, parent, *args, **kwargs):
@@ -81,59 +88,230 @@ class ScrollableFrame(tk.Frame):
         self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
 
 class RowWidget(tk.Frame):
-    """リストの1行を表すウィジェット"""
+    """リストの1行を表すウィジェット
+
+    VirtualRowList では同じウィジェットを別の行に使い回すので、
+    表示内容は bind_item で差し替えるのじゃ。
+    """
+    # 作成スレッドからメインスレッドへサムネイルを渡すキュー（Tk はメインスレッドからしか触れない）
+    _thumb_results = queue.SimpleQueue()
+    _thumb_waiting = 0      # 受け取り待ちの件数（メインスレッドだけが触る）
+    _thumb_polling = False
+
     def __init__(self, parent, filepath, score, is_target=False, show_thumb=True):
-        super().__init__(parent, bg="#e6ffe6" if is_target else "#ffffff", pady=2, padx=2, bd=1, relief=tk.SOLID if is_target else tk.FLAT)
-        self.filepath = filepath
+        super().__init__(parent, pady=2, padx=2, bd=1)
+        self.filepath = None
         self.score = score
         self.show_thumb = show_thumb
         self.is_target = is_target
         self._image_loaded = False
         self._thumb_img = None
+        # 画像が来るまでの灰色の枠（ピクセル単位でサイズを固定するためのもの）
+        self._blank_img = tk.PhotoImage(width=THUMB_SIZE[0], height=THUMB_SIZE[1])
         
         # サムネイル領域
-        self.lbl_thumb = tk.Label(self, bg="#dddddd", width=64, height=64) if show_thumb else None
+        self.lbl_thumb = tk.Label(self, bg="#dddddd", image=self._blank_img) if show_thumb else None
         if self.lbl_thumb:
             self.lbl_thumb.pack(side=tk.LEFT, padx=(0, 5))
-            # 遅延ロードはせず、表示時にロード関数を呼ぶ設計にするが、
-            # Threadingでロード済みならそれをセットする形がいい。
-            # ここではシンプルに「表示が必要ならロード」する。
-            if show_thumb:
-                self.load_thumbnail()
 
         # テキスト情報
-        text = f"[基準] {os.path.basename(filepath)}" if is_target else f"({score:.1%}) {os.path.basename(filepath)}"
-        fg = "blue" if is_target else "black"
-        self.lbl_text = tk.Label(self, text=text, font=("MS Gothic", 9), anchor="w", bg=self.cget("bg"), fg=fg)
+        self.lbl_text = tk.Label(self, font=("MS Gothic", 9), anchor="w")
         self.lbl_text.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.bind_item(filepath, score, is_target)
+
+    def bind_item(self, filepath, score, is_target=False):
+        """この行に表示する項目を差し替えるのじゃ。"""
+        if filepath == self.filepath and score == self.score and is_target == self.is_target:
+            return
+        self.filepath = filepath
+        self.score = score
+        self.is_target = is_target
+
+        bg = "#e6ffe6" if is_target else "#ffffff"
+        self.config(bg=bg, relief=tk.SOLID if is_target else tk.FLAT)
+        text = f"[基準] {os.path.basename(filepath)}" if is_target else f"({score:.1%}) {os.path.basename(filepath)}"
+        self.lbl_text.config(text=text, bg=bg, fg="blue" if is_target else "black")
+
+        # 前の項目のサムネイルを外して、必要なら読み直すのじゃ
+        self._image_loaded = False
+        self._thumb_img = None
+        if self.lbl_thumb:
+            self.lbl_thumb.config(image=self._blank_img)
+        if self.show_thumb:
+            self.load_thumbnail()
 
     def load_thumbnail(self):
         if self._image_loaded: return
-        try:
-            # 高速化のため最大サイズを指定してロード
-            with Image.open(self.filepath) as img:
-                img.thumbnail((64, 64))
-                self._thumb_img = ImageTk.PhotoImage(img)
-                if self.lbl_thumb:
-                    self.lbl_thumb.config(image=self._thumb_img, width=0, height=0) # 画像サイズに合わせる
-        except Exception:
-            pass # ロード失敗時はグレーのまま
         self._image_loaded = True
+        # ディスクのサムネイルキャッシュにあればすぐ表示し、無ければバックグラウンドで作るのじゃ
+        store = ThumbnailStore.get_instance()
+        img = store.lookup(self.filepath, THUMB_SIZE)
+        if img is not None:
+            self._set_thumbnail(img)
+            return
+        filepath = self.filepath
+        future = store.request(filepath, THUMB_SIZE)
+        RowWidget._thumb_waiting += 1
+        future.add_done_callback(lambda f: RowWidget._thumb_results.put((self, f, filepath)))
+        if not RowWidget._thumb_polling:
+            RowWidget._thumb_polling = True
+            root = self._root()
+            root.after(THUMB_POLL_MS, RowWidget._poll_thumbnails, root)
+
+    @classmethod
+    def _poll_thumbnails(cls, root):
+        """作成スレッドから届いたサムネイルを表示するのじゃ（メインスレッドで呼ぶ）。
+
+        受け取り待ちが残っている間だけ、THUMB_POLL_MS ごとに呼び直すのじゃ。
+        """
+        while True:
+            try:
+                widget, future, filepath = cls._thumb_results.get_nowait()
+            except queue.Empty:
+                break
+            cls._thumb_waiting -= 1
+            try:
+                widget._on_thumbnail_ready(future, filepath)
+            except tk.TclError:
+                pass # ダイアログが閉じられた後なら何もしないのじゃ
+        if cls._thumb_waiting > 0:
+            try:
+                root.after(THUMB_POLL_MS, cls._poll_thumbnails, root)
+                return
+            except tk.TclError:
+                pass # アプリを閉じた後なのじゃ
+        cls._thumb_polling = False
+
+    def _on_thumbnail_ready(self, future, filepath):
+        """バックグラウンドで作ったサムネイルを表示するのじゃ（メインスレッドで呼ぶ）。"""
+        if not self.winfo_exists() or future.exception() is not None:
+            return # ロード失敗時はグレーのまま
+        if filepath != self.filepath or not self.show_thumb:
+            return # 待っている間に別の行へ使い回されたのじゃ
+        self._set_thumbnail(future.result())
+
+    def _set_thumbnail(self, img):
+        self._thumb_img = ImageTk.PhotoImage(img)
+        if self.lbl_thumb:
+            self.lbl_thumb.config(image=self._thumb_img)
 
     def set_thumbnail_visible(self, visible):
         """サムネイル表示切り替え"""
+        self.show_thumb = visible
         if visible:
             if not self.lbl_thumb:
-                self.lbl_thumb = tk.Label(self, bg="#dddddd")
+                self.lbl_thumb = tk.Label(self, bg="#dddddd", image=self._blank_img)
             self.lbl_thumb.pack(side=tk.LEFT, padx=(0, 5), before=self.lbl_text)
             self.load_thumbnail()
         else:
             if self.lbl_thumb:
                 self.lbl_thumb.pack_forget()
 
+class VirtualRowList(tk.Frame):
+    """見えている行の分だけ RowWidget を作る仮想スクロールリストなのじゃ。
+
+    行の高さを固定し、Canvas のスクロール領域は「行数 × 行の高さ」にするのじゃ。
+    スクロールするたびに、プールしておいた RowWidget を見えている位置へ移して
+    内容を差し替えるので、何万件あってもウィジェットは画面の行数ぶんしか作らないのじゃ。
+    """
+    ROW_HEIGHT_THUMB = THUMB_SIZE[1] + 12
+    ROW_HEIGHT_TEXT = 24
+
+    def __init__(self, parent, get_item, show_thumb=True, **kwargs):
+        """初期化処理。
+
+        Args:
+            parent: 親ウィジェット
+            get_item (callable): 行番号から (パス, スコア, 基準画像か) を返す関数
+            show_thumb (bool): サムネイルを表示するか
+        """
+        super().__init__(parent, **kwargs)
+        self.get_item = get_item
+        self.show_thumb = show_thumb
+        self.row_height = self.ROW_HEIGHT_THUMB if show_thumb else self.ROW_HEIGHT_TEXT
+        self.count = 0
+        self._pool = [] # [(RowWidget, canvas window id), ...]
+
+        self.canvas = tk.Canvas(self, borderwidth=0, highlightthickness=0, bg="#ffffff",
+                                yscrollincrement=self.row_height)
+        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self._on_yscroll)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.canvas.bind("<Configure>", lambda e: self.refresh())
+        self.bind_mouse_wheel(self.canvas)
+
+    def bind_mouse_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_mouse_wheel)
+
+    def _on_mouse_wheel(self, event):
+        self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.refresh()
+
+    def set_count(self, count):
+        """行数を変えるのじゃ（閾値の変更など）。"""
+        self.count = count
+        self._update_scrollregion()
+        self.refresh()
+
+    def set_show_thumb(self, show):
+        """サムネイル表示を切り替えるのじゃ。行の高さも変わるのじゃ。"""
+        self.show_thumb = show
+        self.row_height = self.ROW_HEIGHT_THUMB if show else self.ROW_HEIGHT_TEXT
+        self.canvas.configure(yscrollincrement=self.row_height)
+        for rw, _ in self._pool:
+            rw.set_thumbnail_visible(show)
+        self._update_scrollregion()
+        self.refresh()
+
+    def _update_scrollregion(self):
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), self.count * self.row_height))
+
+    def _ensure_pool(self, size):
+        """使い回す RowWidget を必要な数まで増やすのじゃ。"""
+        while len(self._pool) < size:
+            path, score, is_target = self.get_item(0)
+            rw = RowWidget(self.canvas, path, score, is_target=is_target, show_thumb=self.show_thumb)
+            for widget in (rw, rw.lbl_text, rw.lbl_thumb):
+                if widget:
+                    self.bind_mouse_wheel(widget)
+            window_id = self.canvas.create_window(0, 0, window=rw, anchor="nw", state="hidden")
+            self._pool.append((rw, window_id))
+
+    def refresh(self):
+        """見えている範囲の行だけを配置し直すのじゃ。"""
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        if self.count == 0:
+            for _, window_id in self._pool:
+                self.canvas.itemconfigure(window_id, state="hidden")
+            return
+
+        first = max(0, int(self.canvas.canvasy(0) // self.row_height))
+        visible = max(0, min(self.count - first, height // self.row_height + 2))
+        self._ensure_pool(visible)
+        for slot, (rw, window_id) in enumerate(self._pool):
+            index = first + slot
+            if slot < visible and index < self.count:
+                rw.bind_item(*self.get_item(index))
+                self.canvas.coords(window_id, 0, index * self.row_height)
+                self.canvas.itemconfigure(window_id, state="normal", width=width, height=self.row_height)
+            else:
+                self.canvas.itemconfigure(window_id, state="hidden")
+
 class SimilarityMoveDialog(tk.Toplevel):
     """類似画像をまとめて移動するためのダイアログクラスなのじゃ。"""
     def __init__(self, parent, target_file, dest_folder, folder_path, move_callback, refresh_callback=None):
+        """初期化処理。
+
+        Args:
+            move_callback (callable): move_callback(パスのリスト, 移動先) -> MoveResult のリスト
+            refresh_callback (callable): 移動後に1回だけ呼ぶ画面更新 refresh_callback(フォルダ)
+        """
         super().__init__(parent)
         self.title("スマート移動 - 準備中...")
         self.geometry("500x600")
@@ -145,8 +323,8 @@ class SimilarityMoveDialog(tk.Toplevel):
         self.move_callback = move_callback
         self.refresh_callback = refresh_callback
         
-        self.row_widgets = [] # RowWidgetのリスト
-        self.selected_files = [] # Files to move
+        self.candidates = RankedCandidates() # 基準画像以外の候補（スコア降順）
+        self.remaining = 0 # まだ採点していない画像の数
         self.is_calculating = True
         self.stop_thread = False
         
@@ -188,8 +366,8 @@ class SimilarityMoveDialog(tk.Toplevel):
         frame_list_container = tk.Frame(self, bd=1, relief=tk.SUNKEN)
         frame_list_container.pack(expand=True, fill=tk.BOTH, padx=10, pady=5)
         
-        self.scroll_frame = ScrollableFrame(frame_list_container)
-        self.scroll_frame.pack(expand=True, fill=tk.BOTH)
+        self.list_view = VirtualRowList(frame_list_container, self._row_item, show_thumb=self.var_show_thumb.get())
+        self.list_view.pack(expand=True, fill=tk.BOTH)
         
         # Buttons
         frame_btn = tk.Frame(self)
@@ -207,15 +385,13 @@ class SimilarityMoveDialog(tk.Toplevel):
         self.destroy()
 
     def prepare_data_thread(self):
-        """別スレッドで重い処理を行うのじゃ"""
-        try:
-            from GazoToolsLogic import calculate_file_hash, load_vectors, save_vectors
+        """別スレッドで重い処理を行うのじゃ
 
-            # GUI更新用ヘルパー
-            def update_status(text, loaded_count=0, total_count=0):
-                 self.after(0, lambda: self.lb_status.config(text=text))
-                 if total_count > 0:
-                     self.after(0, lambda: self.title(f"準備中... {loaded_count}/{total_count}"))
+        ハッシュもベクトルも揃っている画像は最初にまとめて採点してすぐ表示し、
+        残りはバッチごとにハッシュ・ベクトルを計算して、できた分から一覧に加えるのじゃ。
+        """
+        try:
+            from GazoToolsLogic import calculate_file_hash, peek_hashes, load_vectors, save_vectors
 
             engine = VectorEngine.get_instance()
             vectors = load_vectors()
@@ -233,163 +409,161 @@ class SimilarityMoveDialog(tk.Toplevel):
                 return
 
             all_items = os.listdir(self.folder_path)
-            files = GetGazoFiles(all_items, self.folder_path)
-            total = len(files)
-            
-            candidates_data = [] # (file_path, score)
+            files = [os.path.join(self.folder_path, f) for f in GetGazoFiles(all_items, self.folder_path)]
+            files = [full for full in files if full != self.target_file]
+
+            # 1) ハッシュが分かっていてベクトルもある画像は、読み込まずに一度に採点するのじゃ
+            known = peek_hashes(files)
+            ready = {} # hash -> [file_path, ...]
+            pending = []
+            for full in files:
+                h = known.get(full)
+                if h is not None and h in vectors:
+                    ready.setdefault(h, []).append(full)
+                else:
+                    pending.append(full)
+            self._post_results(self._score_groups(vectors, ready, t_vec), len(pending))
+            logger.debug(f"[PERF] 計算済み {len(files) - len(pending)}件を表示、残り {len(pending)}件")
+
+            # 2) 残りはバッチごとにハッシュとベクトルを計算し、できた分から追加するのじゃ
             vectors_updated = False
-            
-            start_time = time.time()
-            chunk_start_time = start_time
-            
-            count = 0
-            for i, f in enumerate(files):
-                if self.stop_thread: return
-                
-                full = os.path.join(self.folder_path, f)
-                if full == self.target_file: continue
-                
-                h = calculate_file_hash(full)
-                # ベクトルがない場合、ここで計算してしまうのじゃ！
-                if h not in vectors:
+            for start in range(0, len(pending), SMART_MOVE_BATCH_SIZE):
+                if self.stop_thread: break
+                chunk_start_time = time.time()
+                batch = pending[start:start + SMART_MOVE_BATCH_SIZE]
+
+                groups = {} # hash -> [file_path, ...]
+                for full in batch:
                     try:
-                        vec = engine.get_image_feature(full)
-                        if vec:
-                            vectors[h] = vec
+                        groups.setdefault(calculate_file_hash(full), []).append(full)
+                    except FileHashError as e:
+                        logger.warning(f"ハッシュ計算失敗（スキップ）: {full} - {e}")
+
+                # ベクトルがない場合、ここでまとめて計算してしまうのじゃ！
+                missing = {paths[0]: h for h, paths in groups.items() if h not in vectors}
+                if missing:
+                    try:
+                        for path, vec in engine.get_image_features_batch(list(missing)):
+                            vectors[missing[path]] = vec
                             vectors_updated = True
                     except Exception as e:
-                        logger.warning(f"オンデマンドベクトル計算失敗: {f} - {e}")
-
-                if h in vectors:
-                    score = engine.compare_features(t_vec, vectors[h])
-                    candidates_data.append((full, score))
-                
-                count += 1
-                
-                # 10個ごとに時間を計測してログ出力（ユーザー要望）
-                if count % 10 == 0:
-                    current = time.time()
-                    elapsed = current - chunk_start_time
-                    logger.debug(f"[PERF] Processed 10 items in {elapsed:.4f} sec (Total: {count}/{total})")
-                    chunk_start_time = current
-                    update_status(f"計算中... {count}/{total}", count, total)
-
-            # ベクトルが更新されていれば保存するのじゃ
+                        logger.warning(f"オンデマンドベクトル計算失敗: {len(missing)}件 - {e}")
+
+                ready = {h: paths for h, paths in groups.items() if h in vectors}
+                remaining = len(pending) - start - len(batch)
+                self._post_results(self._score_groups(vectors, ready, t_vec), remaining)
+                logger.debug(f"[PERF] Processed {len(batch)} items in {time.time() - chunk_start_time:.4f} sec (Remaining: {remaining})")
+
+            # ベクトルが更新されていれば保存するのじゃ（キャンセルされても計算した分は残す）
             if vectors_updated:
-                self.after(0, lambda: self.lb_status.config(text="ベクトル保存中..."))
+                self._post_status("ベクトル保存中...")
                 try:
                     save_vectors(vectors)
                 except Exception as e:
                     logger.error(f"ベクトル保存エラー: {e}")
 
-            # スコア順にソート
-            candidates_data.sort(key=lambda x: x[1], reverse=True)
-            
-            # RowWidgetの生成はメインスレッドで行う必要があるのじゃ（Tkinterの制約）
-            # なので、データを渡してメインスレッド側で構築する
-            self.after(0, lambda: self.finalize_preparation(candidates_data))
+            if not self.stop_thread:
+                self.after(0, self.finish_preparation)
             
         except Exception as e:
             logger.error(f"データ準備スレッドエラー: {e}", exc_info=True)
             self.after(0, lambda: messagebox.showerror("エラー", f"データ準備中にエラーが発生したのじゃ: {e}"))
             self.after(0, self.destroy)
 
-    def finalize_preparation(self, candidates_data):
-        """データ準備完了後のUI構築（メインスレッド）"""
+    @staticmethod
+    def _score_groups(vectors, groups, t_vec):
+        """ハッシュごとのファイル群を1回の行列計算で採点するのじゃ。
+
+        Returns:
+            list: (file_path, score) のリスト（スコア降順）
+        """
+        if not groups:
+            return []
+        index = SimilarityIndex.from_store(vectors, groups.keys())
+        return [(full, score) for h, score in index.top_k(t_vec, len(index)) for full in groups[h]]
+
+    def _post_results(self, results, remaining):
+        """採点結果をメインスレッドに渡すのじゃ（Tkinterの制約）。"""
+        if not self.stop_thread:
+            self.after(0, self.add_results, results, remaining)
+
+    def _post_status(self, text):
+        if not self.stop_thread:
+            self.after(0, lambda: self.lb_status.config(text=text))
+
+    def add_results(self, results, remaining):
+        """届いた採点結果を一覧に加えるのじゃ（メインスレッド）。"""
         if self.stop_thread: return
-        
-        self.is_calculating = False
-        self.lb_status.config(text="リスト構築中...")
+
+        if self.is_calculating:
+            # 最初の結果が届いた時点で一覧を使えるようにするのじゃ
+            self.is_calculating = False
+            self.btn_execute.config(state=tk.NORMAL)
+        self.remaining = remaining
+        if remaining:
+            self.title(f"スマート移動 - 計算中... 残り{remaining}件")
+        self.candidates.extend(results)
+        self.update_list_filter()
+
+    def finish_preparation(self):
+        """全ての候補の採点が終わったのじゃ（メインスレッド）。"""
+        if self.stop_thread: return
+        self.remaining = 0
         self.title("スマート移動 - 類似画像も一緒に運ぶのじゃ")
-        
-        # ウィジェットプール作成
-        # 基準画像
-        self.row_widgets.append(RowWidget(self.scroll_frame.scrollable_frame, self.target_file, 1.0, is_target=True, show_thumb=self.var_show_thumb.get()))
-        
-        # 候補画像
-        for f, score in candidates_data:
-            rw = RowWidget(self.scroll_frame.scrollable_frame, f, score, show_thumb=self.var_show_thumb.get())
-            self.row_widgets.append(rw)
-            
-        self.btn_execute.config(state=tk.NORMAL)
         self.update_list_filter()
-        self.lb_status.config(text="準備完了")
+
+    def _row_item(self, index):
+        """リストの index 行目の (パス, スコア, 基準画像か) を返すのじゃ。0行目は基準画像。"""
+        if index == 0:
+            return self.target_file, 1.0, True
+        path, score = self.candidates[index - 1]
+        return path, score, False
+
+    @property
+    def selected_files(self):
+        """移動対象（基準画像 + 閾値以上の候補）なのじゃ。"""
+        return [self.target_file] + self.candidates.paths_at_least(self.var_threshold.get())
 
     def update_thumbnail_visibility(self):
         """サムネイル表示の一括切り替え"""
-        show = self.var_show_thumb.get()
-        for rw in self.row_widgets:
-            rw.set_thumbnail_visible(show)
+        self.list_view.set_show_thumb(self.var_show_thumb.get())
     
     def update_list_filter(self):
-        """スライダーの値に基づいてリストをフィルタリング（Widget Pooling）"""
+        """スライダーの値に基づいてリストをフィルタリングするのじゃ。
+
+        候補はスコア降順なので、閾値以上の件数は二分探索で決まり、
+        リストにはその件数を伝えるだけなのじゃ。
+        """
         if self.is_calculating: return
         
-        threshold = self.var_threshold.get()
-        count = 0
-        visible_widgets = []
-        self.selected_files = []
-        
-        # 再描画のチラつきを抑えるため、マップ済みかどうかを管理できればベストだが
-        # pack/pack_forget は比較的軽量なのでそのままやる
-        
-        for rw in self.row_widgets:
-            if rw.is_target:
-                visible_widgets.append(rw)
-                self.selected_files.append(rw.filepath)
-                count += 1
-            elif rw.score >= threshold:
-                visible_widgets.append(rw)
-                self.selected_files.append(rw.filepath)
-                count += 1
-        
-        # 一括配置更新
-        # 現在packされているものと、本来あるべきものの差分だけ操作するのは面倒なので
-        # 全リストのpack状態を更新する（順序維持）
-        # ただ、毎回全部 forget は遅いので、必要なものだけ pack する
-        
-        # 一旦すべて forget するのが手っ取り早いが、数が多いと点滅する。
-        # ここはシンプルに「grid」ではなく「pack」なので、上から順に並べる必要がある。
-        # 既存のslaveリストを取得して...というのは複雑。
-        # リストボックス的挙動なら、「Grid」を使って `grid_remove` のほうが状態保持しやすいかもだが、
-        # ここは `pack_forget` と `pack` でいく。
-        
-        for child in self.scroll_frame.scrollable_frame.winfo_children():
-            child.pack_forget()
-            
-        for rw in visible_widgets:
-            rw.pack(fill=tk.X, expand=True)
-            # 表示された時点で画像ロード（遅延ロード）
-            if rw.show_thumb:
-                rw.load_thumbnail()
-        
-        self.lb_status.config(text=f"移動対象: {count}件")
+        count = self.candidates.count_at_least(self.var_threshold.get()) + 1 # 基準画像の分
+        self.list_view.set_count(count)
+        status = f"移動対象: {count}件"
+        if self.remaining:
+            status += f"（残り {self.remaining}件を計算中...）"
+        self.lb_status.config(text=status)
 
     def on_execute(self):
         if not self.move_callback: return
-        count = len(self.selected_files)
+        selected_files = self.selected_files
+        count = len(selected_files)
         if messagebox.askyesno("確認", f"{count}件のファイルを移動してよいかの？"):
+            # まだ採点中なら止めるのじゃ（表示されている分だけを移動する）
+            self.stop_thread = True
             # 移動処理
             # ★重要★: 基準画像(target_file)を移動すると、呼び出し元のウィンドウが閉じてしまい、
             # このダイアログも道連れで破棄される可能性があるのじゃ。
             # そのため、基準画像はリストの最後に移動させる工夫が必要なのじゃ。
             
-            non_target_files = [f for f in self.selected_files if f != self.target_file]
-            targets = [f for f in self.selected_files if f == self.target_file] # 通常1つ
+            non_target_files = [f for f in selected_files if f != self.target_file]
+            targets = [f for f in selected_files if f == self.target_file] # 通常1つ
             
             # 先に基準以外を移動
             sorted_files = non_target_files + targets
             
-            success_count = 0
-            for f in sorted_files:
-                try:
-                    # キーワード引数 refresh=False を渡せるか試みる
-                    self.move_callback(f, self.dest_folder, refresh=False)
-                    success_count += 1
-                except TypeError:
-                    # refresh引数がない関数だった場合のフォールバック
-                    self.move_callback(f, self.dest_folder)
-                    success_count += 1
+            # move_callback(パスのリスト, 移動先) は MoveResult のリストを返し、画面更新はしないのじゃ
+            results = self.move_callback(sorted_files, self.dest_folder) or []
+            success_count = sum(1 for r in results if r.ok)
             
             # ★ 最後に一括リフレッシュを実行するのじゃ ★
             if self.refresh_callback:
@@ -0,0 +1,390 @@
+'''
+作成日: 2026年01月08日
+作成者: tamate masayuki
+機能: ファイルハッシュの永続インデックス
+説明: (パス, サイズ, mtime, inode) をキーにMD5を記録し、
+      stat が変わっていなければファイルを読み直さずにハッシュを返すのじゃ。
+      途中の保存は変更分だけを追記ログ（.log）に書き、全体の書き直しは終了時にまとめて行うのじゃ。
+'''
+import os
+import json
+import time
+import hashlib
+import threading
+from lib.GazoToolsExceptions import FileHashError
+from lib.GazoToolsLogger import LoggerManager
+from lib.config_defaults import (
+    HASH_INDEX_FILE, HASH_INDEX_FLUSH_COUNT, HASH_INDEX_FLUSH_INTERVAL
+)
+
+logger = LoggerManager.get_logger(__name__)
+
+HASH_INDEX_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024  # 1MBずつ読むのじゃ
+
+
+def compute_md5(filepath):
+    """ファイル全体を読んでMD5を計算するのじゃ（インデックスを経由しない素の計算）。
+
+    Args:
+        filepath (str): ファイルパス
+
+    Returns:
+        str: MD5の16進文字列
+
+    Raises:
+        OSError: ファイルが読めない場合
+    """
+    hash_md5 = hashlib.md5()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            hash_md5.update(chunk)
+    return hash_md5.hexdigest()
+
+
+def normalize_path(filepath):
+    """インデックスのキーとして使う正規化パスを返すのじゃ。"""
+    return os.path.normcase(os.path.abspath(filepath))
+
+
+class HashIndex:
+    """stat情報でハッシュの再計算を省くための永続インデックスなのじゃ。
+
+    エントリは ``正規化パス -> [size, mtime_ns, inode, digest]`` の形で保持し、
+    stat の結果が一致する限り保存済みのダイジェストを返すのじゃ。
+    変更は一定件数または一定時間ごとに、変わったエントリだけを追記ログへ書き出すのじゃ
+    （1行が ``[正規化パス, エントリ or null]``、全削除は ``{"clear": true}``）。
+    途中で確実に残したいときは save_pending() で追記ログに書くのじゃ。
+    flush() はインデックス全体を書き直して追記ログを消すので、終了時に呼ぶのじゃ。
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        """シングルトンインスタンスを取得するのじゃ。"""
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, index_file=HASH_INDEX_FILE,
+                 flush_count=HASH_INDEX_FLUSH_COUNT,
+                 flush_interval=HASH_INDEX_FLUSH_INTERVAL):
+        """初期化処理。
+
+        Args:
+            index_file (str): インデックスの保存先
+            flush_count (int): この件数の変更が溜まったら書き出す
+            flush_interval (float): 最後の書き出しからこの秒数経ったら書き出す
+        """
+        self.index_file = index_file
+        self.log_file = index_file + ".log"
+        self.flush_count = flush_count
+        self.flush_interval = flush_interval
+        self.entries = {}
+        self._entry_lock = threading.RLock()
+        self._write_lock = threading.Lock()   # 書き出しの順番を守るための鍵（エントリの鍵とは別）
+        self._changes = {}        # まだ追記ログに書いていない変更 {キー: エントリ or None}
+        self._cleared = False     # まだ追記ログに書いていない全削除
+        self._dirty_count = 0
+        self._log_lines = 0       # 追記ログの行数（0 でなければ flush で全体を書き直す）
+        self._log_torn = False    # 追記に失敗して、最後の行が書きかけかもしれない
+        self._last_flush = time.time()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    # ==================== 永続化 ====================
+
+    def _load(self):
+        """インデックスファイルと追記ログを読み込むのじゃ。壊れていたら空から始めるのじゃ。"""
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") != HASH_INDEX_VERSION:
+                    logger.warning(f"ハッシュインデックスのバージョン不一致のため作り直します: {self.index_file}")
+                    self._discard_log()
+                    return
+                self.entries = data.get("entries", {})
+            except (IOError, json.JSONDecodeError) as e:
+                logger.warning(f"ハッシュインデックス読み込み失敗、新規作成します: {e}")
+                self.entries = {}
+        self._replay_log()
+        if self.entries:
+            logger.info(f"ハッシュインデックスを読み込みました: {len(self.entries)}件 (追記ログ {self._log_lines}行)")
+
+    def _replay_log(self):
+        """追記ログの変更をエントリに重ねるのじゃ。壊れた行は読み飛ばすのじゃ。
+
+        落ちて最後の行が書きかけのまま残っていたら、最後の改行まで切り詰めるのじゃ。
+        そのままだと次の追記がその行につながり、追記した最初の行まで読めなくなるのじゃ。
+        """
+        if not os.path.exists(self.log_file):
+            return
+        try:
+            with open(self.log_file, "rb") as f:
+                data = f.read()
+            if data and not data.endswith(b"\n"):
+                end = data.rfind(b"\n") + 1
+                logger.warning("ハッシュインデックスの追記ログの書きかけの行を切り詰めました")
+                with open(self.log_file, "r+b") as f:
+                    f.truncate(end)
+                data = data[:end]
+            for line in data.decode("utf-8", errors="replace").splitlines():
+                line = line.strip()
+                if not line:
+                    continue
+                self._log_lines += 1
+                try:
+                    record = json.loads(line)
+                    if isinstance(record, dict):
+                        if record.get("clear"):
+                            self.entries.clear()
+                    elif record[1] is None:
+                        self.entries.pop(record[0], None)
+                    else:
+                        self.entries[record[0]] = record[1]
+                except (json.JSONDecodeError, IndexError, TypeError, KeyError):
+                    logger.warning("ハッシュインデックスの追記ログの壊れた行を読み飛ばしました")
+        except IOError as e:
+            logger.warning(f"ハッシュインデックスの追記ログ読み込み失敗: {self.log_file} - {e}")
+
+    def _discard_log(self):
+        try:
+            os.remove(self.log_file)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"ハッシュインデックスの追記ログ削除失敗: {self.log_file} - {e}")
+
+    def flush(self):
+        """インデックス全体を書き直し、追記ログを消すのじゃ（終了時などに呼ぶ）。
+
+        エントリの鍵はコピーする間だけ持ち、書き込みは鍵を放してから行うのじゃ。
+        """
+        with self._write_lock:
+            with self._entry_lock:
+                if self._dirty_count == 0 and self._log_lines == 0:
+                    return
+                data = {"version": HASH_INDEX_VERSION, "entries": dict(self.entries)}
+                self._changes = {}
+                self._cleared = False
+                self._dirty_count = 0
+                self._last_flush = time.time()
+            try:
+                os.makedirs(os.path.dirname(self.index_file) or ".", exist_ok=True)
+                tmp_path = self.index_file + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+                os.replace(tmp_path, self.index_file)
+                # 追記ログの中身は全て書き直した内容に含まれているのじゃ
+                self._discard_log()
+                self._log_lines = 0
+                self._log_torn = False
+                logger.debug(f"ハッシュインデックスを保存しました: {len(data['entries'])}件")
+            except IOError as e:
+                logger.error(f"ハッシュインデックス書き込み失敗: {self.index_file} - {e}")
+
+    def save_pending(self):
+        """溜まった変更だけを追記ログに書き出すのじゃ（途中保存用。全体の書き直しは flush）。"""
+        self._append_changes()
+
+    def _append_changes(self):
+        """溜まった変更だけを追記ログに書き出すのじゃ（変更の件数分の I/O で済む）。"""
+        with self._write_lock:
+            with self._entry_lock:
+                if not self._changes and not self._cleared:
+                    return
+                changes, self._changes = self._changes, {}
+                cleared, self._cleared = self._cleared, False
+                self._dirty_count = 0
+                self._last_flush = time.time()
+            lines = [json.dumps({"clear": True})] if cleared else []
+            lines.extend(json.dumps([k, e], ensure_ascii=False, separators=(",", ":")) for k, e in changes.items())
+            try:
+                os.makedirs(os.path.dirname(self.log_file) or ".", exist_ok=True)
+                with open(self.log_file, "a", encoding="utf-8") as f:
+                    # 前の追記が途中で失敗していたら、書きかけの行とつながらないよう改行から始めるのじゃ
+                    f.write(("\n" if self._log_torn else "") + "\n".join(lines) + "\n")
+                self._log_lines += len(lines)
+                self._log_torn = False
+            except IOError as e:
+                self._log_torn = True
+                # 書けなかった分もメモリには残っているので、終了時の flush で保存されるのじゃ
+                logger.error(f"ハッシュインデックス追記失敗: {self.log_file} - {e}")
+
+    def _mark_dirty(self, key=None, entry=None):
+        """変更を記録し、書き出す頃合いなら True を返すのじゃ（エントリの鍵を持って呼ぶ）。
+
+        書き出し自体は、呼び出し側が鍵を放してから _append_changes で行うのじゃ。
+        """
+        if key is not None:
+            self._changes[key] = entry
+        self._dirty_count += 1
+        return (self._dirty_count >= self.flush_count
+                or time.time() - self._last_flush >= self.flush_interval)
+
+    # ==================== 参照 ====================
+
+    def _lookup(self, key, st):
+        """stat が一致するエントリのダイジェストを返すのじゃ。なければ None。"""
+        entry = self.entries.get(key)
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns and entry[2] == st.st_ino:
+            return entry[3]
+        return None
+
+    def get_hash(self, filepath):
+        """ファイルのハッシュを返すのじゃ。stat が変わっていなければ読み込みを省くのじゃ。
+
+        Args:
+            filepath (str): ファイルパス
+
+        Returns:
+            str: MD5の16進文字列
+
+        Raises:
+            FileHashError: ファイルが存在しない・読めない場合
+        """
+        key = normalize_path(filepath)
+        try:
+            st = os.stat(filepath)
+        except FileNotFoundError as e:
+            self.invalidate(filepath)
+            raise FileHashError(f"File not found: {filepath}") from e
+        except OSError as e:
+            raise FileHashError(f"Cannot stat file: {filepath}") from e
+
+        with self._entry_lock:
+            digest = self._lookup(key, st)
+            if digest is not None:
+                self.hits += 1
+                return digest
+
+        try:
+            digest = compute_md5(filepath)
+        except FileNotFoundError as e:
+            self.invalidate(filepath)
+            raise FileHashError(f"File not found: {filepath}") from e
+        except OSError as e:
+            raise FileHashError(f"Cannot read file: {filepath}") from e
+
+        entry = [st.st_size, st.st_mtime_ns, st.st_ino, digest]
+        with self._entry_lock:
+            self.misses += 1
+            self.entries[key] = entry
+            due = self._mark_dirty(key, entry)
+        if due:
+            self._append_changes()
+        return digest
+
+    def get_hashes(self, paths):
+        """複数ファイルのハッシュをまとめて取得するのじゃ。
+
+        読めなかったファイルは結果に含めないのじゃ（例外は投げない）。
+
+        Args:
+            paths (list): ファイルパスのリスト
+
+        Returns:
+            dict: {パス: ハッシュ}（引数で渡されたパス表記のまま）
+        """
+        results = {}
+        for path in paths:
+            try:
+                results[path] = self.get_hash(path)
+            except FileHashError as e:
+                logger.warning(f"ハッシュ取得失敗（スキップ）: {path} - {e}")
+        return results
+
+    def peek(self, filepath):
+        """stat が一致する場合だけ保存済みハッシュを返すのじゃ。計算はしないのじゃ。"""
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return None
+        with self._entry_lock:
+            return self._lookup(normalize_path(filepath), st)
+
+    # ==================== 更新 ====================
+
+    def invalidate(self, filepath):
+        """指定ファイルのエントリを削除するのじゃ。"""
+        key = normalize_path(filepath)
+        with self._entry_lock:
+            due = self.entries.pop(key, None) is not None and self._mark_dirty(key)
+        if due:
+            self._append_changes()
+
+    def rename(self, old_path, new_path):
+        """リネーム・移動したファイルのエントリを引き継ぐのじゃ。
+
+        ダイジェストは内容が同じなので使い回し、stat は移動先で取り直すのじゃ。
+        """
+        old_key = normalize_path(old_path)
+        new_key = normalize_path(new_path)
+        with self._entry_lock:
+            entry = self.entries.pop(old_key, None)
+            if entry is None:
+                return
+            due = self._mark_dirty(old_key)
+            try:
+                st = os.stat(new_path)
+            except OSError:
+                st = None
+            if st is not None and st.st_size == entry[0]:
+                moved = [st.st_size, st.st_mtime_ns, st.st_ino, entry[3]]
+                self.entries[new_key] = moved
+                due = self._mark_dirty(new_key, moved)
+        if due:
+            self._append_changes()
+
+    def invalidate_tree(self, folder):
+        """フォルダ以下の全エントリを削除するのじゃ（フォルダごと消えたとき用）。"""
+        prefix = normalize_path(folder).rstrip(os.sep) + os.sep
+        due = False
+        with self._entry_lock:
+            stale = [k for k in self.entries if k.startswith(prefix)]
+            for k in stale:
+                del self.entries[k]
+                due = self._mark_dirty(k)
+        if due:
+            self._append_changes()
+
+    def rename_tree(self, old_folder, new_folder):
+        """リネーム・移動したフォルダ以下のエントリを引き継ぐのじゃ。
+
+        フォルダのリネームでは中のファイルの stat は変わらないので、キーだけ付け替えるのじゃ。
+        """
+        old_prefix = normalize_path(old_folder).rstrip(os.sep) + os.sep
+        new_prefix = normalize_path(new_folder).rstrip(os.sep) + os.sep
+        due = False
+        with self._entry_lock:
+            moved = [k for k in self.entries if k.startswith(old_prefix)]
+            for k in moved:
+                new_key = new_prefix + k[len(old_prefix):]
+                self.entries[new_key] = self.entries.pop(k)
+                self._mark_dirty(k)
+                due = self._mark_dirty(new_key, self.entries[new_key])
+        if due:
+            self._append_changes()
+
+    def clear(self):
+        """全エントリを削除するのじゃ。"""
+        with self._entry_lock:
+            self.entries.clear()
+            self._changes = {}
+            self._cleared = True
+            due = self._mark_dirty()
+        if due:
+            self._append_changes()
+
+    def get_stats(self):
+        """統計情報を返すのじゃ。"""
+        return {
+            "count": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -2,91 +2,316 @@
 GazoTools 画像キャッシング機構
 
 LRU（最近最少使用）キャッシュで、頻繁にアクセスされる画像をメモリに保持。
-タイル表示やスライドショーの描画パフォーマンスを大幅に向上させるのじゃ。
+画像ウィンドウ・パズル整列・サムネイルの全てがこのキャッシュを通して画像を読むので、
+同じ画像を何度もデコードせずに済むのじゃ。
 """
 
 from collections import OrderedDict
+from concurrent.futures import Future
+import heapq
+import itertools
 import threading
 import sys
+import os
+import math
 from pathlib import Path
-from PIL import Image
+from PIL import Image, ImageOps
 from .GazoToolsLogger import LoggerManager
+from .GazoToolsImageDecode import decode_to_size
+from .config_defaults import (
+    IMAGE_CACHE_FULL_MB, IMAGE_CACHE_THUMB_MB, IMAGE_CACHE_THUMB_MAX_SIDE,
+    IMAGE_PRELOAD_WORKERS, THUMBNAIL_MAX_WIDTH, THUMBNAIL_MAX_HEIGHT
+)
 
 logger = LoggerManager.get_logger(__name__)
 
+# キャッシュの枠
+TIER_FULL = "full"
+TIER_THUMB = "thumb"
+
+# 目標サイズへの合わせ方
+FIT_EXACT = "exact"
+FIT_COVER = "cover"
+FIT_CONTAIN = "contain"
+
+
+# Pillow が内部で1ピクセルに使うバイト数（RGB も 4 バイトで持っているのじゃ）
+_MODE_PIXEL_BYTES = {
+    "1": 1, "L": 1, "P": 1, "I;16": 2, "I;16B": 2, "I;16L": 2,
+    "LA": 4, "La": 4, "PA": 4, "RGB": 4, "RGBA": 4, "RGBa": 4, "RGBX": 4,
+    "CMYK": 4, "YCbCr": 4, "LAB": 4, "HSV": 4, "I": 4, "F": 4,
+}
+_PALETTE_BYTES = 1024
+
+
+def image_nbytes(img):
+    """画像がメモリ上で使うバイト数を、モードに応じて計算するのじゃ。"""
+    width, height = img.size
+    pixel_bytes = _MODE_PIXEL_BYTES.get(img.mode)
+    if pixel_bytes is None:
+        pixel_bytes = len(img.getbands())
+    extra = _PALETTE_BYTES if img.mode in ("P", "PA") else 0
+    return width * height * pixel_bytes + extra
+
+
+def folder_preload_tag(folder):
+    """フォルダの画像の先読みに付けるタグなのじゃ（フォルダを移ったら cancel_preloads で取り消す）。"""
+    return ("folder", os.path.normcase(os.path.abspath(folder)))
+
+
+def fitted_size(source_size, target_size, fit):
+    """合わせ方に応じて、比率を保ったまま縮める先のサイズを返すのじゃ。
+
+    exact の場合は目標サイズそのもの、cover は領域を覆う最小のサイズ、
+    contain は領域に収まる最大のサイズ（拡大はしない）になるのじゃ。
+    """
+    tw, th = target_size
+    sw, sh = source_size
+    if fit == FIT_COVER:
+        scale = max(tw / sw, th / sh)
+        return max(1, math.ceil(sw * scale)), max(1, math.ceil(sh * scale))
+    if fit == FIT_CONTAIN:
+        scale = min(tw / sw, th / sh, 1.0)
+        return max(1, round(sw * scale)), max(1, round(sh * scale))
+    return tw, th
+
+
+class PreloadPool:
+    """画像の先読みを行う、優先度付きのスレッドプールなのじゃ。
+    
+    後から頼まれた先読みほど先に処理するので、ユーザーが次々とフォルダや画像を
+    切り替えても、古い（もう要らない）先読みが新しいものを待たせないのじゃ。
+    タグを付けておけば、フォルダを変えたときにまとめて取り消せるのじゃ。
+    """
+    
+    def __init__(self, cache, workers=IMAGE_PRELOAD_WORKERS):
+        """初期化処理。
+        
+        Args:
+            cache (ImageCache): 読み込み先のキャッシュ
+            workers (int): スレッド数の上限
+        """
+        self.cache = cache
+        self.workers = max(1, workers)
+        self._heap = []                  # [(-バッチ番号, バッチ内の順番, Future, パス, サイズ, 合わせ方, タグ)]
+        self._batch_seq = itertools.count(1)
+        self._cond = threading.Condition()
+        self._threads = []
+        self._closed = False
+    
+    def submit(self, image_paths, target_size=None, fit=FIT_EXACT, tag=None):
+        """先読みを登録し、画像ごとの Future のリストを返すのじゃ。
+        
+        Args:
+            image_paths (list): 画像ファイルパスのリスト（先頭ほど先に読むのじゃ）
+            target_size: 目標サイズ (width, height)。画像ごとに変えるときはサイズのリスト
+            fit (str): 目標サイズへの合わせ方
+            tag (str): cancel でまとめて取り消すための目印（フォルダなど）
+            
+        Returns:
+            list: concurrent.futures.Future のリスト（結果は PIL.Image）
+        """
+        image_paths = list(image_paths)
+        sizes = target_size if isinstance(target_size, list) else [target_size] * len(image_paths)
+        futures = []
+        with self._cond:
+            batch = next(self._batch_seq)
+            for order, (path, size) in enumerate(zip(image_paths, sizes)):
+                future = Future()
+                heapq.heappush(self._heap, (-batch, order, future, path, size, fit, tag))
+                futures.append(future)
+            self._ensure_workers_locked()
+            self._cond.notify_all()
+        return futures
+    
+    def cancel(self, tag=None):
+        """まだ始まっていない先読みを取り消すのじゃ。
+        
+        Args:
+            tag: 指定した場合はそのタグの先読みだけ、None なら全て取り消すのじゃ
+            
+        Returns:
+            int: 取り消した数
+        """
+        with self._cond:
+            keep = []
+            cancelled = 0
+            for item in self._heap:
+                if tag is None or item[6] == tag:
+                    item[2].cancel()
+                    cancelled += 1
+                else:
+                    keep.append(item)
+            heapq.heapify(keep)
+            self._heap = keep
+        if cancelled:
+            logger.debug(f"先読み取り消し: {cancelled}件")
+        return cancelled
+    
+    def pending_count(self):
+        with self._cond:
+            return len(self._heap)
+    
+    def shutdown(self):
+        """待っている先読みを全て取り消し、スレッドを止めるのじゃ。"""
+        self.cancel()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+    
+    def _ensure_workers_locked(self):
+        """必要な分だけスレッドを起動するのじゃ（ロック内で呼ぶ）。"""
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < min(self.workers, len(self._heap)):
+            thread = threading.Thread(target=self._worker, name="ImagePreload", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def _worker(self):
+        """キューから一番新しい先読みを取り出して読み込むのじゃ。"""
+        while True:
+            with self._cond:
+                while not self._heap and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                _, _, future, path, target_size, fit, _ = heapq.heappop(self._heap)
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self.cache.get(path, target_size, fit))
+            except Exception as e:
+                future.set_exception(e)
+
 
 class ImageCache:
-    """LRUキャッシュで画像を管理するシングルトンクラスのじゃ。
+    """デコード済みの画像を LRU で保持するシングルトンクラスのじゃ。
     
-    メモリ効率とパフォーマンスのバランスを取りながら、頻繁にアクセスされる
-    画像をメモリに保持し、ディスクI/Oを削減するのじゃ。
+    キーは (パス, 更新時刻, 目標サイズ, 合わせ方) なので、ファイルが書き換われば自動で
+    読み直すのじゃ。1つの画像について複数のサイズを持てて、小さいサイズは
+    キャッシュ済みの大きいサイズから縮めて作るので、ファイルを読み直さないのじゃ。
+    表示用 (full) とサムネイル用 (thumb) で容量を分けているので、
+    大量のサムネイルが表示用の画像を追い出すことはないのじゃ。
+    複数のスレッドから同時に呼べて、同じ画像を同時に要求されてもデコードは1回だけなのじゃ。
+    返す画像はキャッシュと共有しているので、呼び出し側で書き換えてはいけないのじゃ。
     """
     
     _instance = None
     _lock = threading.Lock()
     
     @classmethod
-    def get_instance(cls, max_size_mb=256):
+    def get_instance(cls, max_size_mb=IMAGE_CACHE_FULL_MB, thumb_size_mb=IMAGE_CACHE_THUMB_MB):
         """シングルトンインスタンスを取得するのじゃ。
         
         Args:
-            max_size_mb (int): キャッシュの最大メモリサイズ（MB単位）
+            max_size_mb (int): 表示用キャッシュの最大メモリサイズ（MB単位）
+            thumb_size_mb (int): サムネイル用キャッシュの最大メモリサイズ（MB単位）
         """
         with cls._lock:
             if cls._instance is None:
-                cls._instance = cls(max_size_mb=max_size_mb)
+                cls._instance = cls(max_size_mb=max_size_mb, thumb_size_mb=thumb_size_mb)
         return cls._instance
     
-    def __init__(self, max_size_mb=256):
+    def __init__(self, max_size_mb=IMAGE_CACHE_FULL_MB, thumb_size_mb=IMAGE_CACHE_THUMB_MB):
         """初期化処理。
         
         Args:
-            max_size_mb (int): キャッシュの最大メモリサイズ（MB）
+            max_size_mb (int): 表示用キャッシュの最大メモリサイズ（MB）
+            thumb_size_mb (int): サムネイル用キャッシュの最大メモリサイズ（MB）
+        """
+        self.max_bytes = {TIER_FULL: max_size_mb * 1024 * 1024,
+                          TIER_THUMB: thumb_size_mb * 1024 * 1024}
+        self.tiers = {TIER_FULL: OrderedDict(), TIER_THUMB: OrderedDict()}  # {key: (PIL.Image, バイト数)}
+        self.tier_bytes = {TIER_FULL: 0, TIER_THUMB: 0}
+        self.variants = {}      # {(パス, 更新時刻): {キャッシュ済みのキー}}
+        self.source_sizes = {}  # {(パス, 更新時刻): 元画像のサイズ}
+        self.hits = 0
+        self.misses = 0
+        self.derived = 0        # ミスのうち、キャッシュ済みの別サイズから作れた数
+        self._inflight = {}     # {key: Future} デコード中の画像
+        self._cache_lock = threading.Lock()
+        self._preload_pool = None
+        logger.info(f"ImageCache初期化: 表示用{max_size_mb}MB + サムネイル用{thumb_size_mb}MBのメモリを使用するのじゃ")
+    
+    @property
+    def max_size_bytes(self):
+        return sum(self.max_bytes.values())
+    
+    @property
+    def current_size_bytes(self):
+        return sum(self.tier_bytes.values())
+    
+    @staticmethod
+    def make_key(image_path, target_size=None, fit=FIT_EXACT):
+        """キャッシュのキー (パス, 更新時刻, 目標サイズ, 合わせ方) を作るのじゃ。
+        
+        Raises:
+            FileNotFoundError: ファイルが無い場合
         """
-        self.max_size_bytes = max_size_mb * 1024 * 1024  # MB → bytes
-        self.current_size_bytes = 0
-        self.cache = OrderedDict()  # {path: PIL.Image}
-        logger.info(f"ImageCache初期化: 最大{max_size_mb}MBのメモリを使用するのじゃ")
+        full_path = os.path.normcase(os.path.abspath(image_path))
+        mtime = os.stat(full_path).st_mtime_ns
+        size = (int(target_size[0]), int(target_size[1])) if target_size else None
+        return (full_path, mtime, size, fit)
     
-    def get(self, image_path, target_size=None):
+    @staticmethod
+    def tier_for(target_size):
+        """目標サイズからキャッシュの枠（full / thumb）を決めるのじゃ。"""
+        if target_size and max(target_size) <= IMAGE_CACHE_THUMB_MAX_SIDE:
+            return TIER_THUMB
+        return TIER_FULL
+    
+    def get(self, image_path, target_size=None, fit=FIT_EXACT):
         """キャッシュから画像を取得。未キャッシュならディスクから読み込むのじゃ。
         
         Args:
             image_path (str): 画像ファイルパス
-            target_size (tuple): リサイズ先サイズ (width, height) - 省略可
+            target_size (tuple): 目標サイズ (width, height) - 省略時は原寸（RGB）
+            fit (str): 目標サイズへの合わせ方
+                "exact": ちょうどそのサイズに伸縮 / "cover": 比率を保って埋め、はみ出しを切り取る /
+                "contain": 比率を保って収める（拡大はしない）
             
         Returns:
             PIL.Image: 画像オブジェクト（キャッシュヒット時は高速）
         """
         try:
-            # キャッシュから取得
-            if image_path in self.cache:
-                # LRU更新：アクセス順を最新に
-                self.cache.move_to_end(image_path)
-                img = self.cache[image_path]
-                
-                if target_size and img.size != target_size:
-                    img = img.resize(target_size, Image.Resampling.LANCZOS)
-                
-                if logger.level == "DEBUG":
-                    logger.debug(f"キャッシュヒット: {Path(image_path).name}")
-                
-                return img
-            
-            # ディスクから読み込み
-            if logger.level == "DEBUG":
-                logger.debug(f"ディスク読み込み: {Path(image_path).name}")
-            
-            img = Image.open(image_path).convert("RGB")
-            
-            # リサイズが指定されていればここで実行
-            if target_size:
-                img = img.resize(target_size, Image.Resampling.LANCZOS)
+            key = self.make_key(image_path, target_size, fit)
+            tier = self.tier_for(key[2])
+            with self._cache_lock:
+                entry = self.tiers[tier].get(key)
+                if entry is not None:
+                    # LRU更新：アクセス順を最新に
+                    self.tiers[tier].move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                future = self._inflight.get(key)
+                if future is not None:
+                    # 他のスレッドがデコード中なので、その結果を待つのじゃ
+                    self.hits += 1
+                    owner = False
+                else:
+                    future = Future()
+                    self._inflight[key] = future
+                    self.misses += 1
+                    owner = True
+                    base = self._find_base_locked(key)
             
-            # キャッシュに追加
-            self._add_to_cache(image_path, img)
+            if not owner:
+                return future.result()
             
-            return img
+            try:
+                if base is not None:
+                    img = self._derive(base, key[0:2], key[2], fit)
+                else:
+                    img = self._decode(key[0:2], key[2], fit)
+                self._add_to_cache(key, tier, img)
+                future.set_result(img)
+                return img
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            finally:
+                with self._cache_lock:
+                    self._inflight.pop(key, None)
             
         except FileNotFoundError:
             logger.error(f"画像ファイルが見つかりません: {image_path}")
@@ -95,25 +320,80 @@ class ImageCache:
             logger.error(f"画像読み込みエラー: {image_path} - {e}")
             raise
     
-    def preload(self, image_paths, target_size=None):
+    def get_thumbnail(self, image_path, max_size=(THUMBNAIL_MAX_WIDTH, THUMBNAIL_MAX_HEIGHT)):
+        """比率を保って max_size に収めたサムネイルを取得するのじゃ。"""
+        return self.get(image_path, max_size, fit=FIT_CONTAIN)
+    
+    def _find_base_locked(self, key):
+        """要求サイズを作れる、キャッシュ済みの一番小さい別サイズを探すのじゃ（ロック内で呼ぶ）。
+        
+        元画像と同じ比率で、縮める先のサイズ以上あるものだけが使えるのじゃ。
+        """
+        source, target_size, fit = key[0:2], key[2], key[3]
+        source_size = self.source_sizes.get(source)
+        if target_size is None or source_size is None:
+            return None
+        need_w, need_h = fitted_size(source_size, target_size, fit)
+        aspect = source_size[0] / source_size[1]
+        
+        best = None
+        for other in self.variants.get(source, ()):
+            entry = self.tiers[self.tier_for(other[2])].get(other)
+            if entry is None:
+                continue
+            img = entry[0]
+            if img.width < need_w or img.height < need_h:
+                continue
+            if abs(img.width / img.height - aspect) > aspect * 0.01:
+                continue  # 切り取り・伸縮で比率が変わっているものは使えないのじゃ
+            if best is None or img.width * img.height < best.width * best.height:
+                best = img
+        return best
+    
+    def _derive(self, base, source, target_size, fit):
+        """キャッシュ済みの大きい画像から、要求サイズの画像を作るのじゃ。"""
+        scaled = fitted_size(self.source_sizes[source], target_size, fit)
+        img = base if base.size == scaled else base.resize(scaled, Image.LANCZOS)
+        if fit == FIT_COVER and img.size != tuple(target_size):
+            img = ImageOps.fit(img, tuple(target_size), Image.LANCZOS)
+        with self._cache_lock:
+            self.derived += 1
+        return img
+    
+    def _decode(self, source, target_size, fit):
+        """ディスクから読み込み、目標サイズに近い解像度でデコードするのじゃ。"""
+        with Image.open(source[0]) as img:
+            with self._cache_lock:
+                self.source_sizes[source] = img.size
+            if target_size is None:
+                return img.convert("RGB")
+            img_scaled = decode_to_size(img, fitted_size(img.size, target_size, fit))
+        if fit == FIT_COVER and img_scaled.size != tuple(target_size):
+            # 比率を保って縮めた後なので、切り取りはほぼ中央のトリミングだけなのじゃ
+            return ImageOps.fit(img_scaled, tuple(target_size), Image.LANCZOS)
+        return img_scaled
+    
+    def preload(self, image_paths, target_size=None, fit=FIT_EXACT):
         """複数の画像を事前読み込みするのじゃ。
         
         スライドショーやギャラリー表示前に呼び出して、表示遅延を防ぐ。
+        バックグラウンドのスレッドから呼んでも安全なのじゃ。
         
         Args:
             image_paths (list): 画像ファイルパスのリスト
             target_size (tuple): リサイズ先サイズ (width, height)
+            fit (str): 目標サイズへの合わせ方
         """
         loaded = 0
         skipped = 0
         
         for path in image_paths:
-            if path in self.cache:
+            if self.contains(path, target_size, fit):
                 skipped += 1
                 continue
             
             try:
-                self.get(path, target_size)
+                self.get(path, target_size, fit)
                 loaded += 1
             except Exception as e:
                 logger.warning(f"プリロード失敗: {Path(path).name}")
@@ -121,44 +401,124 @@ class ImageCache:
         
         logger.info(f"プリロード完了: {loaded}個読み込み, {skipped}個スキップ")
     
-    def _add_to_cache(self, image_path, img):
-        """画像をキャッシュに追加するのじゃ。必要に応じてLRU削除。"""
-        # 画像サイズ推定（RGBA相当で計算）
-        width, height = img.size
-        estimated_size = width * height * 4  # RGBA: 4bytes/pixel
-        
-        # 容量を超えるなら古い項目を削除
-        while self.current_size_bytes + estimated_size > self.max_size_bytes:
-            if not self.cache:
-                break
+    def preload_async(self, image_paths, target_size=None, fit=FIT_EXACT, tag=None):
+        """複数の画像をバックグラウンドで事前読み込みし、Future のリストを返すのじゃ。
+        
+        呼び出し側のスレッドは待たないのじゃ。新しく頼んだ先読みほど先に処理されるのじゃ。
+        
+        Args:
+            image_paths (list): 画像ファイルパスのリスト（先頭ほど先に読むのじゃ）
+            target_size: リサイズ先サイズ (width, height)。画像ごとに変えるときはサイズのリスト
+            fit (str): 目標サイズへの合わせ方
+            tag: cancel_preloads でまとめて取り消すための目印（フォルダの画像なら folder_preload_tag(フォルダ)）
             
-            removed_path, removed_img = self.cache.popitem(last=False)
-            removed_size = removed_img.size[0] * removed_img.size[1] * 4
-            self.current_size_bytes -= removed_size
-            logger.debug(f"キャッシュ削除（LRU）: {Path(removed_path).name}")
+        Returns:
+            list: concurrent.futures.Future のリスト（結果は PIL.Image）
+        """
+        with self._cache_lock:
+            if self._preload_pool is None:
+                self._preload_pool = PreloadPool(self)
+            pool = self._preload_pool
+        return pool.submit(image_paths, target_size, fit, tag)
+    
+    def cancel_preloads(self, tag=None):
+        """まだ始まっていない先読みを取り消すのじゃ（tag=None なら全て）。
         
-        # 新規項目を追加
-        self.cache[image_path] = img
-        self.current_size_bytes += estimated_size
+        Returns:
+            int: 取り消した数
+        """
+        pool = self._preload_pool
+        return pool.cancel(tag) if pool is not None else 0
+    
+    def contains(self, image_path, target_size=None, fit=FIT_EXACT):
+        """キャッシュ済みかどうかを返すのじゃ（統計には数えないのじゃ）。"""
+        try:
+            key = self.make_key(image_path, target_size, fit)
+        except OSError:
+            return False
+        with self._cache_lock:
+            return key in self.tiers[self.tier_for(key[2])]
+    
+    def _add_to_cache(self, key, tier, img):
+        """画像をキャッシュに追加するのじゃ。必要に応じてLRU削除。"""
+        nbytes = image_nbytes(img)
+        cache = self.tiers[tier]
+        
+        with self._cache_lock:
+            if key in cache:
+                return
+            # 容量を超えるなら古い項目を削除
+            while self.tier_bytes[tier] + nbytes > self.max_bytes[tier]:
+                if not cache:
+                    break
+                
+                removed_key, (_, removed_bytes) = cache.popitem(last=False)
+                self.tier_bytes[tier] -= removed_bytes
+                self._forget_variant_locked(removed_key)
+                logger.debug(f"キャッシュ削除（LRU）: {Path(removed_key[0]).name}")
+            
+            # 新規項目を追加
+            cache[key] = (img, nbytes)
+            self.tier_bytes[tier] += nbytes
+            self.variants.setdefault(key[0:2], set()).add(key)
+    
+    def _forget_variant_locked(self, key):
+        """追い出したキーを画像ごとのサイズ一覧から外すのじゃ（ロック内で呼ぶ）。"""
+        source = key[0:2]
+        keys = self.variants.get(source)
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            del self.variants[source]
+            self.source_sizes.pop(source, None)
     
     def clear(self):
         """キャッシュを全削除するのじゃ。"""
-        self.cache.clear()
-        self.current_size_bytes = 0
+        with self._cache_lock:
+            for cache in self.tiers.values():
+                cache.clear()
+            for tier in self.tier_bytes:
+                self.tier_bytes[tier] = 0
+            self.variants.clear()
+            self.source_sizes.clear()
+            self.hits = 0
+            self.misses = 0
+            self.derived = 0
         logger.info("ImageCacheをクリアしたのじゃ")
     
     def get_stats(self):
         """キャッシュ統計情報を返すのじゃ。
         
         Returns:
-            dict: {"count": キャッシュ内の画像数, "size_mb": 使用メモリ}
+            dict: {"count": キャッシュ内の画像数, "size_mb": 使用メモリ, "max_mb": 上限,
+                   "hits": ヒット数, "misses": ミス数, "derived": 別サイズから作れた数,
+                   "hit_rate": ヒット率, "tiers": {枠名: {"count", "size_mb", "max_mb"}}}
         """
-        size_mb = self.current_size_bytes / (1024 * 1024)
+        mb = 1024 * 1024
+        with self._cache_lock:
+            tiers = {
+                tier: {
+                    "count": len(cache),
+                    "size_mb": self.tier_bytes[tier] / mb,
+                    "max_mb": self.max_bytes[tier] / mb,
+                }
+                for tier, cache in self.tiers.items()
+            }
+            hits, misses, derived = self.hits, self.misses, self.derived
+        total = hits + misses
         return {
-            "count": len(self.cache),
-            "size_mb": size_mb,
-            "max_mb": self.max_size_bytes / (1024 * 1024)
+            "count": sum(t["count"] for t in tiers.values()),
+            "size_mb": sum(t["size_mb"] for t in tiers.values()),
+            "max_mb": sum(t["max_mb"] for t in tiers.values()),
+            "hits": hits,
+            "misses": misses,
+            "derived": derived,
+            "hit_rate": hits / total if total else 0.0,
+            "tiers": tiers,
         }
+    
+    get_cache_stats = get_stats
 
 
 class TileImageLoader:
@@ -179,29 +539,36 @@ class TileImageLoader:
         self.cache = ImageCache.get_instance(max_size_mb=cache_mb)
         logger.info(f"TileImageLoader初期化: {tile_size[0]}x{tile_size[1]}のタイルサイズで設定")
     
-    def load_tiles(self, image_paths, preload=True):
+    def load_tiles(self, image_paths, preload=True, tag=None):
         """複数の画像をタイル用にロードするのじゃ。
         
         Args:
             image_paths (list): 画像ファイルパスのリスト
-            preload (bool): 事前読み込みを実行するか
+            preload (bool): 先読みスレッドで並列に読み込むか
+            tag: 先読みに付ける目印（フォルダの画像なら folder_preload_tag(フォルダ)）
             
         Returns:
             list: (パス, PIL.Image) のタプルリスト
         """
         if preload:
-            self.cache.preload(image_paths, target_size=self.tile_size)
+            futures = self.load_tiles_async(image_paths, tag=tag)
+        else:
+            futures = [None] * len(image_paths)
         
         results = []
-        for path in image_paths:
+        for path, future in zip(image_paths, futures):
             try:
-                img = self.cache.get(path, target_size=self.tile_size)
+                img = future.result() if future is not None else self.cache.get(path, target_size=self.tile_size)
                 results.append((path, img))
             except Exception as e:
                 logger.warning(f"タイル読み込み失敗: {path}")
                 continue
         
         return results
+    
+    def load_tiles_async(self, image_paths, tag=None):
+        """タイル用の画像をバックグラウンドで読み込み、Future のリストを返すのじゃ。"""
+        return self.cache.preload_async(image_paths, target_size=self.tile_size, tag=tag)
 
 
 class SlideShowImageLoader:
@@ -235,9 +602,10 @@ class SlideShowImageLoader:
             idx = (current_index + offset) % len(image_paths)
             to_preload.append(image_paths[idx])
         
-        # 事前ロード実行
+        # 事前ロード実行（バックグラウンド）。フォルダを移ったら取り消せるよう、フォルダのタグを付けるのじゃ
         if to_preload:
-            self.cache.preload(to_preload)
+            tag = folder_preload_tag(os.path.dirname(image_paths[current_index]))
+            self.cache.preload_async(to_preload, tag=tag)
             logger.debug(f"スライドショー先読み: {len(to_preload)}個を準備")
     
     def get_current(self, image_paths, current_index):
@@ -0,0 +1,44 @@
+'''
+作成日: 2026年01月14日
+作成者: tamate masayuki
+機能: 表示サイズに近い解像度でのデコード
+説明: 大きな画像を原寸でデコードしてから縮小すると時間がかかるので、
+      JPEG は draft() で DCT の段階から 1/2〜1/8 に縮めてデコードし、
+      それ以外の形式は reduce() で整数分の1に縮めてから LANCZOS で仕上げるのじゃ。
+'''
+from PIL import Image
+from lib.config_defaults import DECODE_REDUCING_GAP
+
+# reduce() が使える画像モード
+REDUCIBLE_MODES = ("L", "LA", "RGB", "RGBA", "RGBX", "CMYK", "YCbCr", "I", "F")
+
+
+def decode_to_size(img, size, reducing_gap=DECODE_REDUCING_GAP):
+    """開いた画像を、指定サイズに近い解像度でデコードしてリサイズするのじゃ。
+
+    1段目で目標サイズの reducing_gap 倍程度まで安く縮め（JPEG の draft / reduce）、
+    2段目で LANCZOS をかけて目標サイズに仕上げるのじゃ。
+    拡大する場合は原寸でデコードして、そのまま LANCZOS をかけるのじゃ。
+
+    Args:
+        img (PIL.Image): Image.open 直後の（まだデコードしていない）画像
+        size (tuple): 目標サイズ (width, height)
+        reducing_gap (float): 1段目の縮小で残す倍率（大きいほど高画質・低速）
+
+    Returns:
+        PIL.Image: 目標サイズの画像
+    """
+    target_w, target_h = max(1, int(size[0])), max(1, int(size[1]))
+    keep_w, keep_h = int(target_w * reducing_gap), int(target_h * reducing_gap)
+
+    if img.format == "JPEG" and img.width > keep_w and img.height > keep_h:
+        # 要求サイズ以上を保ったまま、できるだけ小さいスケールでデコードされるのじゃ
+        img.draft(img.mode, (keep_w, keep_h))
+
+    factor = min(img.width // keep_w, img.height // keep_h)
+    if factor >= 2 and img.mode in REDUCIBLE_MODES:
+        img = img.reduce(factor)
+
+    if img.size == (target_w, target_h):
+        return img.copy()  # ファイルを閉じた後も使えるように複製するのじゃ
+    return img.resize((target_w, target_h), Image.LANCZOS)
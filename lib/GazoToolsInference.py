@@ -0,0 +1,162 @@
+'''
+作成日: 2026年01月11日
+作成者: tamate masayuki
+機能: CPU 向けの推論高速化モード
+説明: 動的量子化 (int8 Linear)・torch.jit.trace・torch.compile・channels_last を使って
+      float32 モデルから高速な推論用モデルを作るのじゃ。
+      作ったモデルは float32 との出力のコサイン類似度を確かめ、許容値を下回れば使わないのじゃ。
+      確かめた結果はモデル・モードごとにファイルへ覚えておき、次からは確かめ直さないのじゃ。
+'''
+import os
+import copy
+import json
+import torch
+from lib.GazoToolsExceptions import AIModelError
+from lib.GazoToolsLogger import LoggerManager
+from lib.config_defaults import INFERENCE_PARITY_FILE
+
+logger = LoggerManager.get_logger(__name__)
+
+INFERENCE_MODE_FLOAT32 = "float32"
+INFERENCE_MODE_INT8 = "int8"
+INFERENCE_MODE_JIT = "jit"
+INFERENCE_MODE_COMPILE = "compile"
+
+
+def to_channels_last(tensor):
+    """4次元テンソルを channels_last のメモリ配置にするのじゃ。"""
+    if tensor.dim() == 4:
+        return tensor.contiguous(memory_format=torch.channels_last)
+    return tensor
+
+
+def build_inference_model(model, mode, example_input, channels_last=False):
+    """float32 モデルから指定モードの推論用モデルを作るのじゃ（元のモデルは変更しない）。
+
+    Args:
+        model (torch.nn.Module): eval 済みの float32 モデル
+        mode (str): "float32" / "int8" / "jit" / "compile"
+        example_input (torch.Tensor): jit.trace 用の入力例
+        channels_last (bool): channels_last のメモリ配置を使うか
+
+    Returns:
+        torch.nn.Module: 推論用モデル
+
+    Raises:
+        AIModelError: 未知のモード、または変換に失敗した場合
+    """
+    try:
+        fast = copy.deepcopy(model).eval()
+        if channels_last:
+            fast = fast.to(memory_format=torch.channels_last)
+            example_input = to_channels_last(example_input)
+
+        if mode == INFERENCE_MODE_FLOAT32:
+            return fast
+        if mode == INFERENCE_MODE_INT8:
+            # 量子化は Linear 層だけ（畳み込みは float のまま）
+            return torch.ao.quantization.quantize_dynamic(fast, {torch.nn.Linear}, dtype=torch.qint8)
+        if mode == INFERENCE_MODE_JIT:
+            with torch.no_grad():
+                traced = torch.jit.trace(fast, example_input)
+            return torch.jit.freeze(traced)
+        if mode == INFERENCE_MODE_COMPILE:
+            compiled = torch.compile(fast)
+            with torch.no_grad():
+                compiled(example_input)  # ここでコンパイルを済ませ、失敗を検出するのじゃ
+            return compiled
+    except Exception as e:
+        raise AIModelError(f"Failed to build '{mode}' inference model: {e}") from e
+    raise AIModelError(f"Unknown inference mode: {mode}")
+
+
+def cosine_parity(reference_model, model, inputs, channels_last=False):
+    """2つのモデルの出力のコサイン類似度の最小値を返すのじゃ。
+
+    Args:
+        reference_model (torch.nn.Module): 基準となる float32 モデル
+        model (torch.nn.Module): 比較するモデル
+        inputs (torch.Tensor): shape=(n, ...) の入力
+        channels_last (bool): model 側に channels_last で入力するか
+
+    Returns:
+        float: 行ごとのコサイン類似度の最小値
+    """
+    with torch.no_grad():
+        ref = reference_model(inputs)
+        out = model(to_channels_last(inputs) if channels_last else inputs)
+    return float(torch.nn.functional.cosine_similarity(ref.float(), out.float(), dim=1).min())
+
+
+def parity_key(model_name, mode, channels_last):
+    """パリティの記録に使うキー（モデル・モード・torch のバージョンの組）を作るのじゃ。"""
+    return f"{model_name}|{mode}|channels_last={bool(channels_last)}|torch={torch.__version__}"
+
+
+def load_parity(key, path=INFERENCE_PARITY_FILE):
+    """記録済みのパリティを返すのじゃ。無ければ None。"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            value = json.load(f).get(key)
+    except (IOError, ValueError, AttributeError):
+        return None
+    return value.get("parity") if isinstance(value, dict) else None
+
+
+def save_parity(key, parity, samples, path=INFERENCE_PARITY_FILE):
+    """実画像で確かめたパリティを一時ファイル経由で記録するのじゃ。"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            data = {}
+    except (IOError, ValueError):
+        data = {}
+    data[key] = {"parity": parity, "samples": samples}
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+    except IOError as e:
+        logger.warning(f"パリティの記録に失敗: {path} - {e}")
+
+
+def select_inference_model(model, mode, example_input, tolerance, channels_last=False, parity_inputs=None,
+                           parity=None):
+    """推論用モデルを作ってパリティチェックし、合格したものを返すのじゃ。
+
+    失敗・不合格の場合は float32 モデル（元のモデル）にフォールバックするのじゃ。
+
+    Args:
+        model (torch.nn.Module): eval 済みの float32 モデル
+        mode (str): 推論モード
+        example_input (torch.Tensor): jit.trace 用の入力例（1件）
+        tolerance (float): 許容するコサイン類似度の下限
+        channels_last (bool): channels_last のメモリ配置を使うか
+        parity_inputs (torch.Tensor): パリティチェック用の入力（省略時は example_input）
+        parity (float): 記録済みのパリティ（渡せばチェックを省くのじゃ）
+
+    Returns:
+        tuple: (モデル, 実際に使うモード, channels_last を使うか, パリティ値 or None)
+    """
+    if mode == INFERENCE_MODE_FLOAT32 and not channels_last:
+        return model, INFERENCE_MODE_FLOAT32, False, None
+    if parity is not None and parity < tolerance:
+        logger.warning(f"推論モード '{mode}' は記録済みのパリティ不足 ({parity:.4f} < {tolerance})、float32 で推論するのじゃ")
+        return model, INFERENCE_MODE_FLOAT32, False, parity
+    if parity_inputs is None:
+        parity_inputs = example_input
+    try:
+        fast = build_inference_model(model, mode, example_input, channels_last)
+        if parity is None:
+            parity = cosine_parity(model, fast, parity_inputs, channels_last)
+    except AIModelError as e:
+        logger.warning(f"推論モード '{mode}' を使えないので float32 で推論するのじゃ: {e}")
+        return model, INFERENCE_MODE_FLOAT32, False, None
+    if parity < tolerance:
+        logger.warning(f"推論モード '{mode}' のパリティ不足 ({parity:.4f} < {tolerance})、float32 で推論するのじゃ")
+        return model, INFERENCE_MODE_FLOAT32, False, parity
+    logger.info(f"推論モード '{mode}' (channels_last={channels_last}) を使うのじゃ: パリティ {parity:.4f}")
+    return fast, mode, channels_last, parity
@@ -34,4 +34,48 @@ def GetGazoFiles(folder, base_path):
         if str(f).lower().endswith(valid_extensions):
             Files.append(f)
 
-    return Files
\ No newline at end of file
+    return Files
+
+def scan_folder(path):
+    '''
+    os.scandir で1回だけ読み、(画像ファイル名リスト, 子フォルダ名リスト) を名前順で返す。
+    "." で始まるファイル・フォルダとシンボリックリンクのフォルダは対象外。
+    ファイル一覧・フォルダ走査・フォルダ監視・ベクトル化で同じ規則にするため、フォルダを読むときはこれを使います。
+    読めないフォルダは OSError を投げます。
+    '''
+    names = []
+    subdirs = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.name.startswith("."):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.is_file():
+                    names.append(entry.name)
+            except OSError:
+                continue
+    return GetGazoFiles(sorted(names), path), sorted(subdirs)
+
+def CollapseRoots(roots):
+    '''
+    フォルダのリストから、存在しないもの・重複・他のフォルダの中にあるものを取り除いて返す。
+    順序は最初に現れた順を保ちます。
+    '''
+    result = []
+    keys = []
+    for r in roots:
+        if not r or not os.path.isdir(r):
+            continue
+        key = os.path.normcase(os.path.abspath(r))
+        if any(key == k or key.startswith(k.rstrip(os.sep) + os.sep) for k in keys):
+            continue
+        # 既に登録済みのフォルダがこのフォルダの中にあれば置き換える
+        inner = [i for i, k in enumerate(keys) if k.startswith(key.rstrip(os.sep) + os.sep)]
+        for i in reversed(inner):
+            del keys[i]
+            del result[i]
+        keys.append(key)
+        result.append(r)
+    return result
@@ -0,0 +1,258 @@
+'''
+作成日: 2026年01月17日
+作成者: tamate masayuki
+機能: ファイル移動の履歴（元に戻す・やり直す）
+説明: 一括移動を1つの「バッチ」として JSON Lines のファイルに追記していくのじゃ。
+      元に戻すときは移動先から移動元へ動かし直すだけなので、同じドライブなら rename だけで済むのじゃ。
+      起動時はファイルを頭から読み直して、元に戻す・やり直すのスタックを組み立てるのじゃ。
+'''
+import os
+import json
+import time
+import threading
+from lib.GazoToolsFileOps import MoveResult, move_pairs
+from lib.GazoToolsExceptions import FileHashError
+from lib.GazoToolsHashIndex import HashIndex
+from lib.GazoToolsLogger import LoggerManager
+from lib.config_defaults import MOVE_JOURNAL_FILE, MOVE_JOURNAL_MAX_BATCHES
+
+logger = LoggerManager.get_logger(__name__)
+
+OP_MOVE = "move"
+OP_UNDO = "undo"
+OP_REDO = "redo"
+
+
+class MoveJournal:
+    """ファイル移動の履歴を管理するシングルトンクラスなのじゃ。
+
+    1行が1つの操作で、形式は次のとおりなのじゃ。
+    ``{"op": "move", "batch": 番号, "time": 時刻, "files": [[移動元, 移動先, [サイズ, 更新時刻ns]], ...]}``
+    ``{"op": "undo" | "redo", "batch": 番号, "time": 時刻}``
+
+    3つ目は移動した直後のファイルの目印なのじゃ（古い履歴ではハッシュ文字列）。
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        """シングルトンインスタンスを取得するのじゃ。"""
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, journal_file=MOVE_JOURNAL_FILE, max_batches=MOVE_JOURNAL_MAX_BATCHES):
+        """初期化処理。
+
+        Args:
+            journal_file (str): 履歴ファイルのパス
+            max_batches (int): 元に戻せるバッチの最大数
+        """
+        self.journal_file = journal_file
+        self.max_batches = max_batches
+        self.batches = {}       # {番号: {"time": 時刻, "files": [[移動元, 移動先, 目印], ...]}}
+        self.undo_stack = []    # 元に戻せるバッチ番号（最後が最新）
+        self.redo_stack = []    # やり直せるバッチ番号（最後が次にやり直すもの）
+        self.next_id = 1
+        self._journal_lock = threading.RLock()
+        self._line_count = 0
+        self._load()
+
+    # ==================== 永続化 ====================
+
+    def _apply(self, record):
+        """1行分の操作をスタックに反映するのじゃ。"""
+        op = record.get("op")
+        batch = record.get("batch")
+        if op == OP_MOVE:
+            for dropped in self.redo_stack:
+                self.batches.pop(dropped, None)
+            self.redo_stack = []
+            self.batches[batch] = {"time": record.get("time"), "files": record.get("files", [])}
+            self.undo_stack.append(batch)
+            self.next_id = max(self.next_id, batch + 1)
+            while len(self.undo_stack) > self.max_batches:
+                self.batches.pop(self.undo_stack.pop(0), None)
+        elif op == OP_UNDO and self.undo_stack and self.undo_stack[-1] == batch:
+            self.redo_stack.append(self.undo_stack.pop())
+        elif op == OP_REDO and self.redo_stack and self.redo_stack[-1] == batch:
+            self.undo_stack.append(self.redo_stack.pop())
+
+    def _load(self):
+        """履歴ファイルを読み直してスタックを組み立てるのじゃ。"""
+        if not os.path.exists(self.journal_file):
+            return
+        try:
+            with open(self.journal_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        self._apply(json.loads(line))
+                    except (json.JSONDecodeError, AttributeError, TypeError):
+                        # 書き込み途中で落ちた最後の行などは読み飛ばすのじゃ
+                        logger.warning("移動履歴の壊れた行を読み飛ばしました")
+                    self._line_count += 1
+        except IOError as e:
+            logger.error(f"移動履歴読み込み失敗: {self.journal_file} - {e}")
+            return
+        if self._line_count > 2 * self.max_batches:
+            self._compact()
+        logger.info(f"移動履歴を読み込みました: 元に戻せる移動 {len(self.undo_stack)}件")
+
+    def _append(self, record):
+        """1行追記して、すぐディスクに書き出すのじゃ。"""
+        try:
+            os.makedirs(os.path.dirname(self.journal_file) or ".", exist_ok=True)
+            with open(self.journal_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._line_count += 1
+        except IOError as e:
+            logger.error(f"移動履歴書き込み失敗: {self.journal_file} - {e}")
+
+    def _compact(self):
+        """まだ元に戻せる・やり直せるバッチだけで履歴ファイルを書き直すのじゃ。"""
+        lines = []
+        for batch in self.undo_stack:
+            lines.append({"op": OP_MOVE, "batch": batch, **self.batches[batch]})
+        # やり直せるバッチは「移動して元に戻した」状態で書き、スタック順を保つのじゃ
+        for batch in reversed(self.redo_stack):
+            lines.append({"op": OP_MOVE, "batch": batch, **self.batches[batch]})
+        for batch in self.redo_stack:
+            lines.append({"op": OP_UNDO, "batch": batch})
+        try:
+            tmp_path = self.journal_file + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for record in lines:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.journal_file)
+            self._line_count = len(lines)
+        except IOError as e:
+            logger.error(f"移動履歴の書き直し失敗: {self.journal_file} - {e}")
+
+    # ==================== 記録 ====================
+
+    @staticmethod
+    def _stamp(path):
+        """ファイルの目印（サイズと更新時刻ns）を返すのじゃ。無ければ None。
+
+        rename でも別ドライブへのコピー（copy2）でも変わらず、内容を書き換えると変わるのじゃ。
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return [st.st_size, st.st_mtime_ns]
+
+    @classmethod
+    def _unchanged(cls, path, stamp):
+        """path が記録した目印のままなら True を返すのじゃ。目印が無いときは False。"""
+        if isinstance(stamp, str):
+            # 古い履歴はハッシュを記録していたのじゃ
+            try:
+                return HashIndex.get_instance().get_hash(path) == stamp
+            except FileHashError:
+                return False
+        if not isinstance(stamp, list) or len(stamp) != 2:
+            return False
+        return cls._stamp(path) == stamp
+
+    def record(self, results):
+        """一括移動の結果を1つのバッチとして記録するのじゃ。
+
+        Args:
+            results (list): bulk_move が返した MoveResult のリスト
+
+        Returns:
+            int: バッチ番号（移動できたファイルが無ければ None）
+        """
+        files = [[r.src, r.dest, self._stamp(r.dest)] for r in results if r.ok]
+        if not files:
+            return None
+        with self._journal_lock:
+            record = {"op": OP_MOVE, "batch": self.next_id, "time": time.time(), "files": files}
+            self._append(record)
+            self._apply(record)
+            return record["batch"]
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def preview(self, redo=False):
+        """次に元に戻す（redo=True ならやり直す）ときに動くファイルを返すのじゃ。
+
+        Returns:
+            list: (今の場所, 移動する先) のリスト（動かすバッチが無ければ空）
+        """
+        with self._journal_lock:
+            stack = self.redo_stack if redo else self.undo_stack
+            if not stack:
+                return []
+            files = self.batches[stack[-1]]["files"]
+            if redo:
+                return [(src, dest) for src, dest, _ in files]
+            return [(dest, src) for src, dest, _ in reversed(files)]
+
+    # ==================== 元に戻す・やり直す ====================
+
+    def _replay(self, files):
+        """(移動元, 移動先, 目印) の組を移動し直すのじゃ。
+
+        移動元が記録した目印と違う（書き換えられた・別のファイル・目印が無い）ときは、
+        動かさずに失敗として返すのじゃ。
+        """
+        pairs = []
+        skipped = []
+        for src, dest, stamp in files:
+            if self._unchanged(src, stamp):
+                pairs.append((src, dest))
+            elif not os.path.exists(src):
+                skipped.append(MoveResult(src, dest, error="ファイルが見つかりません"))
+            else:
+                skipped.append(MoveResult(src, dest, error="内容が変わっています"))
+        return move_pairs(pairs) + skipped
+
+    def undo(self):
+        """最後の一括移動を元に戻すのじゃ。
+
+        Returns:
+            list: MoveResult のリスト（元に戻す移動が無ければ None）
+        """
+        with self._journal_lock:
+            if not self.undo_stack:
+                return None
+            batch = self.undo_stack[-1]
+            # 後から移動したものから順に戻すのじゃ
+            files = [[dest, src, stamp] for src, dest, stamp in reversed(self.batches[batch]["files"])]
+            results = self._replay(files)
+            record = {"op": OP_UNDO, "batch": batch, "time": time.time()}
+            self._append(record)
+            self._apply(record)
+        logger.info(f"移動を元に戻しました: バッチ{batch} ({sum(r.ok for r in results)}/{len(results)}件)")
+        return results
+
+    def redo(self):
+        """元に戻した一括移動をやり直すのじゃ。
+
+        Returns:
+            list: MoveResult のリスト（やり直す移動が無ければ None）
+        """
+        with self._journal_lock:
+            if not self.redo_stack:
+                return None
+            batch = self.redo_stack[-1]
+            results = self._replay(self.batches[batch]["files"])
+            record = {"op": OP_REDO, "batch": batch, "time": time.time()}
+            self._append(record)
+            self._apply(record)
+        logger.info(f"移動をやり直しました: バッチ{batch} ({sum(r.ok for r in results)}/{len(results)}件)")
+        return results
@@ -0,0 +1,305 @@
+'''
+作成日: 2026年01月19日
+作成者: tamate masayuki
+機能: AI スライドショーの再生順（プレイリスト）
+説明: フォルダの画像をフォルダごとに1回だけハッシュ→ベクトルの行に対応付け、
+      ベクトル行列の上で再生順をまとめて計画するのじゃ。計画の仕方は3つあるのじゃ。
+        walk        : 今の画像に一番近い未再生の画像へ次々にたどる（近傍グラフ上の貪欲法）
+        mmr         : シードに近い画像を、それまでに並べた画像と似すぎないように並べる
+        random_walk : 近傍グラフ上を、近い画像ほど選ばれやすい確率で歩く
+      どれも diversity（0〜1）で「似ている順」と「直前と違うもの」の重みを調整できるのじゃ。
+      近傍グラフはフォルダごとに1回だけ作るので、1枚進めるのは近傍 k 件の計算だけで済み、
+      数千枚分の計画も数ミリ秒で終わるのじゃ。再生待ちは deque に入れておくのじゃ。
+'''
+import os
+import time
+from collections import deque
+import numpy as np
+from lib.GazoToolsHashIndex import HashIndex
+from lib.GazoToolsSimilarity import SimilarityIndex
+from lib.GazoToolsLogger import LoggerManager
+from lib.config_defaults import (
+    SS_AI_PLAN_MODES, DEFAULT_SS_AI_PLAN_MODE, DEFAULT_SS_AI_DIVERSITY,
+    PLAN_KNN, PLAN_KNN_BLOCK, PLAN_SEGMENT_STEPS, PLAN_RECENT_WINDOW, PLAN_MMR_POOL
+)
+
+logger = LoggerManager.get_logger(__name__)
+
+# random_walk の温度（diversity が大きいほど、似ていない近傍も選ばれやすくなる）
+RW_MIN_TEMPERATURE = 0.02
+RW_TEMPERATURE_SCALE = 0.2
+
+
+def knn_graph(matrix, k=PLAN_KNN, block=PLAN_KNN_BLOCK):
+    """正規化済みの行列から、各行に近い行を k 件ずつ求めるのじゃ（自分自身は除く）。
+
+    行列積は block 行ずつ行うので、メモリは block × 行数 分しか使わないのじゃ。
+
+    Returns:
+        tuple: (近い行の番号, 類似度)。どちらも shape=(n, min(k, n-1)) で類似度の降順
+    """
+    n = matrix.shape[0]
+    k = max(0, min(k, n - 1))
+    neighbors = np.empty((n, k), dtype=np.int64)
+    sims = np.empty((n, k), dtype=np.float32)
+    if k == 0:
+        return neighbors, sims
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        scores = matrix[start:stop] @ matrix.T
+        scores[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+        idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        part = np.take_along_axis(scores, idx, axis=1)
+        order = np.argsort(-part, axis=1, kind="stable")
+        neighbors[start:stop] = np.take_along_axis(idx, order, axis=1)
+        sims[start:stop] = np.take_along_axis(part, order, axis=1)
+    return neighbors, sims
+
+
+class PlaylistPlanner:
+    """ベクトル行列の上で再生順（行番号の並び）を計画するクラスなのじゃ。"""
+
+    def __init__(self, matrix, k=PLAN_KNN, rng=None):
+        """初期化処理。
+
+        Args:
+            matrix (np.ndarray): 行ごとに L2 正規化済みの行列
+            k (int): 近傍グラフで1行あたりに覚える近い行の数
+            rng (np.random.Generator): random_walk で使う乱数（省略時は新しく作る）
+        """
+        self.matrix = matrix
+        self.k = k
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self._neighbors = None
+        self._sims = None
+
+    def _graph(self):
+        """近傍グラフを返すのじゃ（最初に使うときに1回だけ作る）。"""
+        if self._neighbors is None:
+            start = time.perf_counter()
+            self._neighbors, self._sims = knn_graph(self.matrix, self.k)
+            logger.info(f"近傍グラフ作成: {self.matrix.shape[0]}件 ({(time.perf_counter() - start) * 1000:.0f}ms)")
+        return self._neighbors, self._sims
+
+    def nearest_unvisited(self, row, visited):
+        """row に一番近い未再生の行を返すのじゃ。全て再生済みなら None。"""
+        scores = self.matrix @ self.matrix[row]
+        scores[visited] = -np.inf
+        best = int(np.argmax(scores))
+        return None if visited[best] else best
+
+    def plan(self, start, visited, mode, diversity, threshold, steps=PLAN_SEGMENT_STEPS):
+        """start から始まる再生順を作り、並べた行の visited に印を付けるのじゃ。
+
+        閾値以上に近い未再生の行が無くなったところで止めるのじゃ（続きは呼び出し側が
+        新しい start を選んでもう一度呼ぶ）。
+
+        Args:
+            start (int): 最初の行
+            visited (np.ndarray): 行ごとの再生済みフラグ（書き換える）
+            mode (str): "walk" / "mmr" / "random_walk"
+            diversity (float): 0〜1。大きいほど直前に並べた行と似ていないものを選ぶ
+            threshold (float): 次に進める類似度の下限（walk・random_walk は直前の行、mmr は start との類似度）
+            steps (int): 最大の長さ
+
+        Returns:
+            list: 行番号のリスト（先頭は start）
+        """
+        visited[start] = True
+        if mode == "mmr":
+            return self._plan_mmr(start, visited, diversity, threshold, steps)
+        return self._plan_walk(start, visited, diversity, threshold, steps, stochastic=(mode == "random_walk"))
+
+    def _plan_walk(self, start, visited, diversity, threshold, steps, stochastic):
+        neighbors, sims = self._graph()
+        order = [start]
+        recent = deque(maxlen=PLAN_RECENT_WINDOW)  # 今の行より前に並べた行
+        current = start
+        while len(order) < steps:
+            row_neighbors, row_sims = neighbors[current], sims[current]
+            ok = (row_sims >= threshold) & ~visited[row_neighbors]
+            if not ok.any():
+                break
+            candidates, score = row_neighbors[ok], row_sims[ok]
+            if diversity > 0 and recent:
+                # 今の行に近く、それより前に見た行とは似ていないものを選ぶのじゃ
+                redundancy = (self.matrix[candidates] @ self.matrix[list(recent)].T).max(axis=1)
+                score = (1.0 - diversity) * score - diversity * redundancy
+            if stochastic:
+                temperature = RW_MIN_TEMPERATURE + diversity * RW_TEMPERATURE_SCALE
+                p = np.exp((score - score.max()) / temperature)
+                pick = self.rng.choice(len(candidates), p=p / p.sum())
+            else:
+                pick = int(np.argmax(score))
+            recent.append(current)
+            current = int(candidates[pick])
+            visited[current] = True
+            order.append(current)
+        return order
+
+    def _plan_mmr(self, start, visited, diversity, threshold, steps):
+        scores = self.matrix @ self.matrix[start]
+        pool = np.flatnonzero(~visited & (scores >= threshold))
+        if diversity <= 0:
+            # 重複を気にしなければ、シードに似ている順そのままなのじゃ
+            picked = pool[np.argsort(-scores[pool], kind="stable")][:steps - 1]
+        else:
+            if len(pool) > PLAN_MMR_POOL:
+                pool = pool[np.argpartition(-scores[pool], PLAN_MMR_POOL - 1)[:PLAN_MMR_POOL]]
+            pool = pool[np.argsort(-scores[pool], kind="stable")]
+            relevance = scores[pool]
+            vecs = self.matrix[pool]
+            redundancy = np.zeros(len(pool), dtype=np.float32)  # 並べ済みの行との類似度の最大値
+            taken = np.zeros(len(pool), dtype=bool)
+            chosen = []
+            for _ in range(min(len(pool), steps - 1)):
+                score = (1.0 - diversity) * relevance - diversity * redundancy
+                score[taken] = -np.inf
+                i = int(np.argmax(score))
+                taken[i] = True
+                chosen.append(i)
+                np.maximum(redundancy, vecs @ vecs[i], out=redundancy)
+            picked = pool[chosen]
+        visited[picked] = True
+        return [start] + picked.tolist()
+
+
+class AIPlaylist:
+    """AI スライドショーの再生順を管理するクラスなのじゃ。
+
+    未再生の画像のうちフォルダ順で最初のものを最初のシードにし、PlaylistPlanner で
+    計画した順に再生待ちへ入れるのじゃ。計画が途切れたら、最後に再生した画像に一番近い
+    未再生の画像から続けるのじゃ（ベクトルの無い画像は、フォルダ順で来たところで1枚だけ挟む）。
+    全部再生したら最初からやり直すのじゃ。同じ内容のファイルは続けて再生するのじゃ。
+    """
+
+    def __init__(self, files, base_folder, vectors, mode=DEFAULT_SS_AI_PLAN_MODE,
+                 diversity=DEFAULT_SS_AI_DIVERSITY, rng=None):
+        """初期化処理。
+
+        Args:
+            files (list): 画像ファイル名（または base_folder からの相対パス・フルパス）
+            base_folder (str): 基準フォルダ
+            vectors (VectorStore or dict): ベクトルデータ
+            mode (str): 計画の仕方（SS_AI_PLAN_MODES のどれか）
+            diversity (float): 0〜1 の多様性
+            rng (np.random.Generator): random_walk で使う乱数（省略時は新しく作る）
+        """
+        self.files = list(files)
+        self.base_folder = base_folder
+        self.vectors = vectors
+        self.mode = mode if mode in SS_AI_PLAN_MODES else DEFAULT_SS_AI_PLAN_MODE
+        self.diversity = diversity
+        self.rng = rng
+        self.queue = deque()       # 再生待ち（ファイルの番号）
+        self.visited = np.zeros(len(self.files), dtype=bool)  # 再生待ちに入れた（再生済みを含む）
+        self._cursor = 0           # これより前のファイルは全て visited なのじゃ
+        self._file_rows = None     # ファイルの番号 → ベクトルの行（ベクトルが無ければ -1）
+        self._row_files = None     # ベクトルの行 → ファイルの番号のリスト
+        self._row_visited = None
+        self._planner = None
+        self._last_row = None      # 最後に計画した行（次の計画はここから続ける）
+
+    def _to_full_path(self, f):
+        if os.path.isabs(f):
+            return f
+        return os.path.join(self.base_folder, f)
+
+    def _build(self):
+        """ファイルをハッシュ→ベクトルの行に対応付けるのじゃ（フォルダごとに1回だけ）。
+
+        ハッシュはハッシュインデックスから取るので、前に読んだファイルは stat だけで済むのじゃ。
+        """
+        full_paths = [self._to_full_path(f) for f in self.files]
+        by_path = HashIndex.get_instance().get_hashes(full_paths)
+        hashes = [by_path.get(p) for p in full_paths]
+        index = SimilarityIndex.from_store(self.vectors, dict.fromkeys(h for h in hashes if h))
+        row_of = {h: row for row, h in enumerate(index.keys)}
+        self._file_rows = np.fromiter((row_of.get(h, -1) for h in hashes), dtype=np.int64, count=len(self.files))
+        self._row_files = [[] for _ in index.keys]
+        for i, row in enumerate(self._file_rows):
+            if row >= 0:
+                self._row_files[row].append(i)
+        self._row_visited = np.zeros(len(index.keys), dtype=bool)
+        for row, file_ids in enumerate(self._row_files):
+            self._row_visited[row] = self.visited[file_ids].any()
+        self._planner = PlaylistPlanner(index.matrix, rng=self.rng)
+        logger.info(f"AI再生順の準備: {len(self.files)}件中 {int((self._file_rows >= 0).sum())}件にベクトルあり")
+
+    def prepare(self):
+        """時間のかかる準備（ハッシュ→行の対応付けと近傍グラフ）を先に済ませておくのじゃ。
+
+        フォルダを設定したときに別スレッドから呼ぶと、最初の1枚を待たせずに済むのじゃ。
+        """
+        if self._file_rows is None:
+            self._build()
+        if self.mode != "mmr":
+            self._planner._graph()
+
+    def configure(self, mode, diversity):
+        """計画の仕方を変えるのじゃ。まだ再生していない再生待ちは次から作り直すのじゃ。"""
+        if mode not in SS_AI_PLAN_MODES:
+            mode = DEFAULT_SS_AI_PLAN_MODE
+        if mode == self.mode and diversity == self.diversity:
+            return
+        self.mode, self.diversity = mode, diversity
+        if self.queue:
+            pending = np.fromiter(self.queue, dtype=np.int64, count=len(self.queue))
+            self.visited[pending] = False
+            rows = self._file_rows[pending]
+            self._row_visited[rows[rows >= 0]] = False
+            self._cursor = min(self._cursor, int(pending.min()))
+            self.queue.clear()
+
+    def _next_seed(self):
+        """次の計画の最初のファイルを返すのじゃ。全て再生済みなら None。"""
+        while self._cursor < len(self.files) and self.visited[self._cursor]:
+            self._cursor += 1
+        if self._cursor >= len(self.files):
+            return None
+        if self._last_row is None or self._file_rows[self._cursor] < 0:
+            return self._cursor
+        row = self._planner.nearest_unvisited(self._last_row, self._row_visited)
+        return self._cursor if row is None else self._row_files[row][0]
+
+    def _refill(self, threshold):
+        """次の計画を作って再生待ちへ入れるのじゃ。"""
+        if self._file_rows is None:
+            self._build()
+        seed = self._next_seed()
+        if seed is None:
+            # 全て再生したので最初からやり直すのじゃ
+            self.visited[:] = False
+            self._row_visited[:] = False
+            self._cursor = 0
+            self._last_row = None
+            seed = self._next_seed()
+
+        row = self._file_rows[seed]
+        if row < 0:
+            self.visited[seed] = True
+            self.queue.append(seed)
+            return
+        start = time.perf_counter()
+        rows = self._planner.plan(int(row), self._row_visited, self.mode, self.diversity, threshold)
+        for r in rows:
+            file_ids = self._row_files[r]
+            self.visited[file_ids] = True
+            self.queue.extend(file_ids)
+        self._last_row = rows[-1]
+        logger.debug(f"AI再生順を計画: {self.mode} {len(rows)}件 ({(time.perf_counter() - start) * 1000:.1f}ms)")
+
+    def next(self, threshold):
+        """次に再生する画像を返すのじゃ。
+
+        Args:
+            threshold (float): 次に進める類似度の下限
+
+        Returns:
+            str: 画像（files の要素）。画像が無ければ None
+        """
+        if not self.files:
+            return None
+        if not self.queue:
+            self._refill(threshold)
+        return self.files[self.queue.popleft()]
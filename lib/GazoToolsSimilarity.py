@@ -0,0 +1,204 @@
+'''
+作成日: 2026年01月08日
+作成者: tamate masayuki
+機能: ベクトル類似度検索エンジン
+説明: L2正規化済みのベクトルを1つの連続した float32 行列にまとめ、
+      行列×ベクトル1回と argpartition で上位k件・閾値検索を行うのじゃ。
+'''
+import bisect
+import numpy as np
+from lib.GazoToolsExceptions import VectorProcessingError
+from lib.GazoToolsLogger import LoggerManager
+
+logger = LoggerManager.get_logger(__name__)
+
+
+def normalize_rows(matrix):
+    """行ごとに L2 正規化した float32 行列を返すのじゃ（ゼロ行はそのまま）。"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+
+def normalize_vector(vec):
+    """1本のベクトルを L2 正規化した float32 配列で返すのじゃ。"""
+    return normalize_rows(vec)[0]
+
+
+class SimilarityIndex:
+    """総当たり（厳密）のコサイン類似度検索インデックスなのじゃ。
+
+    キー（ファイルパスやハッシュ）と行列の行が1対1に対応するのじゃ。
+    ベクトルは登録時に正規化するので、内積がそのままコサイン類似度になるのじゃ。
+    行列が PCA で圧縮されている場合は、元の次元のクエリを codec で圧縮してから比較するのじゃ。
+    """
+
+    def __init__(self, keys=None, matrix=None, codec=None):
+        """初期化処理。
+
+        Args:
+            keys (list): 各行に対応するキー
+            matrix (array-like): shape=(n, dim) のベクトル行列
+            codec (PCACodec): 行列が圧縮コードの場合のコーデック（省略可）
+        """
+        self.keys = []
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.codec = codec
+        if keys is not None and matrix is not None:
+            self.add(keys, matrix)
+
+    @classmethod
+    def from_store(cls, store, hashes):
+        """ベクトルストアから指定ハッシュの行だけを集めてインデックスを作るのじゃ。
+
+        Args:
+            store (VectorStore or dict): ベクトルストア（普通の dict も可）
+            hashes (iterable): 対象のハッシュ
+
+        Returns:
+            SimilarityIndex: キーがハッシュのインデックス
+        """
+        if hasattr(store, "get_matrix"):
+            found, matrix = store.get_matrix(hashes)
+            return cls(found, matrix, codec=getattr(store, "codec", None))
+        found = [h for h in hashes if store.get(h)]
+        return cls(found, [store[h] for h in found])
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def dim(self):
+        return self.matrix.shape[1] if self.matrix.size else 0
+
+    def add(self, keys, matrix):
+        """キーとベクトルを追加するのじゃ。
+
+        Raises:
+            VectorProcessingError: 件数や次元数が合わない場合
+        """
+        keys = list(keys)
+        if not keys:
+            return
+        block = normalize_rows(matrix)
+        if block.shape[0] != len(keys):
+            raise VectorProcessingError(f"Key count {len(keys)} does not match matrix rows {block.shape[0]}")
+        if len(self.keys) == 0:
+            self.matrix = block
+        else:
+            if block.shape[1] != self.matrix.shape[1]:
+                raise VectorProcessingError(
+                    f"Vector dimension mismatch: expected {self.matrix.shape[1]}, got {block.shape[1]}")
+            self.matrix = np.ascontiguousarray(np.vstack([self.matrix, block]))
+        self.keys.extend(keys)
+
+    def scores(self, query):
+        """全行とのコサイン類似度を1回の行列積で計算するのじゃ。
+
+        Returns:
+            np.ndarray: shape=(n,) のスコア
+        """
+        if len(self.keys) == 0:
+            return np.zeros(0, dtype=np.float32)
+        if self.codec is not None:
+            query = self.codec.encode_query(query)
+        q = normalize_vector(query)
+        if q.shape[0] != self.matrix.shape[1]:
+            raise VectorProcessingError(
+                f"Query dimension mismatch: expected {self.matrix.shape[1]}, got {q.shape[0]}")
+        return self.matrix @ q
+
+    def top_k(self, query, k, threshold=None):
+        """類似度の高い順に最大k件を返すのじゃ。
+
+        Args:
+            query (array-like): クエリベクトル
+            k (int): 最大件数
+            threshold (float): これ未満のスコアは除外（省略可）
+
+        Returns:
+            list: (キー, スコア) のタプルリスト（スコア降順）
+        """
+        scores = self.scores(query)
+        n = scores.shape[0]
+        if n == 0 or k <= 0:
+            return []
+        k = min(k, n)
+        if k < n:
+            idx = np.argpartition(-scores, k - 1)[:k]
+        else:
+            idx = np.arange(n)
+        idx = idx[np.argsort(-scores[idx], kind="stable")]
+        if threshold is not None:
+            idx = idx[scores[idx] >= threshold]
+        return [(self.keys[i], float(scores[i])) for i in idx]
+
+    def range(self, query, threshold):
+        """閾値以上のスコアを持つ全件を降順で返すのじゃ。
+
+        Returns:
+            list: (キー, スコア) のタプルリスト（スコア降順）
+        """
+        scores = self.scores(query)
+        idx = np.nonzero(scores >= threshold)[0]
+        idx = idx[np.argsort(-scores[idx], kind="stable")]
+        return [(self.keys[i], float(scores[i])) for i in idx]
+
+
+class RankedCandidates:
+    """スコアの降順に並べた候補（パス, スコア）のリストなのじゃ。
+
+    スコアの符号を反転した昇順リストを別に持つので、
+    閾値以上の件数は bisect の二分探索1回で求まるのじゃ。
+    """
+
+    def __init__(self, items=None):
+        """初期化処理。
+
+        Args:
+            items (iterable): (パス, スコア) のタプル（順不同で可）
+        """
+        self._paths = []
+        self._neg_scores = []
+        if items is not None:
+            self.extend(items)
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __getitem__(self, i):
+        """i 番目（スコア降順）の (パス, スコア) を返すのじゃ。"""
+        return self._paths[i], -self._neg_scores[i]
+
+    def add(self, path, score):
+        """候補を1件、順序を保ったまま挿入するのじゃ。同点なら後から来た方が後ろなのじゃ。"""
+        pos = bisect.bisect_right(self._neg_scores, -score)
+        self._neg_scores.insert(pos, -score)
+        self._paths.insert(pos, path)
+
+    def extend(self, items):
+        """候補をまとめて追加するのじゃ。"""
+        items = list(items)
+        if not items:
+            return
+        if len(items) > len(self._paths):
+            # 多いときは全部並べ直した方が速いのじゃ
+            merged = [(p, -s) for p, s in zip(self._paths, self._neg_scores)]
+            merged.extend((p, float(s)) for p, s in items)
+            merged.sort(key=lambda item: -item[1])
+            self._paths = [p for p, _ in merged]
+            self._neg_scores = [-s for _, s in merged]
+        else:
+            for path, score in items:
+                self.add(path, float(score))
+
+    def count_at_least(self, threshold):
+        """スコアが閾値以上の件数を返すのじゃ。先頭からこの件数が該当するのじゃ。"""
+        return bisect.bisect_right(self._neg_scores, -threshold)
+
+    def paths_at_least(self, threshold):
+        """スコアが閾値以上のパスを降順で返すのじゃ。"""
+        return self._paths[:self.count_at_least(threshold)]
@@ -0,0 +1,155 @@
+'''
+作成日: 2026年01月13日
+作成者: tamate masayuki
+機能: スライドショーの先読みエンジン
+説明: 次に表示する画像を N 枚先まで決めておき、デコード・リサイズ・ハッシュ・ベクトル計算を
+      ワーカースレッドで済ませておくのじゃ。メインスレッドは準備済みの画像から
+      PhotoImage を作るだけになるので、切り替えのたびに UI が固まらないのじゃ。
+'''
+import threading
+from collections import deque
+from lib.GazoToolsLogger import LoggerManager
+from lib.config_defaults import SS_PREFETCH_COUNT
+
+logger = LoggerManager.get_logger(__name__)
+
+
+class PreparedImage:
+    """表示の準備ができた画像なのじゃ。"""
+
+    __slots__ = ("file_name", "full_path", "image", "scale", "image_hash")
+
+    def __init__(self, file_name, full_path, image, scale, image_hash=None):
+        """初期化処理。
+
+        Args:
+            file_name (str): 画像リスト上の名前（相対パスまたはフルパス）
+            full_path (str): 正規化したフルパス
+            image (PIL.Image): 表示サイズにリサイズ済みの画像
+            scale (float): 元画像に対する表示倍率
+            image_hash (str): ファイルのハッシュ
+        """
+        self.file_name = file_name
+        self.full_path = full_path
+        self.image = image
+        self.scale = scale
+        self.image_hash = image_hash
+
+    @property
+    def size(self):
+        return self.image.size
+
+
+class SlideShowPrefetcher:
+    """スライドショーの画像をバックグラウンドで先読みするクラスなのじゃ。
+
+    次の画像の決定 (decide_fn) と準備 (prepare_fn) はどちらもワーカースレッドで呼ぶので、
+    Tk のウィジェットや変数に触らない関数を渡すのじゃ。画面サイズや再生モードなど
+    Tk 側の値は、メインスレッドから set_params で渡すのじゃ。
+    """
+
+    def __init__(self, decide_fn, prepare_fn, depth=SS_PREFETCH_COUNT):
+        """初期化処理。
+
+        Args:
+            decide_fn (callable): decide_fn(params) -> 次の画像名 or None
+            prepare_fn (callable): prepare_fn(file_name, params) -> PreparedImage
+            depth (int): 先に準備しておく画像数
+        """
+        self.decide_fn = decide_fn
+        self.prepare_fn = prepare_fn
+        self.depth = max(1, depth)
+        self._ready = deque()
+        self._cond = threading.Condition()
+        self._params = None
+        self._generation = 0
+        self._running = False
+        self._thread = None
+
+    @property
+    def is_running(self):
+        return self._running
+
+    def ready_count(self):
+        with self._cond:
+            return len(self._ready)
+
+    def start(self, params):
+        """ワーカースレッドを起動するのじゃ（起動済みなら設定だけ更新するのじゃ）。"""
+        self.set_params(params)
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="SlideShowPrefetcher", daemon=True)
+            self._thread.start()
+        logger.info(f"スライドショー先読み開始: {self.depth}枚先まで準備するのじゃ")
+
+    def stop(self, timeout=None):
+        """ワーカースレッドを止め、準備済みの画像を捨てるのじゃ。"""
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._generation += 1
+            self._ready.clear()
+            self._cond.notify_all()
+            thread = self._thread
+        if timeout is not None and thread is not None:
+            thread.join(timeout)
+        logger.info("スライドショー先読み停止")
+
+    def set_params(self, params):
+        """表示設定を更新するのじゃ。前と違えば準備済みの画像は作り直すのじゃ。"""
+        with self._cond:
+            if params == self._params:
+                return
+            self._params = params
+            self._invalidate_locked()
+
+    def invalidate(self):
+        """フォルダの切り替えなどで、準備済みの画像を捨てるのじゃ。"""
+        with self._cond:
+            self._invalidate_locked()
+
+    def _invalidate_locked(self):
+        self._generation += 1
+        self._ready.clear()
+        self._cond.notify_all()
+
+    def next(self):
+        """準備済みの画像を1つ取り出すのじゃ。間に合っていなければ None を返すのじゃ。"""
+        with self._cond:
+            if not self._ready:
+                return None
+            item = self._ready.popleft()
+            self._cond.notify_all()
+            return item
+
+    def _run(self):
+        """ワーカー本体。キューが depth 枚になるまで次の画像を準備し続けるのじゃ。"""
+        while True:
+            with self._cond:
+                while self._running and len(self._ready) >= self.depth:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                generation = self._generation
+                params = self._params
+
+            item = None
+            try:
+                file_name = self.decide_fn(params)
+                if file_name:
+                    item = self.prepare_fn(file_name, params)
+            except Exception as e:
+                logger.warning(f"スライドショー先読み失敗: {e}")
+
+            with self._cond:
+                if not self._running:
+                    return
+                if item is not None and generation == self._generation:
+                    self._ready.append(item)
+                elif item is None:
+                    # 画像が無い・読めない場合は少し待ってから再試行するのじゃ
+                    self._cond.wait(0.5)
@@ -53,7 +53,14 @@ class AppState:
         self.ss_interval = 5
         self.ss_ai_mode = False
         self.ss_ai_threshold = 0.65
+        self.ss_ai_plan_mode = "walk"   # AI類似度順の再生順の作り方 (walk / mmr / random_walk)
+        self.ss_ai_diversity = 0.3      # AI類似度順の多様性（0 なら似ている順そのまま）
         self.ss_include_subfolders = False
+        self.ai_ann_nprobe = 8   # 近似検索の精度/速度つまみ（IVF の探索クラスタ数）
+        self.ai_vector_workers = 0   # ベクトル化のデコード用プロセス数（0 なら自動）
+        self.ai_inference_mode = "float32"   # 推論モード (float32 / int8 / jit / compile)
+        self.ai_channels_last = False        # channels_last メモリ配置で推論するか
+        self.ai_parity_tolerance = 0.99      # 高速モードが float32 と一致すべきコサイン類似度
         
         # ベクトル表示設定
         self.vector_display = {
@@ -70,6 +77,9 @@ class AppState:
             "auto_vectorize": True,
         }
 
+        # フォルダ訪問回数 {正規化パス: 回数}
+        self.folder_visits = {}
+
         # スマート移動設定
         self.smart_move_threshold = 0.90
         self.smart_move_show_thumbnails = True
@@ -135,11 +145,33 @@ class AppState:
         self.current_folder = path
         self.current_files = []
         self.current_folders = []
+        self._record_folder_visit(path)
         
         logger.info(f"現在のフォルダを変更: {path}")
         self._notify_callbacks("folder_changed", {"path": path})
         return True
     
+    def _record_folder_visit(self, path):
+        """フォルダの訪問回数を数える（ベクトル化の優先順位に使用）"""
+        from lib.config_defaults import FOLDER_VISITS_MAX_ENTRIES
+        key = os.path.normcase(os.path.abspath(path))
+        self.folder_visits[key] = self.folder_visits.get(key, 0) + 1
+        if len(self.folder_visits) > FOLDER_VISITS_MAX_ENTRIES:
+            # 訪問回数の少ないものから捨てる
+            keep = sorted(self.folder_visits.items(), key=lambda kv: kv[1], reverse=True)
+            self.folder_visits = dict(keep[:FOLDER_VISITS_MAX_ENTRIES])
+    
+    def get_folder_visits(self, path):
+        """フォルダの訪問回数を取得
+        
+        Args:
+            path (str): フォルダパス
+        
+        Returns:
+            int: 訪問回数（未訪問なら 0）
+        """
+        return self.folder_visits.get(os.path.normcase(os.path.abspath(path)), 0)
+    
     def set_current_files(self, files):
         """現在のファイルリストを設定
         
@@ -159,7 +191,16 @@ class AppState:
         self.current_folders = folders
         logger.debug(f"フォルダ一覧を更新: {len(folders)}件")
         self._notify_callbacks("folders_changed", {"folders": folders, "count": len(folders)})
-    
+
+    def notify_library_changed(self, events):
+        """フォルダ監視で見つけたファイルの追加・削除・変更・リネームを通知
+
+        Args:
+            events (list): GazoToolsWatcher.FsEvent のリスト
+        """
+        logger.debug(f"ライブラリの変化を検出: {len(events)}件")
+        self._notify_callbacks("library_changed", {"events": events, "count": len(events)})
+
     # ==================== 移動先管理 ====================
     
     def set_move_destination(self, index, path):
@@ -314,6 +355,56 @@ class AppState:
         logger.debug(f"AI類似度閾値: {self.ss_ai_threshold}")
         self._notify_callbacks("ss_ai_threshold_changed", {"threshold": self.ss_ai_threshold})
     
+    def set_ss_ai_plan_mode(self, mode):
+        """AI類似度順の再生順の作り方設定"""
+        from lib.config_defaults import SS_AI_PLAN_MODES
+        if mode not in SS_AI_PLAN_MODES:
+            logger.warning(f"無効な再生順の作り方: {mode}")
+            return False
+        self.ss_ai_plan_mode = mode
+        logger.debug(f"AI再生順の作り方: {mode}")
+        self._notify_callbacks("ss_ai_plan_mode_changed", {"mode": mode})
+        return True
+    
+    def set_ss_ai_diversity(self, diversity):
+        """AI類似度順の多様性設定（0 なら似ている順そのまま、1 に近いほど直前と違う画像を選ぶ）"""
+        self.ss_ai_diversity = max(0.0, min(1.0, diversity))
+        logger.debug(f"AI再生順の多様性: {self.ss_ai_diversity}")
+        self._notify_callbacks("ss_ai_diversity_changed", {"diversity": self.ss_ai_diversity})
+    
+    def set_ai_ann_nprobe(self, nprobe):
+        """近似検索で探索するクラスタ数設定（大きいほど高精度・低速）"""
+        from lib.config_defaults import MIN_ANN_NPROBE, MAX_ANN_NPROBE
+        self.ai_ann_nprobe = max(MIN_ANN_NPROBE, min(MAX_ANN_NPROBE, int(nprobe)))
+        logger.debug(f"近似検索 nprobe: {self.ai_ann_nprobe}")
+        self._notify_callbacks("ai_ann_nprobe_changed", {"nprobe": self.ai_ann_nprobe})
+    
+    def set_ai_vector_workers(self, workers):
+        """ベクトル化のデコード用プロセス数設定（0 なら自動）"""
+        from lib.config_defaults import MAX_VECTOR_WORKERS
+        self.ai_vector_workers = max(0, min(MAX_VECTOR_WORKERS, int(workers)))
+        logger.debug(f"ベクトル化ワーカー数: {self.ai_vector_workers}")
+        self._notify_callbacks("ai_vector_workers_changed", {"workers": self.ai_vector_workers})
+    
+    def set_ai_inference_mode(self, mode, channels_last=None):
+        """推論モード設定（次回の AI モデル読み込みから有効）"""
+        from lib.config_defaults import INFERENCE_MODES
+        if mode not in INFERENCE_MODES:
+            logger.warning(f"無効な推論モード: {mode}")
+            return False
+        self.ai_inference_mode = mode
+        if channels_last is not None:
+            self.ai_channels_last = bool(channels_last)
+        logger.info(f"推論モード: {mode} (channels_last={self.ai_channels_last})")
+        self._notify_callbacks("ai_inference_mode_changed", {"mode": mode, "channels_last": self.ai_channels_last})
+        return True
+    
+    def set_ai_parity_tolerance(self, tolerance):
+        """推論モードのパリティ許容値設定"""
+        self.ai_parity_tolerance = max(0.0, min(1.0, tolerance))
+        logger.debug(f"推論パリティ許容値: {self.ai_parity_tolerance}")
+        self._notify_callbacks("ai_parity_tolerance_changed", {"tolerance": self.ai_parity_tolerance})
+    
     def set_ss_include_subfolders(self, enabled):
         """子フォルダを含める設定"""
         self.ss_include_subfolders = enabled
@@ -457,7 +548,14 @@ class AppState:
                 "ss_interval": self.ss_interval,
                 "ss_ai_mode": self.ss_ai_mode,
                 "ss_ai_threshold": self.ss_ai_threshold,
+                "ss_ai_plan_mode": self.ss_ai_plan_mode,
+                "ss_ai_diversity": self.ss_ai_diversity,
                 "ss_include_subfolders": self.ss_include_subfolders,
+                "ai_ann_nprobe": self.ai_ann_nprobe,
+                "ai_vector_workers": self.ai_vector_workers,
+                "ai_inference_mode": self.ai_inference_mode,
+                "ai_channels_last": self.ai_channels_last,
+                "ai_parity_tolerance": self.ai_parity_tolerance,
                 "move_dest_list": self.move_dest_list,
                 "move_reg_idx": self.move_reg_idx,
                 "move_dest_count": self.move_dest_count,
@@ -471,6 +569,7 @@ class AppState:
                 "smart_move_threshold": self.smart_move_threshold,
                 "smart_move_show_thumbnails": self.smart_move_show_thumbnails,
                 "show_splash_tips": self.show_splash_tips,
+                "folder_visits": self.folder_visits,
             }
         }
     
@@ -513,7 +612,25 @@ class AppState:
                 self.ss_interval = settings.get("ss_interval", 5)
                 self.ss_ai_mode = settings.get("ss_ai_mode", False)
                 self.ss_ai_threshold = settings.get("ss_ai_threshold", 0.65)
+                # 手で書き換えた設定や古い設定でも、セッターと同じ範囲に収めるのじゃ
+                from lib.config_defaults import SS_AI_PLAN_MODES
+                plan_mode = settings.get("ss_ai_plan_mode", "walk")
+                if plan_mode not in SS_AI_PLAN_MODES:
+                    logger.warning(f"無効な再生順の作り方なので walk にします: {plan_mode}")
+                    plan_mode = "walk"
+                self.ss_ai_plan_mode = plan_mode
+                try:
+                    diversity = float(settings.get("ss_ai_diversity", 0.3))
+                except (TypeError, ValueError):
+                    logger.warning(f"無効な多様性なので 0.3 にします: {settings.get('ss_ai_diversity')}")
+                    diversity = 0.3
+                self.ss_ai_diversity = max(0.0, min(1.0, diversity))
                 self.ss_include_subfolders = settings.get("ss_include_subfolders", False)
+                self.ai_ann_nprobe = settings.get("ai_ann_nprobe", 8)
+                self.ai_vector_workers = settings.get("ai_vector_workers", 0)
+                self.ai_inference_mode = settings.get("ai_inference_mode", "float32")
+                self.ai_channels_last = settings.get("ai_channels_last", False)
+                self.ai_parity_tolerance = settings.get("ai_parity_tolerance", 0.99)
                 self.cpu_low_color = settings.get("cpu_low_color", "#e0ffe0")
                 self.cpu_high_color = settings.get("cpu_high_color", "#ff8080")
                 
@@ -543,6 +660,9 @@ class AppState:
                 self.smart_move_threshold = settings.get("smart_move_threshold", 0.90)
                 self.smart_move_show_thumbnails = settings.get("smart_move_show_thumbnails", True)
                 self.show_splash_tips = settings.get("show_splash_tips", False)
+                visits = settings.get("folder_visits")
+                if isinstance(visits, dict):
+                    self.folder_visits = visits
             
             logger.info("状態を復元しました")
         except Exception as e:
@@ -0,0 +1,362 @@
+'''
+作成日: 2026年01月16日
+作成者: tamate masayuki
+機能: ディスクのサムネイルキャッシュ
+説明: ファイル内容のハッシュをキーに、WebP（使えなければ JPEG）で圧縮したサムネイルを
+      いくつかのシャードファイルに追記していき、場所はインデックス (JSON) に記録するのじゃ。
+      ファイルを移動・リネームしても内容が同じなら作り直さずに済むのじゃ。
+      インデックスに載っていない書きかけの部分は、次に開いたときに切り捨てるのじゃ。
+      シャードの合計が THUMB_MAX_MB を超えたら、しばらく使っていないものを捨てて
+      新しい世代のシャードに詰め直すのじゃ（インデックスを書き換えてから古い世代を消す）。
+      読み出しは鍵を放して行うので、古い世代を読んでいる途中なら、読み終わってから消すのじゃ。
+'''
+import io
+import os
+import re
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, features
+from lib.GazoToolsHashIndex import HashIndex
+from lib.GazoToolsImageCache import ImageCache
+from lib.GazoToolsLogger import LoggerManager
+from lib.config_defaults import (
+    THUMB_DIR, THUMB_SHARD_COUNT, THUMB_FORMAT, THUMB_QUALITY, THUMB_WORKERS, THUMB_FLUSH_COUNT,
+    THUMB_MAX_MB, THUMB_COMPACT_RATIO
+)
+
+logger = LoggerManager.get_logger(__name__)
+
+THUMB_INDEX_VERSION = 1
+THUMB_INDEX_NAME = "thumbs_index.json"
+SHARD_FILE_PATTERN = re.compile(r"thumbs_[0-9a-f]{2}(?:\.(\d+))?\.bin$")
+
+
+def thumb_key(digest, size):
+    """インデックスのキー（ハッシュとサイズ）を作るのじゃ。"""
+    return f"{digest}:{int(size[0])}x{int(size[1])}"
+
+
+class ThumbnailStore:
+    """サムネイルをシャードファイルに詰めて保存するシングルトンクラスなのじゃ。
+
+    エントリは ``"ハッシュ:幅x高さ" -> [シャード番号, オフセット, 長さ]`` の形で保持するのじゃ。
+    エントリの並びは使った順（最後が最近）で、容量を超えたら先頭から捨てるのじゃ。
+    シャードのファイル名には世代（epoch）が付き、インデックスが指す世代だけが有効なのじゃ。
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        """シングルトンインスタンスを取得するのじゃ。"""
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, thumb_dir=THUMB_DIR, shard_count=THUMB_SHARD_COUNT,
+                 image_format=THUMB_FORMAT, hash_index=None, workers=THUMB_WORKERS,
+                 max_bytes=THUMB_MAX_MB * 1024 * 1024):
+        """初期化処理。
+
+        Args:
+            thumb_dir (str): シャードとインデックスの保存先フォルダ
+            shard_count (int): シャードファイルの数
+            image_format (str): "WEBP" または "JPEG"
+            hash_index (HashIndex): ハッシュの取得元（省略時はアプリ共通のもの）
+            workers (int): バックグラウンドでサムネイルを作るスレッド数
+            max_bytes (int): シャードの合計サイズの上限
+        """
+        self.thumb_dir = thumb_dir
+        self.index_file = os.path.join(thumb_dir, THUMB_INDEX_NAME)
+        self.shard_count = shard_count
+        if image_format == "WEBP" and not features.check("webp"):
+            image_format = "JPEG"
+        self.image_format = image_format
+        self.hash_index = hash_index or HashIndex.get_instance()
+        self.max_bytes = max_bytes
+        self.entries = {}
+        self.epoch = 0             # 今のシャードの世代（詰め直すたびに増える）
+        self._disk_bytes = 0       # 今の世代のシャードの合計サイズ（捨てたものを含む）
+        self._store_lock = threading.RLock()
+        self._write_lock = threading.Lock()    # インデックスを書くのは一度に1つだけなのじゃ
+        self._compact_lock = threading.Lock()
+        self._dirty_count = 0
+        self._readers = {}  # {世代: 鍵を放してシャードを読んでいる数}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Thumbnail")
+        self._pending = {}  # {(パス, サイズ): Future} 作成中のサムネイル
+        self._load()
+
+    # ==================== 永続化 ====================
+
+    def _shard_path(self, shard, epoch=None):
+        epoch = self.epoch if epoch is None else epoch
+        suffix = f".{epoch}" if epoch else ""
+        return os.path.join(self.thumb_dir, f"thumbs_{shard:02x}{suffix}.bin")
+
+    def _remove_other_epochs(self):
+        """今の世代ではないシャード（詰め直しの残りや途中で落ちた分）を消すのじゃ。
+
+        読んでいる途中の世代は残し、最後に読み終えた get が消すのじゃ。
+        """
+        with self._store_lock:
+            keep = {self.epoch} | set(self._readers)
+        try:
+            names = os.listdir(self.thumb_dir)
+        except OSError:
+            return
+        for name in names:
+            m = SHARD_FILE_PATTERN.match(name)
+            if m and int(m.group(1) or 0) not in keep:
+                try:
+                    os.remove(os.path.join(self.thumb_dir, name))
+                except OSError as e:
+                    logger.warning(f"古いサムネイルシャードを消せませんでした: {name} - {e}")
+
+    def _load(self):
+        """インデックスを読み込み、シャードの書きかけ部分を切り捨てるのじゃ。"""
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == THUMB_INDEX_VERSION and data.get("shards") == self.shard_count:
+                    self.entries = data.get("entries", {})
+                    self.epoch = data.get("epoch", 0)
+                else:
+                    logger.warning("サムネイルインデックスの形式が違うので作り直します")
+            except (IOError, json.JSONDecodeError) as e:
+                logger.warning(f"サムネイルインデックス読み込み失敗、作り直します: {e}")
+                self.entries = {}
+
+        # シャードごとに、インデックスが知っている終端より後ろを切り捨てるのじゃ
+        ends = {}
+        for shard, offset, length in self.entries.values():
+            ends[shard] = max(ends.get(shard, 0), offset + length)
+        for shard in range(self.shard_count):
+            path = self._shard_path(shard)
+            if not os.path.exists(path):
+                continue
+            size = os.path.getsize(path)
+            end = ends.get(shard, 0)
+            if size > end:
+                with open(path, "r+b") as f:
+                    f.truncate(end)
+            elif size < end:
+                # シャードが欠けているなら、そのシャードのエントリは使えないのじゃ
+                logger.warning(f"サムネイルシャードが壊れています: {path}")
+                self.entries = {k: v for k, v in self.entries.items()
+                                if v[0] != shard or v[1] + v[2] <= size}
+            self._disk_bytes += min(size, end)
+        self._remove_other_epochs()
+        if self.entries:
+            logger.info(f"サムネイルインデックスを読み込みました: {len(self.entries)}件")
+
+    def flush(self):
+        """インデックスに未保存の追加があれば書き出すのじゃ。
+
+        中身のコピーだけ鍵を持って行い、書き込みは鍵を放してから1つずつ行うので、
+        古いコピーが新しいインデックスを上書きすることは無いのじゃ。
+        """
+        with self._write_lock:
+            with self._store_lock:
+                if self._dirty_count == 0:
+                    return
+                data = {"version": THUMB_INDEX_VERSION, "shards": self.shard_count,
+                        "epoch": self.epoch, "entries": dict(self.entries)}
+                self._dirty_count = 0
+            try:
+                os.makedirs(self.thumb_dir, exist_ok=True)
+                tmp_path = self.index_file + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, separators=(",", ":"))
+                os.replace(tmp_path, self.index_file)
+            except IOError as e:
+                logger.error(f"サムネイルインデックス書き込み失敗: {self.index_file} - {e}")
+
+    def _copy_entries(self, entries, epoch, ends, out):
+        """entries のデータを epoch の世代のシャードの後ろへ写し、新しい場所を out に入れるのじゃ。"""
+        by_shard = {}
+        for key, (shard, offset, length) in entries.items():
+            by_shard.setdefault(shard, []).append((key, offset, length))
+        for shard, items in by_shard.items():
+            with open(self._shard_path(shard), "rb") as src, open(self._shard_path(shard, epoch), "ab") as dst:
+                for key, offset, length in sorted(items, key=lambda item: item[1]):
+                    src.seek(offset)
+                    dst.write(src.read(length))
+                    out[key] = [shard, ends.get(shard, 0), length]
+                    ends[shard] = ends.get(shard, 0) + length
+
+    def compact(self):
+        """しばらく使っていないサムネイルを捨て、残りを新しい世代のシャードに詰め直すのじゃ。
+
+        写すのは鍵を放して行い、その間に追加されたものは最後に鍵を持って写すのじゃ。
+        インデックスを新しい世代で書いてから古い世代を消すので、途中で落ちても壊れないのじゃ。
+
+        Returns:
+            bool: 詰め直した場合 True
+        """
+        if not self._compact_lock.acquire(blocking=False):
+            return False # 他のスレッドが詰め直している最中なのじゃ
+        try:
+            with self._store_lock:
+                before = dict(self.entries)
+                old_epoch, epoch = self.epoch, self.epoch + 1
+            budget = int(self.max_bytes * THUMB_COMPACT_RATIO)
+            keep, used = {}, 0
+            for key in reversed(list(before)):
+                length = before[key][2]
+                if used + length > budget:
+                    break
+                keep[key] = before[key]
+                used += length
+
+            ends, moved = {}, {}
+            os.makedirs(self.thumb_dir, exist_ok=True)
+            for shard in range(self.shard_count):
+                # 前に失敗した詰め直しの書きかけが残っていたら消しておくのじゃ
+                if os.path.exists(self._shard_path(shard, epoch)):
+                    os.remove(self._shard_path(shard, epoch))
+            self._copy_entries(keep, epoch, ends, moved)
+            with self._store_lock:
+                # 詰め直している間に追加・作り直されたものも写すのじゃ
+                late = {k: v for k, v in self.entries.items() if before.get(k) != v}
+                self._copy_entries(late, epoch, ends, moved)
+                self.entries = {k: moved[k] for k in self.entries if k in moved}
+                self.epoch = epoch
+                self._disk_bytes = sum(ends.values())
+                self._dirty_count += 1
+            self.flush()
+            self._remove_other_epochs()
+            logger.info(f"サムネイルを詰め直しました: {len(before)}件 → {len(self.entries)}件 "
+                        f"({self._disk_bytes // (1024 * 1024)}MB, 世代 {old_epoch}→{epoch})")
+            return True
+        except OSError as e:
+            logger.error(f"サムネイルの詰め直し失敗: {e}")
+            return False
+        finally:
+            self._compact_lock.release()
+
+    # ==================== 参照・追加 ====================
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, digest, size):
+        """ハッシュとサイズからサムネイルを読み出すのじゃ。無ければ None。
+
+        鍵を持つのはエントリと世代を写す間だけで、読み出しと展開は鍵を放して行うので、
+        put や詰め直しを待たないのじゃ。読んでいる世代のシャードは読み終わるまで消さないのじゃ。
+        """
+        key = thumb_key(digest, size)
+        with self._store_lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return None
+            self.entries[key] = entry  # 使った順の最後へ移すのじゃ
+            epoch = self.epoch
+            self._readers[epoch] = self._readers.get(epoch, 0) + 1
+        shard, offset, length = entry
+        try:
+            with open(self._shard_path(shard, epoch), "rb") as f:
+                f.seek(offset)
+                data = f.read(length)
+            img = Image.open(io.BytesIO(data))
+            img.load()
+            return img
+        except (OSError, ValueError) as e:
+            logger.warning(f"サムネイル読み出し失敗（作り直します）: {digest} - {e}")
+            with self._store_lock:
+                if epoch == self.epoch and self.entries.get(key) == entry:
+                    self.entries.pop(key, None)
+            return None
+        finally:
+            self._release_epoch(epoch)
+
+    def _release_epoch(self, epoch):
+        """get が epoch の世代を読み終えたのじゃ。詰め直し済みの世代で最後なら、そのシャードを消すのじゃ。"""
+        with self._store_lock:
+            self._readers[epoch] -= 1
+            if self._readers[epoch]:
+                return
+            del self._readers[epoch]
+            if epoch == self.epoch:
+                return
+        for shard in range(self.shard_count):
+            try:
+                os.remove(self._shard_path(shard, epoch))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"古いサムネイルシャードを消せませんでした: {self._shard_path(shard, epoch)} - {e}")
+
+    def put(self, digest, size, img):
+        """サムネイルを圧縮してシャードに追記するのじゃ。"""
+        buf = io.BytesIO()
+        if self.image_format == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        img.save(buf, format=self.image_format, quality=THUMB_QUALITY)
+        data = buf.getvalue()
+        shard = int(digest[:2], 16) % self.shard_count
+
+        with self._store_lock:
+            os.makedirs(self.thumb_dir, exist_ok=True)
+            with open(self._shard_path(shard), "ab") as f:
+                offset = f.tell()
+                f.write(data)
+            key = thumb_key(digest, size)
+            self.entries.pop(key, None)
+            self.entries[key] = [shard, offset, len(data)]
+            self._disk_bytes += len(data)
+            self._dirty_count += 1
+            due = self._dirty_count >= THUMB_FLUSH_COUNT
+            over = self._disk_bytes > self.max_bytes
+        if over:
+            self.compact()
+        elif due:
+            self.flush()
+
+    def lookup(self, filepath, size):
+        """ハッシュがインデックスにあるファイルなら、すぐにサムネイルを返すのじゃ。
+
+        ハッシュの計算やサムネイルの作成はしないので、UI スレッドから呼んでも速いのじゃ。
+        """
+        digest = self.hash_index.peek(filepath)
+        if digest is None:
+            return None
+        return self.get(digest, size)
+
+    def get_or_create(self, filepath, size):
+        """サムネイルを返すのじゃ。無ければ画像から作って保存するのじゃ。
+
+        Raises:
+            FileHashError: ハッシュが計算できない場合
+            OSError: 画像が読めない場合
+        """
+        digest = self.hash_index.get_hash(filepath)
+        img = self.get(digest, size)
+        if img is not None:
+            return img
+        img = ImageCache.get_instance().get_thumbnail(filepath, size)
+        self.put(digest, size, img)
+        return img
+
+    def request(self, filepath, size):
+        """サムネイルをバックグラウンドで用意し、Future を返すのじゃ。
+
+        同じファイル・サイズを作成中なら、その Future を返すのじゃ。
+        """
+        key = (os.path.normcase(os.path.abspath(filepath)), tuple(size))
+        with self._store_lock:
+            future = self._pending.get(key)
+            if future is not None:
+                return future
+            future = self._executor.submit(self.get_or_create, filepath, size)
+            self._pending[key] = future
+
+        def _done(_):
+            with self._store_lock:
+                self._pending.pop(key, None)
+        future.add_done_callback(_done)
+        return future
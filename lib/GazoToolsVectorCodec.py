@@ -0,0 +1,113 @@
+'''
+作成日: 2026年01月12日
+作成者: tamate masayuki
+機能: ベクトル圧縮コーデック (PCA)
+説明: 1024次元のベクトルを、ライブラリから学習した主成分で 128/256 次元に射影するのじゃ。
+      中心化しない射影（切り捨て SVD）なので、正規化済みベクトルの内積＝コサイン類似度が
+      圧縮後もほぼ保たれ、既存の閾値をそのまま使えるのじゃ。
+'''
+import os
+import numpy as np
+from lib.GazoToolsExceptions import VectorProcessingError
+from lib.GazoToolsLogger import LoggerManager
+from lib.GazoToolsSimilarity import normalize_rows
+
+logger = LoggerManager.get_logger(__name__)
+
+STORAGE_FLOAT32 = "float32"
+STORAGE_FLOAT16 = "float16"
+STORAGE_PCA_PREFIX = "pca"
+
+
+def parse_storage_mode(mode):
+    """保存形式の文字列を (行列の dtype, PCA 次元 or None) に分解するのじゃ。
+
+    Raises:
+        VectorProcessingError: 未知の保存形式の場合
+    """
+    if mode == STORAGE_FLOAT32:
+        return np.float32, None
+    if mode == STORAGE_FLOAT16:
+        return np.float16, None
+    if mode.startswith(STORAGE_PCA_PREFIX) and mode[len(STORAGE_PCA_PREFIX):].isdigit():
+        return np.float32, int(mode[len(STORAGE_PCA_PREFIX):])
+    raise VectorProcessingError(f"Unknown vector storage mode: {mode}")
+
+
+class PCACodec:
+    """主成分への射影でベクトルを圧縮・復元するクラスなのじゃ。"""
+
+    def __init__(self, components):
+        """初期化処理。
+
+        Args:
+            components (np.ndarray): shape=(dim, input_dim) の正規直交な主成分
+        """
+        self.components = np.ascontiguousarray(components, dtype=np.float32)
+
+    @property
+    def dim(self):
+        return self.components.shape[0]
+
+    @property
+    def input_dim(self):
+        return self.components.shape[1]
+
+    @classmethod
+    def fit(cls, matrix, dim):
+        """行列から主成分を学習するのじゃ。
+
+        Args:
+            matrix (np.ndarray): shape=(n, input_dim) の学習用ベクトル
+            dim (int): 圧縮後の次元数
+
+        Raises:
+            VectorProcessingError: 次元数が入力を超える場合
+        """
+        data = normalize_rows(matrix)
+        if dim > data.shape[1]:
+            raise VectorProcessingError(f"PCA dimension {dim} exceeds input dimension {data.shape[1]}")
+        # 件数が次元数より少なくても動くよう、SVD の結果を 0 埋めで補うのじゃ
+        _, _, vt = np.linalg.svd(data, full_matrices=False)
+        components = np.zeros((dim, data.shape[1]), dtype=np.float32)
+        components[:min(dim, vt.shape[0])] = vt[:dim]
+        codec = cls(components)
+        kept = np.linalg.norm(codec.encode(data), axis=1) ** 2
+        logger.info(f"PCA 学習完了: {data.shape[1]}→{dim}次元, 保持エネルギー平均 {float(kept.mean()):.3f}")
+        return codec
+
+    def encode(self, matrix):
+        """shape=(n, input_dim) または (input_dim,) を圧縮するのじゃ。"""
+        return np.asarray(matrix, dtype=np.float32) @ self.components.T
+
+    def decode(self, codes):
+        """圧縮コードを元の次元に近似復元するのじゃ。"""
+        return np.asarray(codes, dtype=np.float32) @ self.components
+
+    def encode_query(self, vec):
+        """元の次元のクエリなら圧縮し、圧縮済みならそのまま返すのじゃ。"""
+        arr = np.asarray(vec, dtype=np.float32).reshape(-1)
+        if arr.shape[0] == self.input_dim:
+            return self.encode(arr)
+        return arr
+
+    def save(self, path):
+        """主成分を一時ファイル経由で保存するのじゃ。"""
+        try:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, components=self.components)
+            os.replace(tmp_path, path)
+        except (IOError, OSError) as e:
+            logger.error(f"PCA コーデック書き込みエラー: {path}", exc_info=True)
+            raise VectorProcessingError(f"Cannot write PCA codec: {e}") from e
+
+    @classmethod
+    def load(cls, path):
+        """保存済みの主成分を読み込むのじゃ。"""
+        try:
+            with np.load(path) as data:
+                return cls(data["components"])
+        except Exception as e:
+            logger.error(f"PCA コーデック読み込みエラー: {path}", exc_info=True)
+            raise VectorProcessingError(f"Cannot read PCA codec: {e}") from e
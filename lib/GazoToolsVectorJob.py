@@ -0,0 +1,135 @@
+'''
+作成日: 2026年01月10日
+作成者: tamate masayuki
+機能: 再開可能なベクトル化ジョブのマニフェスト
+説明: ベクトル化待ちのファイル（パス→ハッシュ）をジョブファイルに保存しておき、
+      アプリを閉じても次回起動時に続きから処理できるようにするのじゃ。
+      ハッシュもマニフェストに入れておくので、再開時に計算し直す必要はないのじゃ。
+      ジョブファイルは1つだけなので、対象の範囲（フォルダ・子フォルダ・ファイル一覧）も
+      一緒に保存し、再開前にフォルダの中身が変わっていないか確かめられるようにするのじゃ。
+'''
+import os
+import json
+import time
+import hashlib
+from lib.GazoToolsExceptions import VectorProcessingError
+from lib.GazoToolsLogger import LoggerManager
+from lib.config_defaults import VECTOR_JOB_FILE
+
+logger = LoggerManager.get_logger(__name__)
+
+VECTOR_JOB_VERSION = 2
+
+
+def listing_digest(paths):
+    """対象ファイルの一覧から、並び順によらない要約を作るのじゃ。"""
+    h = hashlib.md5()
+    for path in sorted(paths):
+        h.update(os.fsencode(path))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class VectorJob:
+    """ベクトル化ジョブの進み具合を保持するクラスなのじゃ。"""
+
+    def __init__(self, folder, pending=None, job_file=VECTOR_JOB_FILE,
+                 roots=None, recursive=False, files=None, listing=None):
+        """初期化処理。
+
+        Args:
+            folder (str): ジョブを開始したフォルダ
+            pending (dict): {フルパス: ハッシュ} のベクトル化待ちファイル
+            job_file (str): マニフェストの保存先
+            roots (list): 対象フォルダ（省略時は folder のみ）
+            recursive (bool): 子フォルダも対象か
+            files (list): フォルダをたどらず、このファイルだけを対象にした場合のファイル一覧
+            listing (str): ジョブを作ったときの対象ファイル一覧の要約（listing_digest）
+        """
+        self.folder = folder
+        self.pending = dict(pending or {})
+        self.job_file = job_file
+        self.roots = list(roots or [folder])
+        self.recursive = recursive
+        self.files = list(files) if files is not None else None
+        self.listing = listing
+        self.total = len(self.pending)
+        self.done_count = 0
+        self.failed = []
+        self.created = time.time()
+
+    @classmethod
+    def load(cls, job_file=VECTOR_JOB_FILE):
+        """保存済みのジョブを読み込むのじゃ。無ければ None を返すのじゃ。"""
+        if not os.path.exists(job_file):
+            return None
+        try:
+            with open(job_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (IOError, json.JSONDecodeError) as e:
+            logger.warning(f"ベクトル化ジョブ読み込み失敗（破棄します）: {e}")
+            return None
+        if data.get("version") != VECTOR_JOB_VERSION:
+            logger.warning(f"ベクトル化ジョブのバージョンが違うので破棄します: {data.get('version')}")
+            return None
+
+        job = cls(data.get("folder", ""), data.get("pending", {}), job_file=job_file,
+                  roots=data.get("roots"), recursive=data.get("recursive", False),
+                  files=data.get("files"), listing=data.get("listing"))
+        job.total = data.get("total", len(job.pending))
+        job.done_count = data.get("done", 0)
+        job.failed = data.get("failed", [])
+        job.created = data.get("created", job.created)
+        return job
+
+    @property
+    def is_finished(self):
+        return not self.pending
+
+    def mark_done(self, path):
+        """ベクトル化できたファイルを待ち行列から外すのじゃ。"""
+        if self.pending.pop(path, None) is not None:
+            self.done_count += 1
+
+    def mark_failed(self, path):
+        """失敗したファイルを待ち行列から外し、失敗リストに記録するのじゃ。"""
+        if self.pending.pop(path, None) is not None:
+            self.done_count += 1
+            self.failed.append(path)
+
+    def save(self):
+        """マニフェストを一時ファイル経由で保存するのじゃ。
+
+        Raises:
+            VectorProcessingError: 書き込みに失敗した場合
+        """
+        data = {
+            "version": VECTOR_JOB_VERSION,
+            "folder": self.folder,
+            "roots": self.roots,
+            "recursive": self.recursive,
+            "files": self.files,
+            "listing": self.listing,
+            "created": self.created,
+            "total": self.total,
+            "done": self.done_count,
+            "failed": self.failed,
+            "pending": self.pending,
+        }
+        try:
+            os.makedirs(os.path.dirname(self.job_file) or ".", exist_ok=True)
+            tmp_path = self.job_file + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.job_file)
+        except (IOError, OSError) as e:
+            logger.error(f"ベクトル化ジョブ書き込みエラー: {self.job_file}", exc_info=True)
+            raise VectorProcessingError(f"Cannot write vector job: {e}") from e
+
+    def remove(self):
+        """完了したジョブのマニフェストを消すのじゃ。"""
+        try:
+            if os.path.exists(self.job_file):
+                os.remove(self.job_file)
+        except OSError as e:
+            logger.warning(f"ベクトル化ジョブ削除失敗: {e}")
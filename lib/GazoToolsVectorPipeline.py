@@ -0,0 +1,290 @@
+'''
+作成日: 2026年01月09日
+作成者: tamate masayuki
+機能: マルチプロセスの画像デコード・前処理パイプライン
+説明: 画像のデコードと weights.transforms() をプロセスプールで並列に行い、
+      前処理済みのテンソルをバッチにまとめて VectorEngine に流し込むのじゃ。
+      同時に投入するタスク数に上限を設けて、メモリを食いつぶさないようにするのじゃ。
+      ワーカーは python -m lib.GazoToolsVectorPipeline で起動するので、メインスクリプト
+      （UI）を読み込み直さないのじゃ。
+'''
+import os
+import sys
+import time
+import queue
+import pickle
+import threading
+import subprocess
+from collections import deque
+import numpy as np
+from PIL import Image
+from lib.GazoToolsLogger import LoggerManager
+from lib.config_defaults import (
+    VECTOR_PIPELINE_BATCH_SIZE, VECTOR_PIPELINE_INFLIGHT_PER_WORKER
+)
+
+logger = LoggerManager.get_logger(__name__)
+
+# ワーカープロセスごとに1回だけ作る前処理
+_worker_preprocess = None
+
+# ワーカーを python -m で起動するときに lib パッケージが見つかるフォルダ
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def default_worker_count():
+    """CPU コア数から既定のワーカー数を決めるのじゃ（推論用に1コア残す）。"""
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def _build_preprocess():
+    """MobileNetV3 と同じ前処理を作るのじゃ（重みのダウンロードは不要）。"""
+    from torchvision import models
+    return models.MobileNet_V3_Small_Weights.DEFAULT.transforms()
+
+
+def _worker_init():
+    """ワーカープロセスの初期化なのじゃ。"""
+    global _worker_preprocess
+    import torch
+    # 各プロセスが全コアを奪い合わないように1スレッドに絞るのじゃ
+    torch.set_num_threads(1)
+    _worker_preprocess = _build_preprocess()
+
+
+def decode_and_preprocess(path):
+    """画像をデコードして前処理し、float32 配列を返すのじゃ。
+
+    Returns:
+        tuple: (パス, shape=(3, H, W) の配列 or None, エラーメッセージ or None)
+    """
+    global _worker_preprocess
+    if _worker_preprocess is None:
+        _worker_preprocess = _build_preprocess()
+    try:
+        with Image.open(path) as img:
+            tensor = _worker_preprocess(img.convert("RGB"))
+        return path, tensor.numpy().astype(np.float32, copy=False), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def _worker_main():
+    """ワーカープロセスの入口なのじゃ。
+
+    標準入力から画像パスを1つずつ受け取り、decode_and_preprocess の結果を標準出力に返すのじゃ。
+    multiprocessing の spawn 方式は子プロセスでメインスクリプトを読み込み直すが、
+    GazoToolsApp.py はトップレベルで UI を組み立てるので、専用の入口から起動するのじゃ。
+    """
+    # 結果の流れに print などが混ざらないよう、標準出力は結果専用にして残りは標準エラーへ回すのじゃ
+    results = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    requests = sys.stdin.buffer
+    _worker_init()
+    while True:
+        try:
+            path = pickle.load(requests)
+        except EOFError:
+            break
+        pickle.dump(decode_and_preprocess(path), results, protocol=pickle.HIGHEST_PROTOCOL)
+        results.flush()
+
+
+class _DecodeWorker:
+    """デコード用のワーカープロセス1つと、その結果を読むスレッドなのじゃ。
+
+    ワーカーは受け取った順に処理するので、処理中のパスを順に覚えておき、
+    ワーカーが落ちたときは残りを失敗として results に積むのじゃ。
+    """
+
+    def __init__(self, results):
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(p for p in (PROJECT_ROOT, env.get("PYTHONPATH")) if p)
+        self.proc = subprocess.Popen([sys.executable, "-m", "lib.GazoToolsVectorPipeline"],
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env)
+        self.results = results
+        self.inflight = deque()
+        self.alive = True
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, name="VectorDecodeReader", daemon=True)
+        self._reader.start()
+
+    def submit(self, path):
+        with self._lock:
+            if not self.alive:
+                self.results.put((path, None, "デコード用ワーカーが終了しました"))
+                return
+            self.inflight.append(path)
+        try:
+            pickle.dump(path, self.proc.stdin, protocol=pickle.HIGHEST_PROTOCOL)
+            self.proc.stdin.flush()
+        except (OSError, ValueError):
+            pass  # 落ちたワーカーの分は読み込みスレッドが失敗として返すのじゃ
+
+    def _read(self):
+        try:
+            while True:
+                result = pickle.load(self.proc.stdout)
+                with self._lock:
+                    self.inflight.popleft()
+                self.results.put(result)
+        except Exception:
+            pass
+        # 落ちた（または閉じた）ので、返ってこなかった分を失敗にするのじゃ
+        with self._lock:
+            self.alive = False
+            while self.inflight:
+                self.results.put((self.inflight.popleft(), None, "デコード用ワーカーが終了しました"))
+
+    def close(self, finished):
+        """ワーカーを止めるのじゃ。最後まで処理したなら入力を閉じて終わるのを待つのじゃ。"""
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        if finished:
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                pass
+        if self.proc.poll() is None:
+            self.proc.kill()
+            self.proc.wait()
+        self._reader.join(5)
+        self.proc.stdout.close()
+
+
+class VectorPipeline:
+    """デコード・前処理（プロセスプール）と推論（呼び出し側スレッド）をつなぐパイプラインなのじゃ。
+
+    ``process`` はジェネレータで、推論が終わった順に (パス, ベクトル, エラー) を返すのじゃ。
+    デコード済みの結果が batch_size 件揃うごとに推論するのじゃ。ワーカー数 0 のときはプロセスを使わず、呼び出し側スレッドで順に処理するのじゃ。
+    """
+
+    def __init__(self, engine, workers=None, batch_size=VECTOR_PIPELINE_BATCH_SIZE,
+                 max_inflight=None):
+        """初期化処理。
+
+        Args:
+            engine (VectorEngine): infer_tensor_batch を持つ推論エンジン
+            workers (int): デコード用プロセス数（None なら CPU 数から自動、0 ならプロセスを使わない）
+            batch_size (int): 推論1回あたりの画像数
+            max_inflight (int): 同時に投入するデコードタスクの上限
+        """
+        self.engine = engine
+        self.workers = default_worker_count() if workers is None else max(0, int(workers))
+        self.batch_size = max(1, int(batch_size))
+        if max_inflight is None:
+            max_inflight = max(self.batch_size, self.workers * VECTOR_PIPELINE_INFLIGHT_PER_WORKER)
+        self.max_inflight = max(1, int(max_inflight))
+        self.processed = 0
+        self.failed = 0
+        self.elapsed = 0.0
+
+    @property
+    def images_per_sec(self):
+        """これまでのスループット（枚/秒）なのじゃ。"""
+        return self.processed / self.elapsed if self.elapsed > 0 else 0.0
+
+    def _infer(self, batch):
+        """前処理済みバッチを推論して (パス, ベクトル, None) のリストにするのじゃ。"""
+        paths = [p for p, _ in batch]
+        try:
+            vectors = self.engine.infer_tensor_batch(np.stack([a for _, a in batch]))
+        except Exception as e:
+            logger.warning(f"バッチ推論失敗: {len(batch)}件 - {e}")
+            self.failed += len(batch)
+            return [(p, None, str(e)) for p in paths]
+        self.processed += len(batch)
+        return list(zip(paths, vectors, [None] * len(paths)))
+
+    def _decoded(self, path, array, error):
+        if error is not None:
+            logger.warning(f"画像デコード失敗（スキップ）: {path} - {error}")
+            self.failed += 1
+        return error is None
+
+    def process(self, paths, should_continue=None):
+        """画像パスを順にベクトル化するのじゃ。
+
+        Args:
+            paths (iterable): 画像パス
+            should_continue (callable): False を返したら途中で止める（省略可）
+
+        Yields:
+            tuple: (パス, ベクトル（リスト） or None, エラーメッセージ or None)
+        """
+        should_continue = should_continue or (lambda: True)
+        start = time.time()
+        try:
+            if self.workers == 0:
+                yield from self._process_inline(paths, should_continue)
+            else:
+                yield from self._process_pool(paths, should_continue)
+        finally:
+            self.elapsed += time.time() - start
+            logger.info(f"ベクトル化パイプライン: {self.processed}件処理、{self.failed}件失敗 "
+                        f"({self.images_per_sec:.1f} 枚/秒, ワーカー{self.workers})")
+
+    def _process_inline(self, paths, should_continue):
+        batch = []
+        for path in paths:
+            if not should_continue():
+                return
+            path, array, error = decode_and_preprocess(path)
+            if not self._decoded(path, array, error):
+                yield path, None, error
+                continue
+            batch.append((path, array))
+            if len(batch) >= self.batch_size:
+                yield from self._infer(batch)
+                batch = []
+        if batch:
+            yield from self._infer(batch)
+
+    def _process_pool(self, paths, should_continue):
+        path_iter = iter(paths)
+        results = queue.Queue()
+        batch = []
+        inflight = 0
+        exhausted = False
+        finished = False
+        pool = [_DecodeWorker(results) for _ in range(self.workers)]
+        try:
+            while True:
+                # 上限まで投入するのじゃ（キューを際限なく伸ばさない）
+                while not exhausted and inflight < self.max_inflight:
+                    if not should_continue():
+                        return
+                    try:
+                        path = next(path_iter)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    # 手の空いているワーカーに回すのじゃ
+                    min(pool, key=lambda w: len(w.inflight)).submit(path)
+                    inflight += 1
+                if inflight == 0:
+                    break
+
+                path, array, error = results.get()
+                inflight -= 1
+                if not self._decoded(path, array, error):
+                    yield path, None, error
+                else:
+                    batch.append((path, array))
+                    if len(batch) >= self.batch_size:
+                        yield from self._infer(batch)
+                        batch = []
+                if not should_continue():
+                    return
+            if batch:
+                yield from self._infer(batch)
+            finished = True
+        finally:
+            for worker in pool:
+                worker.close(finished)
+
+
+if __name__ == "__main__":
+    _worker_main()
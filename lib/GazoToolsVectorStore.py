@@ -0,0 +1,430 @@
+'''
+作成日: 2026年01月08日
+作成者: tamate masayuki
+機能: バイナリ形式のベクトルストア
+説明: 生行列ファイル + ハッシュ→行番号のインデックスでベクトルを保持し、
+      numpy.memmap で開くことで起動・フォルダ切り替え時の読み込みを一瞬にするのじゃ。
+      書き込みは追記のみ。旧形式 (vectordata.json) からは初回に一度だけ移行するのじゃ。
+      保存形式は float32 / float16 / PCA 圧縮 (pca128, pca256 など) から選べるのじゃ。
+'''
+import os
+import json
+import threading
+import numpy as np
+from lib.GazoToolsExceptions import VectorProcessingError
+from lib.GazoToolsLogger import LoggerManager
+from lib.GazoToolsVectorCodec import PCACodec, parse_storage_mode, STORAGE_FLOAT32
+from lib.config_defaults import (
+    VECTOR_DATA_FILE, VECTOR_MATRIX_FILE, VECTOR_INDEX_FILE, PCA_FIT_SAMPLE
+)
+
+logger = LoggerManager.get_logger(__name__)
+
+VECTOR_STORE_VERSION = 1
+VECTOR_DTYPE = np.float32   # 計算・受け渡しに使う dtype
+CONVERT_CHUNK = 8192        # 形式変換時に1回で処理する行数
+
+
+class VectorStore:
+    """ハッシュをキーにベクトルを保持する追記型ストアなのじゃ。
+
+    従来の ``dict`` と同じように ``in`` / ``get`` / ``[]`` / ``[]=`` で扱えるので、
+    既存の呼び出し側はそのまま使えるのじゃ。値は元の次元のリストで返すのじゃ
+    （PCA 形式では近似復元した値）。
+    行列演算が必要な場合は ``get_matrix`` で保存形式のまま（圧縮コードの）numpy 配列を
+    まとめて取り出し、クエリは ``encode_query`` で同じ空間に揃えるのじゃ。
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        """シングルトンインスタンスを取得するのじゃ。"""
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, matrix_file=VECTOR_MATRIX_FILE, index_file=VECTOR_INDEX_FILE,
+                 legacy_file=VECTOR_DATA_FILE):
+        """初期化処理。
+
+        Args:
+            matrix_file (str): float32 行列の保存先（生バイナリ）。他の形式はこの名前から派生するのじゃ
+            index_file (str): ハッシュ→行番号インデックスの保存先
+            legacy_file (str): 移行元の旧 JSON ファイル
+        """
+        self.matrix_file = matrix_file
+        self.index_file = index_file
+        self.legacy_file = legacy_file
+        self.mode = STORAGE_FLOAT32
+        self.storage_dtype = np.float32
+        self.codec = None         # PCA 形式のときの PCACodec
+        self.dim = None           # 保存している次元数（PCA なら圧縮後）
+        self.rows = {}            # {hash: 行番号}
+        self._disk_count = 0      # ディスクに書き出し済みの行数
+        self._pending = []        # 未書き出しのベクトル (保存次元の float32 np.ndarray)
+        self._mmap = None
+        self._active_matrix_file = matrix_file
+        self._store_lock = threading.RLock()
+        self._load()
+
+    # ==================== 読み込み・移行 ====================
+
+    def _load(self):
+        """インデックスと行列を開くのじゃ。インデックスが無ければ旧形式から移行するのじゃ。"""
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (IOError, json.JSONDecodeError) as e:
+                logger.error(f"ベクトルインデックス読み込みエラー: {self.index_file}", exc_info=True)
+                raise VectorProcessingError(f"Cannot read vector index: {e}") from e
+
+            if data.get("version") != VECTOR_STORE_VERSION:
+                raise VectorProcessingError(f"Unsupported vector store version: {data.get('version')}")
+            self.mode = data.get("mode", STORAGE_FLOAT32)
+            self.storage_dtype, _ = parse_storage_mode(self.mode)
+            self.dim = data.get("dim")
+            self.rows = data.get("rows", {})
+            self._disk_count = data.get("count", 0)
+            base_dir = os.path.dirname(self.index_file)
+            if data.get("matrix"):
+                self._active_matrix_file = os.path.join(base_dir, data["matrix"])
+            if data.get("codec"):
+                self.codec = PCACodec.load(os.path.join(base_dir, data["codec"]))
+            self._open_mmap()
+            logger.info(f"ベクトルストアを開きました: {len(self.rows)}件 ({self.dim}次元, {self.mode})")
+        elif os.path.exists(self.legacy_file):
+            self._migrate_legacy()
+
+    def _migrate_legacy(self):
+        """旧形式の JSON から一度だけ移行するのじゃ。元ファイルは残しておくのじゃ。"""
+        logger.info(f"旧形式のベクトルデータを移行するのじゃ: {self.legacy_file}")
+        try:
+            with open(self.legacy_file, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+        except (IOError, json.JSONDecodeError) as e:
+            logger.error(f"旧ベクトルファイル読み込みエラー: {self.legacy_file}", exc_info=True)
+            raise VectorProcessingError(f"Cannot migrate legacy vector file: {e}") from e
+
+        for h, vec in legacy.items():
+            if vec:
+                self[h] = vec
+        self.flush()
+        logger.info(f"ベクトルデータの移行完了: {len(self.rows)}件")
+
+    def _expected_bytes(self, count):
+        return count * (self.dim or 0) * np.dtype(self.storage_dtype).itemsize
+
+    def _open_mmap(self):
+        """ディスク上の行列を読み取り専用でマップするのじゃ。"""
+        self._mmap = None
+        if self._disk_count == 0 or not self.dim:
+            return
+        path = self._active_matrix_file
+        if not os.path.exists(path):
+            raise VectorProcessingError(f"Vector matrix file missing: {path}")
+        if os.path.getsize(path) < self._expected_bytes(self._disk_count):
+            raise VectorProcessingError(f"Vector matrix file is truncated: {path}")
+        self._mmap = np.memmap(path, dtype=self.storage_dtype, mode="r",
+                               shape=(self._disk_count, self.dim))
+
+    # ==================== dict 互換 API ====================
+
+    def __contains__(self, h):
+        return h in self.rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(list(self.rows.keys()))
+
+    def keys(self):
+        return list(self.rows.keys())
+
+    def items(self):
+        """(ハッシュ, ベクトルのリスト) を順に返すのじゃ。"""
+        for h in self.keys():
+            vec = self.get(h)
+            if vec is not None:
+                yield h, vec
+
+    def __getitem__(self, h):
+        vec = self.get_array(h)
+        if vec is None:
+            raise KeyError(h)
+        return vec.tolist()
+
+    def get(self, h, default=None):
+        """ベクトルをリストで返すのじゃ。無ければ default。"""
+        vec = self.get_array(h)
+        return vec.tolist() if vec is not None else default
+
+    def __setitem__(self, h, vec):
+        self.add(h, vec)
+
+    def update(self, mapping):
+        """辞書などからまとめて追加するのじゃ。"""
+        for h, vec in mapping.items():
+            self.add(h, vec)
+
+    # ==================== ベクトル操作 ====================
+
+    @property
+    def input_dim(self):
+        """追加・取得するベクトルの（元の）次元数なのじゃ。"""
+        return self.codec.input_dim if self.codec is not None else self.dim
+
+    def encode_query(self, vec):
+        """クエリベクトルを保存形式の空間に揃えた float32 配列で返すのじゃ。"""
+        if self.codec is not None:
+            return self.codec.encode_query(vec)
+        return np.asarray(vec, dtype=VECTOR_DTYPE).reshape(-1)
+
+    def _row_vector(self, row):
+        if row < self._disk_count:
+            return self._mmap[row]
+        return self._pending[row - self._disk_count]
+
+    def get_code(self, h):
+        """保存形式のままのベクトルを float32 配列（コピー）で返すのじゃ。無ければ None。"""
+        with self._store_lock:
+            row = self.rows.get(h)
+            if row is None:
+                return None
+            return np.array(self._row_vector(row), dtype=VECTOR_DTYPE)
+
+    def get_array(self, h):
+        """元の次元のベクトルを float32 の numpy 配列で返すのじゃ。無ければ None。"""
+        code = self.get_code(h)
+        if code is None or self.codec is None:
+            return code
+        return self.codec.decode(code)
+
+    def get_matrix(self, hashes):
+        """複数ハッシュのベクトルを保存形式のまま1つの行列にまとめて返すのじゃ。
+
+        Args:
+            hashes (iterable): ハッシュのリスト
+
+        Returns:
+            tuple: (見つかったハッシュのリスト, shape=(n, dim) の float32 行列)
+        """
+        with self._store_lock:
+            found = [h for h in hashes if h in self.rows]
+            if not found or not self.dim:
+                return [], np.zeros((0, self.dim or 0), dtype=VECTOR_DTYPE)
+            row_ids = np.fromiter((self.rows[h] for h in found), dtype=np.int64, count=len(found))
+            matrix = np.empty((len(found), self.dim), dtype=VECTOR_DTYPE)
+            on_disk = row_ids < self._disk_count
+            if on_disk.any():
+                matrix[on_disk] = self._mmap[row_ids[on_disk]]
+            if not on_disk.all():
+                for i in np.nonzero(~on_disk)[0]:
+                    matrix[i] = self._pending[row_ids[i] - self._disk_count]
+            return found, matrix
+
+    @property
+    def disk_count(self):
+        """ディスクに書き出し済みの行数なのじゃ（近似インデックスはここまでを索引化する）。"""
+        return self._disk_count
+
+    def get_rows(self, row_ids):
+        """行番号を指定して書き出し済みの行を保存形式のまままとめて取り出すのじゃ。
+
+        Args:
+            row_ids (array-like): 行番号（disk_count 未満）
+
+        Returns:
+            np.ndarray: shape=(n, dim) の float32 行列
+        """
+        with self._store_lock:
+            row_ids = np.asarray(row_ids, dtype=np.int64)
+            if row_ids.size == 0 or self._mmap is None:
+                return np.zeros((0, self.dim or 0), dtype=VECTOR_DTYPE)
+            return np.asarray(self._mmap[row_ids], dtype=VECTOR_DTYPE)
+
+    def add(self, h, vec):
+        """ベクトルを追加するのじゃ（同じハッシュなら新しい行で上書き）。
+
+        PCA 形式では元の次元のベクトルを受け取り、圧縮して保存するのじゃ。
+
+        Raises:
+            VectorProcessingError: 次元数が既存データと合わない場合
+        """
+        arr = np.asarray(vec, dtype=VECTOR_DTYPE).reshape(-1)
+        with self._store_lock:
+            if self.codec is not None:
+                if arr.shape[0] != self.codec.input_dim:
+                    raise VectorProcessingError(
+                        f"Vector dimension mismatch: expected {self.codec.input_dim}, got {arr.shape[0]}")
+                arr = self.codec.encode(arr)
+            elif self.dim is None:
+                self.dim = int(arr.shape[0])
+            elif arr.shape[0] != self.dim:
+                raise VectorProcessingError(
+                    f"Vector dimension mismatch: expected {self.dim}, got {arr.shape[0]}")
+            self._pending.append(arr)
+            self.rows[h] = self._disk_count + len(self._pending) - 1
+
+    @property
+    def pending_count(self):
+        """未書き出しの行数なのじゃ。"""
+        return len(self._pending)
+
+    # ==================== 書き出し ====================
+
+    def _write_index(self, count, rows, mode, dim, matrix_path, codec_path):
+        """インデックスを一時ファイル経由で置き換えるのじゃ。"""
+        base_dir = os.path.dirname(self.index_file)
+        data = {
+            "version": VECTOR_STORE_VERSION,
+            "mode": mode,
+            "dim": dim,
+            "dtype": np.dtype(parse_storage_mode(mode)[0]).name,
+            "count": count,
+            "matrix": os.path.relpath(matrix_path, base_dir),
+            "codec": os.path.relpath(codec_path, base_dir) if codec_path else None,
+            "rows": rows,
+        }
+        tmp_path = self.index_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.index_file)
+
+    def _codec_file(self):
+        """現在の PCA コーデックの保存先なのじゃ。"""
+        return os.path.splitext(self.matrix_file)[0] + f".{self.mode}.npz" if self.codec else None
+
+    def flush(self):
+        """未書き出しの行を行列ファイルに追記し、インデックスを更新するのじゃ。
+
+        行列を先に書き、インデックスは一時ファイル経由で置き換えるので、
+        途中で落ちてもインデックスが指す範囲は常に有効なのじゃ。
+
+        Raises:
+            VectorProcessingError: 書き込みに失敗した場合
+        """
+        with self._store_lock:
+            if not self._pending:
+                return
+            path = self._active_matrix_file
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                # 前回クラッシュ時の書きかけ部分は切り捨てるのじゃ
+                self._mmap = None
+                expected = self._expected_bytes(self._disk_count)
+                if os.path.exists(path) and os.path.getsize(path) != expected:
+                    with open(path, "r+b") as f:
+                        f.truncate(expected)
+
+                block = np.stack(self._pending).astype(self.storage_dtype, copy=False)
+                with open(path, "ab") as f:
+                    f.write(block.tobytes())
+
+                new_count = self._disk_count + len(self._pending)
+                self._write_index(new_count, self.rows, self.mode, self.dim, path, self._codec_file())
+
+                self._disk_count = new_count
+                self._pending = []
+                self._open_mmap()
+                logger.info(f"ベクトルデータを保存しました: {len(self.rows)}件 (行列{new_count}行)")
+            except (IOError, OSError) as e:
+                logger.error(f"ベクトルストア書き込みエラー: {path}", exc_info=True)
+                self._open_mmap()
+                raise VectorProcessingError(f"Cannot write vector store: {e}") from e
+
+    # ==================== 保存形式の変換 ====================
+
+    def _matrix_file_for(self, mode):
+        """保存形式ごとの行列ファイル名なのじゃ（float32 は既定の名前のまま）。"""
+        if mode == STORAGE_FLOAT32:
+            return self.matrix_file
+        return os.path.splitext(self.matrix_file)[0] + f".{mode}.bin"
+
+    def convert(self, mode, sample_size=PCA_FIT_SAMPLE):
+        """保存形式を変換して書き直すのじゃ（上書きで使われなくなった行も詰めるのじゃ）。
+
+        PCA 形式へは既存ライブラリから主成分を学習するのじゃ。PCA 形式から他の形式への
+        変換は近似復元した値を使うので、元の精度には戻らないのじゃ。
+        新しい行列を別名で書き切ってからインデックスを置き換えるので、途中で落ちても
+        元のデータは壊れないのじゃ。
+
+        Args:
+            mode (str): "float32" / "float16" / "pca128" / "pca256" など
+            sample_size (int): PCA 学習に使う最大件数
+
+        Returns:
+            bool: 変換した場合 True（既に同じ形式なら False）
+
+        Raises:
+            VectorProcessingError: 未知の形式や書き込み失敗の場合
+        """
+        dtype, pca_dim = parse_storage_mode(mode)
+        with self._store_lock:
+            if mode == self.mode:
+                return False
+            self.flush()
+            if self.codec is not None and pca_dim is None:
+                logger.warning(f"PCA 形式 ({self.mode}) からの変換は近似値になるのじゃ")
+
+            live = sorted(self.rows.items(), key=lambda kv: kv[1])
+            hashes = [h for h, _ in live]
+            old_rows = np.array([r for _, r in live], dtype=np.int64)
+
+            def decoded(row_ids):
+                codes = self.get_rows(row_ids)
+                return self.codec.decode(codes) if self.codec is not None else codes
+
+            codec = None
+            if pca_dim is not None:
+                if not len(hashes):
+                    raise VectorProcessingError("Cannot fit PCA on an empty vector store")
+                rng = np.random.default_rng(0)
+                sample = np.sort(rng.choice(len(old_rows), min(sample_size, len(old_rows)), replace=False))
+                codec = PCACodec.fit(decoded(old_rows[sample]), pca_dim)
+
+            new_matrix = self._matrix_file_for(mode)
+            if os.path.abspath(new_matrix) == os.path.abspath(self._active_matrix_file):
+                new_matrix += ".new"
+            codec_path = os.path.splitext(self.matrix_file)[0] + f".{mode}.npz" if codec else None
+            old_matrix = self._active_matrix_file
+            old_codec = self._codec_file()
+            try:
+                if codec is not None:
+                    codec.save(codec_path)
+                with open(new_matrix, "wb") as f:
+                    for start in range(0, len(old_rows), CONVERT_CHUNK):
+                        block = decoded(old_rows[start:start + CONVERT_CHUNK])
+                        if codec is not None:
+                            block = codec.encode(block)
+                        f.write(block.astype(dtype).tobytes())
+                new_dim = codec.dim if codec is not None else self.input_dim
+                new_rows = {h: i for i, h in enumerate(hashes)}
+                self._write_index(len(hashes), new_rows, mode, new_dim, new_matrix, codec_path)
+            except (IOError, OSError) as e:
+                logger.error(f"ベクトルストア変換エラー: {mode}", exc_info=True)
+                raise VectorProcessingError(f"Cannot convert vector store: {e}") from e
+
+            self._mmap = None
+            self.mode = mode
+            self.storage_dtype = dtype
+            self.codec = codec
+            self.dim = new_dim
+            self.rows = new_rows
+            self._disk_count = len(hashes)
+            self._active_matrix_file = new_matrix
+            self._open_mmap()
+
+            for path in (old_matrix, old_codec):
+                if path and os.path.abspath(path) not in (os.path.abspath(new_matrix),
+                                                          os.path.abspath(codec_path or "")):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            logger.info(f"ベクトルストアを {mode} に変換しました: {len(hashes)}件 ({new_dim}次元)")
+            return True
@@ -0,0 +1,560 @@
+'''
+作成日: 2026年01月19日
+作成者: tamate masayuki
+機能: フォルダの監視（ライブラリの変化をその場で反映）
+説明: 見ているフォルダ以下の画像の追加・削除・変更・リネームを見つけて、少し待ってから
+      まとめて知らせるのじゃ。Linux では inotify を使い、使えない環境ではフォルダの mtime を
+      定期的に見回って、変わったフォルダだけ一覧を読み直すのじゃ。
+      知らせを受けた側はハッシュインデックス・画面・ベクトル化待ちを差分だけ直せばよいので、
+      大きなライブラリでも全体を読み直す必要はないのじゃ。
+'''
+import os
+import sys
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from lib.GazoToolsLib import GetGazoFiles
+from lib.GazoToolsFolderModel import settled_mtime
+from lib.GazoToolsFolderManifest import FolderManifest
+from lib.GazoToolsHashIndex import HashIndex
+from lib.GazoToolsLogger import LoggerManager
+from lib.config_defaults import (
+    WATCH_BACKEND, WATCH_DEBOUNCE_SEC, WATCH_MAX_DELAY_SEC, WATCH_POLL_INTERVAL, WATCH_MAX_DIRS
+)
+
+logger = LoggerManager.get_logger(__name__)
+
+ADDED = "added"
+REMOVED = "removed"
+MODIFIED = "modified"   # 同じ名前のまま中身が変わった（フォルダなら中を読み直す必要がある）
+RENAMED = "renamed"
+
+
+def is_image(path):
+    """画像ファイルの名前かどうかなのじゃ。"""
+    return bool(GetGazoFiles([os.path.basename(path)], None))
+
+
+class FsEvent:
+    """ファイル・フォルダの変化1件なのじゃ。"""
+
+    __slots__ = ("kind", "path", "old_path", "is_dir")
+
+    def __init__(self, kind, path, old_path=None, is_dir=False):
+        """初期化処理。
+
+        Args:
+            kind (str): ADDED / REMOVED / MODIFIED / RENAMED
+            path (str): 変化したパス（リネームなら新しいパス）
+            old_path (str): リネーム前のパス（リネーム以外は None）
+            is_dir (bool): フォルダの変化か
+        """
+        self.kind = kind
+        self.path = path
+        self.old_path = old_path
+        self.is_dir = is_dir
+
+    def __eq__(self, other):
+        if not isinstance(other, FsEvent):
+            return NotImplemented
+        return (self.kind, self.path, self.old_path, self.is_dir) == \
+            (other.kind, other.path, other.old_path, other.is_dir)
+
+    __hash__ = None
+
+    def __repr__(self):
+        if self.kind == RENAMED:
+            return f"FsEvent({self.kind}, {self.old_path} -> {self.path})"
+        return f"FsEvent({self.kind}, {self.path}{', dir' if self.is_dir else ''})"
+
+
+class EventCoalescer:
+    """待っている間に届いた変化を、パスごとに最終的な結果へまとめるクラスなのじゃ。
+
+    作ってすぐ消えたファイルは何も起きなかったことにし、a→b→c のリネームは a→c にするのじゃ。
+    """
+
+    def __init__(self):
+        self._events = {}  # {パス: FsEvent}（届いた順）
+
+    def __len__(self):
+        return len(self._events)
+
+    def add(self, event):
+        """変化を1件追加するのじゃ。"""
+        if event.kind == RENAMED:
+            self._add_rename(event)
+        else:
+            self._add_simple(event.kind, event.path, event.is_dir)
+
+    def _add_simple(self, kind, path, is_dir):
+        prev = self._events.pop(path, None)
+        if prev is not None:
+            if prev.kind == ADDED:
+                if kind == REMOVED:
+                    return # 作ってすぐ消えたのじゃ
+                kind = ADDED
+            elif prev.kind == RENAMED:
+                # a→b の後で b が変わったなら、a が消えて b が増えたことにするのじゃ
+                self._add_simple(REMOVED, prev.old_path, prev.is_dir)
+                if kind == REMOVED:
+                    return
+                kind = ADDED
+            elif kind == ADDED:
+                kind = MODIFIED # 消えて同じ名前で現れたので、中身が変わったのじゃ
+        self._events[path] = FsEvent(kind, path, is_dir=is_dir)
+
+    def _add_rename(self, event):
+        old, new = event.old_path, event.path
+        prev_old = self._events.get(old)
+        if new not in self._events and (prev_old is None or prev_old.kind in (ADDED, RENAMED)):
+            self._events.pop(old, None)
+            if prev_old is not None and prev_old.kind == ADDED:
+                self._events[new] = FsEvent(ADDED, new, is_dir=event.is_dir)
+                return
+            origin = prev_old.old_path if prev_old is not None else old
+            if origin != new:
+                self._events[new] = FsEvent(RENAMED, new, origin, event.is_dir)
+            return
+        # 上書きや変更が絡むときは、消えて増えたことにするのじゃ
+        self._add_simple(REMOVED, old, event.is_dir)
+        self._add_simple(ADDED, new, event.is_dir)
+
+    def drain(self):
+        """まとめた変化を返して空にするのじゃ。"""
+        events = list(self._events.values())
+        self._events.clear()
+        return events
+
+
+# ==================== 見回り（どの環境でも使える） ====================
+
+class PollingBackend:
+    """フォルダの mtime を定期的に見回り、変わったフォルダだけ一覧を読み直すのじゃ。
+
+    フォルダの mtime は中のファイルの追加・削除・リネームで変わるが、ファイルの上書きでは
+    変わらないので、上書き（MODIFIED）は見つけられないのじゃ。リネームも削除と追加になるのじゃ。
+    """
+
+    name = "polling"
+
+    def __init__(self, interval=WATCH_POLL_INTERVAL, max_dirs=WATCH_MAX_DIRS, manifest=None):
+        """初期化処理。
+
+        Args:
+            interval (float): 見回りの間隔（秒）
+            max_dirs (int): 見回るフォルダ数の上限
+            manifest (FolderManifest): 一覧の読み込みに使うマニフェスト（省略時は共有のもの）
+        """
+        self.interval = interval
+        self.max_dirs = max_dirs
+        self.manifest = manifest or FolderManifest.get_instance()
+        self.recursive = False
+        self._dirs = {}  # {フォルダパス: (mtime_ns, 画像ファイル名の set, 子フォルダ名の set)}
+        self._next_scan = 0.0
+
+    def reset(self, roots, recursive=False):
+        """見回るフォルダを roots に入れ替えるのじゃ。recursive なら子フォルダも見回るのじゃ。"""
+        self._dirs.clear()
+        self.recursive = recursive
+        for root in roots:
+            self._add_tree(root, None)
+        self._next_scan = time.monotonic() + self.interval
+
+    def _add_tree(self, root, events):
+        """root 以下を覚えるのじゃ。events を渡すと中の画像を ADDED として積むのじゃ。"""
+        stack = [root]
+        while stack:
+            folder = stack.pop()
+            if len(self._dirs) >= self.max_dirs:
+                logger.warning(f"監視するフォルダ数が上限({self.max_dirs})に達したので、残りは監視しません: {folder}")
+                return
+            try:
+                st = os.stat(folder)
+                files, subdirs = self.manifest.listing(folder)
+            except OSError:
+                continue
+            self._dirs[folder] = (settled_mtime(st), set(files), set(subdirs))
+            if events is not None:
+                events.extend(FsEvent(ADDED, os.path.join(folder, f)) for f in files)
+            if self.recursive:
+                stack.extend(os.path.join(folder, d) for d in reversed(subdirs))
+
+    def _drop_tree(self, folder, events):
+        """消えたフォルダ以下を忘れ、フォルダの REMOVED を積むのじゃ。"""
+        prefix = folder.rstrip(os.sep) + os.sep
+        for key in [k for k in self._dirs if k == folder or k.startswith(prefix)]:
+            del self._dirs[key]
+        events.append(FsEvent(REMOVED, folder, is_dir=True))
+
+    def read(self, timeout):
+        """次の見回りまで（最長 timeout 秒）待ち、見つけた変化を返すのじゃ。"""
+        wait = self._next_scan - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            return []
+        self._next_scan = time.monotonic() + self.interval
+        events = []
+        for folder in list(self._dirs):
+            if folder not in self._dirs:
+                continue # 親フォルダと一緒に消えたのじゃ
+            mtime, files, subdirs = self._dirs[folder]
+            try:
+                st = os.stat(folder)
+                if mtime is not None and st.st_mtime_ns == mtime:
+                    continue
+                new_files, new_subdirs = self.manifest.listing(folder)
+            except OSError:
+                self._drop_tree(folder, events)
+                continue
+            new_files, new_subdirs = set(new_files), set(new_subdirs)
+            events.extend(FsEvent(ADDED, os.path.join(folder, f)) for f in sorted(new_files - files))
+            events.extend(FsEvent(REMOVED, os.path.join(folder, f)) for f in sorted(files - new_files))
+            for name in sorted(subdirs - new_subdirs):
+                self._drop_tree(os.path.join(folder, name), events)
+            self._dirs[folder] = (settled_mtime(st), new_files, new_subdirs)
+            for name in sorted(new_subdirs - subdirs):
+                path = os.path.join(folder, name)
+                events.append(FsEvent(ADDED, path, is_dir=True))
+                if self.recursive:
+                    self._add_tree(path, events)
+        return events
+
+    def close(self):
+        self._dirs.clear()
+
+
+# ==================== inotify（Linux） ====================
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+INOTIFY_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+                | IN_DELETE_SELF | IN_ONLYDIR)
+INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len の後に名前が続くのじゃ
+INOTIFY_READ_SIZE = 64 * 1024
+
+
+def _load_libc():
+    """inotify が使える libc を返すのじゃ。使えなければ None。"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        libc.inotify_rm_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class InotifyBackend:
+    """inotify でフォルダごとに監視を付け、カーネルから変化を受け取るのじゃ。
+
+    リネームは MOVED_FROM と MOVED_TO を cookie で組にするのじゃ。組にならなかったもの
+    （監視の外との出入り）は、削除または追加として扱うのじゃ。
+    """
+
+    name = "inotify"
+
+    def __init__(self, max_dirs=WATCH_MAX_DIRS, manifest=None):
+        """初期化処理。
+
+        Raises:
+            OSError: inotify が使えない場合
+        """
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise OSError("inotify が使えない環境なのじゃ")
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 失敗: {os.strerror(err)}")
+        self.max_dirs = max_dirs
+        self.manifest = manifest or FolderManifest.get_instance()
+        self.roots = []
+        self.recursive = False
+        self._wd_paths = {}  # {wd: フォルダパス}
+        self._moves = {}     # {cookie: (移動元パス, フォルダか, 読み込み回数)}
+        self._reads = 0
+
+    def reset(self, roots, recursive=False):
+        """監視するフォルダを roots に入れ替えるのじゃ。recursive なら子フォルダも監視するのじゃ。"""
+        for wd in list(self._wd_paths):
+            self._libc.inotify_rm_watch(self._fd, wd)
+        self._wd_paths.clear()
+        self._moves.clear()
+        self.roots = list(roots)
+        self.recursive = recursive
+        for root in self.roots:
+            self._add_tree(root, None)
+
+    def _add_tree(self, root, events):
+        """root 以下に監視を付けるのじゃ。events を渡すと中の画像を ADDED として積むのじゃ。
+
+        監視を付けてから一覧を読むので、その間に増えたものも取りこぼさないのじゃ。
+        """
+        stack = [root]
+        while stack:
+            folder = stack.pop()
+            if len(self._wd_paths) >= self.max_dirs:
+                logger.warning(f"監視するフォルダ数が上限({self.max_dirs})に達したので、残りは監視しません: {folder}")
+                return
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(folder), INOTIFY_MASK)
+            if wd < 0:
+                logger.debug(f"監視を付けられません: {folder} ({os.strerror(ctypes.get_errno())})")
+                continue
+            self._wd_paths[wd] = folder
+            try:
+                files, subdirs = self.manifest.listing(folder)
+            except OSError:
+                continue
+            if events is not None:
+                events.extend(FsEvent(ADDED, os.path.join(folder, f)) for f in files)
+            if self.recursive:
+                stack.extend(os.path.join(folder, d) for d in reversed(subdirs))
+
+    def _subtree_wds(self, folder):
+        prefix = folder.rstrip(os.sep) + os.sep
+        return [wd for wd, path in self._wd_paths.items() if path == folder or path.startswith(prefix)]
+
+    def _drop_tree(self, folder):
+        """監視の外へ出ていったフォルダ以下の監視を外すのじゃ。"""
+        for wd in self._subtree_wds(folder):
+            self._libc.inotify_rm_watch(self._fd, wd)
+            del self._wd_paths[wd]
+
+    def _rename_tree(self, old, new):
+        """リネームしたフォルダ以下の監視のパスを付け替えるのじゃ（監視自体はそのまま続く）。"""
+        for wd in self._subtree_wds(old):
+            self._wd_paths[wd] = new + self._wd_paths[wd][len(old):]
+
+    def _moved_out(self, path, is_dir, events):
+        """組にならなかった MOVED_FROM（監視の外へ出ていった）を削除として扱うのじゃ。"""
+        if is_dir:
+            self._drop_tree(path)
+            events.append(FsEvent(REMOVED, path, is_dir=True))
+        elif is_image(path):
+            events.append(FsEvent(REMOVED, path))
+
+    def _handle(self, wd, mask, cookie, name, events):
+        if mask & IN_Q_OVERFLOW:
+            # 取りこぼしたので、監視しているフォルダ全体を読み直してもらうのじゃ
+            logger.warning("inotify のキューがあふれたので、監視中のフォルダを読み直します")
+            events.extend(FsEvent(MODIFIED, root, is_dir=True) for root in self.roots)
+            return
+        if mask & IN_IGNORED:
+            self._wd_paths.pop(wd, None)
+            return
+        folder = self._wd_paths.get(wd)
+        if folder is None:
+            return
+        if mask & IN_DELETE_SELF:
+            if folder in self.roots:
+                events.append(FsEvent(REMOVED, folder, is_dir=True))
+            return # 子フォルダなら親フォルダの IN_DELETE で知らせるのじゃ
+        is_dir = bool(mask & IN_ISDIR)
+        path = os.path.join(folder, name)
+
+        if mask & IN_MOVED_FROM:
+            self._moves[cookie] = (path, is_dir, self._reads)
+        elif mask & IN_MOVED_TO:
+            moved = self._moves.pop(cookie, None)
+            if moved is None:
+                # 監視の外から入ってきたのじゃ
+                if is_dir:
+                    events.append(FsEvent(ADDED, path, is_dir=True))
+                    if self.recursive:
+                        self._add_tree(path, events)
+                elif is_image(path):
+                    events.append(FsEvent(ADDED, path))
+            elif is_dir:
+                self._rename_tree(moved[0], path)
+                events.append(FsEvent(RENAMED, path, moved[0], is_dir=True))
+            elif is_image(moved[0]) and is_image(path):
+                events.append(FsEvent(RENAMED, path, moved[0]))
+            elif is_image(moved[0]):
+                events.append(FsEvent(REMOVED, moved[0]))
+            elif is_image(path):
+                events.append(FsEvent(ADDED, path)) # 書き込み中の一時ファイルから画像の名前になったのじゃ
+        elif is_dir:
+            if mask & IN_CREATE:
+                events.append(FsEvent(ADDED, path, is_dir=True))
+                if self.recursive:
+                    self._add_tree(path, events)
+            elif mask & IN_DELETE:
+                events.append(FsEvent(REMOVED, path, is_dir=True))
+        elif is_image(path):
+            if mask & IN_CREATE:
+                events.append(FsEvent(ADDED, path))
+            elif mask & IN_CLOSE_WRITE:
+                events.append(FsEvent(MODIFIED, path))
+            elif mask & IN_DELETE:
+                events.append(FsEvent(REMOVED, path))
+
+    def read(self, timeout):
+        """最長 timeout 秒待ち、届いた変化を返すのじゃ。
+
+        MOVED_TO は MOVED_FROM と別の読み込みに分かれることがあるので、組にならなかった
+        MOVED_FROM は次の読み込みまで待ってから削除として扱うのじゃ。
+        """
+        events = []
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if ready:
+            try:
+                data = os.read(self._fd, INOTIFY_READ_SIZE)
+            except BlockingIOError:
+                data = b""
+            offset = 0
+            while offset + INOTIFY_EVENT.size <= len(data):
+                wd, mask, cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                self._handle(wd, mask, cookie, name, events)
+        for cookie, (path, is_dir, reads) in list(self._moves.items()):
+            if not ready or reads < self._reads:
+                del self._moves[cookie]
+                self._moved_out(path, is_dir, events)
+        self._reads += 1
+        return events
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+        self._wd_paths.clear()
+
+
+def create_backend(kind=WATCH_BACKEND):
+    """設定に合った監視方法を作るのじゃ。inotify が使えなければ見回りにするのじゃ。
+
+    Args:
+        kind (str): "auto" / "inotify" / "polling"
+    """
+    if kind in ("auto", "inotify"):
+        try:
+            return InotifyBackend()
+        except OSError as e:
+            if kind == "inotify":
+                logger.warning(f"inotify が使えないので見回りで監視します: {e}")
+    return PollingBackend()
+
+
+# ==================== 監視スレッド ====================
+
+class FolderWatcher(threading.Thread):
+    """フォルダを監視し、変化を少し待ってからまとめて callback(events) に渡すスレッドなのじゃ。
+
+    callback はこのスレッドから呼ぶので、画面に反映するときはメインスレッドに回すのじゃ。
+    """
+
+    def __init__(self, callback, backend=None, debounce=WATCH_DEBOUNCE_SEC, max_delay=WATCH_MAX_DELAY_SEC):
+        """初期化処理。
+
+        Args:
+            callback (callable): FsEvent のリストを受け取る関数
+            backend: 監視方法（省略時は create_backend() で選ぶ）
+            debounce (float): 最後の変化からこの秒数静かになったら知らせる
+            max_delay (float): 変化が続いても、最初の変化からこの秒数で一度知らせる
+        """
+        super().__init__(name="FolderWatcher", daemon=True)
+        self.callback = callback
+        self.backend = backend or create_backend()
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.running = True
+        self._coalescer = EventCoalescer()
+        self._roots = None       # 次に入れ替える (監視フォルダ, 子フォルダも見るか)（None なら入れ替えない）
+        self._roots_lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def watch(self, roots, recursive=False):
+        """監視するフォルダを入れ替えるのじゃ（どのスレッドから呼んでもよい）。
+
+        子フォルダまで見回ると大きなライブラリでは重いので、recursive のときだけにするのじゃ。
+        """
+        with self._roots_lock:
+            self._ready.clear()
+            self._roots = (list(roots), recursive)
+
+    def wait_ready(self, timeout=None):
+        """watch で渡したフォルダの監視が始まるまで待つのじゃ。"""
+        return self._ready.wait(timeout)
+
+    def run(self):
+        logger.info(f"フォルダ監視を開始します ({self.backend.name})")
+        first = last = None
+        try:
+            while self.running:
+                with self._roots_lock:
+                    roots, self._roots = self._roots, None
+                if roots is not None:
+                    roots, recursive = roots
+                    self.backend.reset(roots, recursive)
+                    self._ready.set()
+                    logger.info(f"監視フォルダを変更: {roots} (子フォルダ: {recursive})")
+
+                timeout = self.debounce
+                if last is not None:
+                    timeout = max(0.0, min(last + self.debounce, first + self.max_delay) - time.monotonic())
+                events = self.backend.read(timeout)
+                now = time.monotonic()
+                if events:
+                    for event in events:
+                        self._coalescer.add(event)
+                    last = now
+                    first = first or now
+                if last is not None and (now - last >= self.debounce or now - first >= self.max_delay):
+                    first = last = None
+                    batch = self._coalescer.drain()
+                    if batch:
+                        try:
+                            self.callback(batch)
+                        except Exception as e:
+                            logger.error(f"フォルダ監視のコールバックエラー: {e}", exc_info=True)
+        except Exception as e:
+            logger.error(f"フォルダ監視スレッドエラー: {e}", exc_info=True)
+        finally:
+            self.backend.close()
+            logger.info("フォルダ監視を終了しました")
+
+    def stop(self, timeout=None):
+        """監視を止めるのじゃ。"""
+        self.running = False
+        if self.is_alive():
+            self.join(timeout)
+
+
+def apply_to_hash_index(events, index=None):
+    """変化をハッシュインデックスに反映するのじゃ（ハッシュは次に使うときに計算し直す）。
+
+    Args:
+        events (list): FsEvent のリスト
+        index (HashIndex): 反映先（省略時は共有のもの）
+    """
+    index = index or HashIndex.get_instance()
+    for event in events:
+        if event.kind == RENAMED:
+            if event.is_dir:
+                index.rename_tree(event.old_path, event.path)
+            else:
+                index.rename(event.old_path, event.path)
+        elif event.kind in (REMOVED, MODIFIED):
+            if event.is_dir:
+                if event.kind == REMOVED:
+                    index.invalidate_tree(event.path)
+            else:
+                index.invalidate(event.path)
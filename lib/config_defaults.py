@@ -51,6 +51,10 @@ MIN_SS_INTERVAL = 1
 MAX_SS_INTERVAL = 60
 SS_INTERVAL_OPTIONS = [1, 2, 3, 5, 10, 15, 30, 60]  # メニュー選択肢
 DEFAULT_SS_INCLUDE_SUBFOLDERS = False  # デフォルトはOFF（子フォルダを含めない）
+SS_PREFETCH_COUNT = 3            # スライドショーで先に準備しておく画像数
+SS_PREFETCH_RETRY_MS = 100       # 準備が間に合わなかったときの再試行間隔（ミリ秒）
+SS_VECTOR_SAVE_COUNT = 20        # 先読みで計算したベクトルがこの件数溜まったら保存
+SS_VECTOR_SAVE_INTERVAL = 60     # 先読みで計算したベクトルを最後の保存からこの秒数経ったら保存
 
 
 # ===========================
@@ -61,7 +65,51 @@ MIN_AI_THRESHOLD = 0.0
 MAX_AI_THRESHOLD = 1.0
 
 AI_BATCH_SLEEP = 0.01            # CPU負荷軽減のためのスリープ時間（秒）
-VECTOR_PROCESSING_TIMEOUT = 300  # ベクトル処理のタイムアウト（秒）
+VECTOR_CHECKPOINT_COUNT = 500    # ベクトル化ジョブをこの件数ごとに保存
+VECTOR_CHECKPOINT_INTERVAL = 60  # ベクトル化ジョブをこの秒数ごとに保存
+FOLDER_VISITS_MAX_ENTRIES = 1000 # ベクトル化の優先順位用に覚えておくフォルダ数
+SMART_MOVE_BATCH_SIZE = 16       # スマート移動でベクトルの無い画像をまとめて計算する件数
+
+# AI スライドショーの再生順（walk: 近い画像をたどる / mmr: シードの仲間を重複を避けて並べる /
+# random_walk: 近傍グラフ上を確率的に歩く）
+SS_AI_PLAN_MODES = ["walk", "mmr", "random_walk"]
+DEFAULT_SS_AI_PLAN_MODE = "walk"
+DEFAULT_SS_AI_DIVERSITY = 0.3    # 0 なら似ている順そのまま、1 に近いほど直前に見た画像と違うものを選ぶ
+SS_AI_DIVERSITY_OPTIONS = [0.0, 0.15, 0.3, 0.5, 0.7]
+PLAN_KNN = 32                    # 近傍グラフで1枚あたりに覚える近い画像の数
+PLAN_KNN_BLOCK = 1024            # 近傍グラフを作るときに一度に計算する行数
+PLAN_SEGMENT_STEPS = 1000        # 1回に計画する最大枚数
+PLAN_RECENT_WINDOW = 8           # 重複を避けるときに比べる直前の枚数
+PLAN_MMR_POOL = 512              # mmr で並べ替える候補の最大数
+
+# ベクトルの保存形式（float16 は 1/2、pca128 は 1/8 のサイズ）
+VECTOR_STORAGE_MODES = ["float32", "float16", "pca256", "pca128"]
+DEFAULT_VECTOR_STORAGE_MODE = "float32"
+PCA_FIT_SAMPLE = 20000           # PCA の学習に使う最大件数
+
+# 推論モード（CPU 高速化）
+INFERENCE_MODES = ["float32", "int8", "jit", "compile"]
+DEFAULT_INFERENCE_MODE = "float32"
+DEFAULT_INFERENCE_CHANNELS_LAST = False
+DEFAULT_INFERENCE_PARITY_TOLERANCE = 0.99  # float32 とのコサイン類似度の下限
+INFERENCE_PARITY_SAMPLES = 4               # パリティチェックに使う実画像の数（ライブラリから選ぶ）
+
+# ベクトル化パイプライン（デコード・前処理をプロセスプールで並列化）
+DEFAULT_VECTOR_WORKERS = 0                # デコード用プロセス数（0 なら CPU 数から自動）
+MAX_VECTOR_WORKERS = 32
+VECTOR_PIPELINE_BATCH_SIZE = 32           # 推論1回あたりの画像数
+VECTOR_PIPELINE_INFLIGHT_PER_WORKER = 4   # ワーカー1つあたりの最大投入タスク数
+
+# 近似最近傍 (IVF) インデックス
+ANN_MIN_VECTORS = 20000          # この件数以上のライブラリで IVF を学習する
+ANN_MIN_CANDIDATES = 5000        # 検索対象がこの件数以上なら IVF を使う（未満は総当たり）
+ANN_NLIST = 0                    # クラスタ数（0 なら件数から自動決定）
+DEFAULT_ANN_NPROBE = 8           # 検索するクラスタ数（大きいほど高精度・低速）
+MIN_ANN_NPROBE = 1
+MAX_ANN_NPROBE = 256
+ANN_RETRAIN_FACTOR = 2.0         # 学習時の件数からこの倍率を超えたら再学習
+ANN_TRAIN_SAMPLE = 50000         # k-means 学習に使う最大サンプル数
+ANN_KMEANS_ITERATIONS = 10
 
 
 # ===========================
@@ -102,6 +150,39 @@ DEFAULT_IMAGE_MAX_HEIGHT = 0       # 画像表示の最大高さ（ピクセル
 MIN_IMAGE_SIZE_LIMIT = 50          # 設定可能な最小サイズ
 MAX_IMAGE_SIZE_LIMIT = 10000       # 設定可能な最大サイズ
 
+DECODE_REDUCING_GAP = 2.0          # 縮小デコードで表示サイズの何倍まで残してから LANCZOS をかけるか
+
+# デコード済み画像キャッシュ（表示用とサムネイル用で別々の容量）
+IMAGE_CACHE_FULL_MB = 256          # 表示サイズの画像用
+IMAGE_CACHE_THUMB_MB = 32          # サムネイル用
+IMAGE_CACHE_THUMB_MAX_SIDE = 256   # 長辺がこれ以下の画像はサムネイル用の枠に入れる
+IMAGE_PRELOAD_WORKERS = 4          # 先読み用スレッド数（Pillow はデコード中 GIL を手放すのじゃ）
+
+# ディスクのサムネイルキャッシュ
+THUMB_SHARD_COUNT = 16             # サムネイルを詰めるシャードファイルの数
+THUMB_FORMAT = "WEBP"              # WebP が使えない環境では JPEG にするのじゃ
+THUMB_QUALITY = 80
+THUMB_WORKERS = 2                  # サムネイル作成用スレッド数
+THUMB_FLUSH_COUNT = 200            # この件数の追加が溜まったらインデックスを保存
+THUMB_MAX_MB = 512                 # シャードの合計がこれを超えたら古いサムネイルを捨てて詰め直す
+THUMB_COMPACT_RATIO = 0.75         # 詰め直した後に残す量（THUMB_MAX_MB に対する割合）
+THUMB_POLL_MS = 50                 # 作成スレッドから届いたサムネイルを UI が受け取る間隔（ミリ秒）
+TILE_POLL_MS = 30                  # 整列で先読みした画像を UI が受け取る間隔（ミリ秒）
+
+# 一括移動（別ドライブへはコピー＋削除をスレッドで並列に行う）
+FILE_MOVE_WORKERS = 4
+
+# フォルダ一覧の子フォルダごとの画像数（ネットワークドライブでも待たないようスレッドで数える）
+FOLDER_COUNT_WORKERS = 8
+
+# フォルダの監視（Linux は inotify、それ以外はフォルダの mtime を見回る）
+WATCH_BACKEND = "auto"             # "auto" / "inotify" / "polling"
+WATCH_DEBOUNCE_SEC = 0.5           # 最後の変化からこの秒数静かになったらまとめて知らせる
+WATCH_MAX_DELAY_SEC = 3.0          # 変化が続いても、最初の変化からこの秒数で一度知らせる
+WATCH_POLL_INTERVAL = 2.0          # 見回りの間隔（秒）
+WATCH_MAX_DIRS = 4096              # 監視するフォルダ数の上限（inotify の上限に当たらないように）
+WATCH_AUTO_VECTORIZE = True        # 増えた画像をバックグラウンドでベクトル化する（ベクトルが1件以上ある場合）
+
 
 # ===========================
 # 7. UI 色設定
@@ -126,11 +207,25 @@ COLOR_STATUS_FG = "#000000"      # ステータステキスト色（黒）
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, "data")
 TAG_CSV_FILE = os.path.join(DATA_DIR, "tagdata.csv")
-VECTOR_DATA_FILE = os.path.join(DATA_DIR, "vectordata.json")
+VECTOR_DATA_FILE = os.path.join(DATA_DIR, "vectordata.json")  # 旧形式（移行元）
+VECTOR_MATRIX_FILE = os.path.join(DATA_DIR, "vectors.f32")      # float32 生行列
+VECTOR_INDEX_FILE = os.path.join(DATA_DIR, "vectors_index.json")  # ハッシュ→行番号
+VECTOR_ANN_FILE = os.path.join(DATA_DIR, "vectors_ivf.npz")       # IVF 近似インデックス
+VECTOR_JOB_FILE = os.path.join(DATA_DIR, "vector_job.json")       # 再開用ベクトル化ジョブ
 RATING_DATA_FILE = os.path.join(DATA_DIR, "ratings.json")
+HASH_INDEX_FILE = os.path.join(DATA_DIR, "hashindex.json")
+THUMB_DIR = os.path.join(DATA_DIR, "thumbs")                      # サムネイルのシャードとインデックス
+MOVE_JOURNAL_FILE = os.path.join(DATA_DIR, "move_journal.jsonl")  # ファイル移動の履歴（元に戻す用）
+FOLDER_MANIFEST_FILE = os.path.join(DATA_DIR, "folder_manifest.json")  # フォルダごとの画像一覧と mtime
+INFERENCE_PARITY_FILE = os.path.join(DATA_DIR, "inference_parity.json")  # 推論モードごとの実画像でのパリティ
 CONFIG_FILE = "config.json"
 LOG_DIR = "logs"
 
+# ハッシュインデックスの書き出し条件
+HASH_INDEX_FLUSH_COUNT = 200      # この件数の変更が溜まったら追記ログへ保存
+HASH_INDEX_FLUSH_INTERVAL = 30    # 最後の保存からこの秒数経ったら追記ログへ保存
+MOVE_JOURNAL_MAX_BATCHES = 100    # 元に戻せる移動の回数（古いものは履歴から消す）
+
 
 # ===========================
 # 9. デフォルト設定辞書
@@ -163,6 +258,13 @@ def get_default_config():
             "ss_interval": DEFAULT_SS_INTERVAL,
             "ss_ai_mode": False,
             "ss_ai_threshold": DEFAULT_AI_THRESHOLD,
+            "ss_ai_plan_mode": DEFAULT_SS_AI_PLAN_MODE,
+            "ss_ai_diversity": DEFAULT_SS_AI_DIVERSITY,
+            "ai_ann_nprobe": DEFAULT_ANN_NPROBE,
+            "ai_vector_workers": DEFAULT_VECTOR_WORKERS,
+            "ai_inference_mode": DEFAULT_INFERENCE_MODE,
+            "ai_channels_last": DEFAULT_INFERENCE_CHANNELS_LAST,
+            "ai_parity_tolerance": DEFAULT_INFERENCE_PARITY_TOLERANCE,
             "move_dest_list": [""] * MOVE_DESTINATION_SLOTS,
             "move_reg_idx": 0,
             "move_dest_count": MOVE_DESTINATION_MIN,
@@ -0,0 +1,128 @@
+'''
+test_ann.py - IVF 近似インデックスのテスト
+作成日: 2026年01月09日
+対象: lib/GazoToolsANN.py
+'''
+import pytest
+import numpy as np
+from lib.GazoToolsANN import IVFIndex, train_kmeans, auto_nlist
+from lib.GazoToolsSimilarity import SimilarityIndex, normalize_rows
+from lib.GazoToolsVectorStore import VectorStore
+from lib.GazoToolsExceptions import VectorProcessingError
+
+
+def make_store(tmp_path, n=2000, dim=32, clusters=20, seed=0):
+    """クラスタ構造を持つベクトルを入れたストアを作る"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    store = VectorStore(matrix_file=str(tmp_path / "vectors.f32"),
+                        index_file=str(tmp_path / "vectors_index.json"),
+                        legacy_file=str(tmp_path / "vectordata.json"))
+    for i in range(n):
+        vec = centers[i % clusters] + 0.3 * rng.standard_normal(dim)
+        store[f"h{i}"] = vec
+    store.flush()
+    return store
+
+
+def make_index(tmp_path, **kwargs):
+    params = {"nlist": 32, "nprobe": 4, "min_vectors": 100}
+    params.update(kwargs)
+    return IVFIndex(index_file=str(tmp_path / "vectors_ivf.npz"), **params)
+
+
+class TestIVFIndex:
+    """IVFIndex クラスのテスト"""
+
+    def test_auto_nlist(self):
+        """件数に応じたクラスタ数になること"""
+        assert auto_nlist(100) == 16
+        assert auto_nlist(1_000_000) == 1000
+
+    def test_kmeans_centroids_normalized(self):
+        """セントロイドが正規化されていること"""
+        data = normalize_rows(np.random.default_rng(1).standard_normal((300, 8)))
+        centroids = train_kmeans(data, 10, iterations=3)
+        assert centroids.shape == (10, 8)
+        assert np.allclose(np.linalg.norm(centroids, axis=1), 1.0, atol=1e-5)
+
+    def test_not_trained_below_min_vectors(self, tmp_path):
+        """件数が少ないうちは学習しないこと"""
+        store = make_store(tmp_path, n=50)
+        index = make_index(tmp_path)
+        assert index.update(store) is False
+        assert not index.is_trained
+        with pytest.raises(VectorProcessingError):
+            index.search(store, store["h0"])
+
+    def test_recall_against_exact(self, tmp_path):
+        """総当たり検索と比べて十分な再現率があること"""
+        store = make_store(tmp_path)
+        index = make_index(tmp_path)
+        assert index.update(store) is True
+
+        exact = SimilarityIndex.from_store(store, store.keys())
+        hits = 0
+        for q in range(0, 2000, 100):
+            query = store[f"h{q}"]
+            truth = {h for h, _ in exact.top_k(query, 10)}
+            approx = {h for h, _ in index.search(store, query, k=10)}
+            hits += len(truth & approx)
+        assert hits / 200 >= 0.9
+
+    def test_nprobe_all_is_exact(self, tmp_path):
+        """全クラスタを調べれば総当たりと一致すること"""
+        store = make_store(tmp_path, n=500)
+        index = make_index(tmp_path)
+        index.update(store)
+        exact = SimilarityIndex.from_store(store, store.keys())
+        query = store["h3"]
+        approx = index.search(store, query, k=20, nprobe=len(index.lists))
+        assert [h for h, _ in approx] == [h for h, _ in exact.top_k(query, 20)]
+
+    def test_candidate_filter_and_unindexed_rows(self, tmp_path):
+        """対象ハッシュで絞り込め、未索引の新しい行も結果に含まれること"""
+        store = make_store(tmp_path, n=500)
+        index = make_index(tmp_path)
+        index.update(store)
+
+        store["new"] = store["h0"]  # まだ索引化されていない行
+        candidates = ["h0", "h20", "h40", "new"]
+        result = index.search(store, store["h0"], hashes=candidates, nprobe=len(index.lists))
+        assert {h for h, _ in result} == set(candidates)
+
+    def test_incremental_update_and_reload(self, tmp_path):
+        """追記分だけ割り当てられ、保存したものを読み直せること"""
+        store = make_store(tmp_path, n=500)
+        index = make_index(tmp_path)
+        index.update(store)
+        trained = index.trained_rows
+
+        rng = np.random.default_rng(5)
+        for i in range(100):
+            store[f"extra{i}"] = rng.standard_normal(32)
+        store.flush()
+        assert index.update(store) is True
+        assert index.trained_rows == trained
+        assert index.indexed_rows == 600
+        assert sum(len(l) for l in index.lists) == 600
+
+        reloaded = make_index(tmp_path)
+        assert reloaded.indexed_rows == 600
+        assert reloaded.centroids.shape == index.centroids.shape
+
+    def test_retrain_when_library_grows(self, tmp_path):
+        """学習時の件数から大きく増えたら学習し直すこと"""
+        store = make_store(tmp_path, n=200)
+        index = make_index(tmp_path, nlist=0)
+        index.update(store)
+        rng = np.random.default_rng(7)
+        for i in range(300):
+            store[f"extra{i}"] = rng.standard_normal(32)
+        store.flush()
+        index.update(store)
+        assert index.trained_rows == 500
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,103 @@
+'''
+test_file_ops.py - ファイル一括移動のテスト
+作成日: 2026年01月17日
+対象: lib/GazoToolsFileOps.py
+'''
+import pytest
+import os
+from lib import GazoToolsFileOps
+from lib.GazoToolsFileOps import bulk_move, METHOD_RENAME, METHOD_COPY
+from lib.GazoToolsHashIndex import HashIndex
+from lib.GazoToolsExceptions import FileOperationError
+
+
+@pytest.fixture
+def hash_index(tmp_path, monkeypatch):
+    index = HashIndex(index_file=str(tmp_path / "hash_index.json"))
+    monkeypatch.setattr(HashIndex, "_instance", index)
+    return index
+
+
+@pytest.fixture
+def folders(tmp_path):
+    src = tmp_path / "src"
+    dest = tmp_path / "dest"
+    src.mkdir()
+    dest.mkdir()
+    files = []
+    for i in range(5):
+        path = src / f"img{i}.jpg"
+        path.write_bytes(f"image {i}".encode())
+        files.append(str(path))
+    return files, str(dest)
+
+
+class TestBulkMove:
+    """bulk_move 関数のテスト"""
+
+    def test_same_device_uses_rename(self, folders, hash_index):
+        """同じドライブ内は rename で移動し、結果が入力順に返ること"""
+        files, dest = folders
+        results = bulk_move(files, dest)
+
+        assert [r.src for r in results] == files
+        assert all(r.ok and r.method == METHOD_RENAME for r in results)
+        assert sorted(os.listdir(dest)) == [f"img{i}.jpg" for i in range(5)]
+        assert not any(os.path.exists(f) for f in files)
+
+    def test_cross_device_copies_in_parallel(self, folders, hash_index, monkeypatch):
+        """別ドライブ扱いならコピー＋削除で移動し、内容が保たれること"""
+        monkeypatch.setattr(GazoToolsFileOps, "same_device", lambda path, folder: False)
+        files, dest = folders
+        results = bulk_move(files, dest, workers=3)
+
+        assert all(r.ok and r.method == METHOD_COPY for r in results)
+        assert not any(os.path.exists(f) for f in files)
+        with open(os.path.join(dest, "img3.jpg"), "rb") as f:
+            assert f.read() == b"image 3"
+
+    def test_failures_reported_per_file(self, folders, hash_index):
+        """失敗は止まらずに1件ずつ記録され、既存ファイルは上書きしないこと"""
+        files, dest = folders
+        with open(os.path.join(dest, "img1.jpg"), "wb") as f:
+            f.write(b"keep me")
+        missing = files[0] + ".missing"
+
+        results = bulk_move([missing] + files, dest)
+        by_src = {r.src: r for r in results}
+        assert not by_src[missing].ok and by_src[missing].error
+        assert not by_src[files[1]].ok and os.path.exists(files[1])
+        assert sum(r.ok for r in results) == 4
+        with open(os.path.join(dest, "img1.jpg"), "rb") as f:
+            assert f.read() == b"keep me"
+
+    def test_duplicate_names_not_overwritten(self, folders, hash_index, tmp_path, monkeypatch):
+        """別フォルダの同名ファイルは1件目だけ移動すること"""
+        monkeypatch.setattr(GazoToolsFileOps, "same_device", lambda path, folder: False)
+        files, dest = folders
+        other = tmp_path / "other"
+        other.mkdir()
+        twin = other / "img0.jpg"
+        twin.write_bytes(b"twin")
+
+        results = bulk_move([files[0], str(twin)], dest)
+        assert [r.ok for r in results] == [True, False]
+        assert twin.exists()
+
+    def test_hash_index_follows_move(self, folders, hash_index):
+        """移動したファイルはハッシュを計算し直さずに済むこと"""
+        files, dest = folders
+        digest = hash_index.get_hash(files[2])
+        bulk_move([files[2]], dest)
+
+        assert hash_index.peek(os.path.join(dest, "img2.jpg")) == digest
+
+    def test_invalid_destination(self, folders, hash_index):
+        """移動先フォルダが無ければ例外になること"""
+        files, dest = folders
+        with pytest.raises(FileOperationError):
+            bulk_move(files, dest + "_missing")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,138 @@
+'''
+test_folder_model.py - フォルダ一覧の差分更新のテスト
+作成日: 2026年01月18日
+対象: lib/GazoToolsFolderModel.py
+'''
+import pytest
+import os
+import random
+import threading
+from lib.GazoToolsFolderModel import FolderModel, list_edits, sort_key, COUNT_UNREADABLE
+
+
+def age(path, seconds=60):
+    """mtime を過去にずらして、変更が落ち着いた状態にする"""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns - seconds * 10**9))
+
+
+def apply(items, edits):
+    items = list(items)
+    for edit in edits:
+        if edit[0] == "delete":
+            del items[edit[1]]
+        else:
+            items.insert(edit[1], edit[2])
+    return items
+
+
+@pytest.fixture
+def library(tmp_path):
+    root = tmp_path / "lib"
+    (root / "Sub").mkdir(parents=True)
+    (root / "empty").mkdir()
+    for name in ["b.jpg", "A.png", "note.txt"]:
+        (root / name).write_bytes(b"x")
+    for name in ["1.jpg", "2.jpg"]:
+        (root / "Sub" / name).write_bytes(b"x")
+    for path in [root / "Sub", root / "empty", root]:
+        age(path)
+    return root
+
+
+class TestListEdits:
+    """list_edits 関数のテスト"""
+
+    def test_random_lists(self):
+        """差分を適用すると新しいリストと一致すること"""
+        rng = random.Random(0)
+        pool = [f"f{i}.jpg" for i in range(40)]
+        for _ in range(50):
+            old = sorted(rng.sample(pool, rng.randint(0, 20)), key=sort_key)
+            new = sorted(rng.sample(pool, rng.randint(0, 20)), key=sort_key)
+            assert apply(old, list_edits(old, new)) == new
+
+    def test_unchanged_is_empty(self):
+        assert list_edits(["a", "b"], ["a", "b"]) == []
+
+
+class TestFolderModel:
+    """FolderModel クラスのテスト"""
+
+    def test_load(self, library):
+        """画像と子フォルダが名前順に並び、画像数は未集計で始まること"""
+        model = FolderModel()
+        model.load(str(library))
+        assert model.files == ["A.png", "b.jpg"]
+        assert model.folders == ["empty", "Sub"]
+        assert model.counts == {"empty": None, "Sub": None}
+
+    def test_count_async(self, library):
+        """画像数がスレッドで数えられ、set_count で反映されること"""
+        model = FolderModel(workers=2)
+        model.load(str(library))
+        results = {}
+        done = threading.Event()
+
+        def callback(path, name, count):
+            results[name] = (path, count)
+            if len(results) == 2:
+                done.set()
+
+        model.count_async(callback)
+        assert done.wait(5)
+        for name, (path, count) in results.items():
+            assert model.set_count(path, name, count)
+        assert model.counts == {"empty": 0, "Sub": 2}
+        assert not model.set_count(str(library), "Sub", 2)
+        assert not model.set_count(str(library / "other"), "Sub", 5)
+
+    def test_counts_cached_by_mtime(self, library, monkeypatch):
+        """子フォルダの mtime が変わらなければ数え直さず、戻ってきたときは前回の値を仮置きすること"""
+        model = FolderModel()
+        model.load(str(library))
+        sub = str(library / "Sub")
+        assert model.count_images(sub) == 2
+        monkeypatch.setattr("os.scandir", lambda *a: pytest.fail("rescanned"))
+        assert model.count_images(sub) == 2
+        monkeypatch.undo()
+
+        model.load(str(library / "Sub"))
+        model.load(str(library))
+        assert model.counts["Sub"] == 2
+        assert model.count_images(str(library / "missing")) == COUNT_UNREADABLE
+
+    def test_unchanged_folder_not_rescanned(self, library, monkeypatch):
+        """mtime が変わっていなければ一覧を読み直さないこと"""
+        model = FolderModel()
+        model.load(str(library))
+        monkeypatch.setattr(model, "_scan", lambda: pytest.fail("rescanned"))
+        assert not model.refresh()
+
+    def test_diff_after_move(self, library):
+        """ファイルを子フォルダへ移すと削除だけが返り、子フォルダは数え直されること"""
+        model = FolderModel()
+        model.load(str(library))
+        os.rename(library / "b.jpg", library / "Sub" / "b.jpg")
+
+        diff = model.refresh()
+        assert diff.file_edits == [("delete", 1)]
+        assert diff.folder_edits == []
+        assert model.files == ["A.png"]
+        assert model.count_images(str(library / "Sub")) == 3
+
+    def test_new_folder_and_file(self, library):
+        """追加されたファイルとフォルダが挿入として返ること"""
+        model = FolderModel()
+        model.load(str(library))
+        (library / "c.gif").write_bytes(b"x")
+        (library / "New").mkdir()
+
+        diff = model.refresh()
+        assert diff.file_edits == [("insert", 2, "c.gif")]
+        assert diff.folder_edits == [("insert", 1, "New")]
+        assert diff.changed_counts == {"New": None}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
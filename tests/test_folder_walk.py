@@ -0,0 +1,133 @@
+'''
+test_folder_walk.py - フォルダ走査のテスト
+作成日: 2026年01月10日
+対象: lib/GazoToolsLib.py の scan_folder, CollapseRoots, lib/GazoToolsFolderManifest.py
+'''
+import pytest
+import os
+import shutil
+from lib.GazoToolsLib import scan_folder, CollapseRoots
+from lib.GazoToolsFolderManifest import FolderManifest
+from lib.GazoToolsFolderModel import FolderModel
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """テスト用のフォルダ構成を作る"""
+    for rel in ["a.jpg", "note.txt", "sub1/b.PNG", "sub1/deep/c.webp",
+                "sub2/d.gif", ".hidden/e.jpg", "empty/readme.md"]:
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x")
+    return tmp_path
+
+
+class TestScanFolder:
+    """scan_folder() 関数のテスト"""
+
+    def test_images_and_subfolders(self, tree):
+        """画像と子フォルダを名前順で返し、隠しファイル・隠しフォルダは除くこと"""
+        (tree / ".x.jpg").write_bytes(b"x")
+        assert scan_folder(str(tree)) == (["a.jpg"], ["empty", "sub1", "sub2"])
+
+    @pytest.mark.skipif(not hasattr(os, "symlink"), reason="シンボリックリンクが使えない環境")
+    def test_symlinked_folder_skipped(self, tree, tmp_path_factory):
+        """シンボリックリンクのフォルダはたどらないこと"""
+        outside = tmp_path_factory.mktemp("outside")
+        try:
+            os.symlink(str(outside), str(tree / "link"), target_is_directory=True)
+        except OSError:
+            pytest.skip("シンボリックリンクを作れない環境")
+        assert "link" not in scan_folder(str(tree))[1]
+
+    def test_missing_folder(self, tmp_path):
+        """存在しないフォルダは OSError"""
+        with pytest.raises(OSError):
+            scan_folder(str(tmp_path / "nope"))
+
+    def test_folder_model_uses_same_rules(self, tree):
+        """ファイル一覧（FolderModel）もフォルダ走査と同じものを一覧にすること"""
+        (tree / ".x.jpg").write_bytes(b"x")
+        model = FolderModel(workers=1)
+        model.load(str(tree))
+        files, folders = scan_folder(str(tree))
+        assert model.files == files
+        assert model.folders == folders
+        assert model.count_images(str(tree)) == len(files)
+
+
+class TestCollapseRoots:
+    """CollapseRoots() 関数のテスト"""
+
+    def test_removes_nested_duplicate_and_missing(self, tree):
+        """入れ子・重複・存在しないフォルダを取り除くこと"""
+        roots = [str(tree / "sub1"), str(tree), str(tree / "sub2"), str(tree), "", str(tree / "nope")]
+        assert CollapseRoots(roots) == [str(tree)]
+
+    def test_keeps_siblings_in_order(self, tree):
+        """別々のフォルダは順序を保って残すこと"""
+        roots = [str(tree / "sub2"), str(tree / "sub1"), str(tree / "sub1" / "deep")]
+        assert CollapseRoots(roots) == [str(tree / "sub2"), str(tree / "sub1")]
+
+
+def age_tree(root, seconds=60):
+    """フォルダの mtime を過去にずらして、変更が落ち着いた状態にする"""
+    for dirpath, _, _ in os.walk(root):
+        st = os.stat(dirpath)
+        os.utime(dirpath, ns=(st.st_atime_ns, st.st_mtime_ns - seconds * 10**9))
+
+
+class TestFolderManifest:
+    """FolderManifest クラスのテスト"""
+
+    def test_walk(self, tree, tmp_path):
+        """子フォルダの画像もたどり、隠しフォルダは除くこと"""
+        manifest = FolderManifest(manifest_file=str(tmp_path / "manifest.json"))
+        result = {os.path.relpath(d, tree): files for d, files in manifest.walk(str(tree))}
+        assert result == {
+            ".": ["a.jpg"],
+            "sub1": ["b.PNG"],
+            os.path.join("sub1", "deep"): ["c.webp"],
+            "sub2": ["d.gif"],
+        }
+
+    def test_walk_not_recursive(self, tree, tmp_path):
+        """recursive=False ならそのフォルダだけ"""
+        manifest = FolderManifest(manifest_file=str(tmp_path / "manifest.json"))
+        assert list(manifest.walk(str(tree), recursive=False)) == [(str(tree), ["a.jpg"])]
+
+    def test_walk_missing_root(self, tmp_path):
+        """存在しないフォルダは何も返さないこと"""
+        manifest = FolderManifest(manifest_file=str(tmp_path / "manifest.json"))
+        assert list(manifest.walk(str(tmp_path / "nope"))) == []
+
+    def test_unchanged_folders_not_rescanned(self, tree, tmp_path_factory):
+        """mtime が変わっていないフォルダは読み直さず、変わったフォルダだけ読むこと"""
+        manifest_file = str(tmp_path_factory.mktemp("manifest") / "manifest.json")
+        age_tree(tree)
+        manifest = FolderManifest(manifest_file=manifest_file)
+        first = manifest.collect(str(tree))
+        manifest.flush()
+
+        reopened = FolderManifest(manifest_file=manifest_file)
+        assert reopened.collect(str(tree)) == first
+        assert reopened.scanned == 0
+
+        (tree / "sub2" / "z.jpg").write_bytes(b"x")
+        images = reopened.collect(str(tree))
+        assert os.path.join("sub2", "z.jpg") in images
+        assert reopened.scanned == 1
+
+    def test_removed_subtree_forgotten(self, tree, tmp_path):
+        """消えた子フォルダのエントリはその下ごと消えること"""
+        manifest = FolderManifest(manifest_file=str(tmp_path / "manifest.json"))
+        manifest.collect(str(tree))
+        shutil.rmtree(tree / "sub1")
+
+        images = manifest.collect(str(tree))
+        assert images == ["a.jpg", os.path.join("sub2", "d.gif")]
+        assert not any("sub1" in key for key in manifest.entries)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,204 @@
+'''
+test_hash_index.py - ハッシュインデックスのテスト
+作成日: 2026年01月08日
+対象: lib/GazoToolsHashIndex.py
+'''
+import pytest
+import os
+import json
+import hashlib
+from lib.GazoToolsHashIndex import HashIndex, compute_md5
+from lib.GazoToolsExceptions import FileHashError
+
+
+@pytest.fixture
+def index_file(tmp_path):
+    """テスト用のインデックスファイルパスを返す"""
+    return str(tmp_path / "hashindex.json")
+
+
+@pytest.fixture
+def sample_file(tmp_path):
+    """テスト用のファイルを作成して返す"""
+    path = tmp_path / "image.jpg"
+    path.write_bytes(b"dummy image data")
+    return str(path)
+
+
+class TestHashIndex:
+    """HashIndex クラスのテスト"""
+
+    def test_get_hash_matches_md5(self, index_file, sample_file):
+        """インデックス経由でも MD5 と同じ値が返ること"""
+        index = HashIndex(index_file=index_file)
+        expected = hashlib.md5(b"dummy image data").hexdigest()
+
+        assert index.get_hash(sample_file) == expected
+        assert compute_md5(sample_file) == expected
+
+    def test_second_call_is_hit(self, index_file, sample_file):
+        """2回目はファイルを読まずにヒットすること"""
+        index = HashIndex(index_file=index_file)
+        index.get_hash(sample_file)
+        index.get_hash(sample_file)
+
+        stats = index.get_stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 1
+
+    def test_invalidated_on_change(self, index_file, sample_file):
+        """ファイル内容が変わったらハッシュも変わること"""
+        index = HashIndex(index_file=index_file)
+        first = index.get_hash(sample_file)
+
+        with open(sample_file, "wb") as f:
+            f.write(b"changed content with different size")
+
+        second = index.get_hash(sample_file)
+        assert first != second
+        assert second == hashlib.md5(b"changed content with different size").hexdigest()
+
+    def test_persisted_across_instances(self, index_file, sample_file):
+        """flush 後に別インスタンスから読めること"""
+        index = HashIndex(index_file=index_file)
+        digest = index.get_hash(sample_file)
+        index.flush()
+
+        with open(index_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        assert len(data["entries"]) == 1
+
+        reloaded = HashIndex(index_file=index_file)
+        assert reloaded.peek(sample_file) == digest
+
+    def test_get_hashes_skips_missing(self, index_file, sample_file):
+        """get_hashes は読めないファイルを除外すること"""
+        index = HashIndex(index_file=index_file)
+        missing = sample_file + ".missing"
+
+        result = index.get_hashes([sample_file, missing])
+        assert sample_file in result
+        assert missing not in result
+
+    def test_peek_hashes_only_known(self, index_file, sample_file, tmp_path, monkeypatch):
+        """peek_hashes はインデックス済みのファイルだけを返し、新しく計算しないこと"""
+        from lib.GazoToolsData import peek_hashes
+        index = HashIndex(index_file=index_file)
+        monkeypatch.setattr(HashIndex, "_instance", index)
+        other = tmp_path / "other.jpg"
+        other.write_bytes(b"other data")
+
+        index.get_hash(sample_file)
+        result = peek_hashes([sample_file, str(other)])
+        assert result == {sample_file: compute_md5(sample_file)}
+        assert index.misses == 1
+
+    def test_missing_file_raises(self, index_file):
+        """存在しないファイルは FileHashError になること"""
+        index = HashIndex(index_file=index_file)
+        with pytest.raises(FileHashError):
+            index.get_hash("/nonexistent/file/path.jpg")
+
+    def test_rename_keeps_digest(self, index_file, sample_file, tmp_path):
+        """リネーム後も再計算せずにハッシュが引き継がれること"""
+        index = HashIndex(index_file=index_file)
+        digest = index.get_hash(sample_file)
+
+        new_path = str(tmp_path / "renamed.jpg")
+        os.rename(sample_file, new_path)
+        index.rename(sample_file, new_path)
+
+        assert index.peek(new_path) == digest
+        assert index.peek(sample_file) is None
+
+    def test_corrupt_index_starts_empty(self, index_file):
+        """壊れたインデックスファイルは無視されること"""
+        with open(index_file, "w", encoding="utf-8") as f:
+            f.write("{broken")
+
+        index = HashIndex(index_file=index_file)
+        assert index.get_stats()["count"] == 0
+
+
+    def test_periodic_save_appends_only_changes(self, index_file, tmp_path):
+        """途中の保存は変更分の追記だけで、全体の書き直しは flush で行うこと"""
+        files = []
+        for i in range(5):
+            path = tmp_path / f"img{i}.jpg"
+            path.write_bytes(f"image {i}".encode())
+            files.append(str(path))
+        index = HashIndex(index_file=index_file, flush_count=2)
+        digests = index.get_hashes(files)
+        index.invalidate(files[0])
+
+        assert not os.path.exists(index_file)
+        with open(index_file + ".log", encoding="utf-8") as f:
+            assert len(f.readlines()) == 6
+        reloaded = HashIndex(index_file=index_file)
+        assert reloaded.peek(files[0]) is None
+        assert all(reloaded.peek(p) == digests[p] for p in files[1:])
+
+        reloaded.flush()
+        assert not os.path.exists(index_file + ".log")
+        with open(index_file, encoding="utf-8") as f:
+            assert len(json.load(f)["entries"]) == 4
+
+    def test_save_pending_appends_without_rewrite(self, index_file, sample_file):
+        """save_pending は変更分を追記ログに書くだけで、インデックス全体は書き直さないこと"""
+        index = HashIndex(index_file=index_file)
+        digest = index.get_hash(sample_file)
+        index.save_pending()
+
+        assert not os.path.exists(index_file)
+        assert HashIndex(index_file=index_file).peek(sample_file) == digest
+
+    def test_torn_log_line_skipped(self, index_file, sample_file):
+        """追記ログの書きかけの行は読み飛ばすこと"""
+        index = HashIndex(index_file=index_file, flush_count=1)
+        digest = index.get_hash(sample_file)
+        with open(index_file + ".log", "a", encoding="utf-8") as f:
+            f.write('["/x/broken.jpg", [1, 2')
+
+        assert HashIndex(index_file=index_file).peek(sample_file) == digest
+
+    def test_append_after_torn_line_is_kept(self, index_file, tmp_path):
+        """書きかけの行の後に追記しても、追記した最初の行が読めること"""
+        first = tmp_path / "f0.jpg"
+        first.write_bytes(b"first")
+        index = HashIndex(index_file=index_file, flush_count=1)
+        index.get_hash(str(first))
+        with open(index_file + ".log", "a", encoding="utf-8") as f:
+            f.write('["torn", [1,2')
+
+        files = []
+        for i in (1, 2):
+            path = tmp_path / f"f{i}.jpg"
+            path.write_bytes(f"image {i}".encode())
+            files.append(str(path))
+        index = HashIndex(index_file=index_file, flush_count=1)
+        digests = index.get_hashes(files)
+
+        reloaded = HashIndex(index_file=index_file)
+        assert reloaded.peek(str(first)) is not None
+        assert all(reloaded.peek(p) == digests[p] for p in files)
+        with open(index_file + ".log", encoding="utf-8") as f:
+            assert '["torn"' not in f.read()
+
+    def test_failed_append_does_not_join_next_line(self, index_file, sample_file, tmp_path):
+        """追記に失敗した後の追記は改行から始めること"""
+        index = HashIndex(index_file=index_file)
+        index.get_hash(sample_file)
+        index.save_pending()
+        with open(index_file + ".log", "a", encoding="utf-8") as f:
+            f.write('["torn", [1,2')
+        index._log_torn = True
+
+        other = tmp_path / "other.jpg"
+        other.write_bytes(b"other")
+        digest = index.get_hash(str(other))
+        index.save_pending()
+        assert HashIndex(index_file=index_file).peek(str(other)) == digest
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,268 @@
+'''
+test_image_cache.py - デコード済み画像キャッシュのテスト
+作成日: 2026年01月15日
+対象: lib/GazoToolsImageCache.py
+'''
+import pytest
+import os
+import time
+import threading
+from PIL import Image
+from lib.GazoToolsImageCache import (
+    ImageCache, PreloadPool, TIER_FULL, TIER_THUMB, FIT_COVER, FIT_CONTAIN, image_nbytes,
+    SlideShowImageLoader, folder_preload_tag
+)
+
+
+@pytest.fixture
+def images(tmp_path):
+    """テスト用の画像ファイルを作る"""
+    paths = []
+    for i, color in enumerate(["red", "green", "blue"]):
+        path = tmp_path / f"img{i}.png"
+        Image.new("RGB", (800, 400), color).save(path)
+        paths.append(str(path))
+    return paths
+
+
+class TestImageCache:
+    """ImageCache クラスのテスト"""
+
+    def test_hit_and_miss_stats(self, images):
+        """2回目はキャッシュから返り、ヒット・ミスが数えられること"""
+        cache = ImageCache(max_size_mb=16, thumb_size_mb=4)
+        first = cache.get(images[0], (400, 200))
+        second = cache.get(images[0], (400, 200))
+
+        assert first is second
+        stats = cache.get_stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1
+        assert stats["hit_rate"] == pytest.approx(0.5)
+
+    def test_key_includes_size_and_mtime(self, images):
+        """サイズ違いは別エントリになり、ファイルが更新されたら読み直すこと"""
+        cache = ImageCache(max_size_mb=16, thumb_size_mb=4)
+        a = cache.get(images[0], (400, 200))
+        b = cache.get(images[0], (600, 300))
+        assert a.size == (400, 200) and b.size == (600, 300)
+
+        Image.new("RGB", (800, 400), "white").save(images[0])
+        st = os.stat(images[0])
+        os.utime(images[0], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        c = cache.get(images[0], (400, 200))
+        assert c is not a
+        assert c.getpixel((0, 0)) == (255, 255, 255)
+
+    def test_tiers_have_separate_budgets(self, images):
+        """サムネイルで枠が溢れても表示用の画像は追い出されないこと"""
+        cache = ImageCache(max_size_mb=16, thumb_size_mb=1)
+        full = cache.get(images[0], (800, 400))
+        for _ in range(3):
+            for path in images:
+                cache.get_thumbnail(path, (200, 200))
+                cache.get(path, (250, 250), fit=FIT_COVER)
+
+        stats = cache.get_stats()
+        assert stats["tiers"][TIER_THUMB]["size_mb"] <= 1
+        assert cache.contains(images[0], (800, 400))
+        assert cache.get(images[0], (800, 400)) is full
+        assert cache.tier_for((800, 400)) == TIER_FULL
+        assert cache.tier_for((64, 64)) == TIER_THUMB
+
+    def test_fit_modes(self, images):
+        """cover は領域を埋め、contain は比率を保って収まること"""
+        cache = ImageCache(max_size_mb=16, thumb_size_mb=4)
+        assert cache.get(images[1], (300, 300), fit=FIT_COVER).size == (300, 300)
+        assert cache.get(images[1], (64, 64), fit=FIT_CONTAIN).size == (64, 32)
+        # contain は拡大しない
+        assert cache.get_thumbnail(images[1], (2000, 2000)).size == (800, 400)
+
+    def test_clear(self, images):
+        """クリアでエントリも統計も消えること"""
+        cache = ImageCache(max_size_mb=16, thumb_size_mb=4)
+        cache.get(images[2])
+        cache.clear()
+        stats = cache.get_cache_stats()
+        assert stats["count"] == 0 and stats["size_mb"] == 0
+        assert stats["hits"] == 0 and stats["misses"] == 0
+
+
+class TestImageCacheVariantsAndThreads:
+    """サイズ違いの派生・バイト数・スレッド安全性のテスト"""
+
+    def test_small_variant_derived_from_cached(self, images, monkeypatch):
+        """小さいサイズはキャッシュ済みの大きいサイズから作られ、読み直さないこと"""
+        cache = ImageCache(max_size_mb=16, thumb_size_mb=4)
+        decodes = []
+        original = cache._decode
+        monkeypatch.setattr(cache, "_decode", lambda *a: decodes.append(a) or original(*a))
+
+        cache.get(images[0], (800, 400))
+        thumb = cache.get_thumbnail(images[0], (100, 100))
+        cover = cache.get(images[0], (300, 300), fit=FIT_COVER)
+
+        assert len(decodes) == 1
+        assert thumb.size == (100, 50) and cover.size == (300, 300)
+        assert cache.get_stats()["derived"] == 2
+
+    def test_cropped_variant_not_used_as_base(self, images):
+        """切り取った画像からは別サイズを作らないこと"""
+        cache = ImageCache(max_size_mb=16, thumb_size_mb=4)
+        cache.get(images[0], (400, 400), fit=FIT_COVER)
+        cache.get_thumbnail(images[0], (100, 100))
+        assert cache.get_stats()["derived"] == 0
+
+    def test_real_byte_accounting(self, tmp_path):
+        """モードに応じたバイト数で使用量を数えること"""
+        gray = tmp_path / "gray.png"
+        Image.new("L", (1000, 500)).save(gray)
+        cache = ImageCache(max_size_mb=16, thumb_size_mb=4)
+        img = cache.get(str(gray), (1000, 500))
+        assert img.mode == "L"
+        assert cache.current_size_bytes == 1000 * 500
+        assert image_nbytes(Image.new("RGB", (10, 10))) == 400
+
+    def test_concurrent_get_decodes_once(self, images, monkeypatch):
+        """同じ画像を同時に要求してもデコードは1回だけで、全員が同じ画像を受け取ること"""
+        cache = ImageCache(max_size_mb=16, thumb_size_mb=4)
+        decodes = []
+        original = cache._decode
+
+        def slow_decode(*args):
+            decodes.append(args)
+            time.sleep(0.2)
+            return original(*args)
+
+        monkeypatch.setattr(cache, "_decode", slow_decode)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get(images[1], (400, 200))))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(decodes) == 1
+        assert len(results) == 8 and all(r is results[0] for r in results)
+        stats = cache.get_stats()
+        assert stats["misses"] == 1 and stats["hits"] == 7
+
+    def test_concurrent_errors_propagate(self, tmp_path):
+        """デコード失敗は待っていたスレッドにも伝わり、次回は再試行されること"""
+        broken = tmp_path / "broken.png"
+        broken.write_bytes(b"not an image")
+        cache = ImageCache(max_size_mb=16, thumb_size_mb=4)
+        with pytest.raises(Exception):
+            cache.get(str(broken), (10, 10))
+        assert not cache._inflight
+        with pytest.raises(Exception):
+            cache.get(str(broken), (10, 10))
+
+
+class TestPreloadAsync:
+    """非同期先読みのテスト"""
+
+    def test_returns_futures(self, images):
+        """呼び出し側を待たせずに Future が返り、結果がキャッシュに入ること"""
+        cache = ImageCache(max_size_mb=16, thumb_size_mb=4)
+        futures = cache.preload_async(images, (200, 100))
+        results = [f.result(timeout=5) for f in futures]
+
+        assert [r.size for r in results] == [(200, 100)] * 3
+        assert all(cache.contains(p, (200, 100)) for p in images)
+
+    def test_newer_requests_first(self, images):
+        """後から頼んだ先読みが、古い先読みより先に処理されること"""
+        cache = ImageCache(max_size_mb=16, thumb_size_mb=4)
+        pool = PreloadPool(cache, workers=1)
+        order = []
+        gate = threading.Event()
+        original = cache.get
+
+        def recording_get(path, target_size=None, fit=None):
+            gate.wait(5)
+            order.append(target_size)
+            return original(path, target_size, fit)
+
+        cache.get = recording_get
+        blocker = pool.submit([images[0]], (10, 10))   # ワーカーをここで止めておく
+        time.sleep(0.05)
+        old = pool.submit([images[0], images[1]], (20, 20))
+        new = pool.submit([images[2]], (30, 30))
+        gate.set()
+        for f in blocker + old + new:
+            f.result(timeout=5)
+
+        assert order == [(10, 10), (30, 30), (20, 20), (20, 20)]
+        pool.shutdown()
+
+    def test_cancel_by_tag(self, images):
+        """タグを指定して、始まっていない先読みを取り消せること"""
+        cache = ImageCache(max_size_mb=16, thumb_size_mb=4)
+        pool = PreloadPool(cache, workers=1)
+        gate = threading.Event()
+        original = cache.get
+        cache.get = lambda *a, **k: gate.wait(5) and original(*a, **k)
+
+        running = pool.submit([images[0]], (10, 10), tag="now")
+        time.sleep(0.05)
+        stale = pool.submit(images, (40, 40), tag="old_folder")
+        keep = pool.submit([images[1]], (50, 50), tag="new_folder")
+        assert pool.cancel(tag="old_folder") == 3
+        gate.set()
+
+        assert all(f.cancelled() for f in stale)
+        assert keep[0].result(timeout=5).size == (50, 50)
+        assert running[0].result(timeout=5).size == (10, 10)
+        assert pool.pending_count() == 0
+        pool.shutdown()
+
+    def test_sizes_per_image_in_one_batch(self, images):
+        """画像ごとのサイズを1つの先読みにまとめ、渡した順に読み込むこと"""
+        cache = ImageCache(max_size_mb=16, thumb_size_mb=4)
+        pool = PreloadPool(cache, workers=1)
+        order = []
+        original = cache.get
+        cache.get = lambda path, target_size=None, fit=None: order.append(path) or original(path, target_size, fit)
+
+        sizes = [(100, 50), (60, 60), (30, 90)]
+        futures = pool.submit(images, sizes, fit=FIT_COVER)
+        assert [f.result(timeout=5).size for f in futures] == sizes
+        assert order == images
+        pool.shutdown()
+
+    def test_folder_tag_cancels_only_that_folder(self, images, tmp_path):
+        """フォルダのタグで取り消すと、そのフォルダの先読みだけが取り消されること"""
+        cache = ImageCache(max_size_mb=16, thumb_size_mb=4)
+        cache._preload_pool = PreloadPool(cache, workers=1)
+        gate = threading.Event()
+        original = cache.get
+        cache.get = lambda *a, **k: gate.wait(5) and original(*a, **k)
+
+        running = cache.preload_async([images[0]], (10, 10))
+        time.sleep(0.05)
+        loader = SlideShowImageLoader.__new__(SlideShowImageLoader)
+        loader.cache, loader.preload_count = cache, 2
+        loader.prepare_sequence(images, 0)
+        other = cache.preload_async([images[1]], (20, 20), tag="tile_windows")
+
+        assert cache.cancel_preloads(tag=folder_preload_tag(str(tmp_path / "elsewhere"))) == 0
+        assert cache.cancel_preloads(tag=folder_preload_tag(str(tmp_path))) == 2
+        gate.set()
+        assert other[0].result(timeout=5).size == (20, 20)
+        running[0].result(timeout=5)
+        cache._preload_pool.shutdown()
+
+    def test_errors_in_future(self, tmp_path):
+        """読み込み失敗は Future の例外として返ること"""
+        broken = tmp_path / "broken.png"
+        broken.write_bytes(b"not an image")
+        cache = ImageCache(max_size_mb=16, thumb_size_mb=4)
+        future = cache.preload_async([str(broken)], (10, 10))[0]
+        with pytest.raises(Exception):
+            future.result(timeout=5)
+        assert cache.cancel_preloads() == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
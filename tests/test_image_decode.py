@@ -0,0 +1,68 @@
+'''
+test_image_decode.py - 縮小デコードのテスト
+作成日: 2026年01月14日
+対象: lib/GazoToolsImageDecode.py
+'''
+import pytest
+import numpy as np
+from PIL import Image
+from lib.GazoToolsImageDecode import decode_to_size
+
+
+def gradient_image(w=1600, h=1200):
+    y, x = np.mgrid[0:h, 0:w]
+    arr = np.stack([x * 255 // w, y * 255 // h, np.full_like(x, 128)], axis=-1).astype(np.uint8)
+    return Image.fromarray(arr)
+
+
+def full_decode(path, size):
+    with Image.open(path) as img:
+        return img.convert("RGB").resize(size, Image.LANCZOS)
+
+
+class TestDecodeToSize:
+    """decode_to_size 関数のテスト"""
+
+    @pytest.mark.parametrize("ext", [".jpg", ".png"])
+    def test_matches_full_decode(self, tmp_path, ext):
+        """原寸デコード + LANCZOS とほぼ同じ画像になること"""
+        path = str(tmp_path / f"grad{ext}")
+        gradient_image().save(path)
+
+        with Image.open(path) as img:
+            out = decode_to_size(img, (200, 150))
+        assert out.size == (200, 150)
+        diff = np.abs(np.asarray(out.convert("RGB"), dtype=np.int16) -
+                      np.asarray(full_decode(path, (200, 150)), dtype=np.int16))
+        assert diff.mean() < 3
+
+    def test_jpeg_uses_draft(self, tmp_path):
+        """JPEG は縮小された解像度でデコードされること"""
+        path = str(tmp_path / "big.jpg")
+        gradient_image().save(path)
+        with Image.open(path) as img:
+            decode_to_size(img, (200, 150))
+            assert img.size == (400, 300)  # draft で 1/4 スケールになるのじゃ
+
+    def test_usable_after_close(self, tmp_path):
+        """ファイルを閉じた後も結果を使えること（縮小不要な場合も含む）"""
+        path = str(tmp_path / "small.png")
+        gradient_image(100, 80).save(path)
+        with Image.open(path) as img:
+            same = decode_to_size(img, (100, 80))
+        with Image.open(path) as img:
+            bigger = decode_to_size(img, (300, 240))
+        assert same.getpixel((0, 0)) is not None
+        assert bigger.size == (300, 240)
+
+    def test_palette_image(self, tmp_path):
+        """reduce() 非対応のモードでもリサイズできること"""
+        path = str(tmp_path / "palette.png")
+        gradient_image().convert("P").save(path)
+        with Image.open(path) as img:
+            out = decode_to_size(img, (160, 120))
+        assert out.size == (160, 120)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,100 @@
+'''
+test_inference.py - 推論高速化モードのテスト
+作成日: 2026年01月11日
+対象: lib/GazoToolsInference.py
+'''
+import pytest
+import torch
+import lib.GazoToolsInference as inference
+from lib.GazoToolsInference import (
+    build_inference_model, cosine_parity, select_inference_model, to_channels_last,
+    parity_key, load_parity, save_parity
+)
+from lib.GazoToolsExceptions import AIModelError
+
+
+@pytest.fixture
+def model():
+    """畳み込み + Linear の小さなモデル"""
+    torch.manual_seed(0)
+    net = torch.nn.Sequential(
+        torch.nn.Conv2d(3, 8, 3, padding=1),
+        torch.nn.ReLU(),
+        torch.nn.AdaptiveAvgPool2d(1),
+        torch.nn.Flatten(),
+        torch.nn.Linear(8, 32),
+    )
+    return net.eval()
+
+
+@pytest.fixture
+def inputs():
+    return torch.randn(4, 3, 16, 16, generator=torch.Generator().manual_seed(1))
+
+
+class TestInferenceModes:
+    """推論モードのテスト"""
+
+    def test_channels_last(self, inputs):
+        """4次元テンソルが channels_last になること"""
+        assert to_channels_last(inputs).is_contiguous(memory_format=torch.channels_last)
+
+    @pytest.mark.parametrize("mode", ["float32", "int8", "jit"])
+    def test_modes_keep_parity(self, model, inputs, mode):
+        """各モードの出力が float32 とほぼ一致すること"""
+        fast = build_inference_model(model, mode, inputs[:1], channels_last=True)
+        assert cosine_parity(model, fast, inputs, channels_last=True) > 0.98
+
+    def test_original_model_untouched(self, model, inputs):
+        """元のモデルは変更されないこと"""
+        build_inference_model(model, "int8", inputs[:1])
+        assert isinstance(model[4], torch.nn.Linear)
+
+    def test_unknown_mode(self, model, inputs):
+        """未知のモードはエラー"""
+        with pytest.raises(AIModelError):
+            build_inference_model(model, "fp8", inputs[:1])
+
+    def test_select_falls_back_on_low_parity(self, model, inputs):
+        """パリティが許容値未満なら float32 モデルに戻ること"""
+        chosen, mode, channels_last, parity = select_inference_model(
+            model, "int8", inputs[:1], tolerance=1.01, parity_inputs=inputs)
+        assert chosen is model
+        assert mode == "float32"
+        assert parity is not None and parity < 1.01
+
+    def test_select_accepts_good_mode(self, model, inputs):
+        """パリティが許容値以上ならそのモードを使うこと"""
+        chosen, mode, channels_last, parity = select_inference_model(
+            model, "jit", inputs[:1], tolerance=0.98, channels_last=True, parity_inputs=inputs)
+        assert chosen is not model
+        assert mode == "jit" and channels_last is True
+        assert parity >= 0.98
+
+
+    def test_recorded_parity_skips_check(self, model, inputs, monkeypatch):
+        """記録済みのパリティがあれば、比較の推論をせずに選ぶこと"""
+        monkeypatch.setattr(inference, "cosine_parity", lambda *a, **k: pytest.fail("parity recomputed"))
+        chosen, mode, _, parity = select_inference_model(model, "int8", inputs[:1], tolerance=0.98, parity=0.995)
+        assert chosen is not model and mode == "int8" and parity == 0.995
+
+        monkeypatch.setattr(inference, "build_inference_model", lambda *a, **k: pytest.fail("built"))
+        chosen, mode, _, _ = select_inference_model(model, "int8", inputs[:1], tolerance=0.999, parity=0.995)
+        assert chosen is model and mode == "float32"
+
+    def test_parity_record_roundtrip(self, tmp_path):
+        """パリティはモデル・モードごとに記録され、壊れたファイルは無視されること"""
+        path = str(tmp_path / "parity.json")
+        key = parity_key("MobileNet", "int8", True)
+        assert load_parity(key, path) is None
+        save_parity(key, 0.997, 4, path)
+        save_parity(parity_key("MobileNet", "jit", False), 0.9999, 4, path)
+        assert load_parity(key, path) == 0.997
+        assert load_parity(parity_key("MobileNet", "int8", False), path) is None
+
+        (tmp_path / "parity.json").write_text("{broken", encoding="utf-8")
+        assert load_parity(key, path) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
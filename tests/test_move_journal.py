@@ -0,0 +1,143 @@
+'''
+test_move_journal.py - ファイル移動の履歴のテスト
+作成日: 2026年01月17日
+対象: lib/GazoToolsMoveJournal.py
+'''
+import pytest
+import os
+from lib.GazoToolsFileOps import bulk_move
+from lib.GazoToolsHashIndex import HashIndex
+from lib.GazoToolsMoveJournal import MoveJournal
+
+
+@pytest.fixture
+def hash_index(tmp_path, monkeypatch):
+    index = HashIndex(index_file=str(tmp_path / "hash_index.json"))
+    monkeypatch.setattr(HashIndex, "_instance", index)
+    return index
+
+
+@pytest.fixture
+def journal_file(tmp_path):
+    return str(tmp_path / "move_journal.jsonl")
+
+
+@pytest.fixture
+def folders(tmp_path):
+    src = tmp_path / "src"
+    dest = tmp_path / "dest"
+    src.mkdir()
+    dest.mkdir()
+    files = []
+    for i in range(4):
+        path = src / f"img{i}.jpg"
+        path.write_bytes(f"image {i}".encode())
+        files.append(str(path))
+    return files, str(dest)
+
+
+def moved_batch(journal, files, dest):
+    return journal.record(bulk_move(files, dest))
+
+
+class TestMoveJournal:
+    """MoveJournal クラスのテスト"""
+
+    def test_undo_and_redo_batch(self, folders, hash_index, journal_file):
+        """バッチ全体を元に戻し、やり直せること"""
+        files, dest = folders
+        journal = MoveJournal(journal_file=journal_file)
+        moved_batch(journal, files, dest)
+        assert journal.can_undo() and not journal.can_redo()
+
+        results = journal.undo()
+        assert all(r.ok for r in results)
+        assert all(os.path.exists(f) for f in files)
+        assert os.listdir(dest) == []
+
+        results = journal.redo()
+        assert all(r.ok for r in results)
+        assert not any(os.path.exists(f) for f in files)
+        assert journal.undo() is not None and journal.undo() is None
+
+    def test_preview(self, folders, hash_index, journal_file):
+        """元に戻す・やり直すで動くファイルを、動かさずに確認できること"""
+        files, dest = folders
+        journal = MoveJournal(journal_file=journal_file)
+        assert journal.preview() == []
+        moved_batch(journal, files[:2], dest)
+        moved = [os.path.join(dest, os.path.basename(f)) for f in files[:2]]
+        assert journal.preview() == [(moved[1], files[1]), (moved[0], files[0])]
+        assert journal.preview(redo=True) == []
+        assert all(os.path.exists(m) for m in moved)
+
+        journal.undo()
+        assert journal.preview(redo=True) == list(zip(files[:2], moved))
+
+    def test_stacks_survive_restart(self, folders, hash_index, journal_file):
+        """開き直しても元に戻す・やり直すの状態が復元されること"""
+        files, dest = folders
+        journal = MoveJournal(journal_file=journal_file)
+        moved_batch(journal, files[:2], dest)
+        moved_batch(journal, files[2:], dest)
+        journal.undo()
+
+        reopened = MoveJournal(journal_file=journal_file)
+        assert reopened.undo_stack == [1] and reopened.redo_stack == [2]
+        reopened.undo()
+        assert all(os.path.exists(f) for f in files)
+
+    def test_new_batch_clears_redo(self, folders, hash_index, journal_file):
+        """元に戻した後に新しく移動したら、やり直しはできなくなること"""
+        files, dest = folders
+        journal = MoveJournal(journal_file=journal_file)
+        moved_batch(journal, files[:2], dest)
+        journal.undo()
+        moved_batch(journal, files[2:], dest)
+
+        assert not journal.can_redo()
+        assert MoveJournal(journal_file=journal_file).redo_stack == []
+
+    def test_changed_file_not_moved_back(self, folders, hash_index, journal_file):
+        """移動後に内容が変わったファイルは元に戻さないこと（ハッシュを計算していなくても）"""
+        files, dest = folders
+        journal = MoveJournal(journal_file=journal_file)
+        moved_batch(journal, files[:2], dest)
+        moved = os.path.join(dest, "img0.jpg")
+        with open(moved, "wb") as f:
+            f.write(b"edited afterwards")
+
+        results = {os.path.basename(r.src): r for r in journal.undo()}
+        assert not results["img0.jpg"].ok and results["img1.jpg"].ok
+        assert os.path.exists(moved) and not os.path.exists(files[0])
+        assert os.path.exists(files[1])
+
+    def test_missing_stamp_not_moved(self, folders, hash_index, journal_file):
+        """目印の無い（古い形式の）記録は動かさないこと"""
+        files, dest = folders
+        journal = MoveJournal(journal_file=journal_file)
+        moved_batch(journal, files[:1], dest)
+        journal.batches[1]["files"][0][2] = None
+
+        results = journal.undo()
+        assert not results[0].ok
+        assert not os.path.exists(files[0])
+
+    def test_torn_line_and_compaction(self, folders, hash_index, journal_file):
+        """壊れた最後の行は読み飛ばし、古い履歴は書き直しで消えること"""
+        files, dest = folders
+        journal = MoveJournal(journal_file=journal_file, max_batches=2)
+        for path in files:
+            moved_batch(journal, [path], dest)
+        with open(journal_file, "a", encoding="utf-8") as f:
+            f.write('{"op": "undo", "bat')
+
+        reopened = MoveJournal(journal_file=journal_file, max_batches=2)
+        assert reopened.undo_stack == [3, 4]
+        with open(journal_file, encoding="utf-8") as f:
+            assert len(f.readlines()) == 2
+        assert reopened.next_id == 5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,167 @@
+'''
+test_playlist.py - AI スライドショーの再生順のテスト
+作成日: 2026年01月19日
+対象: lib/GazoToolsPlaylist.py
+'''
+import pytest
+import time
+import numpy as np
+from lib.GazoToolsHashIndex import HashIndex
+from lib.GazoToolsPlaylist import AIPlaylist, PlaylistPlanner, knn_graph
+from lib.GazoToolsSimilarity import normalize_rows
+
+
+@pytest.fixture
+def hash_index(tmp_path, monkeypatch):
+    index = HashIndex(index_file=str(tmp_path / "hashindex.json"))
+    monkeypatch.setattr(HashIndex, "_instance", index)
+    return index
+
+
+@pytest.fixture
+def folder(tmp_path, hash_index):
+    """2つのまとまり（x 方向と y 方向）と、ベクトルの無い画像が1つあるフォルダ"""
+    base = tmp_path / "imgs"
+    base.mkdir()
+    vecs = {
+        "a.jpg": [1.0, 0.0, 0.0],
+        "b.jpg": [0.0, 1.0, 0.0],
+        "c.jpg": [0.9, 0.1, 0.0],
+        "d.jpg": [0.1, 0.9, 0.0],
+        "e.jpg": [0.95, 0.05, 0.0],
+        "f.jpg": None,
+    }
+    vectors = {}
+    for name, vec in vecs.items():
+        (base / name).write_bytes(name.encode())
+        if vec is not None:
+            vectors[hash_index.get_hash(str(base / name))] = vec
+    return base, list(vecs), vectors
+
+
+def play(playlist, n, threshold=0.8):
+    return [playlist.next(threshold) for _ in range(n)]
+
+
+def unit(*vec):
+    v = np.asarray(vec, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+@pytest.fixture
+def clusters():
+    """3つのまとまりに10行ずつ（まとまりの中でも少しずつ違う）"""
+    rng = np.random.default_rng(0)
+    centers = np.eye(8, dtype=np.float32)[:3]
+    rows = np.repeat(centers, 10, axis=0) + rng.normal(0, 0.15, (30, 8)).astype(np.float32)
+    return normalize_rows(rows)
+
+
+class TestKnnGraph:
+    def test_matches_brute_force(self, clusters):
+        neighbors, sims = knn_graph(clusters, k=5, block=7)
+        full = clusters @ clusters.T
+        np.fill_diagonal(full, -np.inf)
+        expected = np.argsort(-full, axis=1, kind="stable")[:, :5]
+        assert np.allclose(sims, np.take_along_axis(full, expected, axis=1), atol=1e-6)
+        assert not (neighbors == np.arange(30)[:, None]).any()
+
+    def test_tiny(self):
+        neighbors, sims = knn_graph(normalize_rows([[1.0, 0.0]]), k=5)
+        assert neighbors.shape == (1, 0)
+
+
+class TestPlaylistPlanner:
+    @pytest.mark.parametrize("mode", ["walk", "mmr", "random_walk"])
+    @pytest.mark.parametrize("diversity", [0.0, 0.5])
+    def test_stays_in_cluster_and_never_repeats(self, clusters, mode, diversity):
+        planner = PlaylistPlanner(clusters, k=12, rng=np.random.default_rng(1))
+        visited = np.zeros(30, dtype=bool)
+        order = planner.plan(0, visited, mode, diversity, threshold=0.6)
+        assert order[0] == 0
+        assert len(order) == len(set(order))
+        # 閾値を超えるのは同じまとまりだけなのじゃ
+        assert set(order) <= set(range(10))
+        assert visited[order].all() and visited.sum() == len(order)
+
+    def test_mmr_without_diversity_is_similarity_order(self, clusters):
+        planner = PlaylistPlanner(clusters)
+        order = planner.plan(0, np.zeros(30, dtype=bool), "mmr", 0.0, threshold=0.6)
+        scores = clusters[order[1:]] @ clusters[0]
+        assert list(scores) == sorted(scores, reverse=True)
+
+    def test_diversity_avoids_near_duplicates(self):
+        # 0 のそばに、ほぼ同じ 1〜3 と少し離れた 4 がある
+        rows = normalize_rows([unit(1, 0, 0), unit(1, 0.01, 0), unit(1, 0.02, 0), unit(1, 0.03, 0), unit(1, 0.5, 0)])
+        plain = PlaylistPlanner(rows).plan(0, np.zeros(5, dtype=bool), "mmr", 0.0, threshold=0.5)
+        diverse = PlaylistPlanner(rows).plan(0, np.zeros(5, dtype=bool), "mmr", 0.7, threshold=0.5)
+        assert plain[-1] == 4
+        assert diverse.index(4) < plain.index(4)
+
+    def test_nearest_unvisited(self, clusters):
+        planner = PlaylistPlanner(clusters)
+        visited = np.zeros(30, dtype=bool)
+        visited[:10] = True
+        assert planner.nearest_unvisited(0, visited) >= 10
+        visited[:] = True
+        assert planner.nearest_unvisited(0, visited) is None
+
+    def test_plans_thousands_of_steps_quickly(self):
+        rows = normalize_rows(np.random.default_rng(2).normal(size=(3000, 64)).astype(np.float32))
+        planner = PlaylistPlanner(rows, k=16)
+        planner._graph()
+        visited = np.zeros(3000, dtype=bool)
+        start = time.perf_counter()
+        order = planner.plan(0, visited, "walk", 0.3, threshold=-1.0, steps=2000)
+        assert len(order) > 1000
+        assert time.perf_counter() - start < 2.0
+
+
+class TestAIPlaylist:
+    @pytest.mark.parametrize("mode", ["walk", "mmr", "random_walk"])
+    def test_plays_every_file_once_per_round(self, folder, mode):
+        base, files, vectors = folder
+        playlist = AIPlaylist(files, str(base), vectors, mode=mode, diversity=0.3, rng=np.random.default_rng(0))
+        first = play(playlist, 6)
+        assert sorted(first) == sorted(files)
+        # 全部再生したら最初からやり直すのじゃ
+        assert sorted(play(playlist, 6)) == sorted(files)
+
+    def test_similar_order_and_chaining(self, folder):
+        base, files, vectors = folder
+        playlist = AIPlaylist(files, str(base), vectors, mode="mmr", diversity=0.0)
+        # a のまとまりの後は、一番近い未再生の b のまとまりへ続け、ベクトルの無い f は最後に挟むのじゃ
+        assert play(playlist, 6) == ["a.jpg", "e.jpg", "c.jpg", "d.jpg", "b.jpg", "f.jpg"]
+
+    def test_configure_replans_pending(self, folder):
+        base, files, vectors = folder
+        playlist = AIPlaylist(files, str(base), vectors, mode="mmr", diversity=0.0)
+        assert playlist.next(0.8) == "a.jpg"
+        playlist.configure("walk", 0.5)
+        assert len(playlist.queue) == 0
+        rest = play(playlist, 5)
+        assert sorted(rest) == ["b.jpg", "c.jpg", "d.jpg", "e.jpg", "f.jpg"]
+
+    def test_hashes_mapped_once(self, folder, hash_index, monkeypatch):
+        base, files, vectors = folder
+        playlist = AIPlaylist(files[:5], str(base), vectors)
+        calls = []
+        original = hash_index.get_hashes
+        monkeypatch.setattr(hash_index, "get_hashes", lambda paths: calls.append(paths) or original(paths))
+        play(playlist, 20, threshold=0.99)
+        assert len(calls) == 1
+
+    def test_prepare_does_the_slow_part(self, folder, hash_index, monkeypatch):
+        base, files, vectors = folder
+        playlist = AIPlaylist(files, str(base), vectors, mode="walk")
+        playlist.prepare()
+        assert playlist._planner._neighbors is not None
+        monkeypatch.setattr(hash_index, "get_hashes", lambda paths: pytest.fail("mapped twice"))
+        assert sorted(play(playlist, 6)) == sorted(files)
+
+    def test_empty(self, tmp_path, hash_index):
+        assert AIPlaylist([], str(tmp_path), {}).next(0.5) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,103 @@
+'''
+test_similarity.py - ベクトル類似度検索エンジンのテスト
+作成日: 2026年01月08日
+対象: lib/GazoToolsSimilarity.py
+'''
+import pytest
+import numpy as np
+from lib.GazoToolsSimilarity import SimilarityIndex, RankedCandidates, normalize_rows
+from lib.GazoToolsExceptions import VectorProcessingError
+
+
+def make_index(n=50, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    matrix = rng.standard_normal((n, dim)).astype(np.float32)
+    return SimilarityIndex([f"k{i}" for i in range(n)], matrix), matrix
+
+
+class TestSimilarityIndex:
+    """SimilarityIndex クラスのテスト"""
+
+    def test_normalize_rows(self):
+        """各行が単位長になり、ゼロ行はゼロのままであること"""
+        m = normalize_rows([[3.0, 4.0], [0.0, 0.0]])
+        assert np.allclose(m[0], [0.6, 0.8])
+        assert np.allclose(m[1], [0.0, 0.0])
+
+    def test_top_k_matches_brute_force(self):
+        """上位k件が総当たりの結果と一致すること"""
+        index, matrix = make_index()
+        query = matrix[7] + 0.1
+        expected = normalize_rows(matrix) @ (query / np.linalg.norm(query))
+        order = np.argsort(-expected)[:5]
+
+        result = index.top_k(query, 5)
+        assert [k for k, _ in result] == [f"k{i}" for i in order]
+        assert np.allclose([s for _, s in result], expected[order], atol=1e-5)
+
+    def test_top_k_threshold_and_k_overflow(self):
+        """閾値で絞り込め、k が件数を超えても全件返ること"""
+        index, matrix = make_index(n=10)
+        result = index.top_k(matrix[0], 100)
+        assert len(result) == 10
+        assert result[0][0] == "k0"
+        assert result[0][1] == pytest.approx(1.0, abs=1e-5)
+
+        filtered = index.top_k(matrix[0], 100, threshold=0.99)
+        assert [k for k, _ in filtered] == ["k0"]
+
+    def test_range_sorted_descending(self):
+        """range は閾値以上を降順で返すこと"""
+        index, matrix = make_index()
+        result = index.range(matrix[3], 0.0)
+        scores = [s for _, s in result]
+        assert scores == sorted(scores, reverse=True)
+        assert all(s >= 0.0 for s in scores)
+
+    def test_empty_index(self):
+        """空のインデックスは空リストを返すこと"""
+        index = SimilarityIndex()
+        assert len(index) == 0
+        assert index.top_k([1.0, 0.0], 3) == []
+
+    def test_dimension_mismatch(self):
+        """次元数の違うクエリは拒否されること"""
+        index, _ = make_index(dim=16)
+        with pytest.raises(VectorProcessingError):
+            index.top_k(np.ones(8), 3)
+
+    def test_from_store_with_dict(self):
+        """普通の dict からもインデックスを作れること"""
+        store = {"a": [1.0, 0.0], "b": [0.0, 1.0], "c": None}
+        index = SimilarityIndex.from_store(store, ["a", "b", "c", "missing"])
+        assert index.keys == ["a", "b"]
+        assert index.top_k([1.0, 0.1], 1)[0][0] == "a"
+
+
+class TestRankedCandidates:
+    """RankedCandidates クラスのテスト"""
+
+    def test_sorted_and_threshold_count(self):
+        """降順に並び、閾値以上の件数が二分探索で求まること"""
+        rng = np.random.default_rng(1)
+        scores = rng.random(200)
+        ranked = RankedCandidates((f"p{i}", s) for i, s in enumerate(scores))
+
+        got = [ranked[i][1] for i in range(len(ranked))]
+        assert got == sorted(got, reverse=True)
+        for threshold in (0.0, 0.25, 0.5, scores[7], 1.0):
+            assert ranked.count_at_least(threshold) == int((scores >= threshold).sum())
+        assert ranked.paths_at_least(2.0) == []
+
+    def test_incremental_add_keeps_order(self):
+        """少しずつ追加しても順序が保たれ、同点は追加順になること"""
+        ranked = RankedCandidates([("a", 0.5), ("b", 0.9)])
+        ranked.add("c", 0.7)
+        ranked.extend([("d", 0.5)])
+        assert [ranked[i][0] for i in range(4)] == ["b", "c", "a", "d"]
+        assert ranked.paths_at_least(0.5) == ["b", "c", "a", "d"]
+        assert ranked.count_at_least(0.6) == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
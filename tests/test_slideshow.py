@@ -0,0 +1,218 @@
+'''
+test_slideshow.py - スライドショー先読みエンジンのテスト
+作成日: 2026年01月13日
+対象: lib/GazoToolsSlideShow.py, GazoToolsLogic.py
+'''
+import pytest
+import time
+import threading
+from PIL import Image
+from lib.GazoToolsSlideShow import SlideShowPrefetcher, PreparedImage
+import GazoToolsLogic
+from GazoToolsLogic import calculate_display_size, prepare_slide_image, decide_next_image, flush_slide_vectors, HakoData
+from lib.GazoToolsPlaylist import AIPlaylist
+from lib.config_defaults import SS_VECTOR_SAVE_COUNT
+
+
+def wait_until(cond, timeout=5.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def fake_prepare(name, params):
+    return PreparedImage(name, name, Image.new("RGB", (4, 4)), 1.0, f"hash_{name}")
+
+
+class TestSlideShowPrefetcher:
+    """SlideShowPrefetcher クラスのテスト"""
+
+    def test_prefetches_in_order(self):
+        """決めた順に depth 枚まで準備されること"""
+        names = iter(f"img{i}" for i in range(100))
+        prefetcher = SlideShowPrefetcher(lambda params: next(names), fake_prepare, depth=3)
+        prefetcher.start({"mode": 1})
+        try:
+            assert wait_until(lambda: prefetcher.ready_count() == 3)
+            time.sleep(0.05)
+            assert prefetcher.ready_count() == 3  # depth を超えて準備しないこと
+            assert [prefetcher.next().file_name for _ in range(3)] == ["img0", "img1", "img2"]
+            assert wait_until(lambda: prefetcher.ready_count() == 3)
+            assert prefetcher.next().file_name == "img3"
+        finally:
+            prefetcher.stop(timeout=2)
+
+    def test_prepare_runs_off_caller_thread(self):
+        """準備処理がワーカースレッドで実行されること"""
+        threads = []
+
+        def prepare(name, params):
+            threads.append(threading.current_thread())
+            return fake_prepare(name, params)
+
+        prefetcher = SlideShowPrefetcher(lambda params: "a.png", prepare, depth=1)
+        prefetcher.start(None)
+        try:
+            assert wait_until(lambda: prefetcher.ready_count() == 1)
+            assert threads and threads[0] is not threading.current_thread()
+        finally:
+            prefetcher.stop(timeout=2)
+
+    def test_params_change_discards_ready(self):
+        """設定が変わると準備済みの画像が作り直されること"""
+        prefetcher = SlideShowPrefetcher(lambda params: params["name"], fake_prepare, depth=2)
+        prefetcher.start({"name": "old"})
+        try:
+            assert wait_until(lambda: prefetcher.ready_count() == 2)
+            prefetcher.set_params({"name": "new"})
+            assert wait_until(lambda: prefetcher.ready_count() == 2)
+            assert prefetcher.next().file_name == "new"
+        finally:
+            prefetcher.stop(timeout=2)
+
+    def test_failures_do_not_stop_worker(self):
+        """準備に失敗しても次の画像の準備を続けること"""
+        calls = []
+
+        def prepare(name, params):
+            calls.append(name)
+            if len(calls) == 1:
+                raise IOError("broken image")
+            return fake_prepare(name, params)
+
+        prefetcher = SlideShowPrefetcher(lambda params: "x.png", prepare, depth=1)
+        prefetcher.start(None)
+        try:
+            assert wait_until(lambda: prefetcher.ready_count() == 1)
+            assert len(calls) >= 2
+        finally:
+            prefetcher.stop(timeout=2)
+
+    def test_stop_clears_queue(self):
+        """停止すると準備済みの画像が捨てられること"""
+        prefetcher = SlideShowPrefetcher(lambda params: "a.png", fake_prepare, depth=2)
+        prefetcher.start(None)
+        assert wait_until(lambda: prefetcher.ready_count() == 2)
+        prefetcher.stop(timeout=2)
+        assert not prefetcher.is_running
+        assert prefetcher.next() is None
+
+
+class TestSlideImagePreparation:
+    """表示サイズ計算と画像準備のテスト"""
+
+    def test_display_size_fits_screen(self):
+        """最大サイズ未設定なら画面の80%に収まり、アスペクト比が保たれること"""
+        new_w, new_h, scale = calculate_display_size(4000, 2000, 1000, 1000)
+        assert new_w <= 800 and new_h <= 800
+        assert abs(new_w / new_h - 2.0) < 0.05
+        assert scale == pytest.approx(new_w / 4000, rel=0.01)
+
+    def test_prepare_slide_image(self, tmp_path):
+        """リサイズ済みの画像とハッシュが準備されること"""
+        path = tmp_path / "slide.png"
+        Image.new("RGB", (3000, 1500), "red").save(path)
+
+        prepared = prepare_slide_image("slide.png", str(tmp_path), (1000, 1000))
+        assert prepared.file_name == "slide.png"
+        assert prepared.size[0] <= 800
+        assert prepared.image_hash
+        assert prepared.image.getpixel((0, 0)) == (255, 0, 0)
+
+    def test_decide_next_image_random(self):
+        """ランダムモードでは画像リストから選ばれること"""
+        data = HakoData("/nonexistent")
+        data.GazoFiles = ["a.png", "b.png"]
+        assert decide_next_image(data, False, 0.5) in data.GazoFiles
+        data.GazoFiles = []
+        assert decide_next_image(data, False, 0.5) is None
+
+
+    def test_slide_vectors_saved_in_batches(self, monkeypatch):
+        """先読みのベクトルは1枚ごとではなく、まとめて保存されること"""
+        saved = []
+        monkeypatch.setattr(GazoToolsLogic, "save_vectors", saved.append)
+        monkeypatch.setattr(GazoToolsLogic, "_slide_vector_pending", 0)
+        monkeypatch.setattr(GazoToolsLogic, "_slide_vector_saved_at", time.monotonic())
+        vectors = {}
+        for _ in range(SS_VECTOR_SAVE_COUNT - 1):
+            assert not flush_slide_vectors(vectors, force=False)
+        assert flush_slide_vectors(vectors, force=False)
+        assert len(saved) == 1
+        # 溜まっていなければ止めたときにも書かないのじゃ
+        assert not flush_slide_vectors(vectors)
+        flush_slide_vectors(vectors, force=False)
+        assert flush_slide_vectors(vectors) and len(saved) == 2
+
+
+class TestAIImageFolderSwitch:
+    """AI再生中にフォルダが切り替わったときのテスト"""
+
+    @pytest.fixture
+    def data(self, monkeypatch):
+        monkeypatch.setattr("lib.GazoToolsData.load_vectors", dict)
+        data = HakoData("/old")
+        data.SetGazoFiles(["a.png", "b.png"], "/old")
+        return data
+
+    def test_switch_while_choosing(self, data, monkeypatch):
+        """選んでいる間にフォルダが変わったら、古いフォルダの画像を返さないこと"""
+        monkeypatch.setattr(AIPlaylist, "prepare", lambda playlist: None)
+        data.prepare_ai_playlist("walk", 0.0).join(5)
+
+        def switching_next(playlist, threshold):
+            data.SetGazoFiles(["c.png"], "/new")
+            return playlist.files[0]
+
+        monkeypatch.setattr(AIPlaylist, "next", switching_next)
+        assert data.GetNextAIImage(0.5, "walk", 0.0) is None
+        assert data.ai_playlist is None or data.ai_playlist.files == ["c.png"]
+
+    def test_playlist_built_off_the_slide_path(self, data, monkeypatch):
+        """再生順は別スレッドで作られ、できるまでは None を返すこと"""
+        release = threading.Event()
+        threads = []
+
+        def slow_prepare(playlist):
+            threads.append(threading.current_thread())
+            release.wait(5)
+
+        monkeypatch.setattr(AIPlaylist, "prepare", slow_prepare)
+        monkeypatch.setattr(AIPlaylist, "next", lambda playlist, threshold: playlist.files[0])
+        builder = data.prepare_ai_playlist("walk", 0.0)
+        assert data.prepare_ai_playlist("walk", 0.0) is None  # 作成中なら作り直さないのじゃ
+        assert data.GetNextAIImage(0.5, "walk", 0.0) is None
+        release.set()
+        builder.join(5)
+        assert threads == [builder]
+        assert data.GetNextAIImage(0.5, "walk", 0.0) == "a.png"
+
+    def test_switch_while_building(self, data, monkeypatch):
+        """作っている間にフォルダが変わったら、古い再生順は残さず新しいフォルダで作り直すこと"""
+        switched = []
+
+        def switching_prepare(playlist):
+            if not switched:
+                switched.append(playlist)
+                data.SetGazoFiles(["c.png"], "/new")
+
+        monkeypatch.setattr(AIPlaylist, "prepare", switching_prepare)
+        monkeypatch.setattr(AIPlaylist, "next", lambda playlist, threshold: playlist.files[0])
+        data.prepare_ai_playlist("walk", 0.0).join(5)
+        assert wait_until(lambda: data.GetNextAIImage(0.5, "walk", 0.0) == "c.png")
+        assert data.ai_playlist is not switched[0]
+
+    def test_failed_build_falls_back_to_random(self, data, monkeypatch):
+        """再生順を作れなかったフォルダでは、ランダムに選ぶこと"""
+        def broken(playlist):
+            raise IOError("broken")
+
+        monkeypatch.setattr(AIPlaylist, "prepare", broken)
+        data.prepare_ai_playlist("walk", 0.0).join(5)
+        assert data.GetNextAIImage(0.5, "walk", 0.0) in ("a.png", "b.png")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
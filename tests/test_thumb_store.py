@@ -0,0 +1,173 @@
+'''
+test_thumb_store.py - ディスクのサムネイルキャッシュのテスト
+作成日: 2026年01月16日
+対象: lib/GazoToolsThumbStore.py
+'''
+import pytest
+import os
+import shutil
+import threading
+from PIL import Image
+import lib.GazoToolsThumbStore as thumb_store_module
+from lib.GazoToolsHashIndex import HashIndex
+from lib.GazoToolsThumbStore import ThumbnailStore, THUMB_INDEX_NAME
+
+SIZE = (64, 64)
+
+
+@pytest.fixture
+def hash_index(tmp_path):
+    return HashIndex(index_file=str(tmp_path / "hash_index.json"))
+
+
+@pytest.fixture
+def image_path(tmp_path):
+    path = tmp_path / "photo.png"
+    Image.new("RGB", (400, 200), "red").save(path)
+    return str(path)
+
+
+def make_store(tmp_path, hash_index, **kwargs):
+    return ThumbnailStore(thumb_dir=str(tmp_path / "thumbs"), shard_count=4, hash_index=hash_index, **kwargs)
+
+
+def noise():
+    """圧縮しても小さくならない（サイズがほぼ同じになる）画像"""
+    return Image.frombytes("RGB", SIZE, os.urandom(SIZE[0] * SIZE[1] * 3))
+
+
+class TestThumbnailStore:
+    """ThumbnailStore クラスのテスト"""
+
+    def test_put_get_roundtrip(self, tmp_path, hash_index):
+        """保存したサムネイルを同じ大きさで読み出せること"""
+        store = make_store(tmp_path, hash_index)
+        store.put("ab" * 16, SIZE, Image.new("RGB", (64, 32), "blue"))
+
+        img = store.get("ab" * 16, SIZE)
+        assert img.size == (64, 32)
+        assert store.get("ab" * 16, (128, 128)) is None
+        assert len(store) == 1
+
+    def test_reopen_after_flush(self, tmp_path, hash_index):
+        """flush 後に開き直しても読み出せること"""
+        store = make_store(tmp_path, hash_index)
+        store.put("01" * 16, SIZE, Image.new("RGB", (64, 64), "green"))
+        store.flush()
+
+        reopened = make_store(tmp_path, hash_index)
+        assert reopened.get("01" * 16, SIZE).size == (64, 64)
+
+    def test_unindexed_tail_truncated(self, tmp_path, hash_index):
+        """インデックスに載っていない書きかけ部分は開き直すと切り捨てられること"""
+        store = make_store(tmp_path, hash_index)
+        store.put("02" * 16, SIZE, Image.new("RGB", (64, 64)))
+        store.flush()
+        store.put("06" * 16, SIZE, Image.new("RGB", (64, 64)))  # 同じシャード、未 flush
+        shard = store._shard_path(2)
+        indexed_end = sum(store.entries[k][2] for k in store.entries if k.startswith("02"))
+
+        reopened = make_store(tmp_path, hash_index)
+        assert os.path.getsize(shard) == indexed_end
+        assert reopened.get("06" * 16, SIZE) is None
+        assert reopened.get("02" * 16, SIZE) is not None
+
+    def test_corrupt_index_starts_over(self, tmp_path, hash_index):
+        """インデックスが壊れていても空の状態で開けること"""
+        os.makedirs(tmp_path / "thumbs")
+        (tmp_path / "thumbs" / THUMB_INDEX_NAME).write_text("{broken", encoding="utf-8")
+        store = make_store(tmp_path, hash_index)
+        assert len(store) == 0
+
+    def test_lookup_does_not_hash(self, tmp_path, hash_index, image_path):
+        """ハッシュが未知のファイルは lookup で None になり、作成後は見つかること"""
+        store = make_store(tmp_path, hash_index)
+        assert store.lookup(image_path, SIZE) is None
+
+        created = store.get_or_create(image_path, SIZE)
+        assert created.size == (64, 32)
+        assert store.lookup(image_path, SIZE).size == (64, 32)
+
+    def test_request_future(self, tmp_path, hash_index, image_path):
+        """バックグラウンド作成の Future から結果を受け取れること"""
+        store = make_store(tmp_path, hash_index)
+        future = store.request(image_path, SIZE)
+        assert future.result(timeout=5).size == (64, 32)
+        assert len(store) == 1
+
+    def test_same_content_shares_entry(self, tmp_path, hash_index, image_path):
+        """内容が同じなら別のパスでも作り直さないこと"""
+        store = make_store(tmp_path, hash_index)
+        store.get_or_create(image_path, SIZE)
+        copy = str(tmp_path / "moved.png")
+        shutil.copy(image_path, copy)
+        store.get_or_create(copy, SIZE)
+        assert len(store) == 1
+
+
+    def test_compaction_keeps_recently_used(self, tmp_path, hash_index):
+        """容量を超えたら使っていないものから捨てて詰め直し、開き直しても読めること"""
+        store = make_store(tmp_path, hash_index, max_bytes=10 ** 9)
+        digests = [f"{i:02x}" * 16 for i in range(8)]
+        for i, digest in enumerate(digests):
+            store.put(digest, SIZE, noise())
+        one = max(length for _, _, length in store.entries.values())
+        assert store.get(digests[0], SIZE) is not None  # 一番古いものを使い直すのじゃ
+
+        # 4件ぶんの容量にすると、詰め直し後は 3件（0.75倍）だけ残るのじゃ
+        store.max_bytes = one * 4
+        assert store.compact()
+        kept = {k.split(":")[0] for k in store.entries}
+        assert digests[0] in kept and digests[7] in kept
+        assert digests[1] not in kept
+        assert store._disk_bytes <= store.max_bytes
+        assert all(store.get(d, SIZE) is not None for d in kept)
+        names = os.listdir(tmp_path / "thumbs")
+        assert not any(n.endswith(".bin") and ".1." not in n for n in names)
+
+        reopened = make_store(tmp_path, hash_index)
+        assert reopened.epoch == 1
+        assert {k.split(":")[0] for k in reopened.entries} == kept
+        assert reopened.get(digests[7], SIZE).size == SIZE
+
+    def test_put_over_limit_compacts(self, tmp_path, hash_index):
+        """put でシャードの合計が上限を超えたら自動で詰め直すこと"""
+        store = make_store(tmp_path, hash_index)
+        store.put("00" * 16, SIZE, noise())
+        store.max_bytes = store._disk_bytes * 3
+        for i in range(1, 6):
+            store.put(f"{i:02x}" * 16, SIZE, noise())
+        assert store.epoch >= 1
+        assert store._disk_bytes <= store.max_bytes
+        assert store.get("05" * 16, SIZE) is not None
+
+    def test_get_reads_outside_lock_during_compaction(self, tmp_path, hash_index, monkeypatch):
+        """読み出し中でも詰め直しが進み、古い世代は読み終わってから消されること"""
+        store = make_store(tmp_path, hash_index)
+        for i in range(4):
+            store.put(f"{i:02x}" * 16, SIZE, noise())
+        store.max_bytes = store._disk_bytes
+        old_shard = store._shard_path(3)
+        original_open = thumb_store_module.Image.open
+        seen = {}
+
+        def open_during_compaction(fp):
+            compactor = threading.Thread(target=lambda: seen.setdefault("compacted", store.compact()))
+            compactor.start()
+            compactor.join(timeout=5)   # get が鍵を持ったままなら詰め直しは終わらないのじゃ
+            seen["old_shard_kept"] = os.path.exists(old_shard)
+            return original_open(fp)
+
+        monkeypatch.setattr(thumb_store_module.Image, "open", open_during_compaction)
+        img = store.get("03" * 16, SIZE)
+        monkeypatch.undo()
+
+        assert img.size == SIZE
+        assert seen == {"compacted": True, "old_shard_kept": True}
+        assert store.epoch == 1 and not store._readers
+        assert not os.path.exists(old_shard)
+        assert store.get("03" * 16, SIZE).size == SIZE
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -236,6 +236,49 @@ class TestAppStateScreensaverSettings:
         
         app_state.set_ss_ai_threshold(0.75)
         assert app_state.ss_ai_threshold == 0.75
+    
+    def test_ai_plan_settings_restored(self):
+        """AI再生順の作り方と多様性を設定から復元できること"""
+        app_state = AppState()
+        app_state.from_dict({"settings": {"ss_ai_plan_mode": "mmr", "ss_ai_diversity": 0.6}})
+        assert app_state.ss_ai_plan_mode == "mmr"
+        assert app_state.ss_ai_diversity == 0.6
+    
+    @pytest.mark.parametrize("mode, diversity, expected", [
+        ("zigzag", 3.5, 1.0),
+        (None, -2, 0.0),
+        ("walk", "abc", 0.3),
+    ])
+    def test_invalid_ai_plan_settings_restored_safely(self, mode, diversity, expected):
+        """手で書き換えた設定でも、作り方は一覧にあるもの、多様性は 0〜1 に収まること"""
+        app_state = AppState()
+        app_state.from_dict({"settings": {"ss_ai_plan_mode": mode, "ss_ai_diversity": diversity}})
+        assert app_state.ss_ai_plan_mode == "walk"
+        assert app_state.ss_ai_diversity == expected
+
+
+class TestAppStateFolderVisits:
+    """AppState のフォルダ訪問回数のテスト"""
+    
+    def test_visits_counted_on_folder_change(self, tmp_path):
+        """フォルダを開くたびに訪問回数が増えること"""
+        app_state = get_app_state()
+        before = app_state.get_folder_visits(str(tmp_path))
+        
+        app_state.set_current_folder(str(tmp_path))
+        app_state.set_current_folder(str(tmp_path))
+        assert app_state.get_folder_visits(str(tmp_path)) == before + 2
+    
+    def test_visits_persisted(self, tmp_path):
+        """訪問回数が設定辞書に保存・復元されること"""
+        app_state = get_app_state()
+        app_state.set_current_folder(str(tmp_path))
+        data = app_state.to_dict()
+        assert "folder_visits" in data["settings"]
+        
+        app_state.folder_visits = {}
+        app_state.from_dict(data)
+        assert app_state.get_folder_visits(str(tmp_path)) >= 1
 
 
 if __name__ == "__main__":
@@ -0,0 +1,184 @@
+'''
+test_vector_job.py - 再開可能なベクトル化ジョブのテスト
+作成日: 2026年01月10日
+対象: lib/GazoToolsVectorJob.py
+'''
+import pytest
+import json
+import lib.GazoToolsAI as ai
+from lib.GazoToolsAI import VectorBatchProcessor
+from lib.GazoToolsFolderManifest import FolderManifest
+from lib.GazoToolsVectorJob import VectorJob, listing_digest
+
+
+@pytest.fixture
+def job_file(tmp_path):
+    return str(tmp_path / "vector_job.json")
+
+
+@pytest.fixture
+def pics(tmp_path, monkeypatch):
+    """画像2枚と、画像1枚入りの子フォルダがあるフォルダを返す"""
+    manifest = FolderManifest(manifest_file=str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(FolderManifest, "_instance", manifest)
+    base = tmp_path / "pics"
+    (base / "sub").mkdir(parents=True)
+    for name in ("a.jpg", "b.jpg", "sub/c.jpg"):
+        (base / name).write_bytes(name.encode())
+    return base
+
+
+class TestVectorJob:
+    """VectorJob クラスのテスト"""
+
+    def test_load_missing(self, job_file):
+        """ジョブファイルが無ければ None"""
+        assert VectorJob.load(job_file) is None
+
+    def test_save_and_resume(self, job_file):
+        """保存した待ち行列とハッシュを読み直せること"""
+        job = VectorJob("/pics", {"/pics/a.jpg": "ha", "/pics/b.jpg": "hb", "/pics/c.jpg": "hc"},
+                        job_file=job_file)
+        job.mark_done("/pics/a.jpg")
+        job.mark_failed("/pics/b.jpg")
+        job.save()
+
+        resumed = VectorJob.load(job_file)
+        assert resumed.folder == "/pics"
+        assert resumed.pending == {"/pics/c.jpg": "hc"}
+        assert resumed.total == 3
+        assert resumed.done_count == 2
+        assert resumed.failed == ["/pics/b.jpg"]
+        assert not resumed.is_finished
+
+    def test_mark_unknown_is_ignored(self, job_file):
+        """待ち行列に無いファイルは数えないこと"""
+        job = VectorJob("/pics", {"/pics/a.jpg": "ha"}, job_file=job_file)
+        job.mark_done("/pics/zzz.jpg")
+        job.mark_done("/pics/a.jpg")
+        job.mark_done("/pics/a.jpg")
+        assert job.done_count == 1
+        assert job.is_finished
+
+    def test_remove(self, job_file):
+        """完了したジョブのファイルが消えること"""
+        job = VectorJob("/pics", {}, job_file=job_file)
+        job.save()
+        job.remove()
+        assert VectorJob.load(job_file) is None
+
+    def test_broken_or_old_manifest(self, job_file):
+        """壊れたファイルや古いバージョンは破棄されること"""
+        with open(job_file, "w", encoding="utf-8") as f:
+            f.write("{broken")
+        assert VectorJob.load(job_file) is None
+
+        with open(job_file, "w", encoding="utf-8") as f:
+            json.dump({"version": 999, "pending": {}}, f)
+        assert VectorJob.load(job_file) is None
+
+    def test_scope_saved(self, job_file):
+        """対象の範囲と一覧の要約も読み直せること"""
+        job = VectorJob("/pics", {"/pics/a.jpg": "ha"}, job_file=job_file,
+                        roots=["/pics", "/dest"], recursive=True, listing="abc")
+        job.save()
+        resumed = VectorJob.load(job_file)
+        assert resumed.roots == ["/pics", "/dest"]
+        assert resumed.recursive
+        assert resumed.files is None
+        assert resumed.listing == "abc"
+
+    def test_listing_digest_ignores_order(self):
+        """一覧の要約は並び順によらず、中身が変われば変わること"""
+        assert listing_digest(["/a", "/b"]) == listing_digest(["/b", "/a"])
+        assert listing_digest(["/a", "/b"]) != listing_digest(["/a", "/b", "/c"])
+
+
+class TestVectorBatchProcessorJob:
+    """VectorBatchProcessor のジョブの扱いのテスト"""
+
+    def make_job(self, base, recursive, job_file):
+        paths = [str(base / "a.jpg"), str(base / "b.jpg")]
+        if recursive:
+            paths.append(str(base / "sub" / "c.jpg"))
+        return VectorJob(str(base), {paths[0]: "ha"}, job_file=job_file,
+                         recursive=recursive, listing=listing_digest(paths))
+
+    @pytest.mark.parametrize("recursive", [False, True])
+    def test_resume_checks_listing(self, pics, job_file, recursive):
+        """再開前に、対象フォルダのファイル一覧が変わっていないか確かめること"""
+        job = self.make_job(pics, recursive, job_file)
+        processor = VectorBatchProcessor.resume(job)
+        assert processor.recursive == recursive
+        assert processor._is_current(job)
+
+        (pics / "sub" / "d.jpg").write_bytes(b"d")
+        assert processor._is_current(job) != recursive
+        (pics / "b.jpg").unlink()
+        assert not processor._is_current(job)
+
+    def test_resume_files_job(self, pics, job_file):
+        """ファイル指定のジョブは、指定したファイルが残っているか確かめること"""
+        files = [str(pics / "a.jpg"), str(pics / "b.jpg")]
+        job = VectorJob(str(pics), {files[0]: "ha"}, job_file=job_file, files=files,
+                        listing=listing_digest(files))
+        processor = VectorBatchProcessor.resume(job)
+        assert processor._is_current(job)
+        (pics / "b.jpg").unlink()
+        assert not processor._is_current(job)
+
+    def test_old_job_without_listing_is_stale(self, pics, job_file):
+        """一覧の要約が無いジョブは、確かめられないので作り直すこと"""
+        job = VectorJob(str(pics), {str(pics / "a.jpg"): "ha"}, job_file=job_file)
+        assert not VectorBatchProcessor.resume(job)._is_current(job)
+
+    def test_checkpoint_keeps_caller_vectors(self, job_file, monkeypatch):
+        """呼び出し元から渡されたベクトルの dict を空にしないこと"""
+        saved = []
+        monkeypatch.setattr(ai, "save_vectors", lambda vectors: saved.append(dict(vectors)))
+        monkeypatch.setattr(ai, "flush_hash_index", lambda: None)
+        monkeypatch.setattr(ai, "save_hash_index_changes", lambda: None)
+        job = VectorJob("/pics", {}, job_file=job_file)
+        processor = VectorBatchProcessor("/pics")
+
+        vectors = {"ha": [1.0]}
+        processor._checkpoint(vectors, job)
+        assert vectors == {"ha": [1.0]}
+
+        processor._buffer = buffer = {"hb": [2.0]}
+        processor._checkpoint(buffer, job)
+        assert buffer == {}
+        assert saved == [{"ha": [1.0]}, {"hb": [2.0]}]
+
+    def test_checkpoint_rewrites_hash_index_only_at_the_end(self, job_file, monkeypatch):
+        """途中のチェックポイントはハッシュの変更分の追記だけで、全体の書き直しは最後だけであること"""
+        calls = []
+        monkeypatch.setattr(ai, "save_vectors", lambda vectors: None)
+        monkeypatch.setattr(ai, "flush_hash_index", lambda: calls.append("flush"))
+        monkeypatch.setattr(ai, "save_hash_index_changes", lambda: calls.append("append"))
+        job = VectorJob("/pics", {}, job_file=job_file)
+        processor = VectorBatchProcessor("/pics")
+        processor._checkpoint({}, job)
+        processor._checkpoint({}, job)
+        processor._checkpoint({}, job, final=True)
+        assert calls == ["append", "append", "flush"]
+
+    def test_new_job_does_not_replace_unfinished(self, job_file, monkeypatch):
+        """中断したジョブが残っていれば、replace=True でない限り新しいジョブを始めないこと"""
+        unfinished = VectorJob("/other", {"/other/a.jpg": "ha"}, job_file=job_file)
+        monkeypatch.setattr(VectorJob, "load", classmethod(lambda cls, job_file=None: unfinished))
+        monkeypatch.setattr(ai.VectorEngine, "get_instance",
+                            classmethod(lambda cls: type("Engine", (), {"check_available": lambda self: True})()))
+        monkeypatch.setattr(ai, "load_vectors", dict)
+        created = []
+        monkeypatch.setattr(VectorBatchProcessor, "_create_job", lambda self, vectors: created.append(self))
+        messages = []
+        VectorBatchProcessor("/pics", callback_finish=messages.append).run()
+        assert created == [] and "/other" in messages[0]
+
+        VectorBatchProcessor("/pics", callback_finish=messages.append, replace=True).run()
+        assert len(created) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
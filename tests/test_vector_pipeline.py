@@ -0,0 +1,110 @@
+'''
+test_vector_pipeline.py - ベクトル化パイプラインのテスト
+作成日: 2026年01月09日
+対象: lib/GazoToolsVectorPipeline.py
+'''
+import pytest
+import sys
+import queue
+import numpy as np
+from PIL import Image
+from lib.GazoToolsVectorPipeline import VectorPipeline, decode_and_preprocess, _DecodeWorker
+
+
+class FakeEngine:
+    """前処理済みバッチの平均値を返すだけの推論エンジン"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def infer_tensor_batch(self, batch):
+        self.batch_sizes.append(batch.shape[0])
+        return [[float(x.mean()), 1.0] for x in batch]
+
+
+@pytest.fixture
+def image_paths(tmp_path):
+    """色の違うテスト画像を作る"""
+    paths = []
+    for i in range(7):
+        path = tmp_path / f"img_{i}.png"
+        Image.new("RGB", (40 + i, 30), (i * 30, 0, 0)).save(path)
+        paths.append(str(path))
+    broken = tmp_path / "broken.jpg"
+    broken.write_bytes(b"not an image")
+    paths.append(str(broken))
+    return paths
+
+
+class TestVectorPipeline:
+    """VectorPipeline クラスのテスト"""
+
+    def test_decode_and_preprocess(self, image_paths):
+        """前処理済みの CHW 配列が返ること"""
+        path, array, error = decode_and_preprocess(image_paths[0])
+        assert error is None
+        assert array.dtype == np.float32
+        assert array.shape[0] == 3
+
+    def test_inline_batches_and_failures(self, image_paths):
+        """バッチにまとめて推論され、壊れた画像はエラーで返ること"""
+        engine = FakeEngine()
+        pipeline = VectorPipeline(engine, workers=0, batch_size=3)
+        results = list(pipeline.process(image_paths))
+
+        assert len(results) == 8
+        ok = [r for r in results if r[1] is not None]
+        ng = [r for r in results if r[1] is None]
+        assert len(ok) == 7 and len(ng) == 1
+        assert ng[0][0].endswith("broken.jpg")
+        assert engine.batch_sizes == [3, 3, 1]
+        assert pipeline.processed == 7 and pipeline.failed == 1
+        assert pipeline.images_per_sec > 0
+
+    def test_process_pool_matches_inline(self, image_paths):
+        """プロセスプールでも同じ結果になること"""
+        inline = {p: v for p, v, _ in VectorPipeline(FakeEngine(), workers=0).process(image_paths)}
+        engine = FakeEngine()
+        pooled = {p: v for p, v, _ in VectorPipeline(engine, workers=2, batch_size=4).process(image_paths)}
+
+        assert pooled.keys() == inline.keys()
+        for p, v in inline.items():
+            if v is None:
+                assert pooled[p] is None
+            else:
+                assert np.allclose(pooled[p], v, atol=1e-5)
+        assert max(engine.batch_sizes) <= 4
+
+    def test_stop_early(self, image_paths):
+        """should_continue が False を返したら止まること"""
+        pipeline = VectorPipeline(FakeEngine(), workers=0, batch_size=1)
+        seen = []
+        for result in pipeline.process(image_paths, lambda: len(seen) < 2):
+            seen.append(result)
+        assert len(seen) == 2
+
+    def test_pool_leaves_main_module_alone(self, image_paths, monkeypatch):
+        """ワーカーは専用の入口から起動し、__main__ を書き換えないこと"""
+        main = sys.modules["__main__"]
+        monkeypatch.setattr(main, "__file__", "/nowhere/GazoToolsApp.py", raising=False)
+        pipeline = VectorPipeline(FakeEngine(), workers=1, batch_size=1)
+        for _ in pipeline.process(image_paths[:2]):
+            assert main.__file__ == "/nowhere/GazoToolsApp.py"
+        assert pipeline.processed == 2
+
+    def test_dead_worker_reports_failures(self, image_paths):
+        """ワーカーが落ちても、待たせずに失敗として返すこと"""
+        results = queue.Queue()
+        worker = _DecodeWorker(results)
+        worker.proc.kill()
+        worker.proc.wait()
+        worker.submit(image_paths[0])
+        worker.submit(image_paths[1])
+        got = [results.get(timeout=10) for _ in range(2)]
+        assert sorted(p for p, _, _ in got) == sorted(image_paths[:2])
+        assert all(array is None and error for _, array, error in got)
+        worker.close(False)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
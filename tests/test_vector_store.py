@@ -0,0 +1,221 @@
+'''
+test_vector_store.py - ベクトルストアのテスト
+作成日: 2026年01月08日
+対象: lib/GazoToolsVectorStore.py
+'''
+import pytest
+import os
+import json
+import numpy as np
+from lib.GazoToolsVectorStore import VectorStore
+from lib.GazoToolsVectorCodec import PCACodec, parse_storage_mode
+from lib.GazoToolsSimilarity import SimilarityIndex
+from lib.GazoToolsAI import VectorEngine
+from lib.GazoToolsExceptions import VectorProcessingError
+
+
+@pytest.fixture
+def store_paths(tmp_path):
+    """テスト用のストアファイルパスを返す"""
+    return {
+        "matrix_file": str(tmp_path / "vectors.f32"),
+        "index_file": str(tmp_path / "vectors_index.json"),
+        "legacy_file": str(tmp_path / "vectordata.json"),
+    }
+
+
+def random_vec(dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal(dim).astype(np.float32).tolist()
+
+
+class TestVectorStore:
+    """VectorStore クラスのテスト"""
+
+    def test_dict_compatible_api(self, store_paths):
+        """dict と同じ使い方ができること"""
+        store = VectorStore(**store_paths)
+        vec = random_vec()
+        store["hash_a"] = vec
+
+        assert "hash_a" in store
+        assert "hash_b" not in store
+        assert len(store) == 1
+        assert store.get("hash_b") is None
+        assert np.allclose(store["hash_a"], vec, atol=1e-6)
+        assert isinstance(store.get("hash_a"), list)
+
+    def test_flush_and_reopen(self, store_paths):
+        """flush 後に別インスタンスから memmap で読めること"""
+        store = VectorStore(**store_paths)
+        vecs = {f"h{i}": random_vec(seed=i) for i in range(5)}
+        store.update(vecs)
+        store.flush()
+
+        reopened = VectorStore(**store_paths)
+        assert len(reopened) == 5
+        for h, v in vecs.items():
+            assert np.allclose(reopened[h], v, atol=1e-6)
+        assert os.path.getsize(store_paths["matrix_file"]) == 5 * 16 * 4
+
+    def test_append_only(self, store_paths):
+        """2回目の flush は追記になること"""
+        store = VectorStore(**store_paths)
+        store["a"] = random_vec(seed=1)
+        store.flush()
+        store["b"] = random_vec(seed=2)
+        store.flush()
+
+        assert os.path.getsize(store_paths["matrix_file"]) == 2 * 16 * 4
+        reopened = VectorStore(**store_paths)
+        assert set(reopened.keys()) == {"a", "b"}
+
+    def test_get_matrix_mixes_disk_and_pending(self, store_paths):
+        """書き出し済みと未書き出しの行をまとめて取り出せること"""
+        store = VectorStore(**store_paths)
+        store["a"] = random_vec(seed=1)
+        store.flush()
+        store["b"] = random_vec(seed=2)
+
+        found, matrix = store.get_matrix(["b", "missing", "a"])
+        assert found == ["b", "a"]
+        assert matrix.shape == (2, 16)
+        assert np.allclose(matrix[1], random_vec(seed=1), atol=1e-6)
+
+    def test_migrates_legacy_json(self, store_paths):
+        """旧形式の JSON から移行されること"""
+        legacy = {"x": random_vec(seed=3), "y": random_vec(seed=4)}
+        with open(store_paths["legacy_file"], "w", encoding="utf-8") as f:
+            json.dump(legacy, f)
+
+        store = VectorStore(**store_paths)
+        assert len(store) == 2
+        assert os.path.exists(store_paths["index_file"])
+        assert np.allclose(store["y"], legacy["y"], atol=1e-6)
+
+    def test_dimension_mismatch(self, store_paths):
+        """次元数が違うベクトルは拒否されること"""
+        store = VectorStore(**store_paths)
+        store["a"] = random_vec(dim=16)
+        with pytest.raises(VectorProcessingError):
+            store["b"] = random_vec(dim=8)
+
+    def test_truncates_partial_write(self, store_paths):
+        """インデックスに載っていない書きかけ部分は切り捨てられること"""
+        store = VectorStore(**store_paths)
+        store["a"] = random_vec(seed=1)
+        store.flush()
+        with open(store_paths["matrix_file"], "ab") as f:
+            f.write(b"\x00" * 10)
+
+        reopened = VectorStore(**store_paths)
+        reopened["b"] = random_vec(seed=2)
+        reopened.flush()
+        assert os.path.getsize(store_paths["matrix_file"]) == 2 * 16 * 4
+        assert np.allclose(VectorStore(**store_paths)["b"], random_vec(seed=2), atol=1e-6)
+
+
+def clustered_vectors(n=60, dim=16, seed=0):
+    """低次元の部分空間に乗ったベクトル（PCA で情報が落ちにくいもの）を作る"""
+    rng = np.random.default_rng(seed)
+    basis = rng.standard_normal((4, dim))
+    return (rng.standard_normal((n, 4)) @ basis).astype(np.float32)
+
+
+class TestVectorStorageModes:
+    """float16 / PCA 保存形式のテスト"""
+
+    def test_parse_storage_mode(self):
+        """保存形式の文字列が分解できること"""
+        assert parse_storage_mode("float32") == (np.float32, None)
+        assert parse_storage_mode("float16") == (np.float16, None)
+        assert parse_storage_mode("pca128") == (np.float32, 128)
+        with pytest.raises(VectorProcessingError):
+            parse_storage_mode("int4")
+
+    def test_float16_halves_file(self, store_paths):
+        """float16 変換でファイルサイズが半分になり、値がほぼ保たれること"""
+        store = VectorStore(**store_paths)
+        vecs = {f"h{i}": random_vec(seed=i) for i in range(10)}
+        store.update(vecs)
+        store.flush()
+
+        assert store.convert("float16") is True
+        assert store.convert("float16") is False
+        reopened = VectorStore(**store_paths)
+        assert reopened.mode == "float16"
+        assert os.path.getsize(reopened._active_matrix_file) == 10 * 16 * 2
+        for h, v in vecs.items():
+            assert np.allclose(reopened[h], v, atol=1e-2)
+
+        reopened["h_new"] = random_vec(seed=99)
+        reopened.flush()
+        assert np.allclose(VectorStore(**store_paths)["h_new"], random_vec(seed=99), atol=1e-2)
+
+    def test_pca_keeps_ranking(self, store_paths):
+        """PCA 圧縮しても類似検索の上位が変わらないこと"""
+        matrix = clustered_vectors()
+        store = VectorStore(**store_paths)
+        store.update({f"h{i}": v for i, v in enumerate(matrix)})
+        store.flush()
+        query = matrix[0]
+        keys = list(store.keys())
+        before = SimilarityIndex.from_store(store, keys).top_k(query, 5)
+
+        assert store.convert("pca8") is True
+        assert store.dim == 8
+        assert store.input_dim == 16
+        assert store.get_matrix(keys)[1].shape == (60, 8)
+        after = SimilarityIndex.from_store(store, keys).top_k(query, 5)
+        assert [h for h, _ in after] == [h for h, _ in before]
+        assert np.allclose([s for _, s in after], [s for _, s in before], atol=1e-4)
+
+    def test_pca_reopen_and_dict_api(self, store_paths):
+        """PCA 形式のストアを開き直しても、dict API は元の次元で返すこと"""
+        matrix = clustered_vectors(seed=1)
+        store = VectorStore(**store_paths)
+        store.update({f"h{i}": v for i, v in enumerate(matrix)})
+        store.flush()
+        store.convert("pca8")
+
+        reopened = VectorStore(**store_paths)
+        assert reopened.mode == "pca8"
+        assert isinstance(reopened.codec, PCACodec)
+        assert len(reopened["h3"]) == 16
+        assert np.allclose(reopened["h3"], matrix[3], atol=1e-3)
+
+        # 新しいベクトルも元の次元で追加でき、圧縮して保存されること
+        reopened["h_new"] = matrix[5].tolist()
+        reopened.flush()
+        assert len(reopened.get_code("h_new")) == 8
+        assert np.allclose(VectorStore(**store_paths)["h_new"], matrix[5], atol=1e-3)
+
+    def test_pca_batch_compare_accepts_both_widths(self, store_paths, monkeypatch):
+        """PCA 形式でも、元の次元の候補と圧縮コードの候補の両方で比較できること"""
+        matrix = clustered_vectors(seed=2)
+        store = VectorStore(**store_paths)
+        store.update({f"h{i}": v for i, v in enumerate(matrix)})
+        store.flush()
+        store.convert("pca8")
+        monkeypatch.setattr(VectorStore, "_instance", store)
+        engine = VectorEngine.__new__(VectorEngine)  # モデルは読み込まずに比較だけ使うのじゃ
+        engine.debug_mode = False
+
+        keys = [f"h{i}" for i in range(len(matrix))]
+        full = [store[h] for h in keys]
+        codes = store.get_matrix(keys)[1]
+        assert len(full[0]) == 16 and codes.shape[1] == 8
+        from_full = engine.compare_features_batch(matrix[0], full, threshold=0.5)
+        from_codes = engine.compare_features_batch(matrix[0], codes, threshold=0.5)
+        assert from_full[0][0] == 0 and from_codes[0][0] == 0
+        assert [i for i, _ in from_full[:5]] == [i for i, _ in from_codes[:5]]
+
+    def test_pca_empty_store(self, store_paths):
+        """空のストアでは PCA を学習できないこと"""
+        store = VectorStore(**store_paths)
+        with pytest.raises(VectorProcessingError):
+            store.convert("pca8")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
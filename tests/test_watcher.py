@@ -0,0 +1,236 @@
+'''
+test_watcher.py - フォルダ監視のテスト
+作成日: 2026年01月19日
+対象: lib/GazoToolsWatcher.py
+'''
+import pytest
+import os
+import time
+import threading
+from lib.GazoToolsWatcher import (
+    FsEvent, EventCoalescer, PollingBackend, InotifyBackend, FolderWatcher, apply_to_hash_index,
+    ADDED, REMOVED, MODIFIED, RENAMED, _load_libc
+)
+from lib.GazoToolsFolderManifest import FolderManifest
+from lib.GazoToolsHashIndex import HashIndex
+
+
+@pytest.fixture
+def library(tmp_path):
+    """画像1枚と、画像1枚入りの子フォルダ sub があるフォルダを返す"""
+    root = tmp_path / "lib"
+    (root / "sub").mkdir(parents=True)
+    (root / "a.jpg").write_bytes(b"a")
+    (root / "sub" / "b.png").write_bytes(b"b")
+    return root
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    """テスト用のフォルダマニフェストを返す"""
+    return FolderManifest(manifest_file=str(tmp_path / "manifest.json"))
+
+
+def coalesce(*events):
+    """events を順に EventCoalescer に入れ、まとめた結果を返す"""
+    c = EventCoalescer()
+    for e in events:
+        c.add(e)
+    return c.drain()
+
+
+class TestEventCoalescer:
+    """EventCoalescer のテスト"""
+
+    def test_added_then_removed_cancels(self):
+        """追加してすぐ消したものは何も起きなかったことになること"""
+        assert coalesce(FsEvent(ADDED, "/x/a.jpg"), FsEvent(MODIFIED, "/x/a.jpg"),
+                        FsEvent(REMOVED, "/x/a.jpg")) == []
+
+    def test_removed_then_added_is_modified(self):
+        """消してから同じ名前で追加したものは MODIFIED になること"""
+        assert coalesce(FsEvent(REMOVED, "/x/a.jpg"), FsEvent(ADDED, "/x/a.jpg")) == \
+            [FsEvent(MODIFIED, "/x/a.jpg")]
+
+    def test_rename_chain(self):
+        """続けてリネームしたものは最初と最後の名前の1件になること"""
+        assert coalesce(FsEvent(RENAMED, "/x/b.jpg", "/x/a.jpg"), FsEvent(RENAMED, "/x/c.jpg", "/x/b.jpg")) == \
+            [FsEvent(RENAMED, "/x/c.jpg", "/x/a.jpg")]
+        # 元の名前に戻れば何も起きていないのじゃ
+        assert coalesce(FsEvent(RENAMED, "/x/b.jpg", "/x/a.jpg"), FsEvent(RENAMED, "/x/a.jpg", "/x/b.jpg")) == []
+
+    def test_rename_of_new_file_is_added(self):
+        """追加したものをリネームしたら、新しい名前の ADDED になること"""
+        assert coalesce(FsEvent(ADDED, "/x/a.jpg"), FsEvent(RENAMED, "/x/b.jpg", "/x/a.jpg")) == \
+            [FsEvent(ADDED, "/x/b.jpg")]
+
+    def test_rename_over_existing(self):
+        """既存のファイルへ上書きリネームしたら、元の名前の REMOVED と上書き先の MODIFIED になること"""
+        events = coalesce(FsEvent(MODIFIED, "/x/b.jpg"), FsEvent(RENAMED, "/x/b.jpg", "/x/a.jpg"))
+        assert FsEvent(REMOVED, "/x/a.jpg") in events
+        assert FsEvent(MODIFIED, "/x/b.jpg") in events
+
+
+class TestPollingBackend:
+    """PollingBackend のテスト"""
+
+    def test_detects_add_remove_and_new_folder(self, library, manifest):
+        """追加・削除・新しい子フォルダの中身を見つけ、画像以外は無視すること"""
+        backend = PollingBackend(interval=0, manifest=manifest)
+        backend.reset([str(library)], recursive=True)
+        assert backend.read(0) == []
+
+        (library / "c.jpg").write_bytes(b"c")
+        (library / "a.jpg").unlink()
+        (library / "new").mkdir()
+        (library / "new" / "d.gif").write_bytes(b"d")
+        (library / "note.txt").write_bytes(b"t")
+        events = backend.read(0)
+        assert FsEvent(ADDED, str(library / "c.jpg")) in events
+        assert FsEvent(REMOVED, str(library / "a.jpg")) in events
+        assert FsEvent(ADDED, str(library / "new"), is_dir=True) in events
+        assert FsEvent(ADDED, str(library / "new" / "d.gif")) in events
+        assert not any(e.path.endswith("note.txt") for e in events)
+
+    def test_removed_folder(self, library, manifest):
+        """消えた子フォルダはフォルダの REMOVED 1件で知らせること"""
+        backend = PollingBackend(interval=0, manifest=manifest)
+        backend.reset([str(library)])
+        (library / "sub" / "b.png").unlink()
+        (library / "sub").rmdir()
+        assert backend.read(0) == [FsEvent(REMOVED, str(library / "sub"), is_dir=True)]
+        assert backend.read(0) == []
+
+    def test_not_recursive_by_default(self, library, manifest):
+        """子フォルダを含めないときは、子フォルダの中を見回らないこと"""
+        backend = PollingBackend(interval=0, manifest=manifest)
+        backend.reset([str(library)])
+        assert list(backend._dirs) == [str(library)]
+
+        (library / "sub" / "c.jpg").write_bytes(b"c")
+        (library / "new").mkdir()
+        (library / "new" / "d.gif").write_bytes(b"d")
+        events = backend.read(0)
+        assert events == [FsEvent(ADDED, str(library / "new"), is_dir=True)]
+        assert list(backend._dirs) == [str(library)]
+
+
+@pytest.mark.skipif(_load_libc() is None, reason="inotify が使えない環境")
+class TestInotifyBackend:
+    """InotifyBackend のテスト"""
+
+    def read_all(self, backend):
+        """何回か読んで、届いた変化を全部返す"""
+        events = []
+        for _ in range(3):
+            events.extend(backend.read(0.05))
+        return events
+
+    def test_events(self, library, manifest):
+        """追加・子フォルダの中のリネーム・削除を受け取れること"""
+        backend = InotifyBackend(manifest=manifest)
+        try:
+            backend.reset([str(library)], recursive=True)
+            (library / "c.jpg").write_bytes(b"c")
+            os.rename(library / "sub" / "b.png", library / "sub" / "b2.png")
+            (library / "a.jpg").unlink()
+            events = self.read_all(backend)
+            assert FsEvent(ADDED, str(library / "c.jpg")) in events
+            assert FsEvent(RENAMED, str(library / "sub" / "b2.png"), str(library / "sub" / "b.png")) in events
+            assert FsEvent(REMOVED, str(library / "a.jpg")) in events
+        finally:
+            backend.close()
+
+    def test_moved_in_and_out(self, library, tmp_path, manifest):
+        """監視の外との出入りは追加と削除として扱うこと"""
+        outside = tmp_path / "outside"
+        outside.mkdir()
+        (outside / "e.jpg").write_bytes(b"e")
+        backend = InotifyBackend(manifest=manifest)
+        try:
+            backend.reset([str(library)], recursive=True)
+            os.rename(outside / "e.jpg", library / "sub" / "e.jpg")
+            os.rename(library / "a.jpg", outside / "a.jpg")
+            events = self.read_all(backend)
+            assert FsEvent(ADDED, str(library / "sub" / "e.jpg")) in events
+            assert FsEvent(REMOVED, str(library / "a.jpg")) in events
+        finally:
+            backend.close()
+
+    def test_renamed_folder_keeps_watching(self, library, manifest):
+        """リネームした子フォルダも新しいパスで監視を続けること"""
+        backend = InotifyBackend(manifest=manifest)
+        try:
+            backend.reset([str(library)], recursive=True)
+            os.rename(library / "sub", library / "sub2")
+            assert FsEvent(RENAMED, str(library / "sub2"), str(library / "sub"), is_dir=True) in self.read_all(backend)
+            (library / "sub2" / "f.jpg").write_bytes(b"f")
+            assert FsEvent(ADDED, str(library / "sub2" / "f.jpg")) in self.read_all(backend)
+        finally:
+            backend.close()
+
+    def test_not_recursive_by_default(self, library, manifest):
+        """子フォルダを含めないときは、監視を付けるのは現在のフォルダだけであること"""
+        backend = InotifyBackend(manifest=manifest)
+        try:
+            backend.reset([str(library)])
+            assert list(backend._wd_paths.values()) == [str(library)]
+            (library / "sub" / "c.jpg").write_bytes(b"c")
+            (library / "new").mkdir()
+            (library / "new" / "d.gif").write_bytes(b"d")
+            assert self.read_all(backend) == [FsEvent(ADDED, str(library / "new"), is_dir=True)]
+            assert list(backend._wd_paths.values()) == [str(library)]
+        finally:
+            backend.close()
+
+
+class TestFolderWatcher:
+    """FolderWatcher のテスト"""
+
+    def test_debounced_batch(self, library, manifest):
+        """続けて起きた変化を少し待ってから1回にまとめて知らせること"""
+        batches = []
+        done = threading.Event()
+
+        def on_events(events):
+            batches.append(events)
+            done.set()
+
+        watcher = FolderWatcher(on_events, backend=PollingBackend(interval=0.05, manifest=manifest),
+                                debounce=0.3, max_delay=5)
+        watcher.watch([str(library)])
+        watcher.start()
+        try:
+            assert watcher.wait_ready(5)
+            (library / "c.jpg").write_bytes(b"c")
+            time.sleep(0.1)
+            (library / "c.jpg").unlink()
+            (library / "d.jpg").write_bytes(b"d")
+            assert done.wait(5)
+        finally:
+            watcher.stop(5)
+        # 作ってすぐ消えた c.jpg は届かず、1回にまとめて届くのじゃ
+        assert batches == [[FsEvent(ADDED, str(library / "d.jpg"))]]
+
+
+def test_apply_to_hash_index(library, tmp_path):
+    """リネームと削除をハッシュインデックスに反映すること"""
+    index = HashIndex(index_file=str(tmp_path / "hashindex.json"))
+    a = str(library / "a.jpg")
+    b = str(library / "sub" / "b.png")
+    digest = index.get_hash(a)
+    index.get_hash(b)
+
+    os.rename(a, str(library / "a2.jpg"))
+    os.rename(str(library / "sub"), str(library / "sub2"))
+    apply_to_hash_index([FsEvent(RENAMED, str(library / "a2.jpg"), a),
+                         FsEvent(RENAMED, str(library / "sub2"), str(library / "sub"), is_dir=True)], index)
+    assert index.peek(str(library / "a2.jpg")) == digest
+    assert index.peek(str(library / "sub2" / "b.png")) is not None
+
+    apply_to_hash_index([FsEvent(REMOVED, str(library / "sub2"), is_dir=True)], index)
+    assert index.peek(str(library / "sub2" / "b.png")) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])